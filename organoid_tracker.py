@@ -6,6 +6,7 @@ import sys
 
 from organoid_tracker.config import ConfigFile
 from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.image_loading import disk_cached_image_loader
 from organoid_tracker.plugin import plugin_loader, plugin_manager
 from organoid_tracker.gui.main_window import launch_window, mainloop
 from organoid_tracker.plugin.plugin_manager import PluginManager
@@ -15,13 +16,14 @@ from organoid_tracker.visualizer import activate
 # Load plugins
 directory = os.path.dirname(os.path.abspath(__file__))
 plugin_directory = os.path.join(directory, "organoid_tracker_plugins")
-plugins = PluginManager()
+plugins = PluginManager(plugin_manager.STANDARD_PLUGIN_MANIFEST_FILE)
 plugins.load_folder(plugin_directory, built_in_folder=True)
 # Load extra plugins (we don't save the config, otherwise you would end up with a configuration file in every directory
 # where you run the visualizer)
 config = ConfigFile("scripts")
 for extra_plugin_directory in config.get_or_default("extra_plugin_directory", plugin_manager.STANDARD_USER_PLUGIN_FOLDER).split(os.path.pathsep):
     plugins.load_folder(extra_plugin_directory)
+disk_cached_image_loader.configure(config)
 if config.made_value_changes:
     config.save()
 
@@ -31,6 +33,7 @@ if len(sys.argv) > 1:
     for plugin in plugins.get_plugins():
         registered_commands = plugin.get_commands()
         if command in registered_commands:
+            plugins.save_manifest_if_changed()
             exit(registered_commands[command](sys.argv[2:]))
     raise ValueError("Invalid command: " + command)
 
@@ -1,14 +1,20 @@
 """Compares two sets of links on the lineage level. Things like missed cell divisions and cell deaths will be
-reported."""
+reported.
 
-from typing import Optional, Set
+First, the lineage starts of both data sets are matched to each other (see the position_matching module). Then, every
+pair of matched lineages is followed track by track. Lineages are independent of each other, so they are compared in
+parallel."""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
+from organoid_tracker.comparison import position_matching
 from organoid_tracker.comparison.report import ComparisonReport, Category
 from organoid_tracker.core import UserError
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.core.links import Links
+from organoid_tracker.core.links import Links, LinkingTrack
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution
+from organoid_tracker.core.typing import DataType
 
 LINEAGE_END_FALSE_NEGATIVES = Category("Missed lineage ends")
 LINEAGE_END_TRUE_POSITIVES = Category("Correctly detected lineage ends")
@@ -22,39 +28,72 @@ LINEAGE_START_FALSE_NEGATIVES = Category("Missed lineage starts")
 LINEAGE_START_TRUE_POSITIVES = Category("Correctly detected lineage starts")
 
 
-def _find_closest_in(all_positions: Set[Position], search: Position, max_distance_um: float,
-                     resolution: ImageResolution) -> Optional[Position]:
-    closest_position = None
-    closest_distance = float("inf")
-    for position in all_positions:
-        if position.time_point_number() != search.time_point_number():
-            continue
-        distance = position.distance_um(search, resolution)
-        if distance < closest_distance and distance < max_distance_um:
-            closest_distance = distance
-            closest_position = position
-    return closest_position
+# A position in a lineage tree, as a track and a time point number within that track
+_TrackPosition = Tuple[LinkingTrack, int]
+
+
+class _LineageEvents:
+    """Collects the report entries of a single lineage. This allows lineages to be compared in parallel, after which
+    the entries are added to the report in a fixed order."""
+
+    _entries: List[Tuple[Category, Position, Tuple[DataType, ...]]]
+
+    def __init__(self):
+        self._entries = list()
+
+    def add_data(self, category: Category, position: Position, *details: DataType):
+        self._entries.append((category, position, details))
+
+    def add_to_report(self, report: ComparisonReport):
+        for category, position, details in self._entries:
+            report.add_data(category, position, *details)
+
+
+def _get_track_ids(links: Links) -> Dict[int, int]:
+    """Gets the track id of every track, indexed by id(track). Links.get_track_id is a linear search, so that's too
+    slow to call for every track."""
+    return {id(track): track_id for track_id, track in links.find_all_tracks_and_ids()}
+
+
+def _get_position(track_position: _TrackPosition) -> Position:
+    track, time_point_number = track_position
+    return track.find_position_at_time_point_number(time_point_number)
 
 
 class _Comparing:
 
     _resolution: ImageResolution
     _max_distance_um: float
-    _ground_truth: Links
-    _scratch: Links
+    _ground_truth_track_ids: Dict[int, int]
+    _scratch_track_ids: Dict[int, int]
 
     def __init__(self, resolution: ImageResolution, ground_truth: Links, scratch: Links, max_distance_um: float):
         """Creates the comparison object. You need to provide two data sets. Cells are not allowed to move further away
          from each other than max_distance_um."""
         self._resolution = resolution
-        self._ground_truth = ground_truth
-        self._scratch = scratch
+        self._ground_truth_track_ids = _get_track_ids(ground_truth)
+        self._scratch_track_ids = _get_track_ids(scratch)
         self._max_distance_um = max_distance_um
 
-    def compare_lineages(self, report: ComparisonReport, position_ground_truth: Position, position_scratch: Position):
+    def _find_futures(self, track_position: _TrackPosition, track_ids: Dict[int, int]) -> List[_TrackPosition]:
+        """Finds the next position in the track, or the first positions of the next tracks if the track ends. Next
+        tracks are returned in order of their track id."""
+        track, time_point_number = track_position
+        if time_point_number < track.last_time_point_number():
+            return [(track, time_point_number + 1)]
+        next_tracks = sorted(track.get_next_tracks(), key=lambda next_track: track_ids[id(next_track)])
+        return [(next_track, next_track.first_time_point_number()) for next_track in next_tracks]
+
+    def compare_lineages(self, report: _LineageEvents, ground_truth_track: LinkingTrack, scratch_track: LinkingTrack):
+        """Compares the lineages starting at the given tracks."""
+        self._compare_from(report, (ground_truth_track, ground_truth_track.first_time_point_number()),
+                           (scratch_track, scratch_track.first_time_point_number()))
+
+    def _compare_from(self, report: _LineageEvents, ground_truth: _TrackPosition, scratch: _TrackPosition):
         while True:
-            next_ground_truth = list(self._ground_truth.find_futures(position_ground_truth))
-            next_scratch = list(self._scratch.find_futures(position_scratch))
+            position_ground_truth = _get_position(ground_truth)
+            next_ground_truth = self._find_futures(ground_truth, self._ground_truth_track_ids)
+            next_scratch = self._find_futures(scratch, self._scratch_track_ids)
             if len(next_ground_truth) == 0:
                 if len(next_scratch) != 0:
                     report.add_data(LINEAGE_END_FALSE_NEGATIVES, position_ground_truth)
@@ -67,42 +106,46 @@ class _Comparing:
                     report.add_data(DIVISIONS_FALSE_NEGATIVES, position_ground_truth)
                 else:  # So both have len 2
                     report.add_data(DIVISIONS_TRUE_POSITIVES, position_ground_truth)
-                    distance_one_one = next_ground_truth[0].distance_um(next_scratch[0], self._resolution)
-                    distance_one_two = next_ground_truth[0].distance_um(next_scratch[1], self._resolution)
+                    daughter_one = _get_position(next_ground_truth[0])
+                    distance_one_one = daughter_one.distance_um(_get_position(next_scratch[0]), self._resolution)
+                    distance_one_two = daughter_one.distance_um(_get_position(next_scratch[1]), self._resolution)
                     if distance_one_one < distance_one_two:
-                        self.compare_lineages(report, next_ground_truth[0], next_scratch[0])
-                        self.compare_lineages(report, next_ground_truth[1], next_scratch[1])
+                        self._compare_from(report, next_ground_truth[0], next_scratch[0])
+                        self._compare_from(report, next_ground_truth[1], next_scratch[1])
                     else:
-                        self.compare_lineages(report, next_ground_truth[0], next_scratch[1])
-                        self.compare_lineages(report, next_ground_truth[1], next_scratch[0])
+                        self._compare_from(report, next_ground_truth[0], next_scratch[1])
+                        self._compare_from(report, next_ground_truth[1], next_scratch[0])
                 return
 
             # len(next_ground_truth) == 1
             if len(next_scratch) > 1:
-                report.add_data(DIVISIONS_FALSE_POSITIVES, position_ground_truth, "moves to", next_ground_truth[0],
-                                "but was detected as dividing into", next_scratch[0], "and", next_scratch[1])
+                report.add_data(DIVISIONS_FALSE_POSITIVES, position_ground_truth, "moves to",
+                                _get_position(next_ground_truth[0]), "but was detected as dividing into",
+                                _get_position(next_scratch[0]), "and", _get_position(next_scratch[1]))
                 return
             elif len(next_scratch) == 0:
                 report.add_data(LINEAGE_END_FALSE_POSITIVES, position_ground_truth)
                 return
 
             # Both have length 1, continue looking in this lineage
-            position_ground_truth = next_ground_truth[0]
-            position_scratch = next_scratch[0]
+            ground_truth = next_ground_truth[0]
+            scratch = next_scratch[0]
 
             # If the detection data skipped time points, do the same for the ground truth data
-            while position_scratch.time_point_number() > position_ground_truth.time_point_number():
-                next_ground_truth = self._ground_truth.find_futures(position_ground_truth)
+            while scratch[1] > ground_truth[1]:
+                next_ground_truth = self._find_futures(ground_truth, self._ground_truth_track_ids)
                 if len(next_ground_truth) == 0:  # Detection data skipped past a lineage end
-                    report.add_data(LINEAGE_END_FALSE_NEGATIVES, position_ground_truth)
+                    report.add_data(LINEAGE_END_FALSE_NEGATIVES, _get_position(ground_truth))
                     return
                 elif len(next_ground_truth) > 1:  # Detection data skipped past a cell division
-                    report.add_data(DIVISIONS_FALSE_NEGATIVES, position_ground_truth)
+                    report.add_data(DIVISIONS_FALSE_NEGATIVES, _get_position(ground_truth))
                     return
                 else:
-                    position_ground_truth = next_ground_truth.pop()
+                    ground_truth = next_ground_truth[0]
 
             # Check distances
+            position_ground_truth = _get_position(ground_truth)
+            position_scratch = _get_position(scratch)
             distance_um = position_ground_truth.distance_um(position_scratch, self._resolution)
             if distance_um > self._max_distance_um:
                 report.add_data(MOVEMENT_DISAGREEMENT, position_ground_truth, "too far away from the detected position "
@@ -111,25 +154,53 @@ class _Comparing:
             report.add_data(MOVEMENT_TRUE_POSITIVES, position_ground_truth)
 
 
-def compare_links(ground_truth: Experiment, scratch: Experiment, max_distance_um: float = 5) -> ComparisonReport:
+def compare_links(ground_truth: Experiment, scratch: Experiment, max_distance_um: float = 5, *,
+                  workers: int = 4) -> ComparisonReport:
     """Compares two sets of links on the lineage level. Things like missed cell divisions and cell deaths will be
-    reported."""
+    reported. Lineages are compared in parallel using the given number of threads."""
     if not ground_truth.links.has_links() or not scratch.links.has_links():
         raise UserError("Linking data is missing", "One of the data sets has no linking data available.")
 
     report = ComparisonReport()
     report.title = "Links comparison"
-    comparing = _Comparing(ground_truth.images.resolution(), ground_truth.links, scratch.links, max_distance_um)
-    lineage_starts_ground_truth = ground_truth.links.find_appeared_positions()
-    lineage_starts_scratch = set(scratch.links.find_appeared_positions())
-    for lineage_start_ground_truth in lineage_starts_ground_truth:
-        lineage_start_scratch = _find_closest_in(lineage_starts_scratch, lineage_start_ground_truth, max_distance_um,
-                                                 ground_truth.images.resolution())
-        if lineage_start_scratch is None:
-            report.add_data(LINEAGE_START_FALSE_NEGATIVES, lineage_start_ground_truth)
+    resolution = ground_truth.images.resolution()
+    comparing = _Comparing(resolution, ground_truth.links, scratch.links, max_distance_um)
+
+    # Match the lineage starts to each other, so that every lineage in the scratch data is compared to at most one
+    # lineage in the ground truth
+    starting_tracks_ground_truth = list(ground_truth.links.find_starting_tracks())
+    starting_tracks_scratch = list(scratch.links.find_starting_tracks())
+    start_matching = position_matching.match_position_lists(
+        [track.find_first_position() for track in starting_tracks_ground_truth],
+        [track.find_first_position() for track in starting_tracks_scratch], resolution, max_distance_um,
+        workers=workers)
+    starting_tracks_scratch_by_position = {track.find_first_position().to_dict_key(): track
+                                           for track in starting_tracks_scratch}
+    matched_starting_tracks_scratch = list()
+    for track in starting_tracks_ground_truth:
+        scratch_start = start_matching.get_scratch_position(track.find_first_position())
+        matched_starting_tracks_scratch.append(None if scratch_start is None
+                                               else starting_tracks_scratch_by_position[scratch_start.to_dict_key()])
+
+    def compare_lineage(tracks: Tuple[LinkingTrack, Optional[LinkingTrack]]) -> Optional[_LineageEvents]:
+        ground_truth_track, scratch_track = tracks
+        if scratch_track is None:
+            return None
+        events = _LineageEvents()
+        comparing.compare_lineages(events, ground_truth_track, scratch_track)
+        return events
+
+    track_pairs = list(zip(starting_tracks_ground_truth, matched_starting_tracks_scratch))
+    if workers <= 1:
+        all_events = [compare_lineage(track_pair) for track_pair in track_pairs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            all_events = list(executor.map(compare_lineage, track_pairs))
+
+    for ground_truth_track, events in zip(starting_tracks_ground_truth, all_events):
+        if events is None:
+            report.add_data(LINEAGE_START_FALSE_NEGATIVES, ground_truth_track.find_first_position())
             continue
-        # Make sure no other lineage can compare itself to this track
-        lineage_starts_scratch.remove(lineage_start_scratch)
-        report.add_data(LINEAGE_START_TRUE_POSITIVES, lineage_start_ground_truth)
-        comparing.compare_lineages(report, lineage_start_ground_truth, lineage_start_scratch)
+        report.add_data(LINEAGE_START_TRUE_POSITIVES, ground_truth_track.find_first_position())
+        events.add_to_report(report)
     return report
@@ -1,15 +1,17 @@
 """Compares two sets of links on the level of individual links. Missed cell divisions/deaths are not reported. Instead,
-for every link in the baseline data, it is checked if it is present in the automatic data, and vice versa."""
-from typing import Iterable, Optional, Tuple, Set
+for every link in the baseline data, it is checked if it is present in the automatic data, and vice versa.
 
-import math
+The comparison happens in two phases. First, the positions of both experiments are matched one-to-one (see the
+position_matching module). Then, every link is translated to the other experiment using that matching, and looked up
+in the set of links of the other experiment."""
+from typing import Dict, List, Optional, Set, Tuple
 
+from organoid_tracker.comparison import position_matching
 from organoid_tracker.comparison.report import Category, ComparisonReport, Statistics
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.core.links import Links
+from organoid_tracker.core.images import Images
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.typing import DataType
-from organoid_tracker.linking import nearby_position_finder
 
 LINKS_FALSE_NEGATIVES = Category("Missed links")
 LINKS_TRUE_POSITIVES = Category("Correctly detected links")
@@ -30,98 +32,104 @@ class LinksReport(ComparisonReport):
         return self.calculate_z_statistics(LINKS_TRUE_POSITIVES, LINKS_FALSE_POSITIVES, LINKS_FALSE_NEGATIVES)
 
 
-def _find_close_positions(position: Position, experiment: Experiment, max_distance: float) -> Set[Position]:
-    all_positions = experiment.positions.of_time_point(position.time_point())
-    resolution = experiment.images.resolution()
-    return nearby_position_finder.find_closest_n_positions(all_positions, around=position, resolution=resolution,
-                                                           max_amount=3, max_distance_um=max_distance, ignore_self=False)
+class _InsideImageChecker:
+    """Checks whether positions are far enough from the image edge. Every position is only checked once, even if it
+    is part of multiple links."""
 
-class _Link:
-    """A link, that keeps it arbitrariy which is pos1 and which is pos2"""
-    pos1: Position
-    pos2: Position
+    _images: Images
+    _margin_xy_px: int
+    _cache: Dict[str, Optional[bool]]  # Indexed by Position.to_dict_key()
 
-    def __init__(self, pos1: Position, pos2: Position):
-        self.pos1 = pos1
-        self.pos2 = pos2
+    def __init__(self, images: Images, margin_xy_px: int):
+        self._images = images
+        self._margin_xy_px = margin_xy_px
+        self._cache = dict()
 
-    def __hash__(self):
-        return hash(self.pos1) + hash(self.pos2)
+    def is_inside(self, position: Position) -> Optional[bool]:
+        """Returns None if there are no images."""
+        if self._margin_xy_px < 0:
+            return True  # No margin checking
+        key = position.to_dict_key()
+        if key in self._cache:
+            return self._cache[key]
+        inside = self._images.is_inside_image(position, margin_xy=self._margin_xy_px)
+        self._cache[key] = inside
+        return inside
 
-    def __eq__(self, other):
-        if not isinstance(other, _Link):
-            return False
-        return (other.pos1 == self.pos1 and other.pos2 == self.pos2) or (other.pos1 == self.pos2 and other.pos2 == self.pos1)
 
+def _to_link_key(position1: Optional[Position], position2: Optional[Position]) -> Optional[Tuple[str, str]]:
+    """Position.__hash__ only uses the x coordinate, so for large sets of links we use Position.to_dict_key() instead.
+    Returns None if any of the positions is None."""
+    if position1 is None or position2 is None:
+        return None
+    return position1.to_dict_key(), position2.to_dict_key()
 
-def _get_link(links: Links, positions1: Iterable[Position], positions2: Iterable[Position],
-              forbidden_links: Set[_Link]
-              ) -> Optional[_Link]:
-    for position1 in positions1:
-        for position2 in positions2:
-            if links.contains_link(position1, position2) and _Link(position1, position2) not in forbidden_links:
-                return _Link(position1, position2)
-    return None
 
+def _to_link_keys(links: List[Tuple[Position, Position]]) -> Set[Tuple[str, str]]:
+    return {(position1.to_dict_key(), position2.to_dict_key()) for position1, position2 in links}
 
-def compare_links(ground_truth: Experiment, scratch: Experiment, max_distance_um: float = 5, margin_xy_px: int = 0) -> LinksReport:
-    images = ground_truth.images
+
+def compare_links(ground_truth: Experiment, scratch: Experiment, max_distance_um: float = 5, margin_xy_px: int = 0,
+                  *, workers: int = 4) -> LinksReport:
+    """Checks for every link in the ground truth whether it's also in the scratch data, and vice versa. Positions are
+    matched using position_matching.match_positions, which processes time points in parallel using the given number of
+    threads."""
+    inside_checker = _InsideImageChecker(ground_truth.images, margin_xy_px)
     result = LinksReport(max_distance_um=max_distance_um, margin_xy_px=margin_xy_px)
 
+    # Phase 1: match the positions
+    matching = position_matching.match_positions(ground_truth, scratch, max_distance_um, workers=workers)
+
+    # Phase 2: compare the links. Links are stored as (earliest, latest), so translated links can be looked up directly
+    ground_truth_links = list(ground_truth.links.find_all_links())
+    scratch_links = list(scratch.links.find_all_links())
+    ground_truth_link_keys = _to_link_keys(ground_truth_links)
+    scratch_link_keys = _to_link_keys(scratch_links)
+
     # Check if all baseline links exist
-    used_scratch_links = set()
-    for position1, position2 in ground_truth.links.find_all_links():
-        if margin_xy_px >= 0:
-            inside1 = images.is_inside_image(position1, margin_xy=margin_xy_px)
-            inside2 = images.is_inside_image(position2, margin_xy=margin_xy_px)
-            if inside1 is None or inside2 is None:
-                raise ValueError("Could not check whether positions are in images.")
-            if not inside1 or not inside2:
-                continue  # Too close to edge, ignore
-
-        scratch_positions1 = _find_close_positions(position1, scratch, max_distance_um)
-        scratch_positions2 = _find_close_positions(position2, scratch, max_distance_um)
-        found_scratch_link = _get_link(scratch.links, scratch_positions1, scratch_positions2, used_scratch_links)
-        if found_scratch_link is not None:
+    for position1, position2 in ground_truth_links:
+        inside1 = inside_checker.is_inside(position1)
+        inside2 = inside_checker.is_inside(position2)
+        if inside1 is None or inside2 is None:
+            raise ValueError("Could not check whether positions are in images.")
+        if not inside1 or not inside2:
+            continue  # Too close to edge, ignore
+
+        scratch_position1 = matching.get_scratch_position(position1)
+        scratch_position2 = matching.get_scratch_position(position2)
+        if _to_link_key(scratch_position1, scratch_position2) in scratch_link_keys:
             # True positive
-            used_scratch_links.add(found_scratch_link)
             result.add_data(LINKS_TRUE_POSITIVES, position1, "is linked to", position2)
         else:
             # False negative
-            if len(scratch_positions1) == 0:
-                if len(scratch_positions2) == 0:
+            if scratch_position1 is None:
+                if scratch_position2 is None:
                     result.add_data(LINKS_FALSE_NEGATIVES, position1, "has mistakenly no link to", position2, ": the automatic data doesn't contain these positions")
                 else:
                     result.add_data(LINKS_FALSE_NEGATIVES, position1, "has mistakenly no link to", position2, ": the automatic data doesn't contain the first position")
-            elif len(scratch_positions2) == 0:
+            elif scratch_position2 is None:
                 result.add_data(LINKS_FALSE_NEGATIVES, position1, "has mistakenly no link to", position2, ": the automatic data doesn't contain the second position")
             else:
                 result.add_data(LINKS_FALSE_NEGATIVES, position1, "has mistakenly no link to", position2, " even though both positions exist in the automatic data")
 
     # Check if all scratch links are real
-    used_ground_truth_links = set()
-    for position1, position2 in scratch.links.find_all_links():
-        if margin_xy_px >= 0:
-            if not images.is_inside_image(position1, margin_xy=margin_xy_px) \
-                    or not images.is_inside_image(position2, margin_xy=margin_xy_px):
-                continue  # Too close to edge, ignore
-
-        ground_truth_positions1 = _find_close_positions(position1, ground_truth, max_distance_um)
-        ground_truth_positions2 = _find_close_positions(position2, ground_truth, max_distance_um)
-        found_ground_truth_link = _get_link(ground_truth.links, ground_truth_positions1, ground_truth_positions2,
-                                            used_ground_truth_links)
-        if found_ground_truth_link is not None:
+    for position1, position2 in scratch_links:
+        if not inside_checker.is_inside(position1) or not inside_checker.is_inside(position2):
+            continue  # Too close to edge, ignore
+
+        ground_truth_position1 = matching.get_ground_truth_position(position1)
+        ground_truth_position2 = matching.get_ground_truth_position(position2)
+        if _to_link_key(ground_truth_position1, ground_truth_position2) in ground_truth_link_keys:
             # True positive, already detected in earlier loop
-            used_ground_truth_links.add(found_ground_truth_link)
             pass
         else:
             # False positive or rejection
-            if len(ground_truth_positions1) == 0 and len(ground_truth_positions2) == 0:
+            if ground_truth_position1 is None and ground_truth_position2 is None:
                 result.add_data(REJECTED, position1, "has no link to ", position2, "because of missing positions")
-            elif len(ground_truth_positions1) == 0:
+            elif ground_truth_position1 is None:
                 result.add_data(LINKS_FALSE_POSITIVES, position1, "was linked to", position2, " even though the former"
                                 " position does not exist in the ground truth")
-            elif len(ground_truth_positions2) == 0:
+            elif ground_truth_position2 is None:
                 result.add_data(LINKS_FALSE_POSITIVES, position1, "was linked to", position2, " even though the latter"
                                 " position does not exist in the ground truth")
             else:
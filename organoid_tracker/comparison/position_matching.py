@@ -0,0 +1,274 @@
+"""Matches the positions of two experiments (for example a ground truth and the output of a tracking algorithm) to each
+other, one time point at a time. Every position is matched to at most one position in the other experiment.
+
+The matching is optimal: first, the number of matched positions is maximized, and then the total distance of the
+matched positions is minimized. Positions further apart than max_distance_um are never matched. So unlike greedy
+matching, the result doesn't depend on the order in which positions are visited.
+
+>>> from organoid_tracker.core.experiment import Experiment
+>>> ground_truth = Experiment()  # Placeholder
+>>> scratch = Experiment()  # Placeholder
+>>> matching = match_positions(ground_truth, scratch, max_distance_um=5)
+>>> for position in ground_truth.positions:
+...     print(position, "matches", matching.get_scratch_position(position))
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Iterable
+
+import numpy
+from numpy import ndarray
+
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.position import Position
+from organoid_tracker.core.resolution import ImageResolution
+
+# Groups with a larger dense cost matrix (rows times columns) are solved using a sparse solver instead, as the dense
+# matrices of a large group (like a densely packed organoid where every position is close to another one) would use
+# hundreds of megabytes
+_MAX_DENSE_SIZE = 1_000_000
+
+
+class TimePointMatching:
+    """The matching of the positions of a single time point. The indices refer to the position lists."""
+
+    ground_truth_positions: List[Position]
+    scratch_positions: List[Position]
+
+    # For every ground truth position the index of the matched scratch position, or -1 if there's no match
+    scratch_index_of_ground_truth: ndarray
+    ground_truth_index_of_scratch: ndarray  # Same, but the other way around
+
+    # Distance to the nearest position in the other experiment (matched or not), or inf if there are no positions
+    ground_truth_nearest_distance_um: ndarray
+    scratch_nearest_distance_um: ndarray
+
+    def __init__(self, ground_truth_positions: List[Position], scratch_positions: List[Position],
+                 scratch_index_of_ground_truth: ndarray, ground_truth_index_of_scratch: ndarray,
+                 ground_truth_nearest_distance_um: ndarray, scratch_nearest_distance_um: ndarray):
+        self.ground_truth_positions = ground_truth_positions
+        self.scratch_positions = scratch_positions
+        self.scratch_index_of_ground_truth = scratch_index_of_ground_truth
+        self.ground_truth_index_of_scratch = ground_truth_index_of_scratch
+        self.ground_truth_nearest_distance_um = ground_truth_nearest_distance_um
+        self.scratch_nearest_distance_um = scratch_nearest_distance_um
+
+    def matched_pairs(self) -> Iterable[Tuple[Position, Position]]:
+        """Iterates over all (ground truth, scratch) position pairs that were matched."""
+        for ground_truth_index in numpy.flatnonzero(self.scratch_index_of_ground_truth >= 0).tolist():
+            yield (self.ground_truth_positions[ground_truth_index],
+                   self.scratch_positions[self.scratch_index_of_ground_truth[ground_truth_index]])
+
+
+class PositionMatching:
+    """The matching of all positions of two experiments."""
+
+    _by_time_point: Dict[int, TimePointMatching]
+
+    # Keyed by Position.to_dict_key(), as Position.__hash__ only uses the x coordinate, which gives lots of collisions
+    _scratch_by_ground_truth: Dict[str, Position]
+    _ground_truth_by_scratch: Dict[str, Position]
+
+    def __init__(self, by_time_point: Dict[int, TimePointMatching]):
+        self._by_time_point = by_time_point
+        self._scratch_by_ground_truth = dict()
+        self._ground_truth_by_scratch = dict()
+        for time_point_matching in by_time_point.values():
+            for ground_truth_position, scratch_position in time_point_matching.matched_pairs():
+                self._scratch_by_ground_truth[ground_truth_position.to_dict_key()] = scratch_position
+                self._ground_truth_by_scratch[scratch_position.to_dict_key()] = ground_truth_position
+
+    def of_time_point_number(self, time_point_number: int) -> Optional[TimePointMatching]:
+        """Gets the matching of a single time point. Returns None if neither experiment has positions there."""
+        return self._by_time_point.get(time_point_number)
+
+    def time_point_numbers(self) -> List[int]:
+        """Gets all time point numbers for which a matching was made, in order."""
+        return sorted(self._by_time_point.keys())
+
+    def get_scratch_position(self, ground_truth_position: Position) -> Optional[Position]:
+        """Gets the scratch position that was matched to the given ground truth position, or None if there is none."""
+        return self._scratch_by_ground_truth.get(ground_truth_position.to_dict_key())
+
+    def get_ground_truth_position(self, scratch_position: Position) -> Optional[Position]:
+        """Gets the ground truth position that was matched to the given scratch position, or None if there is none."""
+        return self._ground_truth_by_scratch.get(scratch_position.to_dict_key())
+
+
+def match_positions(ground_truth: Experiment, scratch: Experiment, max_distance_um: float, *,
+                    workers: int = 4) -> PositionMatching:
+    """Matches the positions of both experiments, using the resolution of the ground truth. Time points are processed
+    in parallel using the given number of threads."""
+    ground_truth_by_time_point = {time_point.time_point_number(): list(ground_truth.positions.of_time_point(time_point))
+                                  for time_point in ground_truth.positions.time_points()}
+    scratch_by_time_point = {time_point.time_point_number(): list(scratch.positions.of_time_point(time_point))
+                             for time_point in scratch.positions.time_points()}
+    return _match_by_time_point(ground_truth_by_time_point, scratch_by_time_point, ground_truth.images.resolution(),
+                                max_distance_um, workers)
+
+
+def match_position_lists(ground_truth_positions: Iterable[Position], scratch_positions: Iterable[Position],
+                         resolution: ImageResolution, max_distance_um: float, *, workers: int = 4) -> PositionMatching:
+    """Like match_positions, but only matches the given positions. Useful if you only want to match for example the
+    first positions of all lineages."""
+    return _match_by_time_point(_group_by_time_point(ground_truth_positions), _group_by_time_point(scratch_positions),
+                                resolution, max_distance_um, workers)
+
+
+def _group_by_time_point(positions: Iterable[Position]) -> Dict[int, List[Position]]:
+    by_time_point = dict()
+    for position in positions:
+        time_point_number = position.time_point_number()
+        positions_of_time_point = by_time_point.get(time_point_number)
+        if positions_of_time_point is None:
+            by_time_point[time_point_number] = [position]
+        else:
+            positions_of_time_point.append(position)
+    return by_time_point
+
+
+def _match_by_time_point(ground_truth_by_time_point: Dict[int, List[Position]],
+                         scratch_by_time_point: Dict[int, List[Position]], resolution: ImageResolution,
+                         max_distance_um: float, workers: int) -> PositionMatching:
+    time_point_numbers = sorted(ground_truth_by_time_point.keys() | scratch_by_time_point.keys())
+
+    def match_time_point(time_point_number: int) -> TimePointMatching:
+        return _match_time_point(ground_truth_by_time_point.get(time_point_number, []),
+                                 scratch_by_time_point.get(time_point_number, []), resolution, max_distance_um)
+
+    if workers <= 1:
+        results = [match_time_point(time_point_number) for time_point_number in time_point_numbers]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(match_time_point, time_point_numbers))
+    return PositionMatching(dict(zip(time_point_numbers, results)))
+
+
+def _to_coords_um(positions: List[Position], resolution: ImageResolution) -> ndarray:
+    coords = numpy.array([(position.x, position.y, position.z) for position in positions],
+                         dtype=numpy.float64).reshape(-1, 3)
+    pixel_size_z_um, pixel_size_y_um, pixel_size_x_um = resolution.pixel_size_zyx_um
+    return coords * numpy.array([pixel_size_x_um, pixel_size_y_um, pixel_size_z_um])
+
+
+def _match_time_point(ground_truth_positions: List[Position], scratch_positions: List[Position],
+                      resolution: ImageResolution, max_distance_um: float) -> TimePointMatching:
+    from scipy.spatial import cKDTree
+
+    scratch_index_of_ground_truth = numpy.full(len(ground_truth_positions), -1, dtype=numpy.int64)
+    ground_truth_index_of_scratch = numpy.full(len(scratch_positions), -1, dtype=numpy.int64)
+    ground_truth_nearest_distance_um = numpy.full(len(ground_truth_positions), numpy.inf)
+    scratch_nearest_distance_um = numpy.full(len(scratch_positions), numpy.inf)
+
+    if len(ground_truth_positions) > 0 and len(scratch_positions) > 0:
+        ground_truth_tree = cKDTree(_to_coords_um(ground_truth_positions, resolution))
+        scratch_tree = cKDTree(_to_coords_um(scratch_positions, resolution))
+        ground_truth_nearest_distance_um, _ = scratch_tree.query(ground_truth_tree.data)
+        scratch_nearest_distance_um, _ = ground_truth_tree.query(scratch_tree.data)
+
+        # Only pairs within the maximum distance are candidates
+        candidates = ground_truth_tree.sparse_distance_matrix(scratch_tree, max_distance_um, output_type="ndarray")
+        ground_truth_indices, scratch_indices = _solve_assignment(candidates["i"], candidates["j"], candidates["v"],
+                                                                  max_distance_um)
+        scratch_index_of_ground_truth[ground_truth_indices] = scratch_indices
+        ground_truth_index_of_scratch[scratch_indices] = ground_truth_indices
+
+    return TimePointMatching(ground_truth_positions, scratch_positions, scratch_index_of_ground_truth,
+                             ground_truth_index_of_scratch, ground_truth_nearest_distance_um,
+                             scratch_nearest_distance_um)
+
+
+def _solve_assignment(rows: ndarray, columns: ndarray, distances: ndarray, max_distance_um: float
+                      ) -> Tuple[ndarray, ndarray]:
+    """Solves the sparse assignment problem. Returns the matched rows and the matched columns. Maximizes the number of
+    matches first, and only then minimizes the total distance."""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    if len(rows) == 0:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+
+    # Only rows and columns with candidates take part, which keeps the problem small
+    used_rows, rows = numpy.unique(rows, return_inverse=True)
+    used_columns, columns = numpy.unique(columns, return_inverse=True)
+    row_count, column_count = len(used_rows), len(used_columns)
+
+    # Positions that cannot reach each other don't influence each other's matching, so we solve every connected group
+    # of candidates separately. Most of those groups are just a single pair, which needs no solving at all
+    size = row_count + column_count
+    graph = coo_matrix((numpy.ones(len(rows)), (rows, row_count + columns)), shape=(size, size))
+    _, labels = connected_components(graph, directed=False)
+    edge_labels = labels[rows]
+    edge_counts = numpy.bincount(edge_labels)
+    is_single_pair = edge_counts[edge_labels] == 1
+    matched_rows = [rows[is_single_pair]]
+    matched_columns = [columns[is_single_pair]]
+
+    multi_edges = numpy.flatnonzero(~is_single_pair)
+    multi_edges = multi_edges[numpy.argsort(edge_labels[multi_edges], kind="stable")]
+    group_starts = numpy.flatnonzero(numpy.diff(edge_labels[multi_edges], prepend=-1))
+    for edges in numpy.split(multi_edges, group_starts[1:]):
+        group_row_count = len(numpy.unique(rows[edges]))
+        group_column_count = len(numpy.unique(columns[edges]))
+        solve = _solve_dense_assignment if group_row_count * group_column_count <= _MAX_DENSE_SIZE \
+            else _solve_sparse_assignment
+        group_rows, group_columns = solve(rows[edges], columns[edges], distances[edges], max_distance_um)
+        matched_rows.append(group_rows)
+        matched_columns.append(group_columns)
+
+    return used_rows[numpy.concatenate(matched_rows)], used_columns[numpy.concatenate(matched_columns)]
+
+
+def _solve_dense_assignment(rows: ndarray, columns: ndarray, distances: ndarray, max_distance_um: float
+                            ) -> Tuple[ndarray, ndarray]:
+    """Solves a small assignment problem using a dense cost matrix."""
+    from scipy.optimize import linear_sum_assignment
+
+    local_rows, rows_inverse = numpy.unique(rows, return_inverse=True)
+    local_columns, columns_inverse = numpy.unique(columns, return_inverse=True)
+
+    # Every candidate pair gets a large bonus, so that it's always better to make one more match, regardless of the
+    # distances. Non-candidate pairs cost nothing, and are removed from the result afterwards
+    bonus = (max_distance_um + 1) * (min(len(local_rows), len(local_columns)) + 1)
+    costs = numpy.zeros((len(local_rows), len(local_columns)))
+    is_candidate = numpy.zeros(costs.shape, dtype=bool)
+    costs[rows_inverse, columns_inverse] = distances - bonus
+    is_candidate[rows_inverse, columns_inverse] = True
+
+    assigned_rows, assigned_columns = linear_sum_assignment(costs)
+    is_real = is_candidate[assigned_rows, assigned_columns]
+    return local_rows[assigned_rows[is_real]], local_columns[assigned_columns[is_real]]
+
+
+def _solve_sparse_assignment(rows: ndarray, columns: ndarray, distances: ndarray, max_distance_um: float
+                             ) -> Tuple[ndarray, ndarray]:
+    """Solves a large assignment problem using only the candidate pairs. Gives the same result as
+    _solve_dense_assignment."""
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+    local_rows, rows_inverse = numpy.unique(rows, return_inverse=True)
+    local_columns, columns_inverse = numpy.unique(columns, return_inverse=True)
+    row_count, column_count = len(local_rows), len(local_columns)
+
+    # The sparse solver needs a matching where every row is used, so every row gets a dummy column and every column a
+    # dummy row. Matching to a dummy means being unmatched, and costs a large penalty, so that it's always better to make
+    # one more match, regardless of the distances. A dummy row and a dummy column can be matched to each other if the
+    # real row and column form a candidate pair, which frees those up for matching to each other.
+    # The solver can loop forever on fractional costs, so we work in whole nanometers. It also drops zero costs, so
+    # every cost gets an extra micrometer
+    costs_nm = numpy.round(distances * 1000) + 1000
+    penalty_nm = (round(max_distance_um * 1000) + 2000) * (min(row_count, column_count) + 1)
+    candidate_count = len(rows_inverse)
+    size = row_count + column_count
+    matrix_rows = numpy.concatenate([rows_inverse, numpy.arange(row_count),
+                                     row_count + numpy.arange(column_count), row_count + columns_inverse])
+    matrix_columns = numpy.concatenate([columns_inverse, column_count + numpy.arange(row_count),
+                                        numpy.arange(column_count), column_count + rows_inverse])
+    costs = numpy.concatenate([costs_nm, numpy.full(size, penalty_nm, dtype=numpy.float64),
+                               numpy.full(candidate_count, 1000.0)])
+    graph = csr_matrix((costs, (matrix_rows, matrix_columns)), shape=(size, size))
+
+    _, assigned_columns = min_weight_full_bipartite_matching(graph)
+    assigned_columns = assigned_columns[:row_count]
+    is_real = assigned_columns < column_count
+    return local_rows[is_real], local_columns[assigned_columns[is_real]]
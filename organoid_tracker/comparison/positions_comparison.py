@@ -1,6 +1,6 @@
+from organoid_tracker.comparison import position_matching
 from organoid_tracker.comparison.report import ComparisonReport, Category, Statistics
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.linking.nearby_position_finder import find_close_positions, find_closest_position
 
 _DETECTIONS_FALSE_NEGATIVES = Category("Missed detections")
 _DETECTIONS_TRUE_POSITIVES = Category("Found detections")
@@ -24,39 +24,43 @@ class DetectionReport(ComparisonReport):
 
 
 def compare_positions(ground_truth: Experiment, scratch: Experiment, max_distance_um: float = 5,
-                      rejection_distance_um: float = 5) -> DetectionReport:
-    """Checks how much the positions in the ground truth match with the given data."""
-    resolution = ground_truth.images.resolution()
+                      rejection_distance_um: float = 5, *, workers: int = 4) -> DetectionReport:
+    """Checks how much the positions in the ground truth match with the given data. The positions are matched one-to-one
+    using an optimal assignment, see the position_matching module. Time points are matched in parallel using the
+    given number of threads."""
+    matching = position_matching.match_positions(ground_truth, scratch, max_distance_um, workers=workers)
 
     report = DetectionReport(max_distance_um=max_distance_um, rejection_distance_um=rejection_distance_um)
     report.summary = f"Comparison of two sets of positions. The ground truth was named \"{ground_truth.name}\", the" \
                      f" comparision object was named \"{scratch.name}\"."
 
-    for time_point in ground_truth.time_points():
-        baseline_positions = set(ground_truth.positions.of_time_point(time_point))
-        if len(baseline_positions) == 0:
+    for time_point_number in matching.time_point_numbers():
+        time_point_matching = matching.of_time_point_number(time_point_number)
+        if len(time_point_matching.ground_truth_positions) == 0:
             continue  # Nothing to compare for this time point
 
-        scratch_positions = set(scratch.positions.of_time_point(time_point))
-        for baseline_position in baseline_positions:
-            nearest_in_scratch = find_close_positions(scratch_positions, around=baseline_position, tolerance=1,
-                                                      resolution=resolution)
-            if len(nearest_in_scratch) == 0:
+        for baseline_position, scratch_index, distance_um in zip(
+                time_point_matching.ground_truth_positions,
+                time_point_matching.scratch_index_of_ground_truth.tolist(),
+                time_point_matching.ground_truth_nearest_distance_um.tolist()):
+            if scratch_index >= 0:
+                report.add_data(_DETECTIONS_TRUE_POSITIVES, baseline_position)
+            elif len(time_point_matching.scratch_positions) == 0:
                 report.add_data(_DETECTIONS_FALSE_NEGATIVES, baseline_position, "No candidates in the scratch data left.")
-                continue
-            distance_um = baseline_position.distance_um(nearest_in_scratch[0], resolution)
-            if distance_um > max_distance_um:
-                report.add_data(_DETECTIONS_FALSE_NEGATIVES, baseline_position, f"Nearest cell was {distance_um:0.1f} um away")
-                continue
-            scratch_positions.remove(nearest_in_scratch[0])
-            report.add_data(_DETECTIONS_TRUE_POSITIVES, baseline_position)
+            elif distance_um <= max_distance_um:
+                report.add_data(_DETECTIONS_FALSE_NEGATIVES, baseline_position,
+                                f"Nearest cell was {distance_um:0.1f} um away, but was matched to another cell")
+            else:
+                report.add_data(_DETECTIONS_FALSE_NEGATIVES, baseline_position,
+                                f"Nearest cell was {distance_um:0.1f} um away")
 
         # Only the scratch positions with no corresponding baseline position are left
-        baseline_positions = set(ground_truth.positions.of_time_point(time_point))
-        for scratch_position in scratch_positions:
-            nearest_in_baseline = find_closest_position(baseline_positions, around=scratch_position,
-                                                        resolution=resolution)
-            distance_um = scratch_position.distance_um(nearest_in_baseline, resolution)
+        for scratch_position, baseline_index, distance_um in zip(
+                time_point_matching.scratch_positions,
+                time_point_matching.ground_truth_index_of_scratch.tolist(),
+                time_point_matching.scratch_nearest_distance_um.tolist()):
+            if baseline_index >= 0:
+                continue
             if distance_um > rejection_distance_um:
                 report.add_data(_DETECTIONS_REJECTED, scratch_position,
                                 f"Nearest ground-truth cell was {distance_um:0.1f} um away")
@@ -3,12 +3,12 @@ from typing import Union, Dict, List, Optional, Tuple, Iterable
 import numpy
 from numpy import ndarray
 
-from organoid_tracker.core import TimePoint, min_none, max_none
-from organoid_tracker.core.position_collection import PositionCollection
+from organoid_tracker.core import TimePoint
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.typing import DataType
 
 _MAX_SHOWN = 15
+_MAX_DIFFERENCE = 0.01  # Positions closer than this on every axis are the same, see Position.__eq__
 
 
 class Category:
@@ -108,48 +108,216 @@ class Details:
         return "Details(" + " ".join(repr(detail) for detail in self._details) + ")"
 
 
+def _split_into_runs(run_ids: ndarray, values: ndarray, max_difference: float) -> ndarray:
+    """Splits the given runs further, such that within a run, the sorted values are at most max_difference apart.
+    Returns the new run ids, which are numbered from 0."""
+    order = numpy.lexsort((values, run_ids))
+    sorted_values = values[order]
+    is_run_start = numpy.ones(len(order), dtype=bool)
+    is_run_start[1:] = (run_ids[order][1:] != run_ids[order][:-1]) \
+        | (sorted_values[1:] - sorted_values[:-1] > max_difference)
+    new_run_ids = numpy.empty(len(order), dtype=numpy.int64)
+    new_run_ids[order] = numpy.cumsum(is_run_start) - 1
+    return new_run_ids
+
+
 class ComparisonReport:
+    """A report of a comparison, in which positions are placed in categories. Every position can be in a category only
+    once. Optionally, details can be attached to a position in a category.
+
+    The entries are stored as columns (category, time point, x, y, z and details index), so that reports of millions of
+    entries remain fast to query. New entries are first collected in a list, and are moved to the columns on the next
+    query."""
+
     title: str = "Comparison"
     summary: str = ""
     _recorded_parameters: Dict[str, DataType]
-    _details_by_category_and_position: Dict[Category, Dict[Position, Details]]
-    _positions_by_category: Dict[Category, PositionCollection]
+
+    _categories: List[Category]  # The id of a category is the index in this list
+    _category_ids: Dict[Category, int]
+
+    # The columns. For entries without details, the details index is -1
+    _category_id_column: ndarray
+    _time_point_column: ndarray
+    _xyz_column: ndarray  # Shape (N, 3)
+    _details_index_column: ndarray
+    _details: List[Details]  # Indexed by the details index
+
+    _pending_entries: List[Tuple[int, int, float, float, float, int]]  # Not yet added to the columns
+    _rows_by_category_id: Dict[int, ndarray]  # Cached, rows of each category sorted by time point
 
     def __init__(self, **parameters: DataType):
         self._recorded_parameters = parameters
-        self._details_by_category_and_position = dict()
-        self._positions_by_category = dict()
+        self._categories = list()
+        self._category_ids = dict()
+        self._category_id_column = numpy.zeros(0, dtype=numpy.int32)
+        self._time_point_column = numpy.zeros(0, dtype=numpy.int32)
+        self._xyz_column = numpy.zeros((0, 3), dtype=numpy.float64)
+        self._details_index_column = numpy.zeros(0, dtype=numpy.int64)
+        self._details = list()
+        self._pending_entries = list()
+        self._rows_by_category_id = dict()
+
+    def _get_category_id(self, category: Category, *, create: bool) -> Optional[int]:
+        category_id = self._category_ids.get(category)
+        if category_id is None and create:
+            category_id = len(self._categories)
+            self._categories.append(category)
+            self._category_ids[category] = category_id
+        return category_id
 
     def add_data(self, category: Category, position: Position, *details: Union[str, Position]):
-        """Adds a data point. The """
-        if category not in self._positions_by_category:
-            self._positions_by_category[category] = PositionCollection()
-        self._positions_by_category[category].add(position)
-
+        """Adds a data point. If the position is already in the category, only the details are replaced (if any
+        details are given). Like in Position.__eq__, positions that are at most 0.01 apart on every axis are the same."""
+        time_point_number = position.time_point_number()
+        if time_point_number is None:
+            raise ValueError("Position does not have a time point, so it cannot be added")
+        details_index = -1
         if details:
-            if category not in self._details_by_category_and_position:
-                self._details_by_category_and_position[category] = dict()
-            self._details_by_category_and_position[category][position] = Details(*details)
+            details_index = len(self._details)
+            self._details.append(Details(*details))
+        self._pending_entries.append((self._get_category_id(category, create=True), time_point_number,
+                                      position.x, position.y, position.z, details_index))
+
+    def add_entries(self, category: Category, xyzt: ndarray, details: Optional[List[Details]] = None):
+        """Adds many data points at once. xyzt is an array of shape (N, 4), with the x, y, z and time point of every
+        position. details, if given, must contain a Details object (possibly empty) for every position."""
+        xyzt = numpy.asarray(xyzt, dtype=numpy.float64).reshape(-1, 4)
+        details_indices = numpy.full(len(xyzt), -1, dtype=numpy.int64)
+        if details is not None:
+            has_details = numpy.array([len(entry_details.details) > 0 for entry_details in details], dtype=bool)
+            details_indices[has_details] = numpy.arange(len(self._details),
+                                                        len(self._details) + int(has_details.sum()))
+            self._details += [entry_details for entry_details in details if len(entry_details.details) > 0]
+        self._flush()
+        self._append_columns(numpy.full(len(xyzt), self._get_category_id(category, create=True), dtype=numpy.int32),
+                             xyzt[:, 3].astype(numpy.int32), xyzt[:, 0:3], details_indices)
+
+    def _flush(self):
+        """Moves the pending entries to the columns."""
+        if not self._pending_entries:
+            return
+        pending = numpy.array(self._pending_entries, dtype=numpy.float64).reshape(-1, 6)
+        self._pending_entries = list()
+        self._append_columns(pending[:, 0].astype(numpy.int32), pending[:, 1].astype(numpy.int32), pending[:, 2:5],
+                             pending[:, 5].astype(numpy.int64))
+
+    def _append_columns(self, category_ids: ndarray, time_points: ndarray, xyz: ndarray, details_indices: ndarray):
+        self._category_id_column = numpy.concatenate([self._category_id_column, category_ids])
+        self._time_point_column = numpy.concatenate([self._time_point_column, time_points])
+        self._xyz_column = numpy.concatenate([self._xyz_column, xyz])
+        self._details_index_column = numpy.concatenate([self._details_index_column, details_indices])
+        self._remove_duplicates()
+        self._rows_by_category_id.clear()
+
+    def _remove_duplicates(self):
+        """Removes duplicate entries of the same position in the same category. Like in Position.__eq__, positions are
+        the same if they are at most 0.01 apart on every axis. The first entry is kept, but it gets the details of the
+        last entry that had details."""
+        row_count = len(self._category_id_column)
+        if row_count < 2:
+            return
+        xyz = self._xyz_column
+
+        # For every row, the (last) row whose details are used. Rows are numbered in the order they were added
+        details_rows = numpy.where(self._details_index_column >= 0, numpy.arange(row_count), -1)
+
+        # First remove exact duplicates, which is fast and by far the most common case
+        order = numpy.lexsort((xyz[:, 2], xyz[:, 1], xyz[:, 0], self._time_point_column, self._category_id_column))
+        is_first_of_group = numpy.ones(row_count, dtype=bool)
+        is_first_of_group[1:] = (self._category_id_column[order][1:] != self._category_id_column[order][:-1]) \
+            | (self._time_point_column[order][1:] != self._time_point_column[order][:-1]) \
+            | (xyz[order][1:] != xyz[order][:-1]).any(axis=1)
+        first_rows = order[is_first_of_group]
+        last_details_rows = numpy.full(len(first_rows), -1, dtype=numpy.int64)
+        numpy.maximum.at(last_details_rows, numpy.cumsum(is_first_of_group) - 1, details_rows[order])
+        details_rows[first_rows] = last_details_rows
+        is_kept = numpy.zeros(row_count, dtype=bool)
+        is_kept[first_rows] = True
+
+        # Then look for positions that are close, but not equal. Such positions end up in the same run of positions
+        # that are at most 0.01 apart when sorted on x, then in the same run when sorted on y, and then on z
+        rows = numpy.flatnonzero(is_kept)
+        run_ids = _split_into_runs(numpy.zeros(len(rows), dtype=numpy.int64),
+                                   self._category_id_column[rows].astype(numpy.float64), 0)
+        run_ids = _split_into_runs(run_ids, self._time_point_column[rows].astype(numpy.float64), 0)
+        for axis in range(3):
+            run_ids = _split_into_runs(run_ids, xyz[rows, axis], _MAX_DIFFERENCE)
+        in_shared_run = numpy.bincount(run_ids)[run_ids] > 1
+        if in_shared_run.any():
+            # These runs are short, so we can compare all positions in a run like Position.__eq__ does
+            candidate_rows = rows[in_shared_run]
+            candidate_run_ids = run_ids[in_shared_run]
+            candidate_order = numpy.lexsort((candidate_rows, candidate_run_ids))  # In the order they were added
+            candidate_rows = candidate_rows[candidate_order].tolist()
+            candidate_run_ids = candidate_run_ids[candidate_order].tolist()
+            kept_rows = list()
+            for i, row in enumerate(candidate_rows):
+                if i == 0 or candidate_run_ids[i] != candidate_run_ids[i - 1]:
+                    kept_rows = list()  # Start of a new run
+                for kept_row in kept_rows:
+                    if (numpy.abs(xyz[kept_row] - xyz[row]) <= _MAX_DIFFERENCE).all():
+                        is_kept[row] = False
+                        details_rows[kept_row] = max(details_rows[kept_row], details_rows[row])
+                        break
+                else:
+                    kept_rows.append(row)
+
+        details_index_column = numpy.where(details_rows >= 0, self._details_index_column[details_rows], -1)
+        self._category_id_column = self._category_id_column[is_kept]
+        self._time_point_column = self._time_point_column[is_kept]
+        self._xyz_column = self._xyz_column[is_kept]
+        self._details_index_column = details_index_column[is_kept]
+
+    def _get_rows(self, category: Category) -> ndarray:
+        """Gets the rows of the given category, sorted by time point."""
+        self._flush()
+        category_id = self._get_category_id(category, create=False)
+        if category_id is None:
+            return numpy.zeros(0, dtype=numpy.int64)
+        rows = self._rows_by_category_id.get(category_id)
+        if rows is None:
+            rows = numpy.flatnonzero(self._category_id_column == category_id)
+            rows = rows[numpy.argsort(self._time_point_column[rows], kind="stable")]
+            self._rows_by_category_id[category_id] = rows
+        return rows
+
+    def _get_rows_of_time_point(self, category: Category, time_point: TimePoint) -> ndarray:
+        rows = self._get_rows(category)
+        time_points = self._time_point_column[rows]
+        time_point_number = time_point.time_point_number()
+        return rows[numpy.searchsorted(time_points, time_point_number, side="left"):
+                    numpy.searchsorted(time_points, time_point_number, side="right")]
+
+    def _to_positions(self, rows: ndarray) -> List[Position]:
+        return [Position(x, y, z, time_point_number=time_point_number) for (x, y, z), time_point_number
+                in zip(self._xyz_column[rows].tolist(), self._time_point_column[rows].tolist())]
 
     def delete_data(self, category: Category, position: Position):
         """Deletes all data of the given position."""
-        positions_in_category = self._positions_by_category.get(category)
-        if positions_in_category is None:
+        rows = self._get_rows_of_time_point(category, position.time_point())
+        if len(rows) == 0:
+            return
+        difference = numpy.abs(self._xyz_column[rows] - numpy.array([position.x, position.y, position.z]))
+        rows_to_delete = rows[(difference <= _MAX_DIFFERENCE).all(axis=1)]
+        if len(rows_to_delete) == 0:
             return
-        positions_in_category.detach_position(position)
 
-        # Also delete the details
-        details_in_category = self._details_by_category_and_position.get(category)
-        if details_in_category is not None and position in details_in_category:
-            del details_in_category[position]
+        is_kept = numpy.ones(len(self._category_id_column), dtype=bool)
+        is_kept[rows_to_delete] = False
+        self._category_id_column = self._category_id_column[is_kept]
+        self._time_point_column = self._time_point_column[is_kept]
+        self._xyz_column = self._xyz_column[is_kept]
+        self._details_index_column = self._details_index_column[is_kept]
+        self._rows_by_category_id.clear()
 
     def get_categories(self) -> Iterable[Category]:
         """Gets all categories that are used in this report."""
-        return tuple(self._positions_by_category.keys())
+        return tuple(self._categories)
 
     def get_category_by_name(self, name: str) -> Optional[Category]:
         """Gets the category with the given name."""
-        for category in self._positions_by_category.keys():
+        for category in self._categories:
             if category.name == name:
                 return category
         return None
@@ -164,20 +332,15 @@ class ComparisonReport:
             for parameter_name, parameter_value in self._recorded_parameters.items():
                 report += f"    {parameter_name} = {parameter_value}\n"
 
-        for category, positions in self._positions_by_category.items():
-            details_by_position = self._details_by_category_and_position.get(category)
-            if details_by_position is None:
-                details_by_position = dict()  # Supply an empty map to prevent errors
-
-            count = len(positions)
+        for category in self._categories:
+            count = self.count_positions(category)
             header = category.name + ": (" + str(count) + ")"
             report += "\n" + header + "\n" + ("-" * len(header)) + "\n"
 
             i = 0
-            for position in positions:
+            for position, details in self.get_entries(category):
                 position_str = str(position)
-                details = details_by_position.get(position)
-                if details is not None:
+                if len(details.details) > 0:
                     position_str += " - " + str(details)
                 report += "* " + position_str + "\n"
                 i += 1
@@ -186,65 +349,66 @@ class ComparisonReport:
                     break
         return report
 
+    def _count_per_value(self, categories: Iterable[Category], column: ndarray
+                         ) -> Tuple[Optional[int], List[ndarray]]:
+        """For every category, counts how often every value in the given integer column occurs. Returns the lowest value
+        and the counts (starting at that value) for every category. Returns None and empty arrays if there are no
+        entries in any of the categories."""
+        values_of_categories = [column[self._get_rows(category)] for category in categories]
+        non_empty = [values for values in values_of_categories if len(values) > 0]
+        if len(non_empty) == 0:
+            return None, [numpy.zeros(0, dtype=numpy.int64) for _ in values_of_categories]
+        min_value = min(int(values.min()) for values in non_empty)
+        max_value = max(int(values.max()) for values in non_empty)
+        return min_value, [numpy.bincount(values - min_value, minlength=max_value - min_value + 1)
+                           for values in values_of_categories]
+
     def calculate_time_statistics(self, true_positives_cat: Category, false_positives_cat: Category,
                                   false_negatives_cat: Category) -> Statistics:
         """Calculate statistics using the given categories as false/true positives/negatives."""
-        empty = PositionCollection()  # Used for non-existing categories
-
-        min_time_point_number = min_none(self._positions_by_category.get(true_positives_cat, empty).first_time_point_number(),
-                                         self._positions_by_category.get(false_positives_cat, empty).first_time_point_number(),
-                                         self._positions_by_category.get(false_negatives_cat, empty).first_time_point_number())
-        max_time_point_number = max_none(self._positions_by_category.get(true_positives_cat, empty).last_time_point_number(),
-                                         self._positions_by_category.get(false_positives_cat, empty).last_time_point_number(),
-                                         self._positions_by_category.get(false_negatives_cat, empty).last_time_point_number())
-
-        time_point_count = max_time_point_number - min_time_point_number + 1
-        true_positives = numpy.ones(time_point_count, dtype=numpy.uint16)
-        false_positives = numpy.ones(time_point_count, dtype=numpy.uint16)
-        false_negatives = numpy.ones(time_point_count, dtype=numpy.uint16)
-        for i in range(time_point_count):
-            time_point = TimePoint(i + min_time_point_number)
-            true_positives[i] = len(self._positions_by_category.get(true_positives_cat, empty).of_time_point(time_point))
-            false_positives[i] = len(self._positions_by_category.get(false_positives_cat, empty).of_time_point(time_point))
-            false_negatives[i] = len(self._positions_by_category.get(false_negatives_cat, empty).of_time_point(time_point))
+        self._flush()
+        min_time_point_number, (true_positives, false_positives, false_negatives) = self._count_per_value(
+            [true_positives_cat, false_positives_cat, false_negatives_cat], self._time_point_column)
+        if min_time_point_number is None:
+            raise ValueError("No entries found in any of the categories")
         return Statistics(min_time_point_number, "Time point", true_positives, false_positives, false_negatives)
 
     def calculate_z_statistics(self, true_positives_cat: Category, false_positives_cat: Category,
                                false_negatives_cat: Category) -> Statistics:
         """Calculate statistics using the given categories as false/true positives/negatives."""
-        min_z = min(self._positions_by_category[true_positives_cat].lowest_z(),
-                    self._positions_by_category[false_positives_cat].lowest_z(),
-                    self._positions_by_category[false_negatives_cat].lowest_z())
-        max_time_point_number = max(self._positions_by_category[true_positives_cat].highest_z(),
-                                    self._positions_by_category[false_positives_cat].highest_z(),
-                                    self._positions_by_category[false_negatives_cat].highest_z())
-
-        z_count = max_time_point_number - min_z + 1
-        true_positives = numpy.ones(z_count, dtype=numpy.uint16)
-        false_positives = numpy.ones(z_count, dtype=numpy.uint16)
-        false_negatives = numpy.ones(z_count, dtype=numpy.uint16)
-        for i in range(z_count):
-            z = i + min_z
-            true_positives[i] = sum(1 for _ in self._positions_by_category[true_positives_cat].nearby_z(z))
-            false_positives[i] = sum(1 for _ in self._positions_by_category[false_positives_cat].nearby_z(z))
-            false_negatives[i] = sum(1 for _ in self._positions_by_category[false_negatives_cat].nearby_z(z))
+        self._flush()
+        rounded_z = numpy.round(self._xyz_column[:, 2]).astype(numpy.int64)
+        min_z, (true_positives, false_positives, false_negatives) = self._count_per_value(
+            [true_positives_cat, false_positives_cat, false_negatives_cat], rounded_z)
+        if min_z is None:
+            raise ValueError("No entries found in any of the categories")
         return Statistics(min_z, "Z layer", true_positives, false_positives, false_negatives)
 
+    def count_positions_per_time_point(self, category: Category, first_time_point_number: int,
+                                       last_time_point_number: int) -> ndarray:
+        """Counts the positions in the given category for every time point from the first to the last time point
+        (inclusive)."""
+        rows = self._get_rows(category)
+        time_points = self._time_point_column[rows]
+        time_points = time_points[(time_points >= first_time_point_number) & (time_points <= last_time_point_number)]
+        return numpy.bincount(time_points - first_time_point_number,
+                              minlength=last_time_point_number - first_time_point_number + 1)
+
     def first_time_point_number(self) -> Optional[int]:
         """Gets the first time point number at which data exits for at least one category. Returns None if therea is no
         data at all in this object."""
-        first_time_point_number = None
-        for category, items in self._positions_by_category.items():
-            first_time_point_number = min_none(first_time_point_number, items.first_time_point_number())
-        return first_time_point_number
+        self._flush()
+        if len(self._time_point_column) == 0:
+            return None
+        return int(self._time_point_column.min())
 
     def last_time_point_number(self) -> Optional[int]:
         """Gets the first time point number at which data exits for at least one category. Returns None if therea is no
         data at all in this object."""
-        last_time_point_number = None
-        for category, items in self._positions_by_category.items():
-            last_time_point_number = max_none(last_time_point_number, items.last_time_point_number())
-        return last_time_point_number
+        self._flush()
+        if len(self._time_point_column) == 0:
+            return None
+        return int(self._time_point_column.max())
 
     def time_points(self) -> Iterable[TimePoint]:
         """Returns all time points from the first to the last, inclusive. Time points in between might not have data
@@ -257,37 +421,46 @@ class ComparisonReport:
             yield TimePoint(time_point_number)
 
     def get_entries(self, category: Category) -> Iterable[Tuple[Position, Details]]:
-        """Gets all entries for the given category."""
-        if category not in self._positions_by_category:
-            return
+        """Gets all entries for the given category, sorted by time point."""
+        rows = self._get_rows(category)
         empty_details = Details()  # Reused to save memory
 
-        details_by_position = self._details_by_category_and_position.get(category)
-        if details_by_position is None:
-            details_by_position = dict()  # Supply an empty map to prevent errors
+        xyz_column = self._xyz_column
+        time_point_column = self._time_point_column
+        details_index_column = self._details_index_column
+        for row in rows.tolist():
+            x, y, z = xyz_column[row].tolist()
+            details_index = details_index_column[row]
+            yield (Position(x, y, z, time_point_number=int(time_point_column[row])),
+                   self._details[details_index] if details_index >= 0 else empty_details)
+
+    def get_entries_as_arrays(self, category: Category) -> Tuple[ndarray, List[Details]]:
+        """Gets all entries for the given category, sorted by time point. Returns an array of shape (N, 4) with the x, y,
+        z and time point of every position, and the details of every position. Much faster than get_entries for large
+        reports."""
+        rows = self._get_rows(category)
+        xyzt = numpy.empty((len(rows), 4), dtype=numpy.float64)
+        xyzt[:, 0:3] = self._xyz_column[rows]
+        xyzt[:, 3] = self._time_point_column[rows]
 
-        for position in self._positions_by_category[category]:
-            details = details_by_position.get(position)
-            if details is None:
-                details = empty_details
-            yield (position, details)
+        empty_details = Details()  # Reused to save memory
+        all_details = self._details
+        details = [all_details[details_index] if details_index >= 0 else empty_details
+                   for details_index in self._details_index_column[rows].tolist()]
+        return xyzt, details
 
     def count_positions(self, category: Category, *, time_point: Optional[TimePoint] = None) -> int:
         """Gets how many entries there are in the given category, optionally at the given time point. Returns 0 if the
         given category is not used."""
-        entries = self._positions_by_category.get(category)
-        if entries is None:
-            return 0
-        return entries.count_positions(time_point=time_point)
+        if time_point is not None:
+            return len(self._get_rows_of_time_point(category, time_point))
+        return len(self._get_rows(category))
 
     def get_positions(self, category: Category, *, time_point: Optional[TimePoint]) -> Iterable[Position]:
         """Gets all positions in the given category, optionally filtered to the given time point."""
-        entries = self._positions_by_category.get(category)
-        if entries is None:
-            return []
         if time_point is not None:
-            return entries.of_time_point(time_point)
-        return entries
+            return self._to_positions(self._get_rows_of_time_point(category, time_point))
+        return self._to_positions(self._get_rows(category))
 
     def recorded_parameters(self) -> Iterable[Tuple[str, DataType]]:
         """Gets all parameters set for this comparison. Useful for reproducing this comparison."""
@@ -4,6 +4,15 @@ from organoid_tracker.comparison.report import ComparisonReport
 def save_report_time_statistics(report: ComparisonReport, file_name: str):
     """Saves the number of positions in each category for each time point to a CSV file."""
     categories = report.get_categories()
+    first_time_point_number = report.first_time_point_number()
+    last_time_point_number = report.last_time_point_number()
+
+    # Count everything at once, instead of asking the report for every time point and category
+    counts_by_category = list()
+    if first_time_point_number is not None and last_time_point_number is not None:
+        counts_by_category = [report.count_positions_per_time_point(category, first_time_point_number,
+                                                                    last_time_point_number).tolist()
+                              for category in categories]
 
     with open(file_name, "w") as handle:
         # Write headers
@@ -12,9 +21,9 @@ def save_report_time_statistics(report: ComparisonReport, file_name: str):
             handle.write("," + category.name)
 
         # Write rows
-        for time_point in report.time_points():
+        for i, time_point in enumerate(report.time_points()):
             handle.write(f"\n{time_point.time_point_number()}")
-            for category in categories:
-                handle.write(f",{report.count_positions(category, time_point=time_point)}")
+            for counts in counts_by_category:
+                handle.write(f",{counts[i]}")
 
         handle.write("\n")
@@ -1,6 +1,8 @@
 import json
 from typing import Dict, Any, List, Union
 
+import numpy
+
 from organoid_tracker.comparison.report import ComparisonReport, Category, Details
 from organoid_tracker.core.position import Position
 
@@ -14,20 +16,29 @@ def save_report(report: ComparisonReport, file: str):
         "categories": [_category_to_json(report, category) for category in report.get_categories()]
     }
     with open(file, "w", encoding="utf8") as file_handle:
-        json.dump(output, file_handle)
+        file_handle.write(json.dumps(output))  # Much faster than json.dump, which writes in small chunks
 
 
 def _category_to_json(report: ComparisonReport, category: Category) -> Dict[str, Any]:
-    """Covnerts all entries in a report category to a JSON structure."""
+    """Converts all entries in a report category to a JSON structure. The positions are converted in bulk, only the
+    details are converted one by one."""
+    xyzt, all_details = report.get_entries_as_arrays(category)
+    entries = list()
+    for x, y, z, time_point_number, details in zip(xyzt[:, 0].tolist(), xyzt[:, 1].tolist(), xyzt[:, 2].tolist(),
+                                                   xyzt[:, 3].astype(numpy.int64).tolist(), all_details):
+        entry = [[x, y, z, time_point_number]]
+        if details.details:
+            entry += _details_to_json(details)
+        entries.append(entry)
     return {
         "name": category.name,
-        "entries": [_entry_to_json(position, details) for position, details in report.get_entries(category)]
+        "entries": entries
     }
 
 
-def _entry_to_json(position: Position, details: Details) -> List[Union[str, List[float]]]:
-    """Converts a single entry (position, details) to a JSON list of lists (=positions) and strings."""
-    return_list = [[position.x, position.y, position.z, position.time_point_number()]]
+def _details_to_json(details: Details) -> List[Union[str, List[float]]]:
+    """Converts details to a JSON list of lists (=positions) and strings."""
+    return_list = list()
     for detail in details.details:
         if isinstance(detail, Position):
             return_list.append([detail.x, detail.y, detail.z, detail.time_point_number()])
@@ -36,6 +47,18 @@ def _entry_to_json(position: Position, details: Details) -> List[Union[str, List
     return return_list
 
 
+def _details_from_json(details_input: List[Union[str, List[float]]]) -> Details:
+    details = list()
+    for detail_input in details_input:
+        # Read the details of every data entry
+        if isinstance(detail_input, str):
+            details.append(detail_input)
+        else:  # not a str, so must be a list
+            details.append(Position(detail_input[0], detail_input[1], detail_input[2],
+                                    time_point_number=detail_input[3]))
+    return Details(*details)
+
+
 def load_report(file: str) -> ComparisonReport:
     """Reconstructs a report from a JSON file."""
     with open(file, "r", encoding="utf8") as file_handle:
@@ -46,19 +69,13 @@ def load_report(file: str) -> ComparisonReport:
 
     report.title = input["title"]
     report.summary = input["summary"]
+    empty_details = Details()  # Reused to save memory
     for category_input in input["categories"]:
-        # Read each category
+        # Read each category, adding all entries at once
         category = Category(category_input["name"])
-        for entry_input in category_input["entries"]:
-            # Read each data entry in every category
-            position_input = entry_input[0]
-            position = Position(position_input[0], position_input[1], position_input[2], time_point_number=position_input[3])
-            details = list()
-            for detail_input in entry_input[1:]:
-                # Read the details of every data entry
-                if isinstance(detail_input, str):
-                    details.append(detail_input)
-                else:  # not a str, so must be a list
-                    details.append(Position(detail_input[0], detail_input[1], detail_input[2], time_point_number=detail_input[3]))
-            report.add_data(category, position, *details)
+        entries_input = category_input["entries"]
+        xyzt = numpy.array([entry_input[0] for entry_input in entries_input], dtype=numpy.float64).reshape(-1, 4)
+        details = [_details_from_json(entry_input[1:]) if len(entry_input) > 1 else empty_details
+                   for entry_input in entries_input]
+        report.add_entries(category, xyzt, details)
     return report
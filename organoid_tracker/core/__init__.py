@@ -23,7 +23,6 @@ import typing
 from collections.abc import Sequence
 from typing import Optional, Iterable, Union, Tuple, Any, NamedTuple, Sized, Container
 
-import matplotlib.colors
 import numpy
 
 from organoid_tracker.core.typing import MPLColor
@@ -205,6 +204,7 @@ class Color:
     @staticmethod
     def from_matplotlib(mpl_color: MPLColor) -> "Color":
         """Creates a color using the Matplotlib library, so you can for example do Color.from_matplotlib("red")."""
+        import matplotlib.colors
         r, g, b = matplotlib.colors.to_rgb(mpl_color)
         return Color.from_rgb_floats(r, g, b)
 
@@ -2,6 +2,7 @@ import math
 from typing import List, Dict, Optional, Iterable, NamedTuple, Tuple
 
 from organoid_tracker.core import TimePoint
+from organoid_tracker.core.change_events import ChangeNotifier, ChangeType
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution
 from organoid_tracker.core.vector import Vector3
@@ -46,8 +47,8 @@ class ClosestBeacon:
         return Beacon(position=self.beacon_position, beacon_type=self.beacon_type)
 
 
-class BeaconCollection:
-    """Ordered list of beacons per time point."""
+class BeaconCollection(ChangeNotifier):
+    """Ordered list of beacons per time point. Use `add_change_listener` to get notified of changes."""
 
     _beacons: Dict[TimePoint, Dict[Position, str]]
 
@@ -67,6 +68,7 @@ class BeaconCollection:
             beacons_at_time_point = dict()
             self._beacons[time_point] = beacons_at_time_point
         beacons_at_time_point[position] = beacon_type
+        self._notify_change(ChangeType.BEACON_ADDED, time_point.time_point_number(), position)
 
     def remove(self, position: Position) -> bool:
         """Removes the beacon at the given position. Returns True if succesful, returns False if there was no beacon at
@@ -83,6 +85,7 @@ class BeaconCollection:
             del beacons_at_time_point[position]
             if len(beacons_at_time_point) == 0:
                 del self._beacons[time_point]  # Remove the now-empty list
+            self._notify_change(ChangeType.BEACON_REMOVED, time_point.time_point_number(), position)
             return True
         except ValueError:
             return False  # Nothing was deleted
@@ -106,6 +109,7 @@ class BeaconCollection:
 
         del beacons_at_time_point[old_position]
         beacons_at_time_point[new_position] = old_beacon_type
+        self._notify_change(ChangeType.BEACON_MOVED, time_point.time_point_number(), old_position, new_position)
         return True
 
     def contains_position(self, beacon: Position) -> bool:
@@ -149,6 +153,7 @@ class BeaconCollection:
             return
 
         beacons_at_time_point[beacon_position] = name if name is not None else _DEFAULT_BEACON_TYPE
+        self._notify_change(ChangeType.BEACON_TYPE_CHANGED, time_point.time_point_number(), beacon_position)
 
     def find_closest_beacon(self, position: Position, resolution: ImageResolution) -> Optional[ClosestBeacon]:
         """Finds the closest beacon at the same time point as the position. Returns None if there are no beacons at that
@@ -196,6 +201,7 @@ class BeaconCollection:
                 self._beacons[time_point].update(beacons_of_time_point)
             else:
                 self._beacons[time_point] = beacons_of_time_point
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def find_single_beacon(self) -> Optional[Position]:
         """If there is only one beacon in the entire experiment, return it. Otherwise, it returns None."""
@@ -219,6 +225,7 @@ class BeaconCollection:
         for time_point, values in self._beacons.items():
             new_beacons_dict[time_point + time_point_delta] = values
         self._beacons = new_beacons_dict
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def of_time_point_with_type(self, time_point: TimePoint) -> Iterable[Beacon]:
         """Gets all beacons at the given time point, including their beacon types."""
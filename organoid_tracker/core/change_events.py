@@ -0,0 +1,101 @@
+"""Change events for the data of an experiment. Caches and other derived data can subscribe to the positions, links,
+connections, splines and beacons of an experiment, so that they only need to update the parts that actually changed.
+
+Listening is opt-in: if nobody subscribed to a collection, no events are created at all.
+
+    def on_change(event: ChangeEvent):
+        print(event.change_type, event.time_point_number, event.position)
+
+    experiment.positions.add_change_listener(on_change)
+
+Note that the listener is registered on the collection object, not on the experiment. If the collection is replaced
+(for example using `experiment.positions = PositionCollection()`), the listener is not carried over.
+"""
+from enum import Enum
+from typing import NamedTuple, Optional, List, Callable
+
+from organoid_tracker.core.position import Position
+
+
+class ChangeType(Enum):
+    """The kind of change. Most changes apply to a single position, link or connection, which is then stored in the
+    event. Some bulk operations (like loading data for an entire time point) just report that everything in a time
+    point, or everything in the collection, changed."""
+
+    POSITION_ADDED = 1
+    POSITION_REMOVED = 2
+    POSITION_MOVED = 3  # event.position is the old position, event.other_position the new position
+    POSITION_DATA_CHANGED = 4  # If event.position is None, the data was changed for all positions
+
+    LINK_ADDED = 5  # event.position is the position in the earliest time point, event.other_position the other
+    LINK_REMOVED = 6
+    LINK_DATA_CHANGED = 7
+    LINEAGE_DATA_CHANGED = 8  # event.position is the first position of the lineage
+
+    CONNECTION_ADDED = 9
+    CONNECTION_REMOVED = 10
+    CONNECTION_DATA_CHANGED = 11
+
+    SPLINE_CHANGED = 12  # A spline was added or removed, or the markers of the splines changed
+
+    BEACON_ADDED = 13
+    BEACON_REMOVED = 14
+    BEACON_MOVED = 15  # event.position is the old position, event.other_position the new position
+    BEACON_TYPE_CHANGED = 16
+
+    TIME_POINT_CHANGED = 17  # Anything in the time point may have changed
+    ALL_CHANGED = 18  # Anything in the collection may have changed, event.time_point_number is None
+
+
+class ChangeEvent(NamedTuple):
+    """A single change in one of the collections of an experiment."""
+
+    change_type: ChangeType
+    time_point_number: Optional[int]
+    position: Optional[Position] = None
+    other_position: Optional[Position] = None  # The other side of a link or connection, or the new position of a move
+    data_name: Optional[str] = None  # For the *_DATA_CHANGED events
+
+    def is_in_time_point(self, time_point_number: int) -> bool:
+        """Returns True if this change affects the given time point. For ALL_CHANGED events, this always returns True.
+        For links, both time points of the link are considered to be affected."""
+        if self.time_point_number is None or self.time_point_number == time_point_number:
+            return True
+        return self.other_position is not None and self.other_position.time_point_number() == time_point_number
+
+
+ChangeListener = Callable[[ChangeEvent], None]
+
+
+class ChangeNotifier:
+    """Base class for collections that report their changes. Subclasses call `_notify_change` after every change."""
+
+    # No list is created until the first listener is added, which keeps collections without listeners cheap
+    _change_listeners: Optional[List[ChangeListener]] = None
+
+    def add_change_listener(self, listener: ChangeListener):
+        """Registers a function that is called after every change to this collection. The function must not modify
+        the collection."""
+        if self._change_listeners is None:
+            self._change_listeners = []
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener: ChangeListener):
+        """Removes a listener that was added using add_change_listener. Does nothing if the listener was not
+        registered."""
+        if self._change_listeners is None:
+            return
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+        if len(self._change_listeners) == 0:
+            self._change_listeners = None
+
+    def _notify_change(self, change_type: ChangeType, time_point_number: Optional[int],
+                       position: Optional[Position] = None, other_position: Optional[Position] = None,
+                       data_name: Optional[str] = None):
+        """Sends the change to all listeners. Does nothing if there are no listeners."""
+        if self._change_listeners is None:
+            return
+        event = ChangeEvent(change_type, time_point_number, position, other_position, data_name)
+        for listener in list(self._change_listeners):
+            listener(event)
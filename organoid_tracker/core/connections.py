@@ -1,15 +1,16 @@
 """Connections are used to indicate connections between particles at the same time point, for example because the
 particles are close by, or they are part of some subsystem. This is different from links, which indicates that two
 observations made at different time points refer to the same particle."""
-from typing import Dict, List, Set, Tuple, Iterable, Optional
-
-import networkx
-from networkx import Graph
+from typing import Dict, List, Set, Tuple, Iterable, Optional, TYPE_CHECKING
 
 from organoid_tracker.core import TimePoint
+from organoid_tracker.core.change_events import ChangeNotifier, ChangeType
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.typing import DataType
 
+if TYPE_CHECKING:
+    import networkx
+
 
 def _lowest_first(position1: Position, position2: Position) -> Tuple[Position, Position]:
     """Returns both positions, but the position with the lowest spatial coords first."""
@@ -117,6 +118,7 @@ class _ConnectionsByTimePoint:
         """
         if not self._graph.has_node(position):
             return False
+        import networkx
         neighbors = self._graph.subgraph(self._graph.neighbors(position))
         number_of_neighbors = neighbors.number_of_nodes()
         cyclic_graph = networkx.cycle_graph(number_of_neighbors, create_using=None)
@@ -126,7 +128,7 @@ class _ConnectionsByTimePoint:
 
         return False
 
-    def to_networkx_graph(self) -> Graph:
+    def to_networkx_graph(self) -> "networkx.Graph":
         """Gets a non-directional NetworkX graph that represents the connections of this time point. The graph is a copy, so any
         changes will not affect the connections in the experiment. This has been done so that we can still switch to
         another data storage method in the future."""
@@ -134,6 +136,7 @@ class _ConnectionsByTimePoint:
 
     def _move_in_time(self, time_point_delta: int):
         """Must only be called from the Connections class, otherwise the time index is out of sync."""
+        import networkx
         new_graph = networkx.Graph()
         for position_a, position_b in self._graph.edges:
             new_graph.add_edge(position_a.with_time_point_number(position_a.time_point_number() + time_point_delta),
@@ -170,8 +173,8 @@ class _ConnectionsByTimePoint:
             self._graph.add_edge(connection[0], connection[1], **metadata_dict_of_connection)
 
 
-class Connections:
-    """Holds the connections of an experiment."""
+class Connections(ChangeNotifier):
+    """Holds the connections of an experiment. Use `add_change_listener` to get notified of changes."""
 
     _by_time_point: Dict[int, _ConnectionsByTimePoint]
 
@@ -192,6 +195,7 @@ class Connections:
             connections = _ConnectionsByTimePoint()
             self._by_time_point[time_point_number] = connections
         connections.add(position1, position2)
+        self._notify_change(ChangeType.CONNECTION_ADDED, time_point_number, position1, position2)
 
     def remove_connection(self, position1: Position, position2: Position) -> bool:
         """Removes a connection between the given positions. Does nothing if no such connection exists. Returns True if
@@ -209,6 +213,7 @@ class Connections:
             return False
         if connections.is_empty():
             del self._by_time_point[time_point_number]
+        self._notify_change(ChangeType.CONNECTION_REMOVED, time_point_number, position1, position2)
         return True
 
     def set_connection_data(self, position1: Position, position2: Position, key: str, value: Optional[DataType]):
@@ -218,6 +223,8 @@ class Connections:
         if by_time_point is None:
             return
         by_time_point.set_data_of_connection(position1, position2, key, value)
+        self._notify_change(ChangeType.CONNECTION_DATA_CHANGED, position1.time_point_number(), position1, position2,
+                            key)
 
     def get_connection_data(self, position1: Position, position2: Position, key: str) -> Optional[DataType]:
         """Gets the metadata of the connection with the given key. If the connection does not exist, or if the
@@ -257,6 +264,11 @@ class Connections:
             return
         connections.replace_position(position_old, position_new)
 
+        if self._change_listeners is not None:
+            for connected_position in list(connections.find_connections(position_new)):
+                self._notify_change(ChangeType.CONNECTION_REMOVED, time_point_number, position_old, connected_position)
+                self._notify_change(ChangeType.CONNECTION_ADDED, time_point_number, position_new, connected_position)
+
     def contains_connection(self, position1: Position, position2: Position) -> bool:
         """Returns True if a connection between the two positions exists."""
         if position1.time_point_number() != position2.time_point_number():
@@ -331,6 +343,7 @@ class Connections:
             else:
                 # Just copy in
                 self._by_time_point[time_point_number] = other_connections.copy()
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def remove_connections_of_position(self, position: Position):
         """Removes all connections to or from the position."""
@@ -340,8 +353,13 @@ class Connections:
         connections = self._by_time_point.get(time_point_number)
         if connections is None:
             return
+        removed_connections = list(connections.find_connections(position)) \
+            if self._change_listeners is not None else []
         connections.remove_connections_of_position(position)
 
+        for connected_position in removed_connections:
+            self._notify_change(ChangeType.CONNECTION_REMOVED, time_point_number, position, connected_position)
+
     def calculate_distances(self, sources: List[Position]) -> Dict[Position, int]:
         """Gets the distances of all positions to the nearest position in [sources].
         All sources must be in the same time point, otherwise ValueError is raised.
@@ -396,11 +414,12 @@ class Connections:
             return self._by_time_point[position.time_point_number()].has_full_neighbors(position)
         return False
 
-    def to_networkx_graph(self, *, time_point: TimePoint) -> Graph:
+    def to_networkx_graph(self, *, time_point: TimePoint) -> "networkx.Graph":
         """Gets a non-directional NetworkX graph that represents the connections of the given time point. The graph is
         a copy, so any changes will not affect the connections in the experiment. This has been done so that we can
         still switch to another data storage method in the future."""
         if time_point.time_point_number() not in self._by_time_point:
+            import networkx
             return networkx.Graph()  # Return an empty graph
         return self._by_time_point[time_point.time_point_number()].to_networkx_graph()
 
@@ -418,6 +437,7 @@ class Connections:
             values._move_in_time(time_point_delta)
             new_connections_dict[time_point_number + time_point_delta] = values
         self._by_time_point = new_connections_dict
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def find_all_connections(self) -> Iterable[Tuple[Position, Position]]:
         """Gets all connections of all time points."""
@@ -433,3 +453,4 @@ class Connections:
             by_time_point = _ConnectionsByTimePoint()
             self._by_time_point[time_point.time_point_number()] = by_time_point
         by_time_point.add_data_from_time_point_dict(connections, metadata_dict)
+        self._notify_change(ChangeType.TIME_POINT_CHANGED, time_point.time_point_number())
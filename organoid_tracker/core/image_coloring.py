@@ -1,8 +1,8 @@
 import random
-from typing import Optional, Tuple, NamedTuple
+from typing import Optional, Tuple, NamedTuple, TYPE_CHECKING
 
-import matplotlib.cm
-from matplotlib.colors import Colormap, ListedColormap, LinearSegmentedColormap
+if TYPE_CHECKING:
+    from matplotlib.colors import Colormap
 
 # The name of the segmentation colormap.
 SEGMENTATION_COLORMAP_NAME = "segmentation"
@@ -19,21 +19,24 @@ COLORMAP_LISTS = {
 _CACHED_COLORMAPS = None
 
 
-def _create_segmentation_colormap() -> Colormap:
+def _create_segmentation_colormap() -> "Colormap":
     """Create a colormap for segmentation masks."""
-    source_colormap: Colormap = matplotlib.cm.jet
+    import matplotlib.cm
+    from matplotlib.colors import ListedColormap
+    source_colormap: "Colormap" = matplotlib.cm.jet
     samples = [source_colormap(sample_pos / 1000) for sample_pos in range(1000)]
     random.Random("fixed seed to ensure same colors").shuffle(samples)
     samples[0] = (0, 0, 0, 0)  # Force background to black
     return ListedColormap(samples, name=SEGMENTATION_COLORMAP_NAME)
 
 
-def _create_black_to_color_colormap(color_name: str, max_color_rgb: Tuple[float, float, float]) -> Colormap:
+def _create_black_to_color_colormap(color_name: str, max_color_rgb: Tuple[float, float, float]) -> "Colormap":
     """Create a colormap that goes from black to a given RGB color."""
+    from matplotlib.colors import LinearSegmentedColormap
     return LinearSegmentedColormap.from_list(color_name, [(0.0, 0.0, 0.0), max_color_rgb])
 
 
-def _create_colormap(name: str) -> Colormap:
+def _create_colormap(name: str) -> "Colormap":
     """Internal function to create a colormap by name. Will also create colormaps for names outside the allowed list."""
     if name == SEGMENTATION_COLORMAP_NAME:
         return _create_segmentation_colormap()
@@ -49,10 +52,11 @@ def _create_colormap(name: str) -> Colormap:
         return _create_black_to_color_colormap("magenta", (1.0, 0.0, 1.0))
     if name == "yellow":
         return _create_black_to_color_colormap("yellow", (1.0, 1.0, 0.0))
+    import matplotlib.cm
     return matplotlib.cm.get_cmap(name)
 
 
-def get_colormap(name: Optional[str]) -> Colormap:
+def get_colormap(name: Optional[str]) -> "Colormap":
     """Load a colormap by name. If the name is not in the allowed list, the gray colormap will be returned.
 
     Note that these colormaps can be different from the built-in Matplotlib colormaps. For example, "green" returns
@@ -73,6 +77,6 @@ def get_colormap(name: Optional[str]) -> Colormap:
     return _CACHED_COLORMAPS[name]
 
 
-def get_segmentation_colormap() -> Colormap:
+def get_segmentation_colormap() -> "Colormap":
     """Get the colormap for segmentation masks."""
     return get_colormap(SEGMENTATION_COLORMAP_NAME)
@@ -1,23 +1,94 @@
 from abc import abstractmethod, ABC
-from typing import Optional, Dict, List, Iterable, Tuple
+from collections import OrderedDict
+from typing import Optional, Dict, List, Iterable, Tuple, NamedTuple, Callable, Any
 
+import numpy
 from numpy import ndarray
 
 from organoid_tracker.core import TimePoint
 from organoid_tracker.core.image_loader import ImageChannel
 
 
+class PixelTransform(NamedTuple):
+    """A transform that changes every pixel based on only its own value:
+    `new_value = clip(value, min_value, max_value) * scale + offset`. The scale may not be negative.
+
+    Two transforms can be combined into one using `then`, so that a chain of such filters only needs a single pass over
+    the image.
+    """
+    min_value: float
+    max_value: float
+    scale: float
+    offset: float
+
+    @staticmethod
+    def identity() -> "PixelTransform":
+        return PixelTransform(-numpy.inf, numpy.inf, 1, 0)
+
+    def apply_to_value(self, value: float) -> float:
+        """Applies the transform to a single value."""
+        return min(max(value, self.min_value), self.max_value) * self.scale + self.offset
+
+    def then(self, next_transform: "PixelTransform") -> "PixelTransform":
+        """Returns a single transform that first applies this transform, and then the given transform."""
+        if self.scale == 0:
+            # We output a constant value
+            return PixelTransform(-numpy.inf, numpy.inf, 0, next_transform.apply_to_value(self.offset))
+
+        # Translate the clipping of the next transform to the input values of this transform
+        min_value = max(self.min_value, (next_transform.min_value - self.offset) / self.scale)
+        max_value = min(self.max_value, (next_transform.max_value - self.offset) / self.scale)
+        if min_value > max_value:
+            # All values end up at the same clipping boundary
+            return PixelTransform(-numpy.inf, numpy.inf, 0,
+                                  next_transform.apply_to_value(self.apply_to_value(min_value)))
+        return PixelTransform(min_value, max_value, self.scale * next_transform.scale,
+                              self.offset * next_transform.scale + next_transform.offset)
+
+    def apply(self, array: ndarray):
+        """Applies the transform to the given floating point array, modifying it."""
+        if self.scale == 0:
+            array[...] = self.offset
+            return
+        numpy.clip(array, self.min_value, self.max_value, out=array)
+        if self.scale != 1:
+            array *= self.scale
+        if self.offset != 0:
+            array += self.offset
+
+
 class ImageFilter(ABC):
     """Filter for images, for example to enhance the contrast."""
 
+    _revision: int = 0
+
     @abstractmethod
     def filter(self, time_point: TimePoint, image_z: Optional[int], image: ndarray):
         """Filters the given input array, which is a grayscale array of 2 or 3 dimensions. If it is three dimensions,
         then image_z is None. Note that the image_z does not include any image offsets, so z=0 will always be the
         lowest image plane.
-        The input array will be modified."""
+        The input array will be modified. When called from ImageFilters, the array is a float32 array, with values in
+        the range of the original image data type."""
         raise NotImplementedError()
 
+    def get_pixel_transform(self, time_point: TimePoint, image_z: int, image_max: float,
+                            data_format_max_value: float) -> Optional[PixelTransform]:
+        """If this filter changes every pixel based on only its own value, then this method returns that transform for
+        the 2D layer at image_z. image_max is the maximum value of the image (for 3D images: of all layers), and
+        data_format_max_value is the maximum value of the image data type (1.0 for floating point images).
+        ImageFilters uses this to apply consecutive filters in a single pass over the image.
+
+        Returns None if this is not possible, in which case self.filter(...) is used instead. This is the default."""
+        return None
+
+    def mark_changed(self):
+        """Call this after changing the settings of this filter, so that previously filtered images are not reused."""
+        self._revision += 1
+
+    def get_revision(self) -> int:
+        """Number that changes every time mark_changed() is called."""
+        return self._revision
+
     @abstractmethod
     def copy(self):
         """Copies the filter, such that changes to this filter have no effect on the copy, and vice versa."""
@@ -29,31 +100,131 @@ class ImageFilter(ABC):
         raise NotImplementedError()
 
 
+class _FilteredCacheEntry(NamedTuple):
+    version: Any  # Version of the filter chain that was used
+    image_array: ndarray
+
+
+def _get_data_format_max_value(dtype: numpy.dtype) -> float:
+    if numpy.issubdtype(dtype, numpy.integer):
+        return float(numpy.iinfo(dtype).max)  # For integer types, we scale from 0 to max_int
+    return 1.0  # For float types, we scale from 0 to 1
+
+
+def _get_layer_maxima(layers: ndarray) -> ndarray:
+    if layers.size == 0:
+        return numpy.zeros(len(layers), dtype=numpy.float64)
+    return layers.reshape(len(layers), -1).max(axis=1).astype(numpy.float64)
+
+
 class ImageFilters:
     _filters: Dict[ImageChannel, List[ImageFilter]]
+    _version: int  # Increased every time a filter is added or removed
+
+    # Filtered images, by (time point number, channel, image_z). The image_z is None for 3D images
+    _cache: "OrderedDict[Tuple[int, ImageChannel, Optional[int]], _FilteredCacheEntry]"
+    _cache_size_bytes: int
+    _CACHE_SIZE_MB = 100
+    _CACHE_SIZE_B = _CACHE_SIZE_MB * 1024 * 1024
 
     def __init__(self):
         self._filters = dict()
+        self._version = 0
+        self._cache = OrderedDict()
+        self._cache_size_bytes = 0
 
     def filter(self, time_point: TimePoint, image_channel: ImageChannel, image_z: Optional[int], array: Optional[ndarray]):
         """Applies the filters to the given array. For 2D arrays, supply an image_z. For 3D arrays, you use None
-        instead."""
+        instead. The given array is never modified."""
         if array is None:
             return None
 
-        if image_channel in self._filters:
-            # Apply all filters (we need to make a copy of the array, otherwise we modify cached arrays)
-            copied_array = array.copy()
-            for image_filter in self._filters[image_channel]:
-                image_filter.filter(time_point, image_z, copied_array)
-            return copied_array
+        filters = self._filters.get(image_channel)
+        if filters is None:
+            return array
+
+        # Work on a float32 copy (we must not modify cached arrays), and only convert back at the end
+        data_format_max_value = _get_data_format_max_value(array.dtype)
+        filtered = array.astype(numpy.float32)
+        layers = filtered[numpy.newaxis] if filtered.ndim == 2 else filtered
+        image_zs = [image_z if image_z is not None else 0] if filtered.ndim == 2 else range(len(layers))
+        layer_maxima = _get_layer_maxima(layers)
+
+        # Consecutive pixel transforms are combined, so that they only need one pass over the image
+        pending_transforms: Optional[List[PixelTransform]] = None
+        for image_filter in filters:
+            image_max = float(layer_maxima.max()) if len(layer_maxima) > 0 else 0.0
+            transforms = [image_filter.get_pixel_transform(time_point, layer_z, image_max, data_format_max_value)
+                          for layer_z in image_zs]
+            if len(transforms) > 0 and all(transform is not None for transform in transforms):
+                if pending_transforms is None:
+                    pending_transforms = transforms
+                else:
+                    pending_transforms = [pending.then(transform)
+                                          for pending, transform in zip(pending_transforms, transforms)]
+
+                # Transforms never decrease values, so we can calculate the new maxima directly
+                layer_maxima = numpy.array([transform.apply_to_value(layer_max)
+                                            for transform, layer_max in zip(transforms, layer_maxima)])
+                continue
 
+            if pending_transforms is not None:
+                for layer, transform in zip(layers, pending_transforms):
+                    transform.apply(layer)
+                pending_transforms = None
+            image_filter.filter(time_point, image_z, filtered)
+            layer_maxima = _get_layer_maxima(layers)
+        if pending_transforms is not None:
+            for layer, transform in zip(layers, pending_transforms):
+                transform.apply(layer)
+
+        if numpy.issubdtype(array.dtype, numpy.integer):
+            numpy.clip(filtered, 0, data_format_max_value, out=filtered)
+            numpy.rint(filtered, out=filtered)
+        return filtered.astype(array.dtype, copy=False)
+
+    def filter_cached(self, time_point: TimePoint, image_channel: ImageChannel, image_z: Optional[int],
+                      load_array: Callable[[], Optional[ndarray]]) -> Optional[ndarray]:
+        """Like filter(...), but reuses the result if the same image was filtered before using the same filters. The
+        array is only loaded (using load_array) if necessary. Don't modify the returned array, as it's cached.
+
+        The cache assumes that load_array always returns the same image for the same time point, channel and z. If
+        that is no longer the case, for example because the image loader changed, call clear_cache()."""
+        filters = self._filters.get(image_channel)
+        if filters is None:
+            return load_array()  # Nothing to filter, so nothing to cache
+
+        key = (time_point.time_point_number(), image_channel, image_z)
+        version = (self._version, tuple(image_filter.get_revision() for image_filter in filters))
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry.version == version:
+                self._cache.move_to_end(key)
+                return entry.image_array
+            self._remove_from_cache(key)
+
+        array = self.filter(time_point, image_channel, image_z, load_array())
+        if array is not None and array.nbytes * 2 < self._CACHE_SIZE_B:
+            self._cache[key] = _FilteredCacheEntry(version, array)
+            self._cache_size_bytes += array.nbytes
+            while self._cache_size_bytes > self._CACHE_SIZE_B:
+                self._remove_from_cache(next(iter(self._cache)))
         return array
 
+    def _remove_from_cache(self, key: Tuple[int, ImageChannel, Optional[int]]):
+        entry = self._cache.pop(key)
+        self._cache_size_bytes -= entry.image_array.nbytes
+
+    def clear_cache(self):
+        """Removes all filtered images from the cache. Call this if the source images changed."""
+        self._cache.clear()
+        self._cache_size_bytes = 0
+
     def clear_channel(self, channel: ImageChannel):
         """Removes all filters for the given channel."""
         if channel in self._filters:
             del self._filters[channel]
+            self._version += 1
 
     def add_filter(self, channel: ImageChannel, filter: ImageFilter):
         """Adds a new filter for the given channel."""
@@ -61,6 +232,7 @@ class ImageFilters:
             self._filters[channel] = [filter]
         else:
             self._filters[channel].append(filter)
+        self._version += 1
 
     def of_channel(self, channel: ImageChannel) -> Iterable[ImageFilter]:
         """Gets all filters for the given channel."""
@@ -2,6 +2,7 @@ import functools
 from abc import ABC, abstractmethod
 from typing import Optional, Tuple, List, Dict, Any
 
+import numpy
 from numpy import ndarray
 
 from organoid_tracker.core import TimePoint
@@ -96,6 +97,69 @@ class ImageLoader(ABC):
             return None
         return TimePoint(number)
 
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        """Loads only a part of a 3D image. The slices work like NumPy slicing of the array returned by
+        get_3d_image_array, so `loader.get_3d_image_region(t, c, numpy.s_[2:4, 10:50, 10:50])` returns the same as
+        `loader.get_3d_image_array(t, c)[2:4, 10:50, 10:50]`. Just like for NumPy, any part of the region that falls
+        outside the image is left out of the returned array. Steps other than 1 are not supported. Returns None if
+        there is no image for this time point or channel.
+
+        The default implementation loads the required 2D slices (or the full 3D image, if most slices are needed
+        anyway) and crops those. Image loaders that can read parts of a file override this method.
+        """
+        image_size_zyx = self.get_image_size_zyx()
+        if image_size_zyx is None:
+            return None
+        z_slice, y_slice, x_slice = _check_region(zyx_slice)
+        z_start, z_stop, _ = z_slice.indices(image_size_zyx[0])
+
+        if z_stop <= z_start or (z_stop - z_start) * 2 > image_size_zyx[0]:
+            # Load the full image
+            array = self.get_3d_image_array(time_point, image_channel)
+            if array is None:
+                return None
+            return array[z_slice, y_slice, x_slice]
+
+        # Load only the required 2D slices
+        slices_2d = list()
+        for image_z in range(z_start, z_stop):
+            array_2d = self.get_2d_image_array(time_point, image_channel, image_z)
+            if array_2d is None:
+                return None
+            slices_2d.append(array_2d[y_slice, x_slice])
+        return numpy.stack(slices_2d)
+
+    def get_resolution_level_count(self) -> int:
+        """Some image formats (like OME-Zarr) also store downscaled versions of the images. Level 0 is always the full
+        resolution, and every next level is smaller. The default implementation returns 1, so only the full resolution
+        is available."""
+        return 1
+
+    def get_image_size_zyx_at_level(self, level: int) -> Optional[Tuple[int, int, int]]:
+        """Gets the image size at the given resolution level. Returns None if there are no images, or if that level
+        doesn't exist. The default implementation only supports level 0."""
+        if level == 0:
+            return self.get_image_size_zyx()
+        return None
+
+    def get_3d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, level: int
+                                    ) -> Optional[ndarray]:
+        """Loads an image at the given resolution level. Returns None if there is no image for this time point,
+        channel or level. The default implementation only supports level 0."""
+        if level == 0:
+            return self.get_3d_image_array(time_point, image_channel)
+        return None
+
+    def get_2d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int,
+                                    level: int) -> Optional[ndarray]:
+        """Loads one single 2d slice of an image at the given resolution level. Note: the image z is also in the
+        coordinates of that level, so from 0 to get_image_size_zyx_at_level(level)[0] - 1. The default implementation
+        only supports level 0."""
+        if level == 0:
+            return self.get_2d_image_array(time_point, image_channel, image_z)
+        return None
+
     def get_channels(self) -> List[ImageChannel]:
         """Gets a list of all available image channels."""
         return [ImageChannel(index_zero=i) for i in range(self.get_channel_count())]
@@ -173,6 +237,18 @@ class ImageLoader(ABC):
         raise ValueError("This image loader does not support saving images")
 
 
+def _check_region(zyx_slice: Tuple[slice, slice, slice]) -> Tuple[slice, slice, slice]:
+    """Checks that the region consists of three slices without steps. Raises ValueError otherwise."""
+    if len(zyx_slice) != 3:
+        raise ValueError(f"Expected three slices (z, y, x), got {zyx_slice}")
+    for axis_slice in zyx_slice:
+        if not isinstance(axis_slice, slice):
+            raise ValueError(f"Expected slices, got {axis_slice}")
+        if axis_slice.step is not None and axis_slice.step != 1:
+            raise ValueError(f"Steps are not supported for image regions, got {axis_slice}")
+    return zyx_slice[0], zyx_slice[1], zyx_slice[2]
+
+
 class NullImageLoader(ImageLoader):
 
     def copy(self) -> "ImageLoader":
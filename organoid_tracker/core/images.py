@@ -1,9 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, List, Tuple, Iterable, Union, Any, NamedTuple
+from typing import Dict, Optional, List, Tuple, Iterable, Union, Any, NamedTuple, TYPE_CHECKING
 
-import matplotlib
 import numpy
-from matplotlib.colors import Colormap
 from numpy import ndarray
 
 from organoid_tracker.core import TimePoint, UserError
@@ -13,6 +11,9 @@ from organoid_tracker.core.image_loader import ImageLoader, ImageChannel, NullIm
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution, ImageTimings
 
+if TYPE_CHECKING:
+    from matplotlib.colors import Colormap
+
 _ZERO = Position(0, 0, 0)
 
 
@@ -97,12 +98,51 @@ class _CachedImageLoader(ImageLoader):
         self._add_to_cache(time_point.time_point_number(), image_z, image_channel, array)
         return array
 
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        image_size_zyx = self._internal.get_image_size_zyx()
+        if image_size_zyx is None:
+            return None
+
+        # Check if all required z levels are in the cache
+        time_point_number = time_point.time_point_number()
+        z_start, z_stop, _ = zyx_slice[0].indices(image_size_zyx[0])
+        image_layers_by_z: List[Optional[ndarray]] = [None] * max(0, z_stop - z_start)
+        for entry in self._image_cache:
+            if entry.time_point_number == time_point_number and entry.image_channel == image_channel \
+                    and z_start <= entry.image_z < z_stop:
+                image_layers_by_z[entry.image_z - z_start] = entry.image_array
+        if len(image_layers_by_z) > 0 and _is_complete(image_layers_by_z):
+            return numpy.array([layer[zyx_slice[1], zyx_slice[2]] for layer in image_layers_by_z],
+                               dtype=image_layers_by_z[0].dtype)
+
+        # Cache miss, read just the region. We don't cache it, as the cache only holds full 2D slices
+        return self._internal.get_3d_image_region(time_point, image_channel, zyx_slice)
+
     def get_channel_count(self) -> int:
         return self._internal.get_channel_count()
 
     def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
         return self._internal.get_image_size_zyx()
 
+    def get_resolution_level_count(self) -> int:
+        return self._internal.get_resolution_level_count()
+
+    def get_image_size_zyx_at_level(self, level: int) -> Optional[Tuple[int, int, int]]:
+        return self._internal.get_image_size_zyx_at_level(level)
+
+    def get_3d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, level: int
+                                    ) -> Optional[ndarray]:
+        if level == 0:
+            return self.get_3d_image_array(time_point, image_channel)
+        return self._internal.get_3d_image_array_at_level(time_point, image_channel, level)  # Only cache full size
+
+    def get_2d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int,
+                                    level: int) -> Optional[ndarray]:
+        if level == 0:
+            return self.get_2d_image_array(time_point, image_channel, image_z)
+        return self._internal.get_2d_image_array_at_level(time_point, image_channel, image_z, level)
+
     def uncached(self) -> ImageLoader:
         return self._internal.uncached()
 
@@ -318,9 +358,9 @@ class Image:
 class ChannelDescription(NamedTuple):
     """Describes a channel in an image. What name did the user give it, and what colormap is used to display it?"""
     channel_name: str
-    colormap: Colormap
+    colormap: "Colormap"
 
-    def with_colormap(self, colormap: Colormap) -> "ChannelDescription":
+    def with_colormap(self, colormap: "Colormap") -> "ChannelDescription":
         """Creates a new ChannelDescription with the same channel name, but a different colormap."""
         return ChannelDescription(self.channel_name, colormap)
 
@@ -455,25 +495,38 @@ class Images:
         """
         if image_loader is not None:
             self._image_loader = _CachedImageLoader(image_loader)
+            self.filters.clear_cache()
             return image_loader
         return self._image_loader.uncached()
 
     def use_image_loader_from(self, images: "Images"):
         """Transfers the image loader from another Images instance, sharing the image cache."""
         self._image_loader = images._image_loader
+        self.filters.clear_cache()
 
     def get_image_stack(self, time_point: TimePoint, image_channel: ImageChannel = ImageChannel(index_zero=0)) -> \
     Optional[ndarray]:
         """Loads an image using the current image loader. Returns None if there is no image for this time point."""
-        array = self._image_loader.get_3d_image_array(time_point, image_channel)
-        return self.filters.filter(time_point, image_channel, None, array)
+        return self.filters.filter_cached(time_point, image_channel, None,
+                                          lambda: self._image_loader.get_3d_image_array(time_point, image_channel))
 
     def get_image_slice_2d(self, time_point: TimePoint, image_channel: ImageChannel, z: int) -> Optional[ndarray]:
         """Gets a 2D grayscale image for the given time point, image channel and z."""
         offset_z = self._offsets.of_time_point(time_point).z
         image_z = int(z - offset_z)
-        array = self._image_loader.get_2d_image_array(time_point, image_channel, image_z)
-        return self.filters.filter(time_point, image_channel, image_z, array)
+        return self.filters.filter_cached(time_point, image_channel, image_z,
+                                          lambda: self._image_loader.get_2d_image_array(time_point, image_channel,
+                                                                                        image_z))
+
+    def get_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                         zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        """Gets a part of a 3D image, like `get_image_stack(time_point, image_channel)[zyx_slice]`. The slices are in
+        image coordinates, so the offset is not taken into account. For channels without filters, only the region is
+        loaded. Filters can depend on the whole image, so for other channels the full image is loaded and filtered."""
+        if next(iter(self.filters.of_channel(image_channel)), None) is not None:
+            array = self.get_image_stack(time_point, image_channel)
+            return None if array is None else array[zyx_slice]
+        return self._image_loader.get_3d_image_region(time_point, image_channel, zyx_slice)
 
     def set_resolution(self, resolution: Optional[ImageResolution], *, overwrite_complex_timings: bool = False):
         """Sets the image resolution.
@@ -537,6 +590,7 @@ class Images:
 
     def get_channel_description(self, channel: ImageChannel) -> ChannelDescription:
         """Gets the description of the given channel."""
+        import matplotlib.cm
         while len(self._channel_descriptions) <= channel.index_zero:
             # Keep generating default channel descriptions until we have enough
             self._channel_descriptions.append(ChannelDescription(f"{len(self._channel_descriptions) + 1}",
@@ -553,6 +607,7 @@ class Images:
         images."""
         self._image_loader.close()
         self._image_loader = NullImageLoader()
+        self.filters.clear_cache()
 
     def move_in_time(self, time_point_delta: int):
         """Moves all timings and offset data in time. The images themselves cannot be moved in time."""
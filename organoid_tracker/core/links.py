@@ -2,6 +2,7 @@ import warnings
 from typing import Optional, Dict, Iterable, List, Set, Tuple, Any, ItemsView
 
 from organoid_tracker.core import TimePoint
+from organoid_tracker.core.change_events import ChangeNotifier, ChangeType
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.typing import DataType
 
@@ -357,10 +358,11 @@ def _create_link_tuple(position1: Position, position2: Position) -> Tuple[Positi
 # We disable the warning about protected members, because we would like to access the protected members of
 # LinkingTrack all the time, to keep the data structure consistent.
 # noinspection PyProtectedMember
-class Links:
+class Links(ChangeNotifier):
     """Represents all links between positions at different time points. This is used to follow particles over time. If a
     position is linked to two positions in the next time step, than that is a cell division. If a position is linked to
-    no position in the next step, then either the cell died or the cell moved out of the image."""
+    no position in the next step, then either the cell died or the cell moved out of the image. Use
+    `add_change_listener` to get notified of changes."""
 
     _tracks: List[LinkingTrack]
     _position_to_track: Dict[str, LinkingTrack]
@@ -393,7 +395,7 @@ class Links:
             self._tracks = other._tracks
             self._position_to_track = other._position_to_track
 
-        # Merge all metadata
+        # Merge all metadata (this also notifies the listeners)
         self.merge_link_meta_data(other)
 
     def merge_link_meta_data(self, other: "Links"):
@@ -407,6 +409,7 @@ class Links:
             else:
                 # Need to merge
                 our_data_of_time_point.merge_data(other_data_of_time_point)
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def add_track(self, track: LinkingTrack):
         """Adds a track to the linking network. This is useful if you have a track that is not linked to the rest of the
@@ -417,6 +420,108 @@ class Links:
         for position in track.positions():
             self._position_to_track[position.to_dict_key()] = track
 
+        if self._change_listeners is not None:
+            previous_position = None
+            for position in track.positions():
+                if previous_position is not None:
+                    self._notify_change(ChangeType.LINK_ADDED, previous_position.time_point_number(),
+                                        previous_position, position)
+                previous_position = position
+
+    def add_links_from_list(self, links: List[Tuple[Position, Position]],
+                            metadata_dict: Optional[Dict[str, List[Optional[DataType]]]] = None):
+        """Adds many links at once, optionally with metadata. The lists in the metadata dictionary must have the same
+        length as the links list, such that metadata_dict["example_key"][i] belongs to links[i]. Raises ValueError if
+        a link is not between consecutive time points.
+
+        This method is kind of low-level, and is mostly used for loading data from files. If there are no links yet,
+        the tracks are built directly from the list, which is a lot faster than calling add_link for every link.
+        """
+        links = [_create_link_tuple(position1, position2) for position1, position2 in links]
+
+        if self.has_links():
+            # Need to fit the links into the existing tracks. Going forwards in time, most links extend a track
+            for position1, position2 in sorted(links, key=lambda link: link[0].time_point_number()):
+                self.add_link(position1, position2)
+        else:
+            self._build_tracks(links)
+
+        if metadata_dict is not None:
+            for data_name, data_values in metadata_dict.items():
+                for link_tuple, value in zip(links, data_values):
+                    if value is None:
+                        continue
+                    time_point_number = link_tuple[0].time_point_number()
+                    data_of_time_point = self._link_meta_by_first_time_point.get(time_point_number)
+                    if data_of_time_point is None:
+                        data_of_time_point = _LinkDataOfTimePoint(link_tuple[0].time_point())
+                        self._link_meta_by_first_time_point[time_point_number] = data_of_time_point
+                    data_of_time_point.set_link_data(link_tuple, data_name, value)
+        self._notify_change(ChangeType.ALL_CHANGED, None)
+
+    def _build_tracks(self, links: List[Tuple[Position, Position]]):
+        """Builds all tracks from the given links, which must have the earliest position first. Only works if there
+        are no tracks yet."""
+        # Work with the same keys as self._position_to_track. Every position object is converted only once
+        keys_by_object_id: Dict[int, str] = dict()
+        positions_by_key: Dict[str, Position] = dict()
+        next_keys: Dict[str, List[str]] = dict()
+        previous_keys: Dict[str, List[str]] = dict()
+        for position1, position2 in links:
+            key1 = keys_by_object_id.get(id(position1))
+            if key1 is None:
+                key1 = position1.to_dict_key()
+                keys_by_object_id[id(position1)] = key1
+                positions_by_key[key1] = position1
+            key2 = keys_by_object_id.get(id(position2))
+            if key2 is None:
+                key2 = position2.to_dict_key()
+                keys_by_object_id[id(position2)] = key2
+                positions_by_key[key2] = position2
+
+            next_list = next_keys.get(key1)
+            if next_list is None:
+                next_keys[key1] = [key2]
+            elif key2 not in next_list:
+                next_list.append(key2)
+            else:
+                continue  # Duplicate link
+            previous_list = previous_keys.get(key2)
+            if previous_list is None:
+                previous_keys[key2] = [key1]
+            else:
+                previous_list.append(key1)
+
+        # A track continues as long as there are no divisions or merges, so a track starts at every position that
+        # doesn't have exactly one previous position, or whose previous position has multiple next positions
+        tracks_by_first_key: Dict[str, LinkingTrack] = dict()
+        last_keys: List[str] = list()
+        for key in positions_by_key.keys():
+            previous_list = previous_keys.get(key)
+            if previous_list is not None and len(previous_list) == 1 and len(next_keys[previous_list[0]]) == 1:
+                continue  # Part of the track of the previous position
+
+            track_keys = [key]
+            next_list = next_keys.get(key)
+            while next_list is not None and len(next_list) == 1 and len(previous_keys[next_list[0]]) == 1:
+                key = next_list[0]
+                track_keys.append(key)
+                next_list = next_keys.get(key)
+
+            track = LinkingTrack([positions_by_key[track_key] for track_key in track_keys])
+            self._tracks.append(track)
+            tracks_by_first_key[track_keys[0]] = track
+            last_keys.append(key)
+            for track_key in track_keys:
+                self._position_to_track[track_key] = track
+
+        # Connect the tracks
+        for track, last_key in zip(self._tracks, last_keys):
+            for next_key in next_keys.get(last_key, ()):
+                next_track = tracks_by_first_key[next_key]
+                track._next_tracks.append(next_track)
+                next_track._previous_tracks.append(track)
+
     def remove_all_links(self):
         """Removes all links in the experiment."""
         for track in self._tracks:  # Help the garbage collector by removing all the cyclic dependencies
@@ -425,12 +530,14 @@ class Links:
         self._tracks.clear()
         self._position_to_track.clear()
         self._link_meta_by_first_time_point.clear()
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def remove_links_of_position(self, position: Position):
         """Removes all links from and to the position."""
         track = self._position_to_track.get(position.to_dict_key())
         if track is None:
             return
+        removed_links = self.find_links_of(position) if self._change_listeners is not None else ()
 
         # First, while the links of this position still exist, remove their metadata
         self._remove_link_metadata(track, position)
@@ -475,6 +582,9 @@ class Links:
         # Remove from index
         del self._position_to_track[position.to_dict_key()]
 
+        for linked_position in removed_links:
+            self._notify_link_change(ChangeType.LINK_REMOVED, position, linked_position)
+
     def _remove_link_metadata(self, track: LinkingTrack, position: Position):
         """Internal method to remove all link metadata of the given position, which must be in the given track."""
 
@@ -525,6 +635,18 @@ class Links:
             if data_of_time_point is not None:
                 data_of_time_point.replace_link(link_tuple_old, link_tuple_new)
 
+        if self._change_listeners is not None:
+            for linked_position in self.find_links_of(position_new):
+                self._notify_link_change(ChangeType.LINK_REMOVED, position_old, linked_position)
+                self._notify_link_change(ChangeType.LINK_ADDED, position_new, linked_position)
+
+    def _notify_link_change(self, change_type: ChangeType, position1: Position, position2: Position,
+                            data_name: Optional[str] = None):
+        """Notifies the listeners of a change to a link. The position in the earliest time point is placed first."""
+        if position1.time_point_number() > position2.time_point_number():
+            position1, position2 = position2, position1
+        self._notify_change(change_type, position1.time_point_number(), position1, position2, data_name)
+
     def has_links(self) -> bool:
         """Returns True if at least one link is present."""
         return len(self._position_to_track) > 0
@@ -608,6 +730,7 @@ class Links:
                 # tracks, but this is faster
                 track1._positions_by_time_point.append(position2)
                 self._position_to_track[position2.to_dict_key()] = track1
+                self._notify_change(ChangeType.LINK_ADDED, position1.time_point_number(), position1, position2)
                 return
 
         if track1 is None:  # Create new mini-track
@@ -633,6 +756,7 @@ class Links:
         track1._next_tracks.append(track2)
         track2._previous_tracks.append(track1)
         self._try_merge(track1, track2)
+        self._notify_change(ChangeType.LINK_ADDED, position1.time_point_number(), position1, position2)
 
     def get_lineage_data(self, track: LinkingTrack, data_name: str) -> Optional[DataType]:
         """Gets the attribute of the lineage tree. Returns None if not found."""
@@ -667,6 +791,8 @@ class Links:
         else:
             # Store value
             track._lineage_data[data_name] = value
+        self._notify_change(ChangeType.LINEAGE_DATA_CHANGED, track._min_time_point_number,
+                            track.find_first_position(), data_name=data_name)
 
     def find_all_data_of_lineage(self, track: LinkingTrack) -> Iterable[Tuple[str, DataType]]:
         """Finds all lineage data of the given track."""
@@ -721,9 +847,10 @@ class Links:
                 return
 
             # The tracks may be connected. Remove the connection, if any
-            if track2 in track1._next_tracks:
-                self._decouple_next_track(track1, next_track=track2)
-                self._decouple_previous_track(track2, previous_track=track1)
+            if track2 not in track1._next_tracks:
+                return
+            self._decouple_next_track(track1, next_track=track2)
+            self._decouple_previous_track(track2, previous_track=track1)
 
         # Remove link data
         link_tuple = position1, position2  # We already checked that position1 is before position2, and that they are in consecutive time points
@@ -732,6 +859,7 @@ class Links:
             data_of_time_point.remove_link(link_tuple)
             if not data_of_time_point.has_link_data():
                 del self._link_meta_by_first_time_point[position1.time_point_number()]
+        self._notify_change(ChangeType.LINK_REMOVED, position1.time_point_number(), position1, position2)
 
     def _decouple_next_track(self, track: LinkingTrack, *, next_track: LinkingTrack):
         """Removes a next track from the current track. If only one next track remains, a merge with the remaining next
@@ -1103,6 +1231,7 @@ class Links:
             data_of_time_point.move_in_time(time_point_delta)
             new_dictionary[time_point_number + time_point_delta] = data_of_time_point
         self._link_meta_by_first_time_point = new_dictionary
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def connect_tracks(self, *, previous: LinkingTrack, next: LinkingTrack):
         """Connects two tracks. The previous track should end one time point before the next track starts. Raises
@@ -1120,6 +1249,8 @@ class Links:
         # Connect the tracks
         previous._next_tracks.append(next)
         next._previous_tracks.append(previous)
+        self._notify_change(ChangeType.LINK_ADDED, previous.last_time_point_number(), previous.find_last_position(),
+                            next.find_first_position())
 
     def has_link_data(self) -> bool:
         """Gets whether there is any link metadata stored here."""
@@ -1157,6 +1288,8 @@ class Links:
         if value is None and not data_of_time_point.has_link_data():
             # Deleted the last data of this time point, so remove the time point
             del self._link_meta_by_first_time_point[link_tuple[0].time_point_number()]
+        self._notify_change(ChangeType.LINK_DATA_CHANGED, link_tuple[0].time_point_number(), link_tuple[0],
+                            link_tuple[1], data_name)
 
     def find_all_links_with_data(self, data_name: str) -> ItemsView[Tuple[Position, Position], DataType]:
         """Gets a dictionary of all positions with the given data marker. Do not modify the returned dictionary."""
@@ -1,10 +1,11 @@
-from typing import Set, Type, Tuple, Iterable, Dict, Any, Optional
-
-from matplotlib.axes import Axes
+from typing import Set, Type, Tuple, Iterable, Dict, Any, Optional, TYPE_CHECKING
 
 from organoid_tracker.core import Color
 from organoid_tracker.core.typing import MPLColor
 
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+
 
 class Marker:
     """Used to represent the type of a position, crypt axis or something else. So does this position represent a
@@ -64,7 +65,7 @@ class Marker:
         return isinstance(other, Marker) and self._save_name == other._save_name
 
 
-def draw_marker_2d(x: float, y: float, dz: int, dt: int, area: Axes, color: MPLColor, edge_color: MPLColor):
+def draw_marker_2d(x: float, y: float, dz: int, dt: int, area: "Axes", color: MPLColor, edge_color: MPLColor):
     """The default (point) representation of a shape. Implementation can fall back on this if they want."""
     if abs(dz) > 3:
         return
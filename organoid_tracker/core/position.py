@@ -73,7 +73,9 @@ class Position:
         return f"{self._time_point_number} {self.z:.2f} {self.y:.2f} {self.x:.2f}"
 
     def __hash__(self) -> int:
-        return int(self.x) ^ hash(self._time_point_number)
+        # Only x is used, as __eq__ allows for small differences. Hashing the tuple (instead of using XOR) avoids
+        # collisions between positions at nearby x and time points, which made large dicts of positions slow
+        return hash((int(self.x), self._time_point_number))
 
     def __eq__(self, other) -> bool:
         if other is None:
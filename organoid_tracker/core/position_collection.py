@@ -1,8 +1,10 @@
 import warnings
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from typing import Dict, AbstractSet, Optional, Iterable, List, Any, Tuple, Union, Type, Set, Sized
 
 from organoid_tracker.core import TimePoint, min_none, max_none
+from organoid_tracker.core.change_events import ChangeNotifier, ChangeType
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.typing import DataType
 
@@ -17,10 +19,15 @@ class _PositionsAtTimePoint:
     _metadata_names: Dict[str, int]  # Metadata name -> index in metadata list in self._positions
     _metadata_counts: Dict[str, int]  # Metadata name -> number of times it is used
 
+    # Lazily built index: round(z) of all positions in ascending order, and the positions in that same order. Set to
+    # None whenever a position is added, moved or removed.
+    _z_index: Optional[Tuple[List[int], List[Position]]]
+
     def __init__(self):
         self._positions = dict()
         self._metadata_names = dict()
         self._metadata_counts = dict()
+        self._z_index = None
 
     def copy(self, ) -> "_PositionsAtTimePoint":
         """Gets a deep copy of this object. Changes to the returned object will not affect this object, and vice versa.
@@ -38,17 +45,21 @@ class _PositionsAtTimePoint:
         for position, metadata in self._positions.items():
             new_dict[position.with_time_point_number(position.time_point_number() + time_point_offset)] = metadata
         self._positions = new_dict
+        self._z_index = None
 
-    def replace_position(self, old_position: Position, new_position: Position):
+    def replace_position(self, old_position: Position, new_position: Position) -> bool:
         """Moves a position if it exists, keeping its metadata. Does nothing if the position is not in this collection.
-        Does not check whether both positions have the same time point."""
+        Does not check whether both positions have the same time point. Returns True if the position was moved."""
         if new_position in self._positions:
             raise ValueError("New position already exists")
         if old_position == new_position:
-            return
+            return False
         old_data = self._positions.pop(old_position, None)
         if old_data is not None:
             self._positions[new_position] = old_data
+            self._z_index = None
+            return True
+        return False
 
     def delete_data_with_name(self, data_name: str):
         """Deletes the data with the given key, for all positions in the time point. Does nothing if the data name is
@@ -94,6 +105,7 @@ class _PositionsAtTimePoint:
             return
         # Add the position with an empty metadata list
         self._positions[position] = []
+        self._z_index = None
 
     def set_position_data_required(self, position: Position, data_name: str, value_required: DataType):
         """Sets the data for a position. If the data already exists, it is overwritten. Note that the position data
@@ -144,6 +156,7 @@ class _PositionsAtTimePoint:
             if data_of_position is None:
                 data_of_position = []
                 self._positions[position] = data_of_position
+                self._z_index = None
 
             # Modify the data list to insert the data value at the correct index
             while len(data_of_position) <= data_index:
@@ -196,6 +209,7 @@ class _PositionsAtTimePoint:
         existing_data = self._positions.pop(position, None)
         if existing_data is None:
             return False
+        self._z_index = None
 
         metadata_names_to_delete = None
         for metadata_name, metadata_index in self._metadata_names.items():
@@ -235,6 +249,7 @@ class _PositionsAtTimePoint:
             if our_metadata_values is None:
                 our_metadata_values = []
                 self._positions[position] = our_metadata_values
+                self._z_index = None
 
             for other_metadata_name, other_metadata_index in other_metadata_names.items():
                 if other_metadata_index >= len(other_metadata_values):
@@ -267,17 +282,35 @@ class _PositionsAtTimePoint:
         """Returns the number of positions in this time point."""
         return len(self._positions)
 
+    def _get_z_index(self) -> Tuple[List[int], List[Position]]:
+        """Gets the z index, rebuilding it if positions were changed since the last call."""
+        z_index = self._z_index
+        if z_index is None:
+            # round(...) never changes the order, so sorting on z also sorts on round(z)
+            positions = sorted(self._positions.keys(), key=lambda position: position.z)
+            z_index = ([round(position.z) for position in positions], positions)
+            self._z_index = z_index
+        return z_index
+
+    def positions_in_z_range(self, z_min: Optional[int], z_max: Optional[int]) -> List[Position]:
+        """Gets all positions for which z_min <= round(position.z) <= z_max, sorted by z. Use None for z_min or z_max
+        to leave out that bound. Uses binary search on a sorted index, so it's fast even for many positions."""
+        rounded_z_values, positions = self._get_z_index()
+        start = 0 if z_min is None else bisect_left(rounded_z_values, z_min)
+        stop = len(positions) if z_max is None else bisect_right(rounded_z_values, z_max)
+        return positions[start:stop]
+
     def lowest_z(self) -> Optional[int]:
         """Returns the lowest z in use for this time point. If there are no positions, returns None."""
         if not self._positions:
             return None
-        return min(round(position.z) for position in self._positions.keys())
+        return self._get_z_index()[0][0]
 
     def highest_z(self) -> Optional[int]:
         """Returns the highest z in use for this time point. If there are no positions, returns None."""
         if not self._positions:
             return None
-        return max(round(position.z) for position in self._positions.keys())
+        return self._get_z_index()[0][-1]
 
 
 def _guess_data_type(example_value: Any) -> Type:
@@ -294,7 +327,9 @@ def _guess_data_type(example_value: Any) -> Type:
 
 
 # noinspection PyProtectedMember
-class PositionCollection:
+class PositionCollection(ChangeNotifier):
+    """All positions of an experiment, along with their metadata. Use `add_change_listener` to get notified of
+    changes."""
 
     _all_positions: Dict[int, _PositionsAtTimePoint]
     _min_time_point_number: Optional[int] = None
@@ -321,6 +356,7 @@ class PositionCollection:
         if time_point.time_point_number() in self._all_positions:
             del self._all_positions[time_point.time_point_number()]
             self._recalculate_min_max_time_points()
+            self._notify_change(ChangeType.TIME_POINT_CHANGED, time_point.time_point_number())
 
     def add(self, position: Position):
         """Adds a position, optionally with the given shape. The position must have a time point specified."""
@@ -335,6 +371,7 @@ class PositionCollection:
             positions_at_time_point = _PositionsAtTimePoint()
             self._all_positions[time_point_number] = positions_at_time_point
         positions_at_time_point.add_position(position)
+        self._notify_change(ChangeType.POSITION_ADDED, time_point_number, position)
 
     def _update_min_max_time_points_for_addition(self, new_time_point_number: int):
         """Bookkeeping: makes sure the min and max time points are updated when a new time point is added"""
@@ -364,7 +401,8 @@ class PositionCollection:
         positions_at_time_point = self._all_positions.get(time_point_number)
         if positions_at_time_point is None:
             return  # Position was not in collection
-        positions_at_time_point.replace_position(old_position, new_position)
+        if positions_at_time_point.replace_position(old_position, new_position):
+            self._notify_change(ChangeType.POSITION_MOVED, time_point_number, old_position, new_position)
 
     def detach_position(self, position: Position):
         """Removes a position from a time point. Does nothing if the position is not in this collection."""
@@ -381,14 +419,14 @@ class PositionCollection:
             del self._all_positions[position.time_point_number()]
             self._recalculate_min_max_time_points()
 
-        if return_value is True:
-            return  # Position was found and removed, but no metadata was depleted
+        if return_value is not True:  # So some metadata was depleted
+            for depleted_metadata_name in return_value:
+                is_in_other_time_points = any(data_of_time_point._metadata_names.get(depleted_metadata_name) is not None
+                                              for data_of_time_point in self._all_positions.values())
+                if not is_in_other_time_points:
+                    del self._data_names_and_types[depleted_metadata_name]
 
-        for depleted_metadata_name in return_value:
-            is_in_other_time_points = any(data_of_time_point._metadata_names.get(depleted_metadata_name) is not None
-                                          for data_of_time_point in self._all_positions.values())
-            if not is_in_other_time_points:
-                del self._data_names_and_types[depleted_metadata_name]
+        self._notify_change(ChangeType.POSITION_REMOVED, position.time_point_number(), position)
 
     def first_time_point_number(self) -> Optional[int]:
         """Gets the first time point that contains positions, or None if there are no positions stored."""
@@ -447,6 +485,7 @@ class PositionCollection:
         # Update min and max time points
         self._min_time_point_number = min_none(self._min_time_point_number, other._min_time_point_number)
         self._max_time_point_number = max_none(self._max_time_point_number, other._max_time_point_number)
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def add_positions(self, other: "PositionCollection"):
         warnings.warn("PositionCollection.add_positions() was renamed to PositionCollection.merge_data()", DeprecationWarning)
@@ -470,15 +509,13 @@ class PositionCollection:
 
     def nearby_z(self, z: int) -> Iterable[Position]:
         """Returns all positions (for any time point) for which round(position.z) == z."""
-        # Not very optimized. There used to be a data structure indexed by Z, but in practice that was not needed.
         for positions_at_time_point in self._all_positions.values():
-            for position in positions_at_time_point.positions():
-                if round(position.z) == z:
-                    yield position
+            yield from positions_at_time_point.positions_in_z_range(z, z)
 
     def of_time_point_and_z(self, time_point: TimePoint, z_min: Optional[int] = None, z_max: Optional[int] = None
                             ) -> Iterable[Position]:
-        """Gets all positions that are nearby the given min to max z, inclusive."""
+        """Gets all positions that are nearby the given min to max z, inclusive. So z_min <= round(position.z) <= z_max.
+        If z_min and/or z_max are given, the positions are returned sorted by z."""
         of_time_point = self._all_positions.get(time_point.time_point_number())
         if of_time_point is None:
             return
@@ -488,12 +525,7 @@ class PositionCollection:
             yield from of_time_point.positions()
             return
 
-        for position in of_time_point.positions():
-            if z_min is not None and round(position.z) < z_min:
-                continue
-            if z_max is not None and round(position.z) > z_max:
-                continue
-            yield position
+        yield from of_time_point.positions_in_z_range(z_min, z_max)
 
     def lowest_z(self) -> Optional[int]:
         """Returns the lowest z in use, or None if there are no positions in this collection."""
@@ -529,6 +561,7 @@ class PositionCollection:
         if self._min_time_point_number is not None and self._max_time_point_number is not None:
             self._min_time_point_number += time_point_delta
             self._max_time_point_number += time_point_delta
+        self._notify_change(ChangeType.ALL_CHANGED, None)
 
     def has_position_data(self) -> bool:
         """Gets whether there is any position metadata stored here."""
@@ -585,6 +618,8 @@ class PositionCollection:
                 # Update our data type index
                 if data_name not in self._data_names_and_types:
                     self._data_names_and_types[data_name] = _guess_data_type(value)
+        self._notify_change(ChangeType.POSITION_DATA_CHANGED, position.time_point_number(), position,
+                            data_name=data_name)
 
     def find_all_positions_with_data(self, data_name: str) -> Iterable[Tuple[Position, DataType]]:
         """Gets a dictionary of all positions with the given data marker. Do not modify the returned dictionary."""
@@ -628,10 +663,16 @@ class PositionCollection:
             first_value = next(iter(data_set.values()))
             self._data_names_and_types[data_name] = _guess_data_type(first_value)
 
+        if self._change_listeners is not None:
+            for position in data_set.keys():
+                self._notify_change(ChangeType.POSITION_DATA_CHANGED, position.time_point_number(), position,
+                                    data_name=data_name)
+
     def delete_data_with_name(self, data_name: str):
         """Deletes the data with the given key, for all positions in the experiment."""
         for positions_at_time_point in self._all_positions.values():
             positions_at_time_point.delete_data_with_name(data_name)
+        self._notify_change(ChangeType.POSITION_DATA_CHANGED, None, data_name=data_name)
 
     def find_all_data_names(self) -> Set[str]:
         """Finds all data_names"""
@@ -697,6 +738,8 @@ class PositionCollection:
                     self._data_names_and_types[data_name] = _guess_data_type(some_value)
                     break
 
+        self._notify_change(ChangeType.TIME_POINT_CHANGED, time_point.time_point_number())
+
     def create_time_point_dict(self, time_point: TimePoint, positions: List[Position]) -> Dict[str, List[Optional[DataType]]]:
         """Creates a dictionary of metadata lists for a given time point. The metadata lists are empty. This is useful
         for creating a new time point with the same positions as an existing time point, but with no metadata."""
@@ -2,9 +2,9 @@ import math
 from typing import List, Dict, Optional, Tuple, Iterable, NamedTuple, Sequence
 
 import numpy
-from scipy import interpolate
 
 from organoid_tracker.core import TimePoint
+from organoid_tracker.core.change_events import ChangeNotifier, ChangeType
 from organoid_tracker.core.links import Links
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.marker import Marker
@@ -157,6 +157,7 @@ class Spline:
 
         k = 3 if len(self._x_list) > 3 else 1
         # noinspection PyTupleAssignmentBalance
+        from scipy import interpolate
         spline, _ = interpolate.splprep([self._x_list, self._y_list, self._z_list], k=k)
         points = interpolate.splev(numpy.arange(0, 1.01, 0.05), spline)
         x_values = points[0]
@@ -373,8 +374,9 @@ def _distance_to_line_segment_squared(line_x1, line_y1, line_z1, line_x2, line_y
                              line_z1 + t * (line_z2 - line_z1))
 
 
-class SplineCollection:
-    """Holds the paths of all time points in an experiment."""
+class SplineCollection(ChangeNotifier):
+    """Holds the paths of all time points in an experiment. Use `add_change_listener` to get notified of changes. Note
+    that changes made directly to a Spline object are not reported."""
 
     _splines: Dict[TimePoint, Dict[int, Spline]]
     _min_time_point_number: Optional[int]
@@ -496,6 +498,7 @@ class SplineCollection:
                 while spline_id in existing_splines:
                     spline_id += 1
             existing_splines[spline_id] = path
+        self._notify_change(ChangeType.SPLINE_CHANGED, time_point.time_point_number())
         return spline_id
 
     def remove_spline(self, time_point: TimePoint, spline_to_remove: Spline):
@@ -521,6 +524,7 @@ class SplineCollection:
             if time_point.time_point_number() == self._min_time_point_number \
                     or time_point.time_point_number() == self._max_time_point_number:
                 self._recalculate_min_max_time_point()  # Removed first or last time point, calculate new min/max
+        self._notify_change(ChangeType.SPLINE_CHANGED, time_point.time_point_number())
 
     def exists(self, path: Spline, time_point: TimePoint) -> bool:
         """Returns True if the path exists in this path collection at the given time point, False otherwise."""
@@ -575,6 +579,7 @@ class SplineCollection:
             return
         for spline in splines.values():
             spline.update_offset_for_positions(new_positions)
+        self._notify_change(ChangeType.SPLINE_CHANGED, time_point.time_point_number())
 
     def set_marker(self, axis_id: int, axis_marker: Optional[Marker]):
         """Sets the marker of the specified data axes across all time points. High-level version of set_marker_name.
@@ -596,11 +601,13 @@ class SplineCollection:
             if axis_id in self._spline_markers:
                 del self._spline_markers[axis_id]
                 del self._spline_is_axis[axis_id]
+                self._notify_change(ChangeType.SPLINE_CHANGED, None)
             return
 
         # Set marker
         self._spline_markers[axis_id] = axis_marker.upper()
         self._spline_is_axis[axis_id] = is_data_axis
+        self._notify_change(ChangeType.SPLINE_CHANGED, None)
 
     def get_marker_name(self, axis_id: int) -> Optional[str]:
         """Gets the marker of the data axes with the given id."""
@@ -622,3 +629,4 @@ class SplineCollection:
             # the Spline object doesn't store time points, so we can just move them to another time point
         self._splines = new_splines
         self._recalculate_min_max_time_point()
+        self._notify_change(ChangeType.ALL_CHANGED, None)
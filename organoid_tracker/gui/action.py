@@ -282,6 +282,14 @@ def set_image_resolution(window: Window):
     image_resolution_dialog.popup_resolution_setter(window)
 
 
+def cancel_running_tasks(window: Window):
+    scheduler = window.get_scheduler()
+    if not scheduler.has_active_tasks():
+        raise UserError("No running tasks", "There are no tasks running at the moment, so there is nothing to cancel.")
+    scheduler.cancel_all_tasks()
+    window.set_status("Requested all running tasks to stop. Some tasks may need a moment before they actually stop.")
+
+
 def view_statistics(window: Window):
     experiment = window.get_experiment()
     if experiment.last_time_point_number() is None:
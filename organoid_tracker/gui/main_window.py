@@ -196,6 +196,7 @@ class MainWindow(Window):
             "File//Export-Export links//GEFF format...": lambda: action.export_links_geff(self),
             "Edit//Experiment-Rename experiment...": lambda: action.rename_experiment(self),
             "Edit//Experiment-Set image resolution...": lambda: action.set_image_resolution(self),
+            "Edit//Tasks-Cancel running tasks": lambda: action.cancel_running_tasks(self),
             "View//Toggle-Toggle showing axis numbers": lambda: action.toggle_axis(self.get_figure()),
             "View//Statistics-View statistics...": lambda: action.view_statistics(self),
         }
@@ -206,6 +207,7 @@ class MainWindow(Window):
         menu_items = dict()
         for plugin in self.plugin_manager.get_plugins():
             menu_items.update(plugin.get_menu_items(self))
+        self.plugin_manager.save_manifest_if_changed()  # Now that the menu items are known
         return menu_items
 
     def _get_last_default_menu(self) -> Dict[str, Any]:
@@ -1,25 +1,65 @@
+import itertools
+import os
 import queue
 from abc import ABC
 from queue import Queue
-from threading import Thread
-from typing import Optional, Any
+from threading import Thread, Event, Lock, Condition
+from typing import Optional, Any, List, Set, Tuple
 
 from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 
-from organoid_tracker.core import UserError
-from organoid_tracker.core.concurrent import ConcurrentSet
 from organoid_tracker.gui.progress_bar import ProgressBar
 
 
+class TaskCancelledError(Exception):
+    """Raised by CancellationToken.raise_if_cancelled() to stop a task that was cancelled. The scheduler catches this
+    exception, and calls Task.on_cancelled() instead of Task.on_error()."""
+    pass
+
+
+class CancellationToken:
+    """Used to cancel a task. Cancellation is cooperative: the task itself needs to check every now and then whether it
+    has been cancelled, for example once per time point."""
+
+    _cancelled: Event
+
+    def __init__(self):
+        self._cancelled = Event()
+
+    def cancel(self):
+        """Requests the task to stop. Can be called from any thread."""
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        """Checks whether cancel() has been called."""
+        return self._cancelled.is_set()
+
+    def raise_if_cancelled(self):
+        """Raises TaskCancelledError if cancel() has been called."""
+        if self._cancelled.is_set():
+            raise TaskCancelledError()
+
+
 class Task(ABC):
     """A long-running task. run() will be called on a worker thread, on_finished() and on_error() on the GUI thread.
 
+    By default, tasks run one at a time. Tasks that can safely run at the same time as other tasks can override
+    allows_concurrency(). Even then, if a task changes some shared state, make sure to do that in on_finished(), not in
+    compute().
+
     Note: this class is kind of low-level. If you have a task that needs to process Experiment objects in some way,
     consider using the higher-level WorkerJob class instead. This class greatly simplifies running any task on all
     active experiments.
     """
 
+    # Tasks with a lower number are started first
+    PRIORITY_INTERACTIVE = 0  # Short tasks that the user is waiting for, like loading data for drawing
+    PRIORITY_NORMAL = 10
+    PRIORITY_BACKGROUND = 20  # Long analyses, like running a neural network
+
+    _cancellation_token: Optional[CancellationToken] = None
+
     def compute(self) -> Any:
         raise NotImplementedError()
 
@@ -30,6 +70,11 @@ class Task(ABC):
         from organoid_tracker.gui import dialog
         dialog.popup_exception(e)
 
+    def on_cancelled(self):
+        """Called on the GUI thread instead of on_finished() or on_error() if the task was cancelled. The default
+        implementation does nothing."""
+        pass
+
     def get_percentage_completed(self) -> Optional[int]:
         """Gets the percentage currently completed. Can be called from any thread.
 
@@ -38,70 +83,130 @@ class Task(ABC):
         """
         return None
 
+    def get_priority(self) -> int:
+        """Gets the priority of this task, like Task.PRIORITY_NORMAL. If there are more tasks than worker threads, tasks
+        with a lower number are started first."""
+        return Task.PRIORITY_NORMAL
+
+    def allows_concurrency(self) -> bool:
+        """Whether this task can run at the same time as other tasks. The default is False, which means that the task
+        never runs at the same time as any other task that returns False. Only return True if compute() doesn't use any
+        shared state, like image loaders or Keras."""
+        return False
+
+    def get_cancellation_token(self) -> CancellationToken:
+        """Gets the token that is used to cancel this task. In compute(), call is_cancelled() or
+        get_cancellation_token().raise_if_cancelled() every now and then to find out if you need to stop."""
+        if self._cancellation_token is None:
+            self._cancellation_token = CancellationToken()
+        return self._cancellation_token
+
+    def cancel(self):
+        """Requests this task to stop. Tasks that haven't started yet will not be started at all."""
+        self.get_cancellation_token().cancel()
+
+    def is_cancelled(self) -> bool:
+        """Checks whether cancel() has been called."""
+        return self.get_cancellation_token().is_cancelled()
+
 
 class _CompletedTask:
     task: Task
     result: Optional[Any]
     error: Optional[Exception] = None
+    cancelled: bool = False
 
-    def __init__(self, task: Task, result: Optional[Any] = None, error: Optional[Exception] = None):
-        if error is None and result is None:
-            raise ValueError("Error and result are both None")
-        if error is not None and result is not None:
-            raise ValueError("Error and result both have a value")
+    def __init__(self, task: Task, result: Optional[Any] = None, error: Optional[Exception] = None, *,
+                 cancelled: bool = False):
+        if not cancelled:
+            if error is None and result is None:
+                raise ValueError("Error and result are both None")
+            if error is not None and result is not None:
+                raise ValueError("Error and result both have a value")
         self.task = task
         self.result = result
         self.error = error
+        self.cancelled = cancelled
 
     def handle(self):
-        if self.error is not None:
+        if self.cancelled:
+            self.task.on_cancelled()
+        elif self.error is not None:
             self.task.on_error(self.error)
         else:
             self.task.on_finished(self.result)
 
 
-class Scheduler(Thread):
-    """To avoid blocking the UI, computationally intensive tasks are run on a worker thread. Simply call add_task(..)
-    and the task will be executed on a worker thread."""
+def _get_default_worker_count() -> int:
+    # At least two, so that tasks that allow concurrency can still run while a long task is running
+    return max(2, min(4, os.cpu_count() or 1))
+
+
+class Scheduler:
+    """To avoid blocking the UI, computationally intensive tasks are run on worker threads. Simply call add_task(..)
+    and the task will be executed on a worker thread. Only tasks that allow it (see Task.allows_concurrency()) run at
+    the same time as other tasks. Of the tasks that can be started, the tasks with the highest priority (see
+    Task.get_priority()) are started first."""
 
-    _task_queue: Queue  # Queue[Task]
-    _running_task: Optional[Task]
+    _queued_tasks: List[Tuple[int, int, Task]]  # So (priority, sequence number, task), protected by _lock
+    _sequence_numbers: "itertools.count"
+    _running_tasks: Set[Task]
+    _exclusive_task_running: bool  # Whether a task that doesn't allow concurrency is running, protected by _lock
+    _unfinished_task_count: int  # Queued and running tasks, protected by _lock
+    _lock: Lock
+    _task_available: Condition  # Uses _lock, notified when a task was added or finished
     _finished_queue: Queue  # Queue[_CompletedTask]
     _progress_bar: ProgressBar
 
-    def __init__(self, progress_bar: ProgressBar):
-        super().__init__()
-        self._task_queue = Queue(maxsize=1)
+    def __init__(self, progress_bar: ProgressBar, worker_count: Optional[int] = None):
+        self._queued_tasks = list()
+        self._sequence_numbers = itertools.count()
+        self._running_tasks = set()
+        self._exclusive_task_running = False
+        self._unfinished_task_count = 0
+        self._lock = Lock()
+        self._task_available = Condition(self._lock)
         self._finished_queue = Queue()
-        self._running_task = None
         self._progress_bar = progress_bar
 
+        if worker_count is None:
+            worker_count = _get_default_worker_count()
+        for i in range(worker_count):
+            Thread(target=self._run_worker, name=f"SchedulerWorker-{i}", daemon=True).start()
+
         timer = QTimer(QApplication.instance())
         timer.timeout.connect(self._check_for_results_on_gui_thread)
         timer.start(100)
 
-    def add_task(self, task: Task):
-        if self._running_task is None:
-            try:
-                self._task_queue.put_nowait(task)
-                self._progress_bar.set_busy()
-                return
-            except queue.Full:
-                pass
-        task.on_error(UserError("Another task is running", "Another task is already running. "
-                                                           "Please wait for it to finish."))
+    def add_task(self, task: Task) -> CancellationToken:
+        """Schedules the task. Returns the token that you can use to cancel it."""
+        cancellation_token = task.get_cancellation_token()  # Created here, so on the GUI thread
+        with self._lock:
+            self._unfinished_task_count += 1
+            self._queued_tasks.append((task.get_priority(), next(self._sequence_numbers), task))
+            self._task_available.notify()
+        self._progress_bar.set_busy()
+        return cancellation_token
+
+    def cancel_all_tasks(self):
+        """Requests all queued and running tasks to stop."""
+        for task in self.get_active_tasks():
+            task.cancel()
+        with self._lock:
+            self._task_available.notify_all()  # Cancelled tasks can be finished right away
 
     def _check_for_results_on_gui_thread(self):
         try:
             # Update progress bar
-            task = self._running_task
-            if task is not None:
-                self._progress_bar.set_progress(task.get_percentage_completed())
+            percentage = self._get_percentage_completed()
+            if percentage is not None:
+                self._progress_bar.set_progress(percentage)
 
             # Handle all finished tasks
             while True:
                 result: _CompletedTask = self._finished_queue.get(block=False)
-                self._progress_bar.set_progress(100)
+                if not self.has_active_tasks():
+                    self._progress_bar.set_progress(100)
                 result.handle()
         except queue.Empty:
             # Ignore, will check again after a while
@@ -113,26 +218,66 @@ class Scheduler(Thread):
             self._progress_bar.set_error()
 
     def _get_percentage_completed(self) -> Optional[float]:
-        """Gets the percentage completed of the current task. Returns None if there is no running task, or if the
-        current task doesn't keep track of how far it is completed."""
-        task = self._running_task
-        if task is None:
+        """Gets the average percentage completed of the running tasks. Returns None if there are no running tasks, or if
+        none of the running tasks keep track of how far they are completed."""
+        with self._lock:
+            tasks = list(self._running_tasks)
+        percentages = [task.get_percentage_completed() for task in tasks]
+        percentages = [percentage for percentage in percentages if percentage is not None]
+        if len(percentages) == 0:
             return None
-        return task.get_percentage_completed()
+        return sum(percentages) / len(percentages)
 
-    def run(self):
-        """Long-running method that processes pending tasks. Do not call, let Python call it."""
+    def _take_next_task(self) -> Optional[Task]:
+        """Removes the queued task with the highest priority that can be started now. Returns None if there's no such
+        task. Must be called with the lock held."""
+        startable_entries = [entry for entry in self._queued_tasks if not self._exclusive_task_running
+                             or entry[2].allows_concurrency() or entry[2].is_cancelled()]
+        if len(startable_entries) == 0:
+            return None
+        entry = min(startable_entries, key=lambda startable_entry: startable_entry[0:2])
+        self._queued_tasks.remove(entry)
+        return entry[2]
+
+    def _run_worker(self):
+        """Long-running method that processes pending tasks. Called on every worker thread."""
         while True:
-            task: Task = self._task_queue.get(block=True, timeout=None)  # Blocks until the next task
-            self._running_task = task  # Set the task as the currently active task
+            with self._lock:
+                task = self._take_next_task()
+                while task is None:
+                    self._task_available.wait()  # Blocks until a task is added or finished
+                    task = self._take_next_task()
+                is_exclusive = not task.allows_concurrency() and not task.is_cancelled()
+                if is_exclusive:
+                    self._exclusive_task_running = True
+                self._running_tasks.add(task)
             try:
-                result = task.compute()
-                self._finished_queue.put(_CompletedTask(task, result=result))
+                if task.is_cancelled():
+                    completed_task = _CompletedTask(task, cancelled=True)  # Cancelled before it was started
+                else:
+                    result = task.compute()
+                    if task.is_cancelled():
+                        completed_task = _CompletedTask(task, cancelled=True)
+                    else:
+                        completed_task = _CompletedTask(task, result=result)
+            except TaskCancelledError:
+                completed_task = _CompletedTask(task, cancelled=True)
             except Exception as e:
-                self._finished_queue.put(_CompletedTask(task, error=e))
-            finally:
-                self._running_task = None
+                completed_task = _CompletedTask(task, error=e)
+            with self._lock:
+                self._running_tasks.discard(task)
+                self._unfinished_task_count -= 1
+                if is_exclusive:
+                    self._exclusive_task_running = False
+                    self._task_available.notify_all()
+            self._finished_queue.put(completed_task)
+
+    def get_active_tasks(self) -> List[Task]:
+        """Gets all tasks that are currently running or scheduled to run."""
+        with self._lock:
+            return list(self._running_tasks) + [task for _, _, task in self._queued_tasks]
 
     def has_active_tasks(self) -> bool:
         """Gets whether there are currently tasks being run or scheduled to run."""
-        return self._running_task is not None or self._task_queue.qsize() > 0
+        with self._lock:
+            return self._unfinished_task_count > 0
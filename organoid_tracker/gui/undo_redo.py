@@ -1,8 +1,49 @@
 import collections
-from typing import Deque, List
+import zlib
+from typing import Deque, List, NamedTuple, Tuple
+
+import numpy
+from numpy import ndarray
 
 from organoid_tracker.core.experiment import Experiment
 
+# By default, the undo history of a tab may use this much memory. Older actions are removed once the history gets larger
+DEFAULT_MEMORY_BUDGET_BYTES = 500 * 1024 * 1024
+
+# Rough estimate of the memory needed to store a position along with its links and data, for use in
+# UndoableAction.get_memory_usage_bytes()
+ESTIMATED_BYTES_PER_POSITION = 500
+
+# Used for actions that don't report their memory usage
+_DEFAULT_ACTION_BYTES = 1000
+
+
+class CompressedArray:
+    """Stores a numpy array in compressed form. Useful for undo actions that need to store (parts of) images, as those
+    usually compress very well."""
+
+    _data: bytes
+    _shape: Tuple[int, ...]
+    _dtype: numpy.dtype
+
+    def __init__(self, array: ndarray):
+        self._shape = array.shape
+        self._dtype = array.dtype
+        self._data = zlib.compress(numpy.ascontiguousarray(array).tobytes(), level=1)
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the compressed data."""
+        return len(self._data)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    def to_array(self) -> ndarray:
+        """Decompresses the array. Returns a new, writable array."""
+        return numpy.frombuffer(zlib.decompress(self._data), dtype=self._dtype).reshape(self._shape).copy()
+
 
 class UndoableAction:
 
@@ -21,6 +62,12 @@ class UndoableAction:
         message of what just happened."""
         raise NotImplementedError()
 
+    def get_memory_usage_bytes(self) -> int:
+        """Estimates how much memory this action keeps alive. Once the undo history uses more than its memory budget,
+        the oldest actions are removed. Actions that store many positions or (parts of) images should override this
+        method. Called after do() and undo()."""
+        return _DEFAULT_ACTION_BYTES
+
 
 class ReversedAction(UndoableAction):
     """Does exactly the opposite of another action. It works by switching the do and undo methods."""
@@ -36,6 +83,9 @@ class ReversedAction(UndoableAction):
     def undo(self, experiment: Experiment):
         return self.inverse.do(experiment)
 
+    def get_memory_usage_bytes(self) -> int:
+        return self.inverse.get_memory_usage_bytes()
+
 
 class CombinedAction(UndoableAction):
     """Combines multiple actions into one. It works by calling the do and undo methods of the actions in the order they
@@ -59,16 +109,69 @@ class CombinedAction(UndoableAction):
             action.undo(experiment)
         return self._undo_message
 
+    def get_memory_usage_bytes(self) -> int:
+        return sum(action.get_memory_usage_bytes() for action in self._actions)
+
+
+class _HistoryEntry(NamedTuple):
+    action: UndoableAction
+    memory_usage_bytes: int
+
+    @staticmethod
+    def of(action: UndoableAction) -> "_HistoryEntry":
+        return _HistoryEntry(action, action.get_memory_usage_bytes())
+
 
 class UndoRedo:
+    """Keeps track of the actions that can be undone and redone. At most 50 actions are stored, and fewer if they
+    use more memory than the memory budget. In that case, the oldest actions are removed."""
+
+    _MAX_ACTIONS = 50
 
-    _undo_queue: Deque[UndoableAction]
-    _redo_queue: Deque[UndoableAction]
+    _undo_queue: Deque[_HistoryEntry]
+    _redo_queue: Deque[_HistoryEntry]
     _unsaved_changes_count: int = 0
+    _memory_usage_bytes: int = 0  # Of both queues
+    _memory_budget_bytes: int
+
+    def __init__(self, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES):
+        self._undo_queue = collections.deque()
+        self._redo_queue = collections.deque()
+        self._memory_budget_bytes = memory_budget_bytes
+
+    def get_memory_usage_bytes(self) -> int:
+        """Gets the (estimated) memory used by all actions that can be undone or redone."""
+        return self._memory_usage_bytes
+
+    def set_memory_budget_bytes(self, memory_budget_bytes: int):
+        """Changes the memory budget. If the undo history is now too large, the oldest actions are removed."""
+        self._memory_budget_bytes = memory_budget_bytes
+        self._remove_old_actions()
+
+    def _push(self, queue: Deque[_HistoryEntry], action: UndoableAction):
+        entry = _HistoryEntry.of(action)
+        queue.append(entry)
+        self._memory_usage_bytes += entry.memory_usage_bytes
+
+    def _pop(self, queue: Deque[_HistoryEntry]) -> UndoableAction:
+        entry = queue.pop()  # Raises IndexError if empty
+        self._memory_usage_bytes -= entry.memory_usage_bytes
+        return entry.action
+
+    def _clear_redo_queue(self):
+        self._memory_usage_bytes -= sum(entry.memory_usage_bytes for entry in self._redo_queue)
+        self._redo_queue.clear()
 
-    def __init__(self):
-        self._undo_queue = collections.deque(maxlen=50)
-        self._redo_queue = collections.deque(maxlen=50)
+    def _remove_old_actions(self):
+        """Removes actions until we're within the limits. First, the oldest actions that can be undone are removed,
+        then the actions that would be redone last. The last action in both queues is always kept, even if it alone is
+        larger than the memory budget, so that it can still be undone or redone."""
+        while len(self._undo_queue) > 1 and (len(self._undo_queue) > self._MAX_ACTIONS
+                                             or self._memory_usage_bytes > self._memory_budget_bytes):
+            self._memory_usage_bytes -= self._undo_queue.popleft().memory_usage_bytes
+        while len(self._redo_queue) > 1 and (len(self._redo_queue) > self._MAX_ACTIONS
+                                             or self._memory_usage_bytes > self._memory_budget_bytes):
+            self._memory_usage_bytes -= self._redo_queue.popleft().memory_usage_bytes
 
     def has_unsaved_changes(self) -> bool:
         """Returns True if there are any unsaved changes, False otherwise."""
@@ -83,17 +186,19 @@ class UndoRedo:
     def do(self, action: UndoableAction, experiment: Experiment) -> str:
         """Performs an action, and stores it so that we can undo it"""
         result_string = action.do(experiment)
-        self._undo_queue.append(action)
-        self._redo_queue.clear()
+        self._clear_redo_queue()
+        self._push(self._undo_queue, action)
+        self._remove_old_actions()
         if action.needs_saving:
             self._unsaved_changes_count += 1
         return result_string
 
     def undo(self, experiment: Experiment) -> str:
         try:
-            action = self._undo_queue.pop()
+            action = self._pop(self._undo_queue)
             result_string = action.undo(experiment)
-            self._redo_queue.append(action)
+            self._push(self._redo_queue, action)
+            self._remove_old_actions()
             if action.needs_saving:
                 self._unsaved_changes_count -= 1
             return result_string
@@ -102,9 +207,10 @@ class UndoRedo:
 
     def redo(self, experiment: Experiment) -> str:
         try:
-            action = self._redo_queue.pop()
+            action = self._pop(self._redo_queue)
             result_string = action.do(experiment)
-            self._undo_queue.append(action)
+            self._push(self._undo_queue, action)
+            self._remove_old_actions()
             if action.needs_saving:
                 self._unsaved_changes_count += 1
             return result_string
@@ -116,6 +222,7 @@ class UndoRedo:
         """
         self._undo_queue.clear()
         self._redo_queue.clear()
+        self._memory_usage_bytes = 0
         self.mark_unsaved_changes()
 
     def mark_unsaved_changes(self):
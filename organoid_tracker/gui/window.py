@@ -26,6 +26,7 @@ class DisplaySettings:
     time_point: TimePoint
     z: int
     max_intensity_projection: bool = False
+    show_redraw_latency: bool = False  # Debug overlay showing how long it took to draw the last frame
     image_channel: ImageChannel
     segmentation_channel: Optional[ImageChannel]
 
@@ -106,8 +107,6 @@ class Window:
     def get_scheduler(self) -> Scheduler:
         if self.__scheduler is None:
             self.__scheduler = Scheduler(self.__progress_bar)
-            self.__scheduler.daemon = True
-            self.__scheduler.start()
         return self.__scheduler
 
     def set_status(self, text: str):
@@ -3,23 +3,30 @@ collect some measurement, or make some change to each experiment. It is run on a
 the GUI while images are being loaded. The job is applied to each experiment, and the results are passed back to the
 GUI.
 
+If multiple experiments are open, they are processed one after another. Jobs that can safely process them in parallel,
+each on their own thread, can override WorkerJob.allows_concurrency().
+
 To get started, make a subclass of WorkerJob, and then call the submit_job function with an instance of your class.
 """
-
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from threading import get_ident, Lock
 from typing import Any, Dict, Iterable, Optional, Union, Sized
 
 from organoid_tracker.core import TimePoint
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.gui.gui_experiment import SingleGuiTab
-from organoid_tracker.gui.threading import Task
+from organoid_tracker.gui.threading import Task, CancellationToken
 from organoid_tracker.gui.window import Window
 
 
 class WorkerJob(ABC):
     """A task that makes changes to the experiment. Will be applied to all open tabs."""
 
-    _current_experiment_completed_fraction: Optional[float] = None
+    # Thread id -> fraction of the experiment that that thread is working on. Set by _WorkerJobTask.
+    _completed_fractions_by_thread: Optional[Dict[int, float]] = None
+    _cancellation_token: Optional[CancellationToken] = None  # Set by _WorkerJobTask
 
     @abstractmethod
     def copy_experiment(self, experiment: Experiment) -> Experiment:
@@ -33,7 +40,9 @@ class WorkerJob(ABC):
 
     @abstractmethod
     def gather_data(self, experiment_copy: Experiment) -> Any:
-        """Gather data from the experiment. Will be called on the worker thread.
+        """Gather data from the experiment. Will be called on a worker thread. If multiple experiments are open, this
+        method is called for each of them. If allows_concurrency() returns True, that happens at the same time, on
+        different threads.
 
         Note: the experiment will be closed (Experiment.close()) after this method is called. This is to avoid memory
         leaks. The original experiment (of the GUI thread) will stay open."""
@@ -46,12 +55,29 @@ class WorkerJob(ABC):
     def reporting_progress(self, time_points: Union[Iterable[TimePoint], Sized]) -> Iterable[TimePoint]:
         """Updates the progress field as we iterate over the experiment during gather_data. Can be used like
         `for time_point in self.reporting_progress(experiment.time_points()): ...` Only call this once for each
-        experiment that you process in gather_data."""
+        experiment that you process in gather_data.
+
+        If the user cancelled the job, this method stops the job by raising TaskCancelledError."""
         time_point_count = len(time_points)
+        thread_id = get_ident()
         for i, time_point in enumerate(time_points):
-            self._current_experiment_completed_fraction = i / time_point_count
+            if self._cancellation_token is not None:
+                self._cancellation_token.raise_if_cancelled()
+            if self._completed_fractions_by_thread is not None:
+                self._completed_fractions_by_thread[thread_id] = i / time_point_count
             yield time_point
 
+    def get_priority(self) -> int:
+        """Gets the priority of this job, see Task.get_priority(). Long-running jobs could return
+        Task.PRIORITY_BACKGROUND here."""
+        return Task.PRIORITY_NORMAL
+
+    def allows_concurrency(self) -> bool:
+        """Whether gather_data can be called for multiple experiments at the same time, and whether this job can run
+        at the same time as other tasks. See Task.allows_concurrency(). The default is False. Don't return True if
+        gather_data loads images or uses Keras."""
+        return False
+
     @abstractmethod
     def on_finished(self, data: Iterable[Any]):
         """Called when the task is finished for all experiments. use_data will already have been called once for every
@@ -65,9 +91,14 @@ class WorkerJob(ABC):
 
     @property
     def current_experiment_completed_fraction(self) -> Optional[float]:
-        """Returns a number between 0 and 1, indicating how much of the current experiment has been completed.
-        Updated by self.reporting_progress(...). None if the iterator returned by that method has never been started."""
-        return self._current_experiment_completed_fraction
+        """Returns a number between 0 and 1, indicating how much of the experiments that are currently being processed
+        has been completed, on average. Updated by self.reporting_progress(...). None if no experiment is currently
+        using that method."""
+        fractions = self._completed_fractions_by_thread
+        if not fractions:
+            return None
+        fractions = fractions.copy()  # Other threads may modify the dictionary
+        return sum(fractions.values()) / len(fractions)
 
 
 def submit_job(window: Window, job: WorkerJob):
@@ -81,49 +112,77 @@ class _WorkerJobTask(Task):
 
     _results_by_tab: Dict[SingleGuiTab, Any]
     _experiment_copies: Dict[SingleGuiTab, Experiment]
+    _experiment_count: int
 
     _experiments_done: int = 0
+    _experiments_done_lock: Lock
 
     def __init__(self, window: Window, job: WorkerJob):
         self._job = job
         self._window = window
         self._results_by_tab = dict()
         self._experiment_copies = dict()
+        self._experiments_done_lock = Lock()
 
         for tab in window.get_gui_experiment().get_active_tabs():
             self._experiment_copies[tab] = job.copy_experiment(tab.experiment)
+        self._experiment_count = len(self._experiment_copies)
+
+        job._completed_fractions_by_thread = dict()
+        job._cancellation_token = self.get_cancellation_token()
 
     def compute(self):
-        for tab, experiment_copy in self._experiment_copies.items():
-            self._results_by_tab[tab] = self._job.gather_data(experiment_copy)
+        tabs = list(self._experiment_copies.keys())
+        try:
+            worker_count = min(len(tabs), os.cpu_count() or 1) if self._job.allows_concurrency() else 1
+            if worker_count <= 1:
+                results = [self._gather_data(tab) for tab in tabs]
+            else:
+                with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                    results = list(executor.map(self._gather_data, tabs))
+            for tab, result in zip(tabs, results):  # Keeps the results in the order of the tabs
+                self._results_by_tab[tab] = result
+        finally:
+            # Close all experiments, also the ones that weren't processed because of an error or cancellation
+            for experiment_copy in self._experiment_copies.values():
+                experiment_copy.close()
+            self._experiment_copies.clear()
+        return 1
 
-            # Increment progress
-            self._experiments_done += 1
-            self._job._current_experiment_completed_fraction = None
+    def _gather_data(self, tab: SingleGuiTab) -> Any:
+        """Processes a single experiment. Called on a worker thread."""
+        self.get_cancellation_token().raise_if_cancelled()
+        try:
+            result = self._job.gather_data(self._experiment_copies[tab])
+        finally:
+            self._job._completed_fractions_by_thread.pop(get_ident(), None)
 
-            experiment_copy.close()
-        self._experiment_copies.clear()
-        return 1
+        # Increment progress
+        with self._experiments_done_lock:
+            self._experiments_done += 1
+        return result
 
     def get_percentage_completed(self) -> Optional[int]:
-        if self._experiments_done == 0 and self._job.current_experiment_completed_fraction is None:
+        current_experiments_fraction = self._job.current_experiment_completed_fraction
+        if self._experiments_done == 0 and current_experiments_fraction is None:
             return None  # Didn't start at all
 
-        if len(self._experiment_copies) == 0:
+        if len(self._experiment_copies) == 0 or self._experiment_count == 0:
             # At the end of self.compute(), we called self._experiment_copies.clear(), so if that's empty, we know we're done
             return 100
 
         # The basis is just how many experiments we already completed
-        basis_fraction = self._experiments_done / len(self._experiment_copies)
-
-        # Then we add to that how far along the current experiment we are
-        current_experiment_fraction = self._job.current_experiment_completed_fraction
-        if current_experiment_fraction is None:
-            current_experiment_fraction = 0
-        total_fraction = basis_fraction + current_experiment_fraction / len(self._experiment_copies)
+        fractions = self._job._completed_fractions_by_thread.copy()  # Other threads may modify the dictionary
+        total_fraction = (self._experiments_done + sum(fractions.values())) / self._experiment_count
 
         return round(total_fraction * 100)
 
+    def get_priority(self) -> int:
+        return self._job.get_priority()
+
+    def allows_concurrency(self) -> bool:
+        return self._job.allows_concurrency()
+
     def on_finished(self, result: Any):
         for tab in self._results_by_tab:
             self._job.use_data(tab, self._results_by_tab[tab])
@@ -1,6 +1,6 @@
 """Helper for reading the image file of a single time point."""
 import os
-from typing import Optional
+from typing import Optional, Tuple
 
 import matplotlib.image
 import numpy
@@ -46,6 +46,22 @@ def read_image_2d(file_name: str, image_z: int) -> Optional[ndarray]:
     return None
 
 
+def read_image_region_3d(file_name: str, zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+    """Like read_image_3d(file_name)[zyx_slice], but for TIFF files with one z per page, only the pages within the
+    region are read. Returns None if the file does not exist or cannot be read."""
+    if not os.path.exists(file_name):
+        return None
+
+    file_name_lower = file_name.lower()
+    if file_name_lower.endswith(".tif") or file_name_lower.endswith(".tiff"):
+        return _load_tiff_region(file_name, zyx_slice)
+
+    array = read_image_3d(file_name)
+    if array is None:
+        return None
+    return array[zyx_slice]
+
+
 def _load_tiff(file_name: str) -> Optional[ndarray]:
     """For TIFF files."""
     import tifffile
@@ -65,6 +81,28 @@ def _load_tiff(file_name: str) -> Optional[ndarray]:
         return None  # Weird TIFF file that cannot be read
 
 
+def _load_tiff_region(file_name: str, zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+    """For TIFF files. Falls back to _load_tiff if the z-stack is not stored as one page per z."""
+    import tifffile
+    with tifffile.TiffFile(file_name) as f:
+        page_count = len(f.pages)
+        if page_count > 1 and len(f.pages[0].shape) == 2 \
+                and tuple(f.series[0].shape) == (page_count,) + tuple(f.pages[0].shape):
+            z_start, z_stop, _ = zyx_slice[0].indices(page_count)
+            if z_stop <= z_start:
+                return numpy.zeros((0,) + f.pages[0].shape, dtype=f.pages[0].dtype)[:, zyx_slice[1], zyx_slice[2]]
+            # noinspection PyTypeChecker
+            array = f.asarray(maxworkers=None, key=range(z_start, z_stop))
+            if len(array.shape) == 2:
+                array = array[numpy.newaxis, ...]  # Only one page was read
+            return array[:, zyx_slice[1], zyx_slice[2]]
+
+    array = _load_tiff(file_name)
+    if array is None:
+        return None
+    return array[zyx_slice]
+
+
 def _load_2d_image(file_name: str) -> Optional[ndarray]:
     """For simple 2d images that may be colored, like PNG, JPG and GIF."""
     try:
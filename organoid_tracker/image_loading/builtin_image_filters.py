@@ -1,14 +1,14 @@
 """Some builtin image filters, so that they can be saved and loaded."""
-from typing import NamedTuple, Dict, Tuple, Optional
+from typing import NamedTuple, Dict, Tuple, Optional, TYPE_CHECKING
 
 import numpy
-import skimage.filters
 from numpy import ndarray
-from scipy.interpolate import LinearNDInterpolator
-from scipy.spatial.qhull import QhullError
 
 from organoid_tracker.core import TimePoint
-from organoid_tracker.core.image_filters import ImageFilter
+from organoid_tracker.core.image_filters import ImageFilter, PixelTransform
+
+if TYPE_CHECKING:
+    from scipy.interpolate import LinearNDInterpolator
 
 
 class ThresholdFilter(ImageFilter):
@@ -39,16 +39,17 @@ class GaussianBlurFilter(ImageFilter):
         self.blur_radius = blur_radius
 
     def filter(self, time_point, image_z, image: ndarray):
+        import skimage.filters
         if len(image.shape) == 3:
             out = numpy.empty_like(image[0], dtype=numpy.float32)
             for z in range(image.shape[0]):
-                slice = image[z].astype(numpy.float32)
-                skimage.filters.gaussian(slice, sigma=self.blur_radius / 2, output=out)
-                image[z] = out.astype(image.dtype)
+                slice = image[z].astype(numpy.float32, copy=False)
+                skimage.filters.gaussian(slice, sigma=self.blur_radius / 2, out=out)
+                image[z] = out
         elif len(image.shape) == 2: # len(...) == 2
             out = numpy.empty_like(image, dtype=numpy.float32)
-            skimage.filters.gaussian(image.astype(numpy.float32), sigma=self.blur_radius / 2, out=out)
-            image[...] = out.astype(image.dtype)
+            skimage.filters.gaussian(image.astype(numpy.float32, copy=False), sigma=self.blur_radius / 2, out=out)
+            image[...] = out
         else:
             raise ValueError("Can only handle 2D or 3D images. Got shape " + str(image.shape))
 
@@ -87,6 +88,13 @@ class MultiplyPixelsFilter(ImageFilter):
         scaled[scaled > max_value] = max_value  # Prevent overflow
         image[...] = scaled.astype(numpy.uint8)
 
+    def get_pixel_transform(self, time_point: TimePoint, image_z: int, image_max: float,
+                            data_format_max_value: float) -> Optional[PixelTransform]:
+        if self.factor == 0:
+            return PixelTransform(-numpy.inf, numpy.inf, 0, 0)
+        # Multiply, but never go above the current maximum, like in self.filter(...)
+        return PixelTransform(-numpy.inf, image_max / self.factor, self.factor, 0)
+
     def copy(self):
         return MultiplyPixelsFilter(self.factor)
 
@@ -107,8 +115,8 @@ class InterpolatedMinMaxFilter(ImageFilter):
     """Allows you to set the min/max pixel values at different points during the time-lapse. For all other points,
     the min and max values are interpolated."""
 
-    _interpolator_minima: Optional[LinearNDInterpolator] = None
-    _interpolator_maxima: Optional[LinearNDInterpolator] = None
+    _interpolator_minima: Optional["LinearNDInterpolator"] = None
+    _interpolator_maxima: Optional["LinearNDInterpolator"] = None
 
     points: Dict[IntensityPoint, Tuple[float, float]]  # Dictionary of point to (min, max)
 
@@ -123,6 +131,9 @@ class InterpolatedMinMaxFilter(ImageFilter):
         if len(self.points) == 1:
             return list(self.points.values())[0]  # Return the only point
 
+        from scipy.interpolate import LinearNDInterpolator
+        from scipy.spatial.qhull import QhullError
+
         # First interpolate on the time axis
         try:
             if self._interpolator_minima is None:
@@ -161,6 +172,17 @@ class InterpolatedMinMaxFilter(ImageFilter):
             return
         self._filter_2d(time_point, image_z, image)
 
+    def get_pixel_transform(self, time_point: TimePoint, image_z: int, image_max: float,
+                            data_format_max_value: float) -> Optional[PixelTransform]:
+        interpolation_result = self.interpolate_point(IntensityPoint(time_point=time_point, z=int(image_z)))
+        if interpolation_result is None:
+            return PixelTransform.identity()
+        min_value, max_value = interpolation_result
+
+        # Clip to min and max, and then scale to use the full data range
+        scale = data_format_max_value / max(max_value - min_value, 1e-6)
+        return PixelTransform(min_value, max_value, scale, -min_value * scale)
+
     def _filter_2d(self, time_point: TimePoint, image_z: int, image: ndarray):
         interpolation_result = self.interpolate_point(IntensityPoint(time_point=time_point, z=int(image_z)))
         if interpolation_result is None:
@@ -208,6 +230,7 @@ class InterpolatedMinMaxFilter(ImageFilter):
         # We need to remove the interpolators, as they're now outdated
         self._interpolator_minima = None
         self._interpolator_maxima = None
+        self.mark_changed()
 
 
 def create_min_max_filter(min_value: float, max_value: float) -> ImageFilter:
@@ -8,8 +8,10 @@
   >>> TimeAppendingImageLoader
 """
 
-from typing import Tuple, List, Optional, Iterable, Collection, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, List, Optional, Iterable, Collection, Dict, Any, Callable
 
+import numpy
 from numpy import ndarray
 
 from organoid_tracker.core import TimePoint, min_none, max_none
@@ -17,6 +19,23 @@ from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
 from organoid_tracker.util import bits
 
 
+def _sum_to_8bit(images: List[Optional[ndarray]]) -> Optional[ndarray]:
+    """Sums the images, ignoring any None values. Images are first scaled to 8bit if they aren't already, and then
+    added without overflow issues: 240 + 80 is capped at 255. If there's only one image, it is returned as-is."""
+    images = [image for image in images if image is not None]
+    if len(images) == 0:
+        return None
+    if len(images) == 1:
+        return images[0]
+
+    # Sum everything into a single 16-bit buffer, which cannot overflow for less than 257 channels
+    total = numpy.zeros(images[0].shape, dtype=numpy.uint16)
+    for image in images:
+        numpy.add(total, bits.ensure_8bit(image), out=total)
+    numpy.minimum(total, 255, out=total)
+    return total.astype(numpy.uint8)
+
+
 class ChannelSummingImageLoader(ImageLoader):
     """
     For summing multiple image channels. Example usage:
@@ -30,6 +49,7 @@ class ChannelSummingImageLoader(ImageLoader):
 
     """
     _image_loader: ImageLoader
+    _image_loader_copies: List[ImageLoader]  # Created when needed, for loading channels at the same time
     _channels: List[List[ImageChannel]]
 
     def __init__(self, original: ImageLoader, channels: Iterable[Collection[ImageChannel]]):
@@ -37,44 +57,42 @@ class ChannelSummingImageLoader(ImageLoader):
         self._channels = list()
         for channel_group in channels:
             self._channels.append(list(channel_group))
-
-    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        self._image_loader_copies = list()
+
+    def _get_image_loaders(self, count: int) -> List[ImageLoader]:
+        """Gets the given number of image loaders, so that every thread can use its own. Image loaders are not
+        thread-safe, so we create copies of the original loader."""
+        while len(self._image_loader_copies) < count - 1:
+            self._image_loader_copies.append(self._image_loader.copy())
+        return [self._image_loader] + self._image_loader_copies[0:count - 1]
+
+    def _load_and_sum(self, image_channel: ImageChannel,
+                      load: Callable[[ImageLoader, ImageChannel], Optional[ndarray]]) -> Optional[ndarray]:
+        """Loads all original channels of the given channel at the same time, and then sums them."""
         if image_channel.index_zero >= len(self._channels):
             return None  # Don't know this channel
 
-        image = None
         original_channels = self._channels[image_channel.index_zero]
-        for original_channel in original_channels:
-            returned_image = self._image_loader.get_3d_image_array(time_point, original_channel)
-            if returned_image is None:
-                # Easy, no image to merge
-                continue
-            if image is None:
-                # Easy, just replace the image
-                image = returned_image
-                continue
-            # Need to merge two images
-            image = bits.add_and_return_8bit(image, returned_image)
-        return image
+        if len(original_channels) == 1:
+            return load(self._image_loader, original_channels[0])  # No need for threads
+
+        image_loaders = self._get_image_loaders(len(original_channels))
+        with ThreadPoolExecutor(max_workers=len(original_channels)) as executor:
+            images = list(executor.map(load, image_loaders, original_channels))
+        return _sum_to_8bit(images)
+
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        return self._load_and_sum(image_channel, lambda image_loader, original_channel:
+                                  image_loader.get_3d_image_array(time_point, original_channel))
 
     def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
-        if image_channel.index_zero >= len(self._channels):
-            return None  # Don't know this channel
+        return self._load_and_sum(image_channel, lambda image_loader, original_channel:
+                                  image_loader.get_2d_image_array(time_point, original_channel, image_z))
 
-        image = None
-        original_channels = self._channels[image_channel.index_zero]
-        for original_channel in original_channels:
-            returned_image = self._image_loader.get_2d_image_array(time_point, original_channel, image_z)
-            if returned_image is None:
-                # Easy, no image to merge
-                continue
-            if image is None:
-                # Easy, just replace the image
-                image = returned_image
-                continue
-            # Need to merge two images
-            image = bits.add_and_return_8bit(image, returned_image)
-        return image
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        return self._load_and_sum(image_channel, lambda image_loader, original_channel:
+                                  image_loader.get_3d_image_region(time_point, original_channel, zyx_slice))
 
     def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
         return self._image_loader.get_image_size_zyx()
@@ -109,6 +127,9 @@ class ChannelSummingImageLoader(ImageLoader):
 
     def close(self):
         self._image_loader.close()
+        for image_loader_copy in self._image_loader_copies:
+            image_loader_copy.close()
+        self._image_loader_copies.clear()
 
     def can_save_images(self, image_channel: ImageChannel) -> bool:
         # We can only save images if we have one original channel, and the underlying image loader supports it
@@ -154,26 +175,38 @@ class ChannelAppendingImageLoader(ImageLoader):
             else:
                 self._unique_loaders.append(image_loader)
 
-    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
-        # Iterate over all image loaders
+    def _find_image_loader(self, image_channel: ImageChannel) -> Optional[Tuple[ImageLoader, ImageChannel]]:
+        """Finds the image loader that provides the given channel, along with the channel in that image loader."""
         image_channel_index = image_channel.index_zero
         for image_loader in self._unique_loaders:
-            if image_channel_index < image_loader.get_channel_count():
-                return image_loader.get_3d_image_array(time_point, ImageChannel(index_zero=image_channel_index))
-            image_channel_index -= image_loader.get_channel_count()
-
+            channel_count = image_loader.get_channel_count()
+            if image_channel_index < channel_count:
+                return image_loader, ImageChannel(index_zero=image_channel_index)
+            image_channel_index -= channel_count
         return None
 
-    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
-        # Iterate over all image loaders
-        image_channel_index = image_channel.index_zero
-        for image_loader in self._unique_loaders:
-            if image_channel_index < image_loader.get_channel_count():
-                return image_loader.get_2d_image_array(time_point, ImageChannel(index_zero=image_channel_index),
-                                                       image_z)
-            image_channel_index -= image_loader.get_channel_count()
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        found = self._find_image_loader(image_channel)
+        if found is None:
+            return None
+        image_loader, internal_channel = found
+        return image_loader.get_3d_image_array(time_point, internal_channel)
 
-        return None
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        found = self._find_image_loader(image_channel)
+        if found is None:
+            return None
+        image_loader, internal_channel = found
+        return image_loader.get_2d_image_array(time_point, internal_channel, image_z)
+
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        # Pass on the region, so that the image loader can read only that part of the image
+        found = self._find_image_loader(image_channel)
+        if found is None:
+            return None
+        image_loader, internal_channel = found
+        return image_loader.get_3d_image_region(time_point, internal_channel, zyx_slice)
 
     def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
         # Returns the size only if all image loaders have the same image size
@@ -243,21 +276,18 @@ class ChannelAppendingImageLoader(ImageLoader):
             internal.close()
 
     def can_save_images(self, image_channel: ImageChannel) -> bool:
-        image_channel_index = image_channel.index_zero
-        for image_loader in self._unique_loaders:
-            if image_channel_index < image_loader.get_channel_count():
-                return image_loader.can_save_images(ImageChannel(index_zero=image_channel_index))
-            image_channel_index -= image_loader.get_channel_count()
-        return False
+        found = self._find_image_loader(image_channel)
+        if found is None:
+            return False
+        image_loader, internal_channel = found
+        return image_loader.can_save_images(internal_channel)
 
     def save_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image: ndarray):
-        image_channel_index = image_channel.index_zero
-        for image_loader in self._unique_loaders:
-            if image_channel_index < image_loader.get_channel_count():
-                image_loader.save_3d_image_array(time_point, ImageChannel(index_zero=image_channel_index), image)
-                return
-            image_channel_index -= image_loader.get_channel_count()
-        raise ValueError(f"Cannot save images for this channel: {image_channel}")
+        found = self._find_image_loader(image_channel)
+        if found is None:
+            raise ValueError(f"Cannot save images for this channel: {image_channel}")
+        image_loader, internal_channel = found
+        image_loader.save_3d_image_array(time_point, internal_channel, image)
 
     def __eq__(self, other) -> bool:
         return isinstance(other, ChannelAppendingImageLoader) and self._unique_loaders == other._unique_loaders
@@ -290,41 +320,10 @@ class TimeAppendingImageLoader(ImageLoader):
         self._min_time_point_number = min_time_point_number
         self._max_time_point_number = max_time_point_number
 
-    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
-        if len(self._internal) == 0:
-            return None
-        if (time_point.time_point_number() < self._min_time_point_number
-                or time_point.time_point_number() > self._max_time_point_number):
-            return None
-
-        time_point_number = time_point.time_point_number()
-
-        # List of channels is different for different image loaders, so use the channel index instead
-        try:
-            channel_index = self.get_channels().index(image_channel)
-        except ValueError:
-            return None  # Channel not available
-
-        image_loader_index = 0
-        while True:
-            # Check channels
-            channels = self._internal[image_loader_index].get_channels()
-            if channel_index >= len(channels):
-                return None  # Not that many channels available for this ImageLoader
-
-            if time_point_number <= self._internal[image_loader_index].last_time_point_number():
-                return self._internal[image_loader_index].get_3d_image_array(
-                    TimePoint(time_point_number),
-                    channels[channel_index])
-
-            # Out of bounds for this time lapse, on to the next
-            time_point_number -= self._internal[image_loader_index].last_time_point_number() + 1
-            image_loader_index += 1
-            if image_loader_index >= len(self._internal):
-                return None  # Out of images
-            time_point_number += self._internal[image_loader_index].first_time_point_number()
-
-    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+    def _find_image_loader(self, time_point: TimePoint, image_channel: ImageChannel
+                           ) -> Optional[Tuple[ImageLoader, TimePoint, ImageChannel]]:
+        """Finds the image loader that provides the given time point, along with the time point and channel in that
+        image loader."""
         if len(self._internal) == 0:
             return None
         if (time_point.time_point_number() < self._min_time_point_number
@@ -347,9 +346,7 @@ class TimeAppendingImageLoader(ImageLoader):
                 if channel_index >= len(channels):
                     return None  # Not that many channels available for this ImageLoader
 
-                return self._internal[image_loader_index].get_2d_image_array(
-                    TimePoint(time_point_number),
-                    channels[channel_index], image_z)
+                return self._internal[image_loader_index], TimePoint(time_point_number), channels[channel_index]
 
             # Out of bounds for this time lapse, on to the next
             time_point_number -= self._internal[image_loader_index].last_time_point_number() + 1
@@ -358,6 +355,29 @@ class TimeAppendingImageLoader(ImageLoader):
                 return None  # Out of images
             time_point_number += self._internal[image_loader_index].first_time_point_number()
 
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        found = self._find_image_loader(time_point, image_channel)
+        if found is None:
+            return None
+        image_loader, internal_time_point, internal_channel = found
+        return image_loader.get_3d_image_array(internal_time_point, internal_channel)
+
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        found = self._find_image_loader(time_point, image_channel)
+        if found is None:
+            return None
+        image_loader, internal_time_point, internal_channel = found
+        return image_loader.get_2d_image_array(internal_time_point, internal_channel, image_z)
+
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        # Pass on the region, so that the image loader can read only that part of the image
+        found = self._find_image_loader(time_point, image_channel)
+        if found is None:
+            return None
+        image_loader, internal_time_point, internal_channel = found
+        return image_loader.get_3d_image_region(internal_time_point, internal_channel, zyx_slice)
+
     def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
         if len(self._internal) == 0:
             return None
@@ -11,6 +11,7 @@ from organoid_tracker.core import TimePoint, UserError
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
 from organoid_tracker.core.resolution import ImageResolution
+from organoid_tracker.image_loading import disk_cached_image_loader
 from organoid_tracker.util.xml_wrapper import XmlWrapper, read_xml
 
 
@@ -81,7 +82,8 @@ def load_from_czi_reader(experiment: Experiment, file: str, reader: CziFile, ser
                          min_time_point: int = 0,
                          max_time_point: int = 1000000000):
     """Sets up the experimental images for an already opened LIF file."""
-    experiment.images.image_loader(_CziImageLoader(file, reader, serie_index, min_time_point, max_time_point))
+    experiment.images.image_loader(disk_cached_image_loader.wrap_if_enabled(
+        _CziImageLoader(file, reader, serie_index, min_time_point, max_time_point)))
 
     # Set up resolution
     try:
@@ -0,0 +1,367 @@
+"""Persistent on-disk cache for image formats that are slow to decode, like LIF, CZI, ND2 and IMS files. Every decoded 2D
+plane is stored as a compressed file in a local folder, so that the next session (or the next script) doesn't need to
+decode it again. This helps a lot if the original files are stored on a network share.
+
+The cache is opt-in. To enable it, add this to the [DEFAULTS] section of organoid_tracker.ini:
+
+    image_disk_cache_folder = C:\\path\\to\\local\\cache\\folder
+    image_disk_cache_size_gb = 20
+
+Cached planes are keyed by the path, modification time and size of the source file, the series within that file, and
+the time point, channel and z. So if the source file changes, the old planes are simply no longer used. Once the cache
+is full, the least recently used planes are removed.
+
+You can also wrap any image loader yourself:
+
+>>> from organoid_tracker.core.experiment import Experiment
+>>> experiment = Experiment()  # Placeholder, with images loaded
+>>> cache = get_cache("path/to/cache/folder", max_size_bytes=20 * 1024 ** 3)
+>>> experiment.images.image_loader(DiskCachedImageLoader(experiment.images.image_loader(), cache))
+>>> print(cache.get_statistics())
+"""
+import hashlib
+import io
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Any, NamedTuple, List
+
+import numpy
+from numpy import ndarray
+
+from organoid_tracker.config import ConfigFile, config_type_float
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel, _check_region
+
+_FILE_EXTENSION = ".npy.zlib"
+_COMPRESSION_LEVEL = 1  # Fast, and still much smaller for the mostly dark microscopy images
+
+
+class CacheStatistics(NamedTuple):
+    """Number of planes that were found (hits) or not found (misses) in the cache since the program started, together
+    with the size of the cache."""
+    hits: int
+    misses: int
+    size_bytes: int
+    max_size_bytes: int
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were found in the cache. Returns 0 if there were no lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.hits} hits, {self.misses} misses ({self.hit_rate() * 100:.1f}% hit rate), using"
+                f" {self.size_bytes / 1024 ** 2:.0f} of {self.max_size_bytes / 1024 ** 2:.0f} MB")
+
+
+class DiskPlaneCache:
+    """A folder with compressed 2D image planes, with a size limit. Thread-safe. Multiple image loaders (and their
+    copies) can share one instance, see get_cache(...)."""
+
+    _folder: str
+    _max_size_bytes: int
+    _lock: threading.Lock
+
+    # Relative file path -> file size. Ordered from least to most recently used
+    _entries: "OrderedDict[str, int]"
+    _size_bytes: int
+    _hits: int
+    _misses: int
+
+    def __init__(self, folder: str, max_size_bytes: int):
+        self._folder = os.path.abspath(folder)
+        self._max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+        # Find the existing entries, oldest first. Every hit updates the modification time of a file, so that the least
+        # recently used entries are also removed first in later sessions
+        existing_files = list()
+        if os.path.isdir(self._folder):
+            for source_entry in os.scandir(self._folder):
+                if not source_entry.is_dir():
+                    continue
+                for plane_entry in os.scandir(source_entry.path):
+                    if plane_entry.name.endswith(_FILE_EXTENSION):
+                        stat = plane_entry.stat()
+                        existing_files.append((stat.st_mtime, source_entry.name + "/" + plane_entry.name,
+                                               stat.st_size))
+        existing_files.sort()
+        for _, relative_path, size in existing_files:
+            self._entries[relative_path] = size
+            self._size_bytes += size
+        self._remove_old_entries()
+
+    def get_plane(self, source_key: str, time_point: TimePoint, image_channel: ImageChannel, image_z: int
+                  ) -> Optional[ndarray]:
+        """Gets a plane from the cache. Returns None if it's not stored."""
+        relative_path = _get_relative_path(source_key, time_point, image_channel, image_z)
+        with self._lock:
+            found = relative_path in self._entries
+            if found:
+                self._entries.move_to_end(relative_path)
+
+        array = None
+        if found:
+            full_path = os.path.join(self._folder, relative_path)
+            try:
+                with open(full_path, "rb") as handle:
+                    array = numpy.load(io.BytesIO(zlib.decompress(handle.read())), allow_pickle=False)
+                os.utime(full_path)
+            except (OSError, ValueError, zlib.error):
+                # Removed by another program, or damaged. Just load the plane again
+                array = None
+                self._forget(relative_path)
+
+        with self._lock:
+            if array is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return array
+
+    def put_plane(self, source_key: str, time_point: TimePoint, image_channel: ImageChannel, image_z: int,
+                  array: ndarray):
+        """Stores a plane in the cache, removing the least recently used planes if the cache becomes too large."""
+        relative_path = _get_relative_path(source_key, time_point, image_channel, image_z)
+        buffer = io.BytesIO()
+        numpy.save(buffer, numpy.ascontiguousarray(array), allow_pickle=False)
+        data = zlib.compress(buffer.getbuffer(), _COMPRESSION_LEVEL)
+        if len(data) > self._max_size_bytes:
+            return
+
+        # Write to a temporary file first, so that other threads and programs never see half-written files
+        full_path = os.path.join(self._folder, relative_path)
+        temporary_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(temporary_path, "wb") as handle:
+                handle.write(data)
+            os.replace(temporary_path, full_path)
+        except OSError:
+            return  # Cache folder is not writable or the disk is full. The cache is optional, so we just continue
+
+        with self._lock:
+            self._size_bytes += len(data) - self._entries.pop(relative_path, 0)
+            self._entries[relative_path] = len(data)
+        self._remove_old_entries()
+
+    def _forget(self, relative_path: str):
+        with self._lock:
+            self._size_bytes -= self._entries.pop(relative_path, 0)
+
+    def _remove_old_entries(self):
+        while True:
+            with self._lock:
+                if self._size_bytes <= self._max_size_bytes or len(self._entries) == 0:
+                    return
+                relative_path, size = self._entries.popitem(last=False)
+                self._size_bytes -= size
+            full_path = os.path.join(self._folder, relative_path)
+            try:
+                os.remove(full_path)
+                os.rmdir(os.path.dirname(full_path))  # Fails (on purpose) if other planes of that file are left
+            except OSError:
+                pass
+
+    def get_statistics(self) -> CacheStatistics:
+        """Gets the hit rate and size of the cache."""
+        with self._lock:
+            return CacheStatistics(hits=self._hits, misses=self._misses, size_bytes=self._size_bytes,
+                                   max_size_bytes=self._max_size_bytes)
+
+    def get_folder(self) -> str:
+        """Gets the folder where the planes are stored."""
+        return self._folder
+
+
+def _get_relative_path(source_key: str, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> str:
+    return (f"{source_key}/t{time_point.time_point_number()}_c{image_channel.index_zero}_z{image_z}"
+            f"{_FILE_EXTENSION}")
+
+
+def _get_source_key(image_loader: ImageLoader) -> Optional[str]:
+    """Gets a key for the file (and series within that file) that the image loader reads from. Returns None if the
+    image loader doesn't read from a file."""
+    container, pattern = image_loader.serialize_to_config()
+    if len(container) == 0:
+        return None
+    container = os.path.abspath(container)
+    try:
+        stat = os.stat(container)
+    except OSError:
+        return None
+    key = "\n".join([container, str(stat.st_mtime_ns), str(stat.st_size), pattern])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+_caches: Dict[str, DiskPlaneCache] = dict()
+_caches_lock = threading.Lock()
+
+
+def get_cache(folder: str, max_size_bytes: int) -> DiskPlaneCache:
+    """Gets the cache for the given folder. Image loaders using the same folder share the same cache instance, so that
+    the size limit is respected."""
+    folder = os.path.abspath(folder)
+    with _caches_lock:
+        cache = _caches.get(folder)
+        if cache is None:
+            cache = DiskPlaneCache(folder, max_size_bytes)
+            _caches[folder] = cache
+        return cache
+
+
+_configured_cache: Optional[DiskPlaneCache] = None
+_configured = False
+
+
+def configure(config: ConfigFile):
+    """Reads the cache settings from the config file. If the settings don't exist yet, they're added to the DEFAULTS
+    section (with the cache disabled), so that they show up in the file once it is saved."""
+    global _configured_cache, _configured
+    folder = config.get_or_default("image_disk_cache_folder", "", store_in_defaults=True,
+                                   comment="Folder for storing decoded planes of LIF, CZI, ND2 and IMS files, so that"
+                                           " they load faster next time. Leave empty to disable.")
+    size_gb = config.get_or_default("image_disk_cache_size_gb", "20", store_in_defaults=True,
+                                    type=config_type_float, comment="Maximum size of the image disk cache.")
+    _configured_cache = get_cache(folder, int(size_gb * 1024 ** 3)) if len(folder) > 0 else None
+    _configured = True
+
+
+def get_configured_cache() -> Optional[DiskPlaneCache]:
+    """Gets the cache configured in organoid_tracker.ini, or None if no cache is configured."""
+    if not _configured:
+        configure(ConfigFile("scripts"))  # We don't save, so we don't create a new config file
+    return _configured_cache
+
+
+def wrap_if_enabled(image_loader: ImageLoader) -> ImageLoader:
+    """Wraps the image loader in a DiskCachedImageLoader if a cache is configured in organoid_tracker.ini. Otherwise,
+    returns the image loader as-is."""
+    cache = get_configured_cache()
+    if cache is None:
+        return image_loader
+    return DiskCachedImageLoader(image_loader, cache)
+
+
+class DiskCachedImageLoader(ImageLoader):
+    """Wrapper that stores all loaded planes in a DiskPlaneCache, and reads them from there next time. Image loaders
+    that don't read from a file are passed through without caching."""
+
+    _internal: ImageLoader
+    _cache: DiskPlaneCache
+    _source_key: Optional[str]
+
+    def __init__(self, internal: ImageLoader, cache: DiskPlaneCache):
+        self._internal = internal
+        self._cache = cache
+        self._source_key = _get_source_key(internal)
+
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        image_size_zyx = self._internal.get_image_size_zyx()
+        if self._source_key is None or image_size_zyx is None:
+            return self._internal.get_3d_image_array(time_point, image_channel)
+
+        planes: List[ndarray] = list()
+        for image_z in range(image_size_zyx[0]):
+            plane = self._cache.get_plane(self._source_key, time_point, image_channel, image_z)
+            if plane is None:
+                break
+            planes.append(plane)
+        if len(planes) == image_size_zyx[0]:
+            return numpy.stack(planes)
+
+        # Cache miss, decode the full stack at once and store the planes that were missing
+        array = self._internal.get_3d_image_array(time_point, image_channel)
+        if array is None:
+            return None
+        for image_z in range(len(planes), array.shape[0]):
+            self._cache.put_plane(self._source_key, time_point, image_channel, image_z, array[image_z])
+        return array
+
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        if self._source_key is None:
+            return self._internal.get_2d_image_array(time_point, image_channel, image_z)
+
+        array = self._cache.get_plane(self._source_key, time_point, image_channel, image_z)
+        if array is not None:
+            return array
+        array = self._internal.get_2d_image_array(time_point, image_channel, image_z)
+        if array is not None:
+            self._cache.put_plane(self._source_key, time_point, image_channel, image_z, array)
+        return array
+
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        image_size_zyx = self._internal.get_image_size_zyx()
+        if self._source_key is None or image_size_zyx is None:
+            return self._internal.get_3d_image_region(time_point, image_channel, zyx_slice)
+        z_slice, y_slice, x_slice = _check_region(zyx_slice)
+        z_start, z_stop, _ = z_slice.indices(image_size_zyx[0])
+
+        planes: List[ndarray] = list()
+        for image_z in range(z_start, z_stop):
+            plane = self._cache.get_plane(self._source_key, time_point, image_channel, image_z)
+            if plane is None:
+                break
+            planes.append(plane[y_slice, x_slice])
+        if len(planes) > 0 and len(planes) == z_stop - z_start:
+            return numpy.stack(planes)
+
+        # Cache miss, let the internal loader read only the region. We don't store anything, as we only have a part of
+        # the planes
+        return self._internal.get_3d_image_region(time_point, image_channel, zyx_slice)
+
+    def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
+        return self._internal.get_image_size_zyx()
+
+    def first_time_point_number(self) -> Optional[int]:
+        return self._internal.first_time_point_number()
+
+    def last_time_point_number(self) -> Optional[int]:
+        return self._internal.last_time_point_number()
+
+    def get_channel_count(self) -> int:
+        return self._internal.get_channel_count()
+
+    def get_resolution_level_count(self) -> int:
+        return self._internal.get_resolution_level_count()
+
+    def get_image_size_zyx_at_level(self, level: int) -> Optional[Tuple[int, int, int]]:
+        return self._internal.get_image_size_zyx_at_level(level)
+
+    def get_3d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, level: int
+                                    ) -> Optional[ndarray]:
+        if level == 0:
+            return self.get_3d_image_array(time_point, image_channel)
+        return self._internal.get_3d_image_array_at_level(time_point, image_channel, level)  # Only cache full size
+
+    def get_2d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int,
+                                    level: int) -> Optional[ndarray]:
+        if level == 0:
+            return self.get_2d_image_array(time_point, image_channel, image_z)
+        return self._internal.get_2d_image_array_at_level(time_point, image_channel, image_z, level)
+
+    def get_cache_statistics(self) -> CacheStatistics:
+        """Gets the statistics of the cache. Note that the cache can be shared with other image loaders."""
+        return self._cache.get_statistics()
+
+    def serialize_to_config(self) -> Tuple[str, str]:
+        return self._internal.serialize_to_config()
+
+    def serialize_to_dictionary(self) -> Dict[str, Any]:
+        return self._internal.serialize_to_dictionary()
+
+    def uncached(self) -> "ImageLoader":
+        return self._internal
+
+    def copy(self) -> "ImageLoader":
+        return DiskCachedImageLoader(self._internal.copy(), self._cache)
+
+    def close(self):
+        self._internal.close()
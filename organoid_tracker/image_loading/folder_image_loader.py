@@ -4,9 +4,10 @@ from typing import Optional, Tuple, List, Any
 from numpy import ndarray
 
 from organoid_tracker.core import TimePoint
-from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel, _check_region
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.image_loading._simple_image_file_io import read_image_3d, read_image_2d, write_image_3d
+from organoid_tracker.image_loading._simple_image_file_io import read_image_3d, read_image_2d, write_image_3d, \
+    read_image_region_3d
 
 
 def _discover_min_time_point_and_channel(folder: str, file_name_format: str, guess_time_point: int) -> Tuple[Optional[int], Optional[int]]:
@@ -124,6 +125,19 @@ class FolderImageLoader(ImageLoader):
             channel=image_channel.index_zero + self._channel_offset))
         return read_image_2d(file_name, image_z)
 
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        if time_point.time_point_number() < self._min_time_point or\
+                time_point.time_point_number() > self._max_time_point:
+            return None
+        if image_channel.index_zero >= self._channel_count:
+            return None  # Asking for an image channel that doesn't exist
+
+        file_name = path.join(self._folder, self._file_name_format.format(
+            time=time_point.time_point_number(),
+            channel=image_channel.index_zero + self._channel_offset))
+        return read_image_region_3d(file_name, _check_region(zyx_slice))
+
     def get_channel_count(self) -> int:
         return self._channel_count
 
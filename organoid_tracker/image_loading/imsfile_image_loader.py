@@ -48,8 +48,9 @@ from skimage.transform import rescale
 
 from organoid_tracker.core import TimePoint
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel, _check_region
 from organoid_tracker.core.resolution import ImageResolution, ImageTimings
+from organoid_tracker.image_loading import disk_cached_image_loader
 
 
 def load_from_ims_file(experiment: Experiment, file_name: str, min_time_point: Optional[int] = None,
@@ -59,7 +60,7 @@ def load_from_ims_file(experiment: Experiment, file_name: str, min_time_point: O
         print("Failed to load \"" + file_name + "\" - file does not exist")
         return
     image_loader = _ImsImageLoader(file_name, min_time_point, max_time_point)
-    experiment.images.image_loader(image_loader)
+    experiment.images.image_loader(disk_cached_image_loader.wrap_if_enabled(image_loader))
 
     if experiment.images.resolution(allow_incomplete=True).is_incomplete():
         resolution_zyx = image_loader.get_spatial_resolution_um()
@@ -758,6 +759,28 @@ class _ImsImageLoader(ImageLoader):
             return None  # Got an all-zero array, ignore
         return array
 
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        time_point_number = time_point.time_point_number()
+        if time_point_number < self.first_time_point_number() or time_point_number > self.last_time_point_number():
+            return None
+        if image_channel.index_zero < 0 or image_channel.index_zero >= self._reader.Channels:
+            return None
+        z_slice, y_slice, x_slice = _check_region(zyx_slice)
+
+        # Read the region as an HDF5 hyperslab, so that only the overlapping HDF5 chunks are read
+        image_size_zyx = self.get_image_size_zyx()
+        z_start, z_stop, _ = z_slice.indices(image_size_zyx[0])
+        y_start, y_stop, _ = y_slice.indices(image_size_zyx[1])
+        x_start, x_stop, _ = x_slice.indices(image_size_zyx[2])
+        out = numpy.zeros((max(0, z_stop - z_start), max(0, y_stop - y_start), max(0, x_stop - x_start)),
+                          dtype=self._reader.dtype)
+        if out.size > 0:
+            data_set = self._reader.hf[self._reader.location_generator(0, time_point_number, image_channel.index_zero,
+                                                                       data="data")]
+            data_set.read_direct(out, numpy.s_[z_start:z_stop, y_start:y_stop, x_start:x_stop])
+        return out
+
     def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
         return self._reader.shape[-3], self._reader.shape[-2], self._reader.shape[-1]
 
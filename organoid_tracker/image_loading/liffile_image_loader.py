@@ -10,7 +10,7 @@ from organoid_tracker.core import TimePoint
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
 from organoid_tracker.core.resolution import ImageResolution
-from organoid_tracker.image_loading import _lif
+from organoid_tracker.image_loading import _lif, disk_cached_image_loader
 from organoid_tracker.util import bits
 
 
@@ -45,7 +45,8 @@ def load_from_lif_file(experiment: Experiment, file: str, series_index_or_name:
 def load_from_lif_reader(experiment: Experiment, file: str, reader: _lif.Reader, serie_index_one: int, min_time_point: int = 0,
                          max_time_point: int = 1000000000):
     """Sets up the experimental images for an already opened LIF file."""
-    experiment.images.image_loader(_LifImageLoader(file, reader, serie_index_one, min_time_point, max_time_point))
+    experiment.images.image_loader(disk_cached_image_loader.wrap_if_enabled(
+        _LifImageLoader(file, reader, serie_index_one, min_time_point, max_time_point)))
     serie_header = reader.getSeriesHeaders()[serie_index_one - 1]
     dimensions = serie_header.getDimensions()
     experiment.images.set_resolution(_dimensions_to_resolution(dimensions))
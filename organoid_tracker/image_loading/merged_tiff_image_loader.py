@@ -9,18 +9,19 @@ from tifffile import TiffFile, TiffPageSeries, TiffTags
 
 from organoid_tracker.core import TimePoint, max_none, min_none, UserError
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel, _check_region
 from organoid_tracker.core.resolution import ImageResolution
 
 
 def load_from_tif_file(experiment: Experiment, file: str, min_time_point: Optional[int] = None,
-                       max_time_point: Optional[int] = None):
-    """Creates an image loader for the individual images in the TIF file."""
+                       max_time_point: Optional[int] = None, *, use_memmap: bool = True):
+    """Creates an image loader for the individual images in the TIF file. If use_memmap is True (the default),
+    uncompressed files are read through a memory map instead of through tifffile."""
     if not os.path.exists(file):
         print("Failed to load \"" + file + "\" - file does not exist")
         return
 
-    image_loader = _MergedTiffImageLoader(file, min_time_point, max_time_point)
+    image_loader = _MergedTiffImageLoader(file, min_time_point, max_time_point, use_memmap=use_memmap)
     experiment.images.image_loader(image_loader)
 
     # Update resolution
@@ -84,8 +85,14 @@ class _MergedTiffImageLoader(ImageLoader):
     _min_time_point_number: int
     _max_time_point_number: int
 
-    def __init__(self, file_name: str, min_time_point_number: Optional[int], max_time_point_number: Optional[int]):
+    # For uncompressed files, the pixels are read directly from a memory map (with TZCYX axes) instead
+    _use_memmap: bool
+    _memmap_tzcyx: Optional[ndarray] = None
+
+    def __init__(self, file_name: str, min_time_point_number: Optional[int], max_time_point_number: Optional[int], *,
+                 use_memmap: bool = True):
         self._file_name = file_name
+        self._use_memmap = use_memmap
 
         self._tiff = TiffFile(file_name)
         self._tiff_series = self._tiff.series[0]
@@ -106,6 +113,37 @@ class _MergedTiffImageLoader(ImageLoader):
         self._min_time_point_number = max_none(0, min_time_point_number)
         self._max_time_point_number = min_none(self._get_highest_time_point(self._axes, self._shape),
                                                max_time_point_number)
+        if use_memmap:
+            self._memmap_tzcyx = self._create_memmap_tzcyx()
+
+    def _create_memmap_tzcyx(self) -> Optional[ndarray]:
+        """Opens the pixel data of the file as a read-only memory map, with the axes reordered to TZCYX. Returns None if
+        the pixels are not stored as a single uncompressed block, or if the file has unsupported axes.
+
+        Files that we can save to are never memory mapped, as overwriting a file that is still mapped would invalidate
+        the arrays that we returned earlier."""
+        if self.can_save_images(ImageChannel(index_zero=0)):
+            return None
+        data_offset = self._tiff_series.dataoffset  # Only available for uncompressed, contiguous data
+        if data_offset is None:
+            return None
+        if any(axis not in "TZCYX" for axis in self._axes):
+            return None
+        dtype = numpy.dtype(self._tiff_series.dtype).newbyteorder(self._tiff.byteorder)
+        if data_offset + int(numpy.prod(self._shape)) * dtype.itemsize > os.path.getsize(self._file_name):
+            return None  # File is truncated
+        try:
+            array = numpy.memmap(self._file_name, dtype=dtype, mode="r", offset=data_offset, shape=tuple(self._shape))
+        except (OSError, ValueError):
+            return None
+
+        # Add the missing axes, and put the axes in TZCYX order
+        axes = self._axes
+        for axis in "TZC":
+            if axis not in axes:
+                array = array[numpy.newaxis]
+                axes = axis + axes
+        return array.transpose([axes.index(axis) for axis in "TZCYX"])
 
     def guess_resolution(self) -> Optional[ImageResolution]:
         with self._tiff_lock:
@@ -140,6 +178,10 @@ class _MergedTiffImageLoader(ImageLoader):
         if image_channel.index_zero >= len(self._channels):
             return None  # Invalid channel
 
+        memmap_tzcyx = self._memmap_tzcyx
+        if memmap_tzcyx is not None:
+            return memmap_tzcyx[time_point.time_point_number(), :, image_channel.index_zero]  # Read-only view
+
         with self._tiff_lock:
             out = tifffile.create_output(None, self._image_size_zyx, self._tiff_series.dtype)
             for z in range(self._image_size_zyx[0]):
@@ -155,11 +197,42 @@ class _MergedTiffImageLoader(ImageLoader):
         if image_z < 0 or image_z >= self._image_size_zyx[0]:
             return None  # Z out of range
 
+        memmap_tzcyx = self._memmap_tzcyx
+        if memmap_tzcyx is not None:
+            return memmap_tzcyx[time_point.time_point_number(), image_z, image_channel.index_zero]  # Read-only view
+
         with self._tiff_lock:
             out = tifffile.create_output(None, self._image_size_zyx[1:], self._tiff_series.dtype)
             self._get_2d_image_array(time_point.time_point_number(), image_channel.index_zero, image_z, out)
         return out
 
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        if time_point.time_point_number() < self.first_time_point_number() \
+                or time_point.time_point_number() > self.last_time_point_number():
+            return None
+        if image_channel.index_zero >= len(self._channels):
+            return None  # Invalid channel
+        z_slice, y_slice, x_slice = _check_region(zyx_slice)
+
+        memmap_tzcyx = self._memmap_tzcyx
+        if memmap_tzcyx is not None:
+            # Read-only view
+            return memmap_tzcyx[time_point.time_point_number(), z_slice, image_channel.index_zero, y_slice, x_slice]
+
+        # Every z is stored as a separate page, so we only need to read the pages within the region
+        z_start, z_stop, _ = z_slice.indices(self._image_size_zyx[0])
+        y_start, y_stop, _ = y_slice.indices(self._image_size_zyx[1])
+        x_start, x_stop, _ = x_slice.indices(self._image_size_zyx[2])
+        out = numpy.empty((max(0, z_stop - z_start), max(0, y_stop - y_start), max(0, x_stop - x_start)),
+                          dtype=self._tiff_series.dtype)
+        with self._tiff_lock:
+            page = tifffile.create_output(None, self._image_size_zyx[1:], self._tiff_series.dtype)
+            for z in range(z_start, z_stop):
+                self._get_2d_image_array(time_point.time_point_number(), image_channel.index_zero, z, page)
+                out[z - z_start] = page[y_slice, x_slice]
+        return out
+
     def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
         return self._image_size_zyx
 
@@ -176,7 +249,8 @@ class _MergedTiffImageLoader(ImageLoader):
         return self._file_name, ""
 
     def copy(self) -> "ImageLoader":
-        return _MergedTiffImageLoader(self._file_name, self._min_time_point_number, self._max_time_point_number)
+        return _MergedTiffImageLoader(self._file_name, self._min_time_point_number, self._max_time_point_number,
+                                      use_memmap=self._use_memmap)
 
     def _get_offset(self, t: int, c: int, z: int, item_size: int) -> int:
         """Gets the pixel offset for the given 2D image."""
@@ -227,6 +301,7 @@ class _MergedTiffImageLoader(ImageLoader):
         return file_name
 
     def close(self):
+        self._memmap_tzcyx = None
         self._tiff.close()
 
     def can_save_images(self, image_channel: ImageChannel) -> bool:
@@ -10,6 +10,7 @@ from organoid_tracker.core import TimePoint, max_none, min_none, UserError
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
 from organoid_tracker.core.resolution import ImageResolution
+from organoid_tracker.image_loading import disk_cached_image_loader
 
 
 class Nd2File:
@@ -36,7 +37,7 @@ def load_image_series(experiment: Experiment, file: Nd2File, field_of_view: int,
     Note: to prevent thread-safety issues, you are not allowed to use the file argument afterwards.
     """
     image_loader = _Nd2ImageLoader(file._file_name, file._nd2_parser, field_of_view, min_time_point, max_time_point)
-    experiment.images.image_loader(image_loader)
+    experiment.images.image_loader(disk_cached_image_loader.wrap_if_enabled(image_loader))
 
     # Update resolution if none is stored
     try:
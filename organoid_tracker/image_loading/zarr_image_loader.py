@@ -1,6 +1,10 @@
+import itertools
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple, Optional, List
+from threading import Lock
+from typing import Tuple, Optional, List, Dict, Any, Union
 
 import numpy
 import zarr
@@ -10,7 +14,7 @@ from zarr.storage import LocalStore, ZipStore
 
 from organoid_tracker.core import TimePoint, UserError, image_coloring
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel, _check_region
 from organoid_tracker.core.images import ChannelDescription
 
 _SUPPORTED_AXIS = ("t", "c", "z", "y", "x")
@@ -64,15 +68,24 @@ def load_from_zarr_file(experiment: Experiment, file_name: str, min_time_point:
         key = keys[0]
         zarr_sub_entry = zarr_group_or_array[key]
 
-        if isinstance(zarr_sub_entry, zarr.Array):
+        # Find the group with the OME-Zarr multiscales metadata (it's either the root, or a subgroup like in the
+        # layout used by bioformats2raw)
+        multiscales_group = zarr_group_or_array
+        if isinstance(zarr_sub_entry, zarr.Group) and _read_multiscales_metadata(zarr_sub_entry.attrs) is not None:
+            multiscales_group = zarr_sub_entry
+        resolution_levels = _read_resolution_levels(multiscales_group)
+        if resolution_levels is None and isinstance(zarr_sub_entry, zarr.Array):
+            resolution_levels = [zarr_sub_entry]  # Just a single array
+
+        if resolution_levels is not None:
             # Found an array!
-            axes_names = _read_axes_order_from_attrs(zarr_group_or_array.attrs)
+            axes_names = _read_axes_order_from_attrs(multiscales_group.attrs)
             if axes_names is None:
                 axes_names = axes_names_geff  # Try the ones from GEFF instead, if any
             if axes_names is None:
-                axes_names = _guess_axes_order_from_shape(zarr_sub_entry)  # Make an educated guess
+                axes_names = _guess_axes_order_from_shape(resolution_levels[0])  # Make an educated guess
 
-            experiment.images.image_loader(_ZarrImageLoader(file_name, axes_names, zarr_sub_entry, min_time_point, max_time_point))
+            experiment.images.image_loader(_ZarrImageLoader(file_name, axes_names, resolution_levels, min_time_point, max_time_point))
 
             if key == "segmentation":
                 # Set the appropriate colormap
@@ -83,7 +96,7 @@ def load_from_zarr_file(experiment: Experiment, file_name: str, min_time_point:
     elif isinstance(zarr_group_or_array, zarr.Array):
         # We just have a bare array, try to display it
         axes_names = _guess_axes_order_from_shape(zarr_group_or_array)
-        experiment.images.image_loader(_ZarrImageLoader(file_name, axes_names, zarr_group_or_array, min_time_point, max_time_point))
+        experiment.images.image_loader(_ZarrImageLoader(file_name, axes_names, [zarr_group_or_array], min_time_point, max_time_point))
     else:
         # Don't know what happened here
         raise UserError("Unsupported ZARR", f"Found unsupported entry: {zarr_group_or_array}")
@@ -120,13 +133,41 @@ def _read_axis_order_from_geff(tracks_group: zarr.Group) -> str:
     return "".join(axes_names)
 
 
+def _read_multiscales_metadata(attributes: Attributes) -> Optional[Dict[str, Any]]:
+    """Gets the metadata of the first OME-Zarr multiscale image. Supports both OME-Zarr 0.4 (metadata stored directly in
+    the attributes) and 0.5 (metadata stored in the "ome" attribute). Returns None if there is no such metadata."""
+    if "ome" in attributes:
+        attributes = attributes["ome"]
+    if "multiscales" not in attributes or len(attributes["multiscales"]) == 0:
+        return None
+    return attributes["multiscales"][0]
+
+
+def _read_resolution_levels(group: zarr.Group) -> Optional[List[zarr.Array]]:
+    """Reads the arrays of all resolution levels of an OME-Zarr multiscale image, from full resolution to the lowest
+    resolution. Returns None if the group has no multiscales metadata."""
+    multiscales_meta = _read_multiscales_metadata(group.attrs)
+    if multiscales_meta is None or "datasets" not in multiscales_meta:
+        return None
+
+    resolution_levels = list()
+    for dataset in multiscales_meta["datasets"]:
+        array = group.get(dataset["path"])
+        if not isinstance(array, zarr.Array):
+            break  # Missing resolution level, use only the levels we have so far
+        resolution_levels.append(array)
+    if len(resolution_levels) == 0:
+        return None
+    return resolution_levels
+
+
 def _read_axes_order_from_attrs(attributes: Attributes) -> Optional[str]:
     """Reads the attributes of a ZARR file, to figure out the axis order.
     Returned string uses letters from _SUPPORTED_AXIS."""
-    if "multiscales" not in attributes:
+    multiscales_meta = _read_multiscales_metadata(attributes)
+    if multiscales_meta is None:
         return None  # Right now, we only support the axes metadata in the "multiscales" format
 
-    multiscales_meta = attributes["multiscales"][0]
     if "axes" not in multiscales_meta:
         return None
 
@@ -141,11 +182,66 @@ def _read_axes_order_from_attrs(attributes: Attributes) -> Optional[str]:
     return "".join(axes_names)
 
 
+class _ChunkCache:
+    """Least-recently-used cache of decoded chunks. Shared by all Zarr image loaders, so that the total memory use stays
+    limited. Scrolling through z or reading nearby patches then doesn't decompress the same chunks over and over."""
+
+    _chunks: "OrderedDict[Tuple[Any, ...], ndarray]"
+    _size_bytes: int
+    _max_size_bytes: int
+    _lock: Lock
+
+    def __init__(self, max_size_bytes: int):
+        self._chunks = OrderedDict()
+        self._size_bytes = 0
+        self._max_size_bytes = max_size_bytes
+        self._lock = Lock()
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[ndarray]:
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                self._chunks.move_to_end(key)
+            return chunk
+
+    def put(self, key: Tuple[Any, ...], chunk: ndarray):
+        if chunk.nbytes * 4 > self._max_size_bytes:
+            return  # Chunk is too large to be worth caching, it would push out everything else
+        with self._lock:
+            old_chunk = self._chunks.pop(key, None)
+            if old_chunk is not None:
+                self._size_bytes -= old_chunk.nbytes
+            self._chunks[key] = chunk
+            self._size_bytes += chunk.nbytes
+            while self._size_bytes > self._max_size_bytes:
+                _, removed_chunk = self._chunks.popitem(last=False)
+                self._size_bytes -= removed_chunk.nbytes
+
+    def remove_file(self, file_name: str):
+        """Removes all chunks of the given file."""
+        with self._lock:
+            for key in [key for key in self._chunks.keys() if key[0] == file_name]:
+                self._size_bytes -= self._chunks.pop(key).nbytes
+
+
+_CHUNK_CACHE = _ChunkCache(max_size_bytes=512 * 1024 * 1024)
+_CHUNK_THREAD_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _get_chunk_thread_pool() -> ThreadPoolExecutor:
+    """Gets the thread pool used for decompressing chunks in parallel. Created on first use."""
+    global _CHUNK_THREAD_POOL
+    if _CHUNK_THREAD_POOL is None:
+        _CHUNK_THREAD_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                                thread_name_prefix="ZarrChunkReader")
+    return _CHUNK_THREAD_POOL
+
+
 class _ZarrImageLoader(ImageLoader):
 
     _file_name: str
 
-    _raw_zarr_array: zarr.Array
+    _resolution_levels: List[zarr.Array]  # Full resolution is at index 0, lower resolutions follow
 
     _axes_names: str
     _axes_sizes: Tuple[int, ...]
@@ -156,12 +252,13 @@ class _ZarrImageLoader(ImageLoader):
     _z_count: int
     _channel_count: int
 
-    def __init__(self, file_name: str, axes_names: str, array: zarr.Array, min_time_point: Optional[int] = None, max_time_point: Optional[int] = None):
+    def __init__(self, file_name: str, axes_names: str, resolution_levels: List[zarr.Array],
+                 min_time_point: Optional[int] = None, max_time_point: Optional[int] = None):
         self._file_name = file_name
         self._axes_names = axes_names
-        self._raw_zarr_array = array
+        self._resolution_levels = resolution_levels
 
-        self._axes_sizes = self._raw_zarr_array.shape
+        self._axes_sizes = self._resolution_levels[0].shape
 
         # Find available time points
         self._min_available_time_point_number = 0
@@ -178,12 +275,17 @@ class _ZarrImageLoader(ImageLoader):
         self._z_count = 1 if "z" not in self._axes_names else self._axes_sizes[self._axes_names.index("z")]
         self._channel_count = 1 if "c" not in self._axes_names else self._axes_sizes[self._axes_names.index("c")]
 
-    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+    def _read(self, level: int, time_point: TimePoint, image_channel: ImageChannel,
+              zyx_selection: Tuple[Union[int, slice], Union[int, slice], Union[int, slice]]) -> Optional[ndarray]:
+        """Reads the given region. Integers in zyx_selection remove that axis from the output, like in NumPy. Returns
+        None if the time point, channel or level doesn't exist."""
         # Check bounds
         if time_point.time_point_number() < self._min_available_time_point_number or time_point.time_point_number() > self._max_available_time_point_number:
             return None
         if image_channel.index_zero < 0 or image_channel.index_zero >= self._channel_count:
             return None
+        if level < 0 or level >= len(self._resolution_levels):
+            return None
 
         # Build indices array
         indices = []
@@ -193,38 +295,106 @@ class _ZarrImageLoader(ImageLoader):
             elif axis_name == "c":
                 indices.append(image_channel.index_zero)
             elif axis_name in ("z", "y", "x"):
-                indices.append(slice(None))
+                indices.append(zyx_selection["zyx".index(axis_name)])
+
+        return self._read_chunks(self._resolution_levels[level], indices)
+
+    def _read_chunks(self, array: zarr.Array, indices: List[Union[int, slice]]) -> ndarray:
+        """Reads the given indices from the array. Only the chunks that overlap with the selection are read. Chunks are
+        taken from the chunk cache if possible, otherwise they are read and decompressed in parallel."""
+        starts = list()
+        stops = list()
+        chunk_ranges = list()
+        for index, chunk_size, axis_size in zip(indices, array.chunks, array.shape):
+            if isinstance(index, slice):
+                start, stop, _ = index.indices(axis_size)
+                stop = max(start, stop)
+            else:
+                start, stop = index, index + 1
+            starts.append(start)
+            stops.append(stop)
+            chunk_ranges.append(range(start // chunk_size, (stop - 1) // chunk_size + 1) if stop > start else range(0))
+
+        output = numpy.empty([stop - start for start, stop in zip(starts, stops)], dtype=array.dtype)
+
+        # Collect the chunks, and find out which ones we still need to read
+        chunks = dict()
+        missing_chunk_coords = list()
+        for chunk_coords in itertools.product(*chunk_ranges):
+            chunk = _CHUNK_CACHE.get((self._file_name, array.path, chunk_coords))
+            if chunk is None:
+                missing_chunk_coords.append(chunk_coords)
+            else:
+                chunks[chunk_coords] = chunk
+
+        def read_chunk(chunk_coords: Tuple[int, ...]) -> ndarray:
+            chunk_selection = tuple(slice(coord * chunk_size, min((coord + 1) * chunk_size, axis_size))
+                                    for coord, chunk_size, axis_size in zip(chunk_coords, array.chunks, array.shape))
+            return array[chunk_selection]
+
+        if len(missing_chunk_coords) == 1:
+            read_chunks = [read_chunk(missing_chunk_coords[0])]  # No need to involve other threads
+        else:
+            read_chunks = _get_chunk_thread_pool().map(read_chunk, missing_chunk_coords)
+        for chunk_coords, chunk in zip(missing_chunk_coords, read_chunks):
+            _CHUNK_CACHE.put((self._file_name, array.path, chunk_coords), chunk)
+            chunks[chunk_coords] = chunk
+
+        # Copy the overlapping part of every chunk into the output
+        for chunk_coords, chunk in chunks.items():
+            chunk_indices = list()
+            output_indices = list()
+            for coord, chunk_size, start, stop in zip(chunk_coords, array.chunks, starts, stops):
+                chunk_start = coord * chunk_size
+                overlap_start = max(start, chunk_start)
+                overlap_stop = min(stop, chunk_start + chunk_size)
+                chunk_indices.append(slice(overlap_start - chunk_start, overlap_stop - chunk_start))
+                output_indices.append(slice(overlap_start - start, overlap_stop - start))
+            output[tuple(output_indices)] = chunk[tuple(chunk_indices)]
+
+        # Remove the axes that were selected using an integer
+        return output[tuple(0 if isinstance(index, int) else slice(None) for index in indices)]
 
-        return self._raw_zarr_array[tuple(indices)]
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        return self.get_3d_image_array_at_level(time_point, image_channel, 0)
 
-    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
-        # Check bounds
-        if time_point.time_point_number() < self._min_available_time_point_number or time_point.time_point_number() > self._max_available_time_point_number:
-            return None
-        if image_z < 0 or image_z >= self._z_count:
-            return None
-        if image_channel.index_zero < 0 or image_channel.index_zero >= self._channel_count:
-            return None
+    def get_3d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, level: int
+                                    ) -> Optional[ndarray]:
+        return self._read(level, time_point, image_channel, (slice(None), slice(None), slice(None)))
 
-        # Build indices array
-        indices = []
-        for axis_name in self._axes_names:
-            if axis_name == "t":
-                indices.append(time_point.time_point_number())
-            elif axis_name == "c":
-                indices.append(image_channel.index_zero)
-            elif axis_name == "z":
-                indices.append(image_z)
-            elif axis_name in ("y", "x"):
-                indices.append(slice(None))
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        z_slice, y_slice, x_slice = _check_region(zyx_slice)
+        array = self._read(0, time_point, image_channel, (z_slice, y_slice, x_slice))
+        if array is not None and "z" not in self._axes_names:
+            array = array[numpy.newaxis][z_slice]  # Image has a single z level, which wasn't stored as an axis
+        return array
+
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        return self.get_2d_image_array_at_level(time_point, image_channel, image_z, 0)
 
-        return self._raw_zarr_array[tuple(indices)]
+    def get_2d_image_array_at_level(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int,
+                                    level: int) -> Optional[ndarray]:
+        image_size_zyx = self.get_image_size_zyx_at_level(level)
+        if image_size_zyx is None or image_z < 0 or image_z >= image_size_zyx[0]:
+            return None
+        return self._read(level, time_point, image_channel, (image_z, slice(None), slice(None)))
 
     def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
         y_size = self._axes_sizes[self._axes_names.index("y")]
         x_size = self._axes_sizes[self._axes_names.index("x")]
         return self._z_count, y_size, x_size
 
+    def get_resolution_level_count(self) -> int:
+        return len(self._resolution_levels)
+
+    def get_image_size_zyx_at_level(self, level: int) -> Optional[Tuple[int, int, int]]:
+        if level < 0 or level >= len(self._resolution_levels):
+            return None
+        shape = self._resolution_levels[level].shape
+        z_size = 1 if "z" not in self._axes_names else shape[self._axes_names.index("z")]
+        return z_size, shape[self._axes_names.index("y")], shape[self._axes_names.index("x")]
+
     def first_time_point_number(self) -> Optional[int]:
         return self._min_available_time_point_number
 
@@ -238,7 +408,10 @@ class _ZarrImageLoader(ImageLoader):
         return self._file_name, "0"
 
     def copy(self) -> "ImageLoader":
-        return _ZarrImageLoader(self._file_name, self._min_available_time_point_number, self._max_available_time_point_number)
+        # Zarr arrays can safely be read from multiple threads, so we can share them
+        return _ZarrImageLoader(self._file_name, self._axes_names, self._resolution_levels,
+                                self._min_available_time_point_number, self._max_available_time_point_number)
 
     def close(self):
-        self._raw_zarr_array.store.close()
+        _CHUNK_CACHE.remove_file(self._file_name)
+        self._resolution_levels[0].store.close()
@@ -2,7 +2,8 @@
 https://public.celltrackingchallenge.net/documents/Naming%20and%20file%20content%20conventions.pdf """
 import math
 import os
-from typing import Optional, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, NamedTuple, Tuple, Union
 
 import numpy
 import skimage.measure
@@ -13,7 +14,6 @@ from tifffile import tifffile
 
 from organoid_tracker.core import UserError, bounding_box
 from organoid_tracker.core.experiment import Experiment
-from organoid_tracker.core.images import Image
 from organoid_tracker.core.links import Links
 from organoid_tracker.core.mask import Mask
 from organoid_tracker.core.position import Position
@@ -138,10 +138,17 @@ def _create_spherical_mask(radius_um: float, resolution: ImageResolution) -> Mas
     return mask
 
 
-def save_data_files(experiment: Experiment, folder: str, mask_size_um=7):
+def save_data_files(experiment: Experiment, folder: str, mask_size_um=7, *, workers: int = 4,
+                    local_watershed: bool = False, compress: bool = False):
     """Saves all cell tracks in the data format of the Cell Tracking Challenge. Requires the presence of links and
      images. Also requires an image size to be known, as well as the file name ending with .txt (case insensitive).
-     Throws ValueError if any of these conditions are violated."""
+     Throws ValueError if any of these conditions are violated.
+
+     The images of the time points are created in parallel, using the given number of worker threads. Each worker needs
+     memory for a few full-size images. If local_watershed is True, the watershed transformation (only used for _RES
+     folders) is done separately for each group of touching cells, which is faster for sparse images. The result is
+     the same as for the full image. If compress is True, the images are saved using lossless
+     deflate compression."""
     is_ground_truth = folder.endswith("_GT")
     is_scratch = folder.endswith("_RES")
     if not is_ground_truth and not is_scratch:
@@ -165,74 +172,180 @@ def save_data_files(experiment: Experiment, folder: str, mask_size_um=7):
     os.makedirs(sub_folder, exist_ok=True)
 
     image_prefix = "man_track" if is_ground_truth else "mask"
-    if is_scratch:
-        resolution = experiment.images.resolution()
-        _save_track_images_watershed(experiment, os.path.join(sub_folder, image_prefix), mask, resolution)
-    else:
-        _save_track_images(experiment, os.path.join(sub_folder, image_prefix), mask)
+    settings = _ImageSettings(
+        image_size_zyx=tuple(image_size_zyx),
+        mask_offsets_zyx=_get_mask_offsets_zyx(mask),
+        watershed_sampling_zyx=experiment.images.resolution().pixel_size_zyx_um if is_scratch else None,
+        local_watershed=local_watershed,
+        compress=compress)
+    _save_track_images(experiment, os.path.join(sub_folder, image_prefix), settings, workers)
 
     file_name = os.path.join("man_track.txt") if is_ground_truth else "res_track.txt"
     _save_overview_file(experiment, os.path.join(sub_folder, file_name))
 
 
-def _save_track_images(experiment: Experiment, image_prefix: str, mask: Mask):
-    """Saves images colored with all tracks at the right location. Each track is marked using the given mask."""
-    image_size_zyx = experiment.images.image_loader().get_image_size_zyx()
-    links = experiment.links
-    positions = experiment.positions
-    offsets = experiment.images.offsets
+class _ImageSettings(NamedTuple):
+    """Settings for drawing the track images, shared by all time points."""
+    image_size_zyx: Tuple[int, int, int]
+    mask_offsets_zyx: ndarray  # Pixels of the mask, relative to the position, as an (N, 3) array
+    watershed_sampling_zyx: Optional[Tuple[float, float, float]]  # If None, no watershed is applied
+    local_watershed: bool
+    compress: bool
 
-    for time_point in positions.time_points():
-        image_offset = offsets.of_time_point(time_point)
-        image_file_name = f"{image_prefix}{time_point.time_point_number():03}.tif"
-        image_fill_array = Image(numpy.zeros(image_size_zyx, dtype=numpy.uint16), offset=image_offset)
 
-        for position in positions.of_time_point(time_point):
-            track = links.get_track(position)
-            if track is None:
-                continue  # No links, so we cannot save the position
+class _TimePointImage(NamedTuple):
+    """Everything needed to draw the image of a single time point."""
+    file_name: str
+    centers_zyx: ndarray  # Pixel around which the mask is stamped, for every position, as an (N, 3) array
+    seeds_zyx: ndarray  # Pixel of the watershed seed, for every position, as an (N, 3) array
+    labels: ndarray  # Value to stamp, for every position (track id + 1)
 
-            track_id = links.get_track_id(track)
-            mask.center_around(position)
-            mask.stamp_image(image_fill_array, track_id + 1)  # Track id is offset by 1 to avoid track id 0
 
-        tifffile.imwrite(image_file_name, image_fill_array.array) #, compression=tifffile.COMPRESSION.ADOBE_DEFLATE, compressionargs={"level": 9})
+# Maximum number of pixels that are stamped at once, limits the size of the temporary arrays
+_MAX_STAMPED_PIXELS = 2_000_000
 
 
-def _save_track_images_watershed(experiment: Experiment, image_prefix: str, mask: Mask, resolution: ImageResolution):
-    """Saves images colored with all tracks at the right location. Each track is marked using the given mask. A
-    watershed transformation is applied to handle overlapping masks."""
-    image_size_zyx = experiment.images.image_loader().get_image_size_zyx()
+def _get_mask_offsets_zyx(mask: Mask) -> ndarray:
+    """Gets all pixels of the mask, relative to the position that Mask.center_around would center it on."""
+    mask_array = mask.get_mask_array()
+    half_size_zyx = numpy.array([int(size / 2) for size in mask_array.shape], dtype=numpy.int64)
+    return numpy.argwhere(mask_array != 0) - half_size_zyx
+
+
+def _save_track_images(experiment: Experiment, image_prefix: str, settings: _ImageSettings, workers: int):
+    """Saves images colored with all tracks at the right location. Each track is marked using the given mask. If
+    watershed_sampling_zyx is set, a watershed transformation is applied to handle overlapping masks."""
     links = experiment.links
     positions = experiment.positions
     offsets = experiment.images.offsets
 
+    # Looking up the track id for every position separately is slow, so do it once for all tracks
+    track_ids = {id(track): track_id for track_id, track in links.find_all_tracks_and_ids()}
+
+    time_point_images = list()
     for time_point in positions.time_points():
-        image_file_name = f"{image_prefix}{time_point.time_point_number():03}.tif"
         image_offset = offsets.of_time_point(time_point)
-        image_mask_array = Image(numpy.zeros(image_size_zyx, dtype=numpy.uint8), offset=image_offset)
-        image_seed_array = numpy.zeros(image_size_zyx, dtype=numpy.uint16)
-
+        image_min_zyx = numpy.array([int(image_offset.z), int(image_offset.y), int(image_offset.x)],
+                                    dtype=numpy.int64)
+        positions_zyx = list()
+        labels = list()
         for position in positions.of_time_point(time_point):
-            moved_position = position - image_offset
-
             track = links.get_track(position)
             if track is None:
                 continue  # No links, so we cannot save the position
+            positions_zyx.append((position.z, position.y, position.x))
+            labels.append(track_ids[id(track)] + 1)  # Track id is offset by 1 to avoid track id 0
+
+        positions_zyx = numpy.array(positions_zyx, dtype=numpy.float64).reshape(-1, 3)
+        offset_zyx = numpy.array([image_offset.z, image_offset.y, image_offset.x], dtype=numpy.float64)
+        time_point_images.append(_TimePointImage(
+            file_name=f"{image_prefix}{time_point.time_point_number():03}.tif",
+            centers_zyx=positions_zyx.astype(numpy.int64) - image_min_zyx,
+            seeds_zyx=(positions_zyx - offset_zyx).astype(numpy.int64),
+            labels=numpy.array(labels, dtype=numpy.uint16)))
+
+    if workers <= 1 or len(time_point_images) <= 1:
+        for time_point_image in time_point_images:
+            _save_time_point_image(time_point_image, settings)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="CTCExporter") as executor:
+        for _ in executor.map(lambda time_point_image: _save_time_point_image(time_point_image, settings),
+                              time_point_images):
+            pass  # Makes sure that errors are raised
+
+
+def _save_time_point_image(time_point_image: _TimePointImage, settings: _ImageSettings):
+    """Draws and saves the image of a single time point. Called on a worker thread."""
+    if settings.watershed_sampling_zyx is None:
+        image_array = numpy.zeros(settings.image_size_zyx, dtype=numpy.uint16)
+        _stamp(image_array, time_point_image.centers_zyx, settings.mask_offsets_zyx, time_point_image.labels)
+    else:
+        mask_array = numpy.zeros(settings.image_size_zyx, dtype=bool)
+        _stamp(mask_array, time_point_image.centers_zyx, settings.mask_offsets_zyx, True)
+        seed_array = numpy.zeros(settings.image_size_zyx, dtype=numpy.uint16)
+        _stamp(seed_array, time_point_image.seeds_zyx, numpy.zeros((1, 3), dtype=numpy.int64),
+               time_point_image.labels)
+        if settings.local_watershed:
+            image_array = _watershed_locally(mask_array, seed_array, settings.watershed_sampling_zyx)
+        else:
+            image_array = _watershed(mask_array, seed_array, settings.watershed_sampling_zyx)
+
+    if settings.compress:
+        tifffile.imwrite(time_point_image.file_name, image_array, compression="zlib")
+    else:
+        tifffile.imwrite(time_point_image.file_name, image_array)
+
+
+def _stamp(image_array: ndarray, centers_zyx: ndarray, mask_offsets_zyx: ndarray,
+           values: Union[ndarray, int, bool]):
+    """Stamps the mask around all centers. Pixels outside the image are skipped. If masks overlap, the position that
+    comes last wins, just like when calling Mask.stamp_image for every position."""
+    if not isinstance(values, ndarray):
+        values = numpy.full(len(centers_zyx), values, dtype=image_array.dtype)
+    image_shape = numpy.array(image_array.shape, dtype=numpy.int64)
+    batch_size = max(1, _MAX_STAMPED_PIXELS // max(1, len(mask_offsets_zyx)))
+    for batch_start in range(0, len(centers_zyx), batch_size):
+        batch_centers = centers_zyx[batch_start:batch_start + batch_size]
+        pixels = (batch_centers[:, numpy.newaxis, :] + mask_offsets_zyx[numpy.newaxis, :, :]).reshape(-1, 3)
+        pixel_values = numpy.repeat(values[batch_start:batch_start + batch_size], len(mask_offsets_zyx))
+        inside = numpy.all((pixels >= 0) & (pixels < image_shape), axis=1)
+        pixels = pixels[inside]
+        image_array[pixels[:, 0], pixels[:, 1], pixels[:, 2]] = pixel_values[inside]
+
+
+def _watershed(mask_array: ndarray, seed_array: ndarray, sampling_zyx: Tuple[float, float, float]) -> ndarray:
+    """Divides the masked area among the seeds, using a watershed on the distance to the nearest seed."""
+    distance_map = _distance_to_seeds(seed_array, sampling_zyx)
+    return _watershed_on_distance_map(distance_map, mask_array, seed_array)
+
+
+def _distance_to_seeds(seed_array: ndarray, sampling_zyx: Tuple[float, float, float]) -> ndarray:
+    """Distance to the nearest seed. The seeds themselves get slightly different negative values (based on their label),
+    so that the watershed always floods them in the same order. Otherwise, that order would depend on the internal
+    queue of the watershed, which differs between a full image and a crop of it."""
+    distance_map = distance_transform_edt(seed_array == 0, sampling=sampling_zyx)
+    seed_pixels = seed_array != 0
+    if numpy.any(seed_pixels):
+        distance_map[seed_pixels] = -seed_array[seed_pixels] / (float(seed_array.max()) + 1)
+    return distance_map
+
+
+def _watershed_on_distance_map(distance_map: ndarray, mask_array: ndarray, seed_array: ndarray) -> ndarray:
+    """Watershed on the given distance map, in which everything outside the mask is made background."""
+    background_color = distance_map.max() + 1
+    distance_map = numpy.where(mask_array, distance_map, background_color)
+
+    regions = skimage.segmentation.watershed(distance_map, seed_array).astype(numpy.uint16)
+    regions[~mask_array] = 0  # Remove background
+    return regions
+
+
+def _watershed_locally(mask_array: ndarray, seed_array: ndarray, sampling_zyx: Tuple[float, float, float]
+                       ) -> ndarray:
+    """Like _watershed, but only runs the watershed on the bounding box of every group of touching masks. The distance
+    map is still calculated for the full image, so that the result is the same as for _watershed.
+
+    Within a group, the flooding never leaves the group before the whole group is filled, so groups don't influence
+    each other. That is no longer true if a group has no seed (it is then filled from the seeds of other groups, through
+    the background), or if a seed lies outside the mask. In those cases, we fall back to _watershed."""
+    import scipy.ndimage
+
+    groups_array, group_count = scipy.ndimage.label(mask_array)
+    seeded_groups = groups_array[seed_array != 0]
+    if numpy.any(seeded_groups == 0) or len(numpy.unique(seeded_groups)) < group_count:
+        return _watershed(mask_array, seed_array, sampling_zyx)
+
+    distance_map = _distance_to_seeds(seed_array, sampling_zyx)
+    regions = numpy.zeros(mask_array.shape, dtype=numpy.uint16)
+    for group_index, group_slice in enumerate(scipy.ndimage.find_objects(groups_array)):
+        if group_slice is None:
+            continue
+        group_mask = groups_array[group_slice] == group_index + 1
+        group_seeds = numpy.where(group_mask, seed_array[group_slice], 0)
+        group_regions = _watershed_on_distance_map(distance_map[group_slice], group_mask, group_seeds)
+        regions[group_slice][group_mask] = group_regions[group_mask]
+    return regions
 
-            track_id = links.get_track_id(track)
-            mask.center_around(position)
-            mask.stamp_image(image_mask_array, 1)
-            image_seed_array[int(moved_position.z), int(moved_position.y), int(moved_position.x)] = track_id + 1
-            # ^ Track id is offset by 1 to avoid track id 0
-
-        distance_map = distance_transform_edt(image_seed_array == 0, sampling=resolution.pixel_size_zyx_um)
-        background_color = distance_map.max() + 1
-        distance_map[image_mask_array.array == 0] = background_color
-
-        regions = skimage.segmentation.watershed(distance_map, image_seed_array).astype(numpy.uint16)
-        regions[image_mask_array.array == 0] = 0  # Remove background
-        tifffile.imwrite(image_file_name, regions) #, compression=tifffile.COMPRESSION.ADOBE_DEFLATE, compressionargs={"level": 9})
 
 def _save_overview_file(experiment: Experiment, file_name: str):
     """Save overview of all linking tracks and their ids"""
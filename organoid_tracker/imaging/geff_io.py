@@ -1,6 +1,7 @@
+import itertools
 import os
 from enum import auto, Enum
-from typing import Any, List, NamedTuple, Optional, Dict, Type
+from typing import Any, List, Optional, Dict, Type, Tuple
 from typing import Literal
 
 import geff
@@ -8,13 +9,12 @@ import numpy
 import zarr
 from geff import GeffReader
 from geff._typing import ZarrPropDict, PropDictNpArray, InMemoryGeff
-from geff.core_io import write_arrays
-from geff.core_io._serialization import deserialize_vlen_property_data
-from geff_spec import Axis, GeffMetadata
-from statsmodels.tsa.adfvalues import z_ct_smallp
-from zarr.storage import StoreLike
+from geff.core_io import check_for_geff, delete_geff
+from geff.core_io._serialization import serialize_vlen_property_data
+from geff_spec import Axis, GeffMetadata, PropMetadata
+from geff_spec.utils import add_or_update_props_metadata, compute_and_add_axis_min_max, create_props_metadata
 
-from organoid_tracker.core import UserError
+from organoid_tracker.core import UserError, TimePoint
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution
@@ -115,28 +115,9 @@ def load_data_file(geff_source: str, min_time_point: int = -9999999, max_time_po
     for edge_prop_info in in_memory_geff["metadata"].edge_props_metadata.values():
         edge_prop_names.append(edge_prop_info.identifier)
 
-    # Read in the positions
-    positions_by_node_id = _read_positions(experiment, in_memory_geff, min_time_point, max_time_point, node_prop_names)
-
-    # Read in the edges
-    edge_ids = in_memory_geff["edge_ids"]
-    edge_props = in_memory_geff["edge_props"]
-    experiment_links = experiment.links
-    for i, (source_node_id, target_node_id) in enumerate(edge_ids):
-        source_position = positions_by_node_id[source_node_id]
-        target_position = positions_by_node_id[target_node_id]
-        if source_position is None or target_position is None:
-            continue  # Outside of time point range - no position was created
-        experiment_links.add_link(source_position, target_position)
-
-        # Read in the edge metadata
-        for edge_prop_name in edge_prop_names:
-            prop_array = edge_props[edge_prop_name]
-            prop_values = prop_array["values"]
-            prop_missing = prop_array.get("missing")
-            if prop_missing is not None and prop_missing[i]:
-                continue  # Missing value
-            experiment_links.set_link_data(source_position, target_position, edge_prop_name, prop_values[i].tolist())
+    # Read in the positions and links
+    node_positions = _read_positions(experiment, in_memory_geff, min_time_point, max_time_point, node_prop_names)
+    _read_links(experiment, in_memory_geff, node_positions, edge_prop_names)
 
     # Read in any extra metadata
     geff_metadata: GeffMetadata = in_memory_geff["metadata"]
@@ -150,9 +131,10 @@ def load_data_file(geff_source: str, min_time_point: int = -9999999, max_time_po
 
 
 def _read_positions(experiment: Experiment, in_memory_geff: InMemoryGeff, min_time_point: int, max_time_point: int,
-                    node_prop_names: list[str]) -> list[Position | None]:
+                    node_prop_names: List[str]) -> numpy.ndarray:
     """Read the positions and position metadata from the in-memory GEFF data and adds them to the experiment.
-    Returns a list of positions by node id."""
+    Returns an object array with the position of every node, in the same order as the node ids. Nodes outside the
+    time point range have None as their position."""
 
     # Read in the scale factors
     geff_axes = in_memory_geff["metadata"].axes
@@ -169,45 +151,96 @@ def _read_positions(experiment: Experiment, in_memory_geff: InMemoryGeff, min_ti
     else:
         z_values = numpy.zeros_like(x_values)  # For 2D-tracking, just fill in zeros for the Z
 
-    if numpy.min(time_values) == numpy.max(time_values) == 0:
+    if len(time_values) > 0 and numpy.min(time_values) == numpy.max(time_values) == 0:
         # Fix for a malformed GEFF file of 2D cell tracking, where the Z and T axis were swapped
         time_values = z_values
         z_values = numpy.zeros_like(time_values)
 
-    positions_by_node_id = []
+    # Calculate all coordinates at once
+    time_point_numbers = (time_values * axes_info.time.scale + axes_info.time.offset).astype(numpy.int64)
+    x_values = x_values * axes_info.x.scale + axes_info.x.offset
+    y_values = y_values * axes_info.y.scale + axes_info.y.offset
+    z_values = z_values * axes_info.z.scale + axes_info.z.offset
+
+    # Group the nodes by time point, skipping the ones outside the requested time point range
+    node_indices = numpy.flatnonzero((time_point_numbers >= min_time_point) & (time_point_numbers <= max_time_point))
+    node_indices = node_indices[numpy.argsort(time_point_numbers[node_indices], kind="stable")]
+    time_point_numbers_sorted = time_point_numbers[node_indices]
+    unique_time_point_numbers, starts = numpy.unique(time_point_numbers_sorted, return_index=True)
+    ends = numpy.append(starts[1:], len(node_indices))
+
+    # Add the positions one time point at a time, using the bulk method of the position collection
+    node_positions = numpy.full(len(node_ids), None, dtype=object)
     experiment_positions = experiment.positions
-    for i in range(len(node_ids)):
-        node_id = node_ids[i]
-
-        time_point_number = int(time_values[i])
-        if time_point_number < min_time_point or time_point_number > max_time_point:
-            # Skip positions outside the requested time point range
-            continue
+    for time_point_number, start, end in zip(unique_time_point_numbers.tolist(), starts.tolist(), ends.tolist()):
+        indices = node_indices[start:end]
+        positions = [Position(x, y, z, time_point_number=time_point_number) for x, y, z
+                     in zip(x_values[indices].tolist(), y_values[indices].tolist(), z_values[indices].tolist())]
 
-        position = Position(float(x_values[i] * axes_info.x.scale + axes_info.x.offset),
-                            float(y_values[i] * axes_info.y.scale + axes_info.y.offset),
-                            float(z_values[i] * axes_info.z.scale + axes_info.z.offset),
-                            time_point_number=int(time_values[i] * axes_info.time.scale + axes_info.time.offset),)
-
-        if node_id == len(positions_by_node_id):
-            # Most common case - sequential node ids
-            positions_by_node_id.append(position)
-        else:
-            # Handle non-sequential node ids - append the list with None until it's big enough
-            while len(positions_by_node_id) <= node_id:
-                positions_by_node_id.append(None)
-            positions_by_node_id[node_id] = position
-        experiment_positions.add(position)
-
-        # Read in the position metadata
+        metadata_dict = dict()
         for node_prop_name in node_prop_names:
-            prop_array = node_props[node_prop_name]
-            prop_values = prop_array["values"]
-            prop_missing = prop_array["missing"]
-            if prop_missing is not None and prop_missing[i]:
-                continue  # Missing value
-            experiment_positions.set_position_data(position, node_prop_name, prop_values[i].tolist())
-    return positions_by_node_id
+            values = _read_prop_values(node_props[node_prop_name], indices)
+            if values is not None:
+                metadata_dict[node_prop_name] = values
+
+        experiment_positions.add_data_from_time_point_dict(TimePoint(time_point_number), positions, metadata_dict)
+        node_positions[indices] = numpy.fromiter(positions, dtype=object, count=len(positions))
+    return node_positions
+
+
+def _read_links(experiment: Experiment, in_memory_geff: InMemoryGeff, node_positions: numpy.ndarray,
+                edge_prop_names: List[str]):
+    """Reads the links and link metadata from the in-memory GEFF data and adds them to the experiment. Links to nodes
+    for which no position was created (see _read_positions) are skipped."""
+    node_ids = numpy.asarray(in_memory_geff["node_ids"])
+    edge_ids = numpy.asarray(in_memory_geff["edge_ids"]).reshape(-1, 2)
+    if len(node_ids) == 0 or len(edge_ids) == 0:
+        return
+
+    # Look up the index of every node id, without assuming that node ids are sequential
+    sorter = numpy.argsort(node_ids, kind="stable")
+    sorted_node_ids = node_ids[sorter]
+    edge_node_indices = numpy.minimum(numpy.searchsorted(sorted_node_ids, edge_ids), len(node_ids) - 1)
+    is_known_node = sorted_node_ids[edge_node_indices] == edge_ids
+    edge_node_indices = sorter[edge_node_indices]
+
+    # Only keep links between loaded positions
+    has_position = node_positions != None  # noqa: E711 - we need an element-wise comparison here
+    edge_indices = numpy.flatnonzero(is_known_node.all(axis=1) & has_position[edge_node_indices].all(axis=1))
+    links = list(zip(node_positions[edge_node_indices[edge_indices, 0]].tolist(),
+                     node_positions[edge_node_indices[edge_indices, 1]].tolist()))
+
+    # Read in the edge metadata, and add everything at once
+    edge_props = in_memory_geff["edge_props"]
+    metadata_dict = dict()
+    for edge_prop_name in edge_prop_names:
+        values = _read_prop_values(edge_props[edge_prop_name], edge_indices)
+        if values is not None:
+            metadata_dict[edge_prop_name] = values
+    experiment.links.add_links_from_list(links, metadata_dict)
+
+
+def _read_prop_values(prop_dict: PropDictNpArray, indices: numpy.ndarray) -> Optional[List[Optional[DataType]]]:
+    """Gets the values of a property at the given indices as Python values, with None for missing values. Returns
+    None if all those values are missing."""
+    missing = prop_dict.get("missing")
+    missing_indices = None
+    if missing is not None:
+        missing_indices = numpy.flatnonzero(missing[indices])
+        if len(missing_indices) == len(indices):
+            return None
+
+    values = prop_dict["values"][indices]
+    if values.dtype == object:
+        # Variable-length values, stored as separate numpy arrays
+        values_list = [value.tolist() if isinstance(value, numpy.ndarray) else value for value in values]
+    else:
+        values_list = values.tolist()
+
+    if missing_indices is not None:
+        for missing_index in missing_indices.tolist():
+            values_list[missing_index] = None
+    return values_list
 
 
 def _read_axes_info(experiment: Experiment, geff_axes: list[Axis]) -> _AxesInfo:
@@ -220,8 +253,8 @@ def _read_axes_info(experiment: Experiment, geff_axes: list[Axis]) -> _AxesInfo:
         original_unit = ax.unit
         final_unit = ax.unit
         scale_factor = 1
-        offset = ax.offset if "offset" in ax else 0
-        if "scale" in ax:
+        offset = ax.offset if ax.offset is not None else 0
+        if ax.scale is not None:
             scale_factor = ax.scale
             final_unit = ax.scaled_unit  # scaled_unit must exist if scale is set, according to the spec
 
@@ -268,7 +301,7 @@ def _read_axes_info(experiment: Experiment, geff_axes: list[Axis]) -> _AxesInfo:
                     resolution = _get_resolution(experiment)
                     if final_unit not in _MULTIPLICATION_FACTOR_TO_MICROMETERS:
                         raise UserError("Unsupported file",
-                                        f"The unit '{final_unit}' for the {ax_name}-axis is not supported in our GEFF loader")
+                                        f"The unit '{final_unit}' for the {ax.name}-axis is not supported in our GEFF loader")
                     scale_to_micrometers = _MULTIPLICATION_FACTOR_TO_MICROMETERS[final_unit]
                     if ax.name == "x":
                         extra_scale_factor = scale_to_micrometers / resolution.pixel_size_x_um
@@ -289,7 +322,7 @@ def _read_axes_info(experiment: Experiment, geff_axes: list[Axis]) -> _AxesInfo:
         # Put all collected info into axes_info
         our_axis_info = our_axes_info.axis(our_axis_type)
         our_axis_info.axis_name = ax.name
-        our_axis_info.scale_factor = scale_factor
+        our_axis_info.scale = scale_factor
         our_axis_info.offset = offset
 
     return our_axes_info
@@ -306,193 +339,208 @@ def _get_resolution(experiment: Experiment) -> ImageResolution:
     return resolution
 
 
-class _InMemoryPropDictNpArray:
-    data_type: Optional[Type[DataType]]
-    values: List[Optional[DataType | numpy.ndarray]]
-
-    __slots__ = ("data_type", "values", "missing")
-
-    def __init__(self, data_type: Optional[Type[DataType]]):
-        self.data_type = data_type
-        self.values = []
-
-    def _get_numpy_type(self) -> Type[numpy.generic]:
-        """Returns the numpy type corresponding to the data type."""
-        if self.data_type is None:
-            example_value = next((v for v in self.values if v is not None), None)
-            if example_value is None:
-                return numpy.float64  # Default to float64 if all values are None
-            elif isinstance(example_value, float):
-                return numpy.float64
-            elif isinstance(example_value, int):
-                return numpy.int64
-            elif isinstance(example_value, str):
-                return numpy.str_
-            elif isinstance(example_value, bool):
-                return numpy.bool_
-            else:
-                return numpy.object_
-
-        if self.data_type == int:
-            return numpy.int64
-        elif self.data_type == float:
-            return numpy.float64
-        elif self.data_type == str:
-            return numpy.str_
-        elif self.data_type == bool:
-            return numpy.bool_
+def _to_geff_prop_dict(values: List[Optional[DataType]], data_type: Optional[Type[DataType]]) -> PropDictNpArray:
+    """Converts a column of values (with None for missing values) to a dictionary with numpy arrays for GEFF
+    serialization. If the data type is None, it is guessed from the first value that is not None."""
+    if data_type is None:
+        example_value = next((value for value in values if value is not None), None)
+        if isinstance(example_value, (bool, int, float, str, list)):
+            data_type = type(example_value)
         else:
-            return numpy.object_
-
-    def _get_numpy_list_type(self) -> Optional[Type[numpy.generic]]:
-        """In case we're storing lists of a specific type, return the type of elements in the list."""
-        example_value = next((v for v in self.values if v), None)
-        if isinstance(example_value, list):
-            first_element = example_value[0]
-            if isinstance(first_element, float):
-                return numpy.float64
-            elif isinstance(first_element, int):
-                return numpy.int64
-            elif isinstance(first_element, str):
-                return numpy.str_
-            elif isinstance(first_element, bool):
-                return numpy.bool_
-
-        return None  # Not a list of specific type
+            data_type = float if example_value is None else object  # Default to float if all values are None
 
+    missing_array = numpy.array([value is None for value in values], dtype=bool)
+    if not missing_array.any():
+        missing_array = None
+    values_array = numpy.fromiter(values, dtype=object, count=len(values))
+
+    if data_type in (bool, int, float):
+        # Fast path - numpy can convert the whole column at once
+        numpy_type = {bool: numpy.bool_, int: numpy.int64, float: numpy.float64}[data_type]
+        if missing_array is not None:
+            values_array[missing_array] = numpy.nan if data_type == float else data_type(0)
+        return {"values": values_array.astype(numpy_type), "missing": missing_array}
+
+    if data_type == str:
+        if missing_array is not None:
+            values_array[missing_array] = ""
+        return {"values": values_array.astype(numpy.str_), "missing": missing_array}
+
+    if data_type == list:
+        example_list = next((value for value in values if value), None)
+        if example_list is not None and isinstance(example_list[0], str):
+            # Can't save lists of strings in GEFF unfortunately, just plain strings
+            # So we need to convert ["foo", "bar"] to "['foo', 'bar']"
+            return _to_geff_prop_dict([None if value is None else str(value) for value in values], str)
 
+        # Store every list as a separate numpy array
+        list_type = numpy.float64 if example_list is None else type(example_list[0])
+        values_array = numpy.array([numpy.zeros((0,), dtype=list_type) if value is None else numpy.array(value)
+                                    for value in values], dtype=object)
+        return {"values": values_array, "missing": missing_array}
 
-    def to_geff_prop_dict(self) -> PropDictNpArray:
-        """Converts the data structures a dictionary with numpy arrays for GEFF serialization."""
-        numpy_type = self._get_numpy_type()
-        numpy_list_type = self._get_numpy_list_type()
+    return {"values": values_array, "missing": missing_array}
 
-        if numpy_list_type == numpy.str_:
-            # Can't save lists of strings in GEFF unfortunately, just plain strings
-            # So we need to convert ["foo", "bar"] to "['foo', 'bar']"
-            for i, value in enumerate(self.values):
-                if value is not None:
-                    self.values[i] = str(value)
-            numpy_list_type = None
-            numpy_type = numpy.str_
 
-        # Data conversions
-        missing_array = None
-        for i, value in enumerate(self.values):
-            if value is None:
-                if missing_array is None:
-                    # Initialize missing array
-                    missing_array = numpy.zeros(len(self.values), dtype=bool)
-                missing_array[i] = True
-
-                # Need to replace missing value with a default value
-                if numpy_type == numpy.bool_:
-                    self.values[i] = False
-                elif numpy_type == numpy.int64:
-                    self.values[i] = 0
-                elif numpy_type == numpy.str_:
-                    self.values[i] = ""
-                elif numpy_type == numpy.float64:
-                    self.values[i] = numpy.nan
-                else:  # Arrays
-                    self.values[i] = numpy.zeros((0,), dtype=numpy_list_type)
-
-            # Convert Python lists to numpy arrays
-            if isinstance(value, list):
-                self.values[i] = numpy.array(value)
-
-        values_array = numpy.array(self.values, dtype=numpy_type)
-
-        return {
-            "values": values_array,
-            "missing": missing_array,
-        }
-
-
-def save_data_file(experiment: Experiment, file_name: str):
-    """Saves the experiment tracking data to a GEFF file."""
+def _collect_node_columns(experiment: Experiment) -> Tuple[List[Position], Dict[str, PropDictNpArray]]:
+    """Collects the positions and their metadata as columns. The positions are returned in the order of the
+    columns."""
     experiment_positions = experiment.positions
-    experiment_links = experiment.links
+    position_count = len(experiment_positions)
 
-    # Set up the arrays
-    node_ids = []
-    edge_ids = []
-    node_props = dict()
-    position_data_names = list()  # All position metadata names, but not x,y,z,t
-    for node_prop_name, data_type in experiment_positions.get_data_names_and_types().items():
-        node_props[node_prop_name] = _InMemoryPropDictNpArray(data_type)
-        position_data_names.append(node_prop_name)
-    edge_props = dict()
-    for edge_prop_name in experiment_links.find_all_data_names():
-        edge_props[edge_prop_name] = _InMemoryPropDictNpArray(None)
-
-    # These metadata arrays are always present, they encode the position coordinates
-    node_x_array, node_y_array, node_z_array, node_t_array = _InMemoryPropDictNpArray(float), _InMemoryPropDictNpArray(float), _InMemoryPropDictNpArray(float), _InMemoryPropDictNpArray(int)
-    node_props["x"] = node_x_array
-    node_props["y"] = node_y_array
-    node_props["z"] = node_z_array
-    node_props["t"] = node_t_array
-
-    # Collect all the data
-    current_time_point_position_to_node_id: Dict[Position, int] = dict()
-    previous_time_point_position_to_node_id: Dict[Position, int] = dict()
-    for time_point in experiment_positions.time_points():
-        image_offset = experiment.images.offsets.of_time_point(time_point)
+    all_positions = list()
+    x_values = numpy.empty(position_count, dtype=numpy.float64)
+    y_values = numpy.empty(position_count, dtype=numpy.float64)
+    z_values = numpy.empty(position_count, dtype=numpy.float64)
+    t_values = numpy.empty(position_count, dtype=numpy.int64)
+    data_names_and_types = experiment_positions.get_data_names_and_types()
+    data_values = {data_name: [None] * position_count for data_name in data_names_and_types.keys()}
 
-        # Iterate over all positions in this time point
+    start = 0
+    for time_point in experiment_positions.time_points():
         positions = list(experiment_positions.of_time_point(time_point))
-        for position in positions:
-            node_id = len(node_ids)
-
-            # Add to node ids
-            node_ids.append(node_id)
-            current_time_point_position_to_node_id[position] = node_id
-
-            # Add to edge ids
-            for past_position in experiment_links.find_pasts(position):
-                past_node_id = previous_time_point_position_to_node_id.get(past_position)
-                if past_node_id is not None:
-                    edge_ids.append((past_node_id, node_id))
-                for data_name in edge_props.keys():
-                    data_value = experiment_links.get_link_data(past_position, position, data_name)
-                    edge_props[data_name].values.append(data_value)
-
-            # Add to position properties (removing image offset, as GEFF doesn't support per-time-point offsets)
-            node_x_array.values.append(position.x - image_offset.x)
-            node_y_array.values.append(position.y - image_offset.y)
-            node_z_array.values.append(position.z - image_offset.z)
-            node_t_array.values.append(position.time_point_number())
-
-        # Add to node properties (we can use a fast bulk method here)
-        missing_data_names = set(position_data_names)
-        for data_name, data_values in experiment_positions.create_time_point_dict(time_point, positions).items():
-            node_props[data_name].values.extend(data_values)
-            missing_data_names.discard(data_name)
-        for missing_data_name in missing_data_names:
-            # Don't forget to add None values for missing position data - otherwise the arrays will be misaligned
-            node_props[missing_data_name].values.extend([None] * len(positions))
-
-        # Move to next time point
-        previous_time_point_position_to_node_id = current_time_point_position_to_node_id
-        current_time_point_position_to_node_id = dict()
-
-    # Convert global data to extra metadata
-    write_arrays(
-        geff_store=file_name,
-        node_ids=numpy.array(node_ids, dtype=numpy.uint32),
-        node_props={name: prop.to_geff_prop_dict() for name, prop in node_props.items()},
-        edge_ids=numpy.array(edge_ids, dtype=numpy.uint32),
-        edge_props={name: prop.to_geff_prop_dict() for name, prop in edge_props.items()},
-        metadata=GeffMetadata(
-            geff_version=geff.__version__,
-            axes=_get_geff_axes_meta(experiment),
-            directed=True,
-            node_props_metadata={},
-            edge_props_metadata={},
-            extra=experiment.global_data.get_all_data()
-        ),
-        overwrite=True
+        if len(positions) == 0:
+            continue
+        end = start + len(positions)
+
+        # Store the coordinates (removing image offset, as GEFF doesn't support per-time-point offsets)
+        image_offset = experiment.images.offsets.of_time_point(time_point)
+        coords = numpy.array([(position.x, position.y, position.z) for position in positions], dtype=numpy.float64)
+        x_values[start:end] = coords[:, 0] - image_offset.x
+        y_values[start:end] = coords[:, 1] - image_offset.y
+        z_values[start:end] = coords[:, 2] - image_offset.z
+        t_values[start:end] = time_point.time_point_number()
+
+        # Copy over the metadata (we can use a fast bulk method here)
+        for data_name, time_point_values in experiment_positions.create_time_point_dict(time_point, positions).items():
+            column = data_values.get(data_name)
+            if column is None:
+                column = [None] * position_count
+                data_values[data_name] = column
+            column[start:end] = time_point_values
+
+        all_positions += positions
+        start = end
+
+    node_props = {data_name: _to_geff_prop_dict(values, data_names_and_types.get(data_name))
+                  for data_name, values in data_values.items()}
+
+    # These arrays are always present, they encode the position coordinates
+    node_props["x"] = {"values": x_values, "missing": None}
+    node_props["y"] = {"values": y_values, "missing": None}
+    node_props["z"] = {"values": z_values, "missing": None}
+    node_props["t"] = {"values": t_values, "missing": None}
+    return all_positions, node_props
+
+
+def _collect_edge_columns(experiment: Experiment, position_to_node_id: Dict[Position, int]
+                          ) -> Tuple[numpy.ndarray, Dict[str, PropDictNpArray]]:
+    """Collects the edges as an (N, 2) array of node ids, together with the link metadata as columns."""
+    experiment_links = experiment.links
+    links = list(experiment_links.find_all_links())
+
+    # Look up all node ids in one go, using -1 for positions that are not in the position collection
+    node_ids = numpy.fromiter(map(position_to_node_id.get, itertools.chain.from_iterable(links), itertools.repeat(-1)),
+                              dtype=numpy.int64, count=2 * len(links))
+    edge_ids = node_ids.reshape(-1, 2)
+    is_saved = (edge_ids >= 0).all(axis=1)
+    if not is_saved.all():
+        # Skip links to positions that don't exist in the position collection
+        links = list(itertools.compress(links, is_saved.tolist()))
+        edge_ids = edge_ids[is_saved]
+
+    # Only visit the links that actually have the data
+    edge_props = dict()
+    link_to_edge_index = None
+    for data_name in experiment_links.find_all_data_names():
+        if link_to_edge_index is None:
+            link_to_edge_index = dict(zip(links, range(len(links))))
+        values = [None] * len(links)
+        for link, value in experiment_links.find_all_links_with_data(data_name):
+            edge_index = link_to_edge_index.get(link)
+            if edge_index is not None:
+                values[edge_index] = value
+        edge_props[data_name] = _to_geff_prop_dict(values, None)
+
+    return edge_ids, edge_props
+
+
+def save_data_file(experiment: Experiment, file_name: str, *, chunk_size: Optional[int] = None,
+                   compressors: Any = "auto"):
+    """Saves the experiment tracking data to a GEFF file.
+
+    The node and edge arrays are stored as chunked zarr arrays. chunk_size is the number of nodes or edges in each
+    chunk; use None to let zarr decide. compressors is passed on to zarr, so you can for example pass
+    numcodecs.Zstd(level=5), or None to disable compression.
+    """
+    positions, node_props = _collect_node_columns(experiment)
+    position_to_node_id = dict(zip(positions, range(len(positions))))
+    edge_ids, edge_props = _collect_edge_columns(experiment, position_to_node_id)
+
+    metadata = GeffMetadata(
+        geff_version=geff.__version__,
+        axes=_get_geff_axes_meta(experiment),
+        directed=True,
+        node_props_metadata={},
+        edge_props_metadata={},
+        extra=experiment.global_data.get_all_data()
     )
+    _write_arrays(file_name, numpy.arange(len(positions), dtype=numpy.uint32), node_props,
+                  edge_ids.astype(numpy.uint32), edge_props, metadata, chunk_size, compressors)
+
+
+def _write_arrays(file_name: str, node_ids: numpy.ndarray, node_props: Dict[str, PropDictNpArray],
+                  edge_ids: numpy.ndarray, edge_props: Dict[str, PropDictNpArray], metadata: GeffMetadata,
+                  chunk_size: Optional[int], compressors: Any):
+    """Like geff.core_io.write_arrays, but with control over the chunk size and compression. Overwrites any existing
+    GEFF file."""
+    if check_for_geff(file_name):
+        delete_geff(file_name, zarr_format=2)
+
+    geff_root = zarr.open_group(file_name, mode="a", zarr_format=2)
+    _write_zarr_array(geff_root, "nodes/ids", node_ids, chunk_size, compressors)
+    _write_zarr_array(geff_root, "edges/ids", edge_ids, chunk_size, compressors)
+    node_props_meta = _write_props_arrays(geff_root, "nodes", node_props, chunk_size, compressors)
+    edge_props_meta = _write_props_arrays(geff_root, "edges", edge_props, chunk_size, compressors)
+
+    metadata = add_or_update_props_metadata(metadata, node_props_meta, "node")
+    metadata = add_or_update_props_metadata(metadata, edge_props_meta, "edge")
+    metadata = compute_and_add_axis_min_max(metadata, node_props)
+    metadata.write(file_name)
+
+
+def _write_props_arrays(geff_root: zarr.Group, group_name: Literal["nodes", "edges"],
+                        props: Dict[str, PropDictNpArray], chunk_size: Optional[int],
+                        compressors: Any) -> List[PropMetadata]:
+    """Writes the property arrays of the nodes or edges. Returns the metadata of the properties."""
+    props_group = geff_root.require_group(f"{group_name}/props")
+    props_meta = list()
+    for prop_name, prop_dict in props.items():
+        prop_meta = create_props_metadata(prop_name, prop_dict)
+        props_meta.append(prop_meta)
+
+        data = None
+        if prop_meta.varlength:
+            values, missing, data = serialize_vlen_property_data(prop_dict)
+        else:
+            values, missing = prop_dict["values"], prop_dict["missing"]
+
+        prop_group = props_group.create_group(prop_name)
+        _write_zarr_array(prop_group, "values", values, chunk_size, compressors)
+        if missing is not None:
+            _write_zarr_array(prop_group, "missing", missing, chunk_size, compressors)
+        if data is not None:
+            _write_zarr_array(prop_group, "data", data, chunk_size, compressors)
+    return props_meta
+
+
+def _write_zarr_array(group: zarr.Group, path: str, data: numpy.ndarray, chunk_size: Optional[int],
+                      compressors: Any):
+    """Writes an array that is only chunked along the first axis."""
+    chunks = "auto"
+    if chunk_size is not None:
+        chunks = (max(1, min(chunk_size, data.shape[0])),) + data.shape[1:]
+    group.create_array(path, data=data, chunks=chunks, compressors=compressors)
 
 
 def _get_geff_axes_meta(experiment: Experiment) -> List[Axis]:
@@ -501,9 +549,9 @@ def _get_geff_axes_meta(experiment: Experiment) -> List[Axis]:
         resolution = experiment.images.resolution()
         axes = [
             Axis(name="t", type="time", unit="frame", scale=resolution.time_point_interval_m, scaled_unit="minute"),
-            Axis(name="z", type="space", unit="pixel", scale=resolution.pixel_size_x_um, scaled_unit="micrometer"),
+            Axis(name="z", type="space", unit="pixel", scale=resolution.pixel_size_z_um, scaled_unit="micrometer"),
             Axis(name="y", type="space", unit="pixel", scale=resolution.pixel_size_y_um, scaled_unit="micrometer"),
-            Axis(name="x", type="space", unit="pixel", scale=resolution.pixel_size_z_um, scaled_unit="micrometer")
+            Axis(name="x", type="space", unit="pixel", scale=resolution.pixel_size_x_um, scaled_unit="micrometer")
         ]
     except UserError:
         # No resolution set. Fine, we'll just don't export the scaling then
@@ -514,4 +562,3 @@ def _get_geff_axes_meta(experiment: Experiment) -> List[Axis]:
             Axis(name="x", type="space", unit="pixel")
         ]
     return axes
-
@@ -48,9 +48,10 @@ The TrackMate file format works as follows:
       </GUIState>
 """
 
-from typing import Dict, Optional
+from array import array
+from typing import Dict, Optional, List, Tuple, TextIO
 import xml.etree.ElementTree as ElementTreeLib
-from xml.etree.ElementTree import Element, SubElement, Comment
+from xml.etree.ElementTree import Element, SubElement
 
 from organoid_tracker.core import TimePoint, UserError
 from organoid_tracker.core.experiment import Experiment
@@ -58,133 +59,198 @@ from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution
 
 
+class _SpotsOfTimePoint:
+    """The spots of a single time point, as read from the file. The coordinates are stored compactly, and only converted
+    to positions once all of the file is read, because the resolution is stored at the end of the file."""
+
+    ids: array
+    xs: array
+    ys: array
+    zs: array
+
+    def __init__(self):
+        self.ids = array("q")
+        self.xs = array("d")
+        self.ys = array("d")
+        self.zs = array("d")
+
+
 def load_data_file(file_name: str, min_time_point: int, max_time_point: int, experiment: Optional[Experiment] = None
                    ) -> Experiment:
-    """Loads an XML file in the TrackMate format."""
+    """Loads an XML file in the TrackMate format. The file is read incrementally, and all XML elements are discarded
+    once they have been read, so that even files of several gigabytes can be loaded."""
     if experiment is None:
         experiment = Experiment()
 
-    tree = ElementTreeLib.parse(file_name)
-    root = tree.getroot()
-    settings = root.find("Settings")
-    if settings is not None:
-        _read_resolution(experiment, settings)
-    model = root.find("Model")
+    spots_by_time_point: Dict[int, _SpotsOfTimePoint] = dict()
+    spots_of_time_point: Optional[_SpotsOfTimePoint] = None  # None if we're outside the time range
+    edge_source_ids = array("q")
+    edge_target_ids = array("q")
+    coords_in_px = False
+
+    for event, element in ElementTreeLib.iterparse(file_name, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag == "SpotsInFrame":
+                time_point_number = int(element.attrib["frame"])
+                if min_time_point <= time_point_number <= max_time_point:
+                    spots_of_time_point = spots_by_time_point.get(time_point_number)
+                    if spots_of_time_point is None:
+                        spots_of_time_point = _SpotsOfTimePoint()
+                        spots_by_time_point[time_point_number] = spots_of_time_point
+                else:
+                    spots_of_time_point = None  # Skip this time point
+            elif tag == "Model":
+                coords_in_px = _read_spatial_units(element)
+            continue
+
+        # End of element, so all attributes and children have been read
+        if tag == "Spot":
+            if spots_of_time_point is not None:
+                attributes = element.attrib
+                spots_of_time_point.ids.append(int(attributes["ID"]))
+                spots_of_time_point.xs.append(float(attributes["POSITION_X"]))
+                spots_of_time_point.ys.append(float(attributes["POSITION_Y"]))
+                spots_of_time_point.zs.append(float(attributes["POSITION_Z"]))
+            element.clear()
+        elif tag == "Edge":
+            edge_source_ids.append(int(element.attrib["SPOT_SOURCE_ID"]))
+            edge_target_ids.append(int(element.attrib["SPOT_TARGET_ID"]))
+            element.clear()
+        elif tag in {"SpotsInFrame", "Track", "AllSpots", "AllTracks"}:
+            element.clear()  # Removes the (already cleared) child elements
+        elif tag == "ImageData":
+            _read_resolution(experiment, element)
 
-    # Validate
+    spot_dictionary = _add_spots(experiment, spots_by_time_point, coords_in_px)
+    del spots_by_time_point
+    _add_edges(experiment, spot_dictionary, edge_source_ids, edge_target_ids)
+    return experiment
+
+
+def _read_spatial_units(model: Element) -> bool:
+    """Checks the units of the spot coordinates. Returns True if the coordinates are in pixels, False if they are in
+    micrometers. Raises ValueError for other units."""
     if model.attrib["spatialunits"] not in {"µm", "pixel"}:
         raise ValueError("Can only handle coordinates in micrometers and pixels. Cannot handle \""
                          + str(model.attrib["spatialunits"]) + "\".")
+    return model.attrib["spatialunits"] == "pixel"
 
-    # Read all tracks
-    spot_dictionary = _read_spots(experiment, model, min_time_point, max_time_point)
-    all_tracks = model.find("AllTracks")
-    links = experiment.links
-    for track in all_tracks.findall("Track"):
-        for edge in track.findall("Edge"):
-            source = spot_dictionary.get(int(edge.attrib["SPOT_SOURCE_ID"]))
-            target = spot_dictionary.get(int(edge.attrib["SPOT_TARGET_ID"]))
-            if source is None or target is None:
-                continue  # Outside of time range
-
-            if source.time_point_number() > target.time_point_number():
-                source, target = target, source  # Make sure source comes first in time
-
-            while source.time_point_number() < target.time_point_number() - 1:
-                # Add extra positions in case a time point is skipped
-                temp_position = source.with_time_point_number(source.time_point_number() + 1)
-                links.add_link(source, temp_position)
-                source = temp_position
-            links.add_link(source, target)
-    return experiment
 
-
-def _read_spots(experiment: Experiment, model: Element, min_time_point: int, max_time_point: int
-                ) -> Dict[int, Position]:
-    """Reads all spots in the XML tree, and adds them to the experiment. Returns a Dict with a
-    spot id -> Position mapping, which will be used for linking."""
+def _add_spots(experiment: Experiment, spots_by_time_point: Dict[int, _SpotsOfTimePoint], coords_in_px: bool
+               ) -> Dict[int, Position]:
+    """Adds all spots to the experiment. Returns a Dict with a spot id -> Position mapping, which will be used for
+    linking."""
     spot_dictionary = dict()
     positions = experiment.positions
 
     # TrackMate stores positions in the resolution, we store it in pixels. Correct for that.
     x_res, y_res, z_res = 1, 1, 1
-    try:
-        resolution = experiment.images.resolution()
-        x_res = resolution.pixel_size_x_um
-        y_res = resolution.pixel_size_y_um
-        z_res = resolution.pixel_size_z_um
-    except UserError:
-        pass  # Ignore, seems TrackMate is actually storing positions.
-    coords_in_px = model.attrib["spatialunits"] == "pixel"
-
-    all_spots = model.find("AllSpots")
-    for frame in all_spots.findall("SpotsInFrame"):
-        time_point_number = int(frame.attrib["frame"])
-        if time_point_number < min_time_point or time_point_number > max_time_point:
-            continue  # Skip this time point
-        time_point = TimePoint(time_point_number)
-        for spot in frame.findall("Spot"):
-            x = float(spot.attrib["POSITION_X"])
-            y = float(spot.attrib["POSITION_Y"])
-            z = float(spot.attrib["POSITION_Z"])
-            if not coords_in_px:
-                x /= x_res
-                y /= y_res
-                z /= z_res
-
-            id = int(spot.attrib["ID"])
-            position = Position(x, y, z, time_point=time_point)
-            positions.add(position)
-            spot_dictionary[id] = position
+    if not coords_in_px:
+        try:
+            resolution = experiment.images.resolution()
+            x_res = resolution.pixel_size_x_um
+            y_res = resolution.pixel_size_y_um
+            z_res = resolution.pixel_size_z_um
+        except UserError:
+            pass  # Ignore, seems TrackMate is actually storing positions.
+
+    for time_point_number, spots in spots_by_time_point.items():
+        positions_of_time_point = dict()  # Used as an ordered set, to skip duplicate positions
+        for spot_id, x, y, z in zip(spots.ids, spots.xs, spots.ys, spots.zs):
+            position = Position(x / x_res, y / y_res, z / z_res, time_point_number=time_point_number)
+            positions_of_time_point[position] = None
+            spot_dictionary[spot_id] = position
+        positions.add_data_from_time_point_dict(TimePoint(time_point_number), list(positions_of_time_point.keys()),
+                                                dict())
     return spot_dictionary
 
 
-def _read_resolution(experiment: Experiment, settings: Element):
-    image_data = settings.find("ImageData")
-    if image_data is not None:
-        x_res = float(image_data.attrib["pixelwidth"])
-        y_res = float(image_data.attrib["pixelheight"])
-        z_res = float(image_data.attrib["voxeldepth"])
-        t_res = float(image_data.attrib["timeinterval"]) if "timeinterval" in image_data.attrib else 0
-        experiment.images.set_resolution(ImageResolution(x_res, y_res, z_res, t_res))
+def _add_edges(experiment: Experiment, spot_dictionary: Dict[int, Position], edge_source_ids: array,
+               edge_target_ids: array):
+    """Adds all edges as links to the experiment."""
+    edges: List[Tuple[Position, Position]] = list()
+    for source_id, target_id in zip(edge_source_ids, edge_target_ids):
+        source = spot_dictionary.get(source_id)
+        target = spot_dictionary.get(target_id)
+        if source is None or target is None:
+            continue  # Outside of time range
+
+        if source.time_point_number() > target.time_point_number():
+            source, target = target, source  # Make sure source comes first in time
+        edges.append((source, target))
+
+    # Adding the links in order of time is fastest, as then most links just extend an existing track
+    edges.sort(key=lambda edge: edge[0].time_point_number())
+
+    links = experiment.links
+    for source, target in edges:
+        while source.time_point_number() < target.time_point_number() - 1:
+            # Add extra positions in case a time point is skipped
+            temp_position = source.with_time_point_number(source.time_point_number() + 1)
+            links.add_link(source, temp_position)
+            source = temp_position
+        links.add_link(source, target)
+
+
+def _read_resolution(experiment: Experiment, image_data: Element):
+    x_res = float(image_data.attrib["pixelwidth"])
+    y_res = float(image_data.attrib["pixelheight"])
+    z_res = float(image_data.attrib["voxeldepth"])
+    t_res = float(image_data.attrib["timeinterval"]) if "timeinterval" in image_data.attrib else 0
+    experiment.images.set_resolution(ImageResolution(x_res, y_res, z_res, t_res))
 
 
 def save_tracking_data(experiment: Experiment, output_file: str):
-    """Saves the tracking data to the TrackMate format, used by TrackMate, MaMut, Mastodon, LFTree and others."""
-    trackmate = Element('TrackMate', {"version": "3.6.0"})
-    trackmate.append(Comment("Generated by OrganoidTracker"))
+    """Saves the tracking data to the TrackMate format, used by TrackMate, MaMut, Mastodon, LFTree and others. The
+    spots and edges are written directly to the file, without building an XML tree in memory first."""
+    with open(output_file, "w", encoding="utf-8") as handle:
+        handle.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        handle.write('<TrackMate version="3.6.0">\n')
+        handle.write('  <!--Generated by OrganoidTracker-->\n')
 
-    # Make the model tag
-    model = SubElement(trackmate, "Model", {"spatialunits": "pixel", "timeunits": "frame"})
-    feature_declarations = SubElement(model, "FeatureDeclarations")
-    SubElement(feature_declarations, "SpotFeatures")
-    SubElement(feature_declarations, "EdgeFeatures")
-    SubElement(feature_declarations, "TrackFeatures")
+        # Write the model tag
+        handle.write('  <Model spatialunits="pixel" timeunits="frame">\n')
+        handle.write('    <FeatureDeclarations>\n')
+        handle.write('      <SpotFeatures />\n')
+        handle.write('      <EdgeFeatures />\n')
+        handle.write('      <TrackFeatures />\n')
+        handle.write('    </FeatureDeclarations>\n')
 
-    # Store the positions:
-    position_to_id = _store_positions(experiment, model)
+        # Write the positions
+        position_to_id = _write_positions(experiment, handle)
 
-    # Store the links
-    # We store everything in a single track - this seems to be allowed (and it's also wat LFTree uses)
-    all_tracks = SubElement(model, "AllTracks")
-    the_track = SubElement(all_tracks, "Track", {"TRACK_ID": str(1), "name": str(1)})
-    for source_position, target_position in experiment.links.find_all_links():
-        SubElement(the_track, "Edge", {"SPOT_SOURCE_ID": str(position_to_id[source_position]),
-                                       "SPOT_TARGET_ID": str(position_to_id[target_position])})
+        # Write the links
+        # We store everything in a single track - this seems to be allowed (and it's also wat LFTree uses)
+        handle.write('    <AllTracks>\n')
+        handle.write('      <Track TRACK_ID="1" name="1">\n')
+        for source_position, target_position in experiment.links.find_all_links():
+            handle.write(f'        <Edge SPOT_SOURCE_ID="{position_to_id[source_position]}"'
+                         f' SPOT_TARGET_ID="{position_to_id[target_position]}" />\n')
+        handle.write('      </Track>\n')
+        handle.write('    </AllTracks>\n')
+        handle.write('    <FilteredTracks>\n')
+        handle.write('      <TrackID TRACK_ID="1" />\n')
+        handle.write('    </FilteredTracks>\n')
+        handle.write('  </Model>\n')
 
-    filtered_tracks = SubElement(model, "FilteredTracks")
-    SubElement(filtered_tracks, "TrackID", {"TRACK_ID": str(1)})
+        # Write the settings tag, which is small, so we can use ElementTree for it
+        settings = Element("Settings")
+        _store_settings(experiment, settings)
+        _write_small_element(handle, settings)
 
-    # Make the settings tag
-    settings = SubElement(trackmate, "Settings")
-    _store_settings(experiment, settings)
+        # Write the GUIState tag
+        gui_state = Element("GUIState", {"state": "ConfigureViews"})
+        SubElement(gui_state, "View", {"key": "HYPERSTACKDISPLAYER"})
+        _write_small_element(handle, gui_state)
 
-    # Make the GUIState tag
-    gui_state = SubElement(trackmate, "GUIState", {"state": "ConfigureViews"})
-    SubElement(gui_state, "View", {"key": "HYPERSTACKDISPLAYER"})
+        handle.write('</TrackMate>\n')
 
-    tree = ElementTreeLib.ElementTree(trackmate)
-    tree.write(output_file, encoding="utf-8", xml_declaration=True)
+
+def _write_small_element(handle: TextIO, element: Element):
+    """Writes an element (including its children) to the file, indented as a child of the root element."""
+    ElementTreeLib.indent(element, space="  ", level=1)
+    handle.write("  " + ElementTreeLib.tostring(element, encoding="unicode").rstrip() + "\n")
 
 
 def _store_settings(experiment: Experiment, settings: Element):
@@ -214,24 +280,20 @@ def _store_settings(experiment: Experiment, settings: Element):
     SubElement(analyzer_collection, "TrackAnalyzers")
 
 
-def _store_positions(experiment: Experiment, model: Element) -> Dict[Position, int]:
+def _write_positions(experiment: Experiment, handle: TextIO) -> Dict[Position, int]:
     next_id = 0
     position_to_id = dict()
-    all_spots = SubElement(model, "AllSpots", {"nspots": str(len(experiment.positions))})
+    handle.write(f'    <AllSpots nspots="{len(experiment.positions)}">\n')
     for time_point in experiment.time_points():
-        spots_in_frame = SubElement(all_spots, "SpotsInFrame", {"frame": str(time_point.time_point_number())})
+        time_point_number = time_point.time_point_number()
+        handle.write(f'      <SpotsInFrame frame="{time_point_number}">\n')
         for position in experiment.positions.of_time_point(time_point):
             position_to_id[position] = next_id
-
-            SubElement(spots_in_frame, "Spot", {"FRAME": str(position.time_point_number()),
-                                                "ID": str(next_id),
-                                                "POSITION_T": str(float(position.time_point_number())),
-                                                "POSITION_X": str(position.x),
-                                                "POSITION_Y": str(position.y),
-                                                "POSITION_Z": str(position.z),
-                                                "QUALITY": "-1",
-                                                "RADIUS": "3",
-                                                "VISIBILITY": "1",
-                                                "NAME": str(next_id)})
+            handle.write(f'        <Spot FRAME="{time_point_number}" ID="{next_id}"'
+                         f' POSITION_T="{float(time_point_number)}" POSITION_X="{position.x}"'
+                         f' POSITION_Y="{position.y}" POSITION_Z="{position.z}" QUALITY="-1" RADIUS="3"'
+                         f' VISIBILITY="1" NAME="{next_id}" />\n')
             next_id += 1
+        handle.write('      </SpotsInFrame>\n')
+    handle.write('    </AllSpots>\n')
     return position_to_id
@@ -1,16 +1,17 @@
 """Contains function that allows you to find the nearest few positions"""
 
 import operator
-from typing import Iterable, List, Optional, Set, Dict
+from typing import Iterable, List, Optional, Set, Dict, TYPE_CHECKING
 
 import numpy
-from networkx import Graph
 from numpy import ndarray
-from scipy.spatial import distance_matrix
 
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution
 
+if TYPE_CHECKING:
+    from networkx import Graph
+
 
 class _NearestPositions:
     """Internal class for bookkeeping of what the nearest few positions are"""
@@ -133,7 +134,7 @@ def _to_numpy_array_xyz(resolution: ImageResolution, positions: List[Position])
         array[i, 2] = position.z * resolution_z
     return array
 
-def make_nearby_positions_graph(resolution: ImageResolution, positions: List[Position], *, neighbors: int) -> Graph:
+def make_nearby_positions_graph(resolution: ImageResolution, positions: List[Position], *, neighbors: int) -> "Graph":
     """Creates a networkx.Graph of Position objects, where each object is connected to its N nearest neighbors. The
     edges all have the "distance_um" attribute, which is hte distance between those positions in micrometers.
 
@@ -141,6 +142,9 @@ def make_nearby_positions_graph(resolution: ImageResolution, positions: List[Pos
     >>> for position_a, position_b, distance_um in graph.edges.data("distance_um"):
     >>>     ... # Do something with the positions and the distance between them
     """
+    from networkx import Graph
+    from scipy.spatial import distance_matrix
+
     # adjust nummber of neighbors if set of positions is to small
     if len(positions) < neighbors + 1:
         neighbors = len(positions) - 1
@@ -1,9 +1,10 @@
 # File originally written by Jeroen van Zon
-from typing import Callable, Optional, List, Union, NamedTuple, Tuple, Set
+from typing import Callable, Optional, List, Union, NamedTuple, Tuple, Set, Dict, Any
 
 from matplotlib.axes import Axes
 from matplotlib.collections import LineCollection
 
+from organoid_tracker.core.change_events import ChangeEvent, ChangeType
 from organoid_tracker.core.links import LinkingTrack, Links
 from organoid_tracker.core.resolution import ImageResolution, ImageTimings
 from organoid_tracker.core.typing import MPLColor
@@ -117,14 +118,95 @@ def _get_timings(resolution: Optional[ImageResolution], timings: Optional[ImageT
     return ImageTimings.contant_timing(60), False
 
 
+def _get_lineage_structure(lineage: LinkingTrack) -> Tuple[Any, ...]:
+    """Summarizes the structure of a lineage: the tracks in it, at which time points they start and end, and how they
+    are connected. The layout of a lineage tree only depends on this structure."""
+    return tuple((id(track), track.first_time_point_number(), track.last_time_point_number(),
+                  tuple(id(next_track) for next_track in track.get_next_tracks()),
+                  tuple((id(previous_track), previous_track.last_time_point_number())
+                        for previous_track in track.get_previous_tracks()))
+                 for track in lineage.find_all_descending_tracks(include_self=True))
+
+
+class _LineageLayout(NamedTuple):
+    structure: Tuple[Any, ...]
+    width: float
+    lines: List[_Line]
+    links_change_count: int  # Value of LineageLayoutCache._links_change_count when the structure was last checked
+
+
+class LineageLayoutCache:
+    """Remembers the layout (the position of all lines) of lineage trees, so that it doesn't need to be calculated again
+    if a lineage tree is redrawn, for example using other colors. A layout is only reused if the structure of the lineage
+    (see _get_lineage_structure) is still the same, so after editing some links, only the layouts of the affected
+    lineages are recalculated.
+
+    If you pass the links to `watch(...)`, then even checking the structure is skipped as long as no links are added or
+    removed."""
+
+    _layouts: Dict[int, _LineageLayout]  # Indexed by id(starting track)
+    _used_keys: Set[int]
+    _watched_links: Optional[Links] = None
+    _links_change_count: int = 0
+
+    def __init__(self):
+        self._layouts = dict()
+        self._used_keys = set()
+
+    def watch(self, links: Optional[Links]):
+        """Starts listening for changes to the given links. Stops listening to the previously watched links, if any.
+        Call this method with None to stop listening."""
+        if links is self._watched_links:
+            return
+        if self._watched_links is not None:
+            self._watched_links.remove_change_listener(self._on_links_change)
+        self._watched_links = links
+        self._links_change_count += 1
+        if links is not None:
+            links.add_change_listener(self._on_links_change)
+
+    def _on_links_change(self, event: ChangeEvent):
+        if event.change_type in (ChangeType.LINK_ADDED, ChangeType.LINK_REMOVED, ChangeType.ALL_CHANGED):
+            self._links_change_count += 1
+
+    def get_or_calculate(self, lineage: LinkingTrack, calculate: Callable[[LinkingTrack], Tuple[float, List[_Line]]]
+                         ) -> Tuple[float, List[_Line]]:
+        """Gets the width and lines of the given lineage. If there is no (valid) stored layout, then calculate(lineage)
+        is used to calculate it."""
+        key = id(lineage)  # The stored lines refer to the lineage, so this id cannot be reused by another object
+        layout = self._layouts.get(key)
+        if layout is None or self._watched_links is None or layout.links_change_count != self._links_change_count:
+            structure = _get_lineage_structure(lineage)
+            if layout is None or layout.structure != structure:
+                width, lines = calculate(lineage)
+                layout = _LineageLayout(structure=structure, width=width, lines=lines,
+                                        links_change_count=self._links_change_count)
+            else:
+                layout = layout._replace(links_change_count=self._links_change_count)
+            self._layouts[key] = layout
+        self._used_keys.add(key)
+        return layout.width, layout.lines
+
+    def discard_unused(self):
+        """Forgets all layouts that were not requested since the last call to this method."""
+        for key in list(self._layouts.keys()):
+            if key not in self._used_keys:
+                del self._layouts[key]
+        self._used_keys.clear()
+
+
 class LineageDrawing:
     starting_tracks: List[LinkingTrack]
+    _layout_cache: LineageLayoutCache
 
-    def __init__(self, links: Union[Links, List[LinkingTrack]]):
+    def __init__(self, links: Union[Links, List[LinkingTrack]], *, layout_cache: Optional[LineageLayoutCache] = None):
+        """Creates a drawing of the given lineages. If you're going to redraw the lineages multiple times, you can pass
+        the same layout cache every time, so that the layout of unchanged lineages is not calculated again."""
         if isinstance(links, Links):
             self.starting_tracks = list(links.find_starting_tracks())
         else:
             self.starting_tracks = links
+        self._layout_cache = layout_cache if layout_cache is not None else LineageLayoutCache()
 
     def _get_sublineage_draw_data(self, linking_track: LinkingTrack, x_curr_branch: float, x_end_branch: float,
                                   line_list: List[_Line]) -> Tuple[float, float, List[_Line]]:
@@ -168,10 +250,13 @@ class LineageDrawing:
 
         return x_curr_branch, x_end_branch, line_list
 
-    def _get_lineage_draw_data(self, lineage: LinkingTrack) -> Tuple[float, List[_Line]]:
+    def _calculate_lineage_draw_data(self, lineage: LinkingTrack) -> Tuple[float, List[_Line]]:
         (x_curr, x_end, line_list) = self._get_sublineage_draw_data(lineage, 0, 0, [])
         return x_end, line_list
 
+    def _get_lineage_draw_data(self, lineage: LinkingTrack) -> Tuple[float, List[_Line]]:
+        return self._layout_cache.get_or_calculate(lineage, self._calculate_lineage_draw_data)
+
     def draw_lineages_colored(self, axes: Axes, *, color_getter: _ColorGetter = _black,
                               resolution: Optional[ImageResolution] = None,
                               timings: Optional[ImageTimings] = None,
@@ -179,36 +264,43 @@ class LineageDrawing:
                               label_getter: Callable[[LinkingTrack], Optional[str]] = _no_labels,
                               lineage_filter: Callable[[LinkingTrack], bool] = _no_filter,
                               line_width: float = 1.5, x_offset_start: float = 0,
-                              set_ylabel: bool = True):
+                              set_ylabel: bool = True, visible_x_range: Optional[Tuple[float, float]] = None):
         """Draws lineage trees that are color coded. You can for example color cells by z position, by track
         length, etc. Returns the width of the lineage tree in Matplotlib pixels.
 
         You can use the resolution parameter, the timings parameter, or neither of them, but not both. If you use
         neither, we will plot time points.
+
+        If visible_x_range is given, only the lineages that are (partly) within that x range are drawn. The returned
+        width still includes all lineages. All lines are drawn using a single LineCollection.
         """
         timings, use_hours = _get_timings(resolution, timings)
         if set_ylabel:
             axes.set_ylabel("Time (h)" if use_hours else "Time point")
 
+        lines_XY = []
+        lines_col = []
         x_offset = x_offset_start
         for lineage in self.starting_tracks:
             if not lineage_filter(lineage):
                 continue
-            width = self._draw_single_lineage_colored(axes, lineage, x_offset, color_getter, label_getter, timings,
-                                                      location_map, line_width)
+            width, line_list = self._get_lineage_draw_data(lineage)
+            if visible_x_range is None or (x_offset + width >= visible_x_range[0] and x_offset <= visible_x_range[1]):
+                self._add_single_lineage_colored(axes, line_list, x_offset, color_getter, label_getter, timings,
+                                                 location_map, lines_XY, lines_col)
             x_offset += width
-        return x_offset - x_offset_start
+        self._layout_cache.discard_unused()
 
-    def _draw_single_lineage_colored(self, ax: Axes, lineage: LinkingTrack, x_offset: float, color_getter: _ColorGetter,
-                                     label_getter: _LabelGetter, image_timings: ImageTimings,
-                                     location_map: LocationMap, line_width: float) -> float:
-        """Draw lineage with given function used for color. You can for example color cells by z position, by track
-        length, etc. Returns the width of the lineage tree in Matplotlib pixels."""
-        (diagram_width, line_list) = self._get_lineage_draw_data(lineage)
-
-        lines_XY = []
-        lines_col = []
+        line_segments = LineCollection(lines_XY, colors=lines_col, lw=line_width, capstyle="projecting")
+        axes.add_collection(line_segments)
+        return x_offset - x_offset_start
 
+    def _add_single_lineage_colored(self, ax: Axes, line_list: List[_Line], x_offset: float,
+                                    color_getter: _ColorGetter, label_getter: _LabelGetter,
+                                    image_timings: ImageTimings, location_map: LocationMap,
+                                    lines_XY: List[List[Tuple[float, float]]], lines_col: List[MPLColor]):
+        """Adds the lines of a lineage to lines_XY, with the given function used for color. You can for example color
+        cells by z position, by track length, etc. Labels are drawn directly."""
         for line in line_list:
             # for current line, get timepoints T
             time_points_of_line = line[1]
@@ -259,10 +351,5 @@ class LineageDrawing:
                 location_map.set_area(int(x_offset + line.x_start), int(time), int(x_offset + line.x_end), int(time),
                                       linking_track.find_position_at_time_point_number(time_point_of_line))
 
-        line_segments = LineCollection(lines_XY, colors=lines_col, lw=line_width, capstyle="projecting")
-        ax.add_collection(line_segments)
-
-        return diagram_width
-
     def __repr__(self) -> str:
         return f"<Lineage tree of {len(self.starting_tracks)} cells>"
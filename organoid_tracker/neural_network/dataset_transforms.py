@@ -1,9 +1,40 @@
+import contextlib
 import threading
 from queue import Queue
 from random import Random
-from typing import Any, Iterable, Iterator
+from typing import Any, Iterable, Iterator, List, TypeVar, ContextManager
 
-from torch.utils.data import IterableDataset
+import keras
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+
+T = TypeVar("T")
+
+
+def get_worker_shard(items: List[T]) -> List[T]:
+    """If called from a DataLoader worker process, this returns the part of the list that this worker should process.
+    Every worker gets a disjoint part of the list, and together the workers process the full list. If not called from a
+    worker process, the full list is returned."""
+    worker_info = get_worker_info()
+    if worker_info is None:
+        return items
+    return items[worker_info.id::worker_info.num_workers]
+
+
+def worker_device_scope() -> ContextManager:
+    """In DataLoader worker processes, Keras operations must run on the CPU: the GPU is reserved for the main process,
+    which moves the finished batches to the GPU. Use this as `with worker_device_scope(): ...` around the sample
+    generation code. Outside worker processes, this does nothing."""
+    if get_worker_info() is None:
+        return contextlib.nullcontext()
+    return keras.device("cpu")
+
+
+def seed_worker(worker_id: int):
+    """Use this as the worker_init_fn of a DataLoader. PyTorch already gives every worker process a different seed, but
+    the random generators of Keras (used for the augmentations) and Python are copied from the main process. This
+    function reseeds them, so that each worker generates different augmentations."""
+    keras.utils.set_random_seed(torch.initial_seed() % 2 ** 32)
 
 
 class RepeatingDataset(IterableDataset):
@@ -16,7 +47,12 @@ class RepeatingDataset(IterableDataset):
 
     def __iter__(self) -> Iterable[Any]:
         while True:
-            yield from iter(self._internal_dataset)
+            yielded_anything = False
+            for sample in self._internal_dataset:
+                yielded_anything = True
+                yield sample
+            if not yielded_anything:
+                return  # Empty dataset (can happen for DataLoader workers that got no data), avoid an endless loop
 
     def __len__(self) -> int:
         """We still return the length of the internal dataset, so that the user knows how long an epoch should be."""
@@ -29,32 +65,34 @@ class PrefetchingDataset(IterableDataset):
     """Wraps an IterableDataset and prefetches samples into a buffer. The prefetching is done in a separate thread.
 
     The advantage of using multithreading instead of multiprocessing is that we can use the same memory space for the
-    buffer, so we don't need to copy things and use more (V)RAM. The downside is that we can't use multiple CPU cores,
-    but that's not really a problem here since the bottleneck in our case is the disk I/O.
+    buffer, so we don't need to copy things and use more (V)RAM. The downside is that we can't use multiple CPU cores.
+    If you need that (for example for CPU-heavy augmentations), use a DataLoader with multiple workers. Every worker
+    then gets its own prefetching thread.
     """
 
     _LAST_ELEMENT = "~~~LAST_ELEMENT~~~"
 
     _internal_dataset: IterableDataset
-    _prefetch_buffer: Queue
+    _buffer_size: int
 
     def __init__(self, dataset: IterableDataset, buffer_size: int = 5):
         self._internal_dataset = dataset
-        self._prefetch_buffer = Queue(maxsize=buffer_size)
+        self._buffer_size = buffer_size
 
-    def _run(self):
+    def _run(self, prefetch_buffer: Queue):
         """Starts prefetching samples from the internal dataset. This method should be called from a separate thread."""
         for sample in self._internal_dataset:
-            qsize = self._prefetch_buffer.qsize()
-            self._prefetch_buffer.put(sample, block=True)
-        self._prefetch_buffer.put(self._LAST_ELEMENT)
+            prefetch_buffer.put(sample, block=True)
+        prefetch_buffer.put(self._LAST_ELEMENT)
 
     def __iter__(self) -> Iterable[Any]:
-        threading.Thread(target=self._run, daemon=True).start()
+        # Created here instead of in __init__, as every worker process needs its own buffer
+        prefetch_buffer = Queue(maxsize=self._buffer_size)
+        threading.Thread(target=self._run, args=(prefetch_buffer,), daemon=True).start()
 
         while True:
-            element = self._prefetch_buffer.get(block=True)
-            if element == self._LAST_ELEMENT:
+            element = prefetch_buffer.get(block=True)
+            if isinstance(element, str) and element == self._LAST_ELEMENT:
                 break
 
             yield element
@@ -82,7 +120,8 @@ class _LimitingIterator(Iterator):
 
 
 class LimitingDataset(IterableDataset):
-    """Wraps an IterableDataset and limits the number of samples that are yielded."""
+    """Wraps an IterableDataset and limits the number of samples that are yielded. If used with multiple DataLoader
+    workers, the workers together yield at most the given number of samples."""
 
     _internal_dataset: IterableDataset
     _max_samples: int
@@ -92,7 +131,14 @@ class LimitingDataset(IterableDataset):
         self._max_samples = max_samples
 
     def __iter__(self) -> Iterator[Any]:
-        return _LimitingIterator(iter(self._internal_dataset), self._max_samples)
+        max_samples = self._max_samples
+        worker_info = get_worker_info()
+        if worker_info is not None:
+            # Divide the samples over the workers
+            max_samples = max_samples // worker_info.num_workers
+            if worker_info.id < self._max_samples % worker_info.num_workers:
+                max_samples += 1
+        return _LimitingIterator(iter(self._internal_dataset), max_samples)
 
 
     def __len__(self) -> int:
@@ -109,19 +155,29 @@ class ShufflingDataset(IterableDataset):
     This class is a compromise between the two. It reads X number of samples in order, places them into a buffer, and
     then shuffles the buffer before yielding the samples. This way we can still read the data in sequence, but the
     neural network will see the data in a pseudo-random order.
+
+    If used with multiple DataLoader workers, every worker shuffles its own samples, using its own seed.
     """
 
     _internal_dataset: IterableDataset
     _buffer_size: int
+    _seed: int
     _random: Random
+    _random_worker_id: int = 0  # Id of the DataLoader worker that _random was seeded for
 
     def __init__(self, dataset: IterableDataset, buffer_size: int = 2000, seed: int = 1):
         """Wraps an IterableDataset and shuffles the samples in a buffer before yielding them."""
         self._internal_dataset = dataset
         self._buffer_size = buffer_size
+        self._seed = seed
         self._random = Random(seed)
 
     def __iter__(self) -> Iterable[Any]:
+        worker_info = get_worker_info()
+        if worker_info is not None and worker_info.id != self._random_worker_id:
+            # Every worker process has a copy of the same Random instance, so give the other workers another seed
+            self._random = Random(f"{self._seed}-{worker_info.id}")
+            self._random_worker_id = worker_info.id
         buffer = list()
         for incoming_sample in self._internal_dataset:
             if len(buffer) < self._buffer_size:
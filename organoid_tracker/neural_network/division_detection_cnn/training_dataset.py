@@ -28,7 +28,8 @@ import numpy as np
 from torch.utils.data import IterableDataset, DataLoader
 
 from organoid_tracker.neural_network import image_transforms, Tensor
-from organoid_tracker.neural_network.dataset_transforms import ShufflingDataset, RepeatingDataset, PrefetchingDataset
+from organoid_tracker.neural_network.dataset_transforms import ShufflingDataset, RepeatingDataset, PrefetchingDataset, \
+    get_worker_shard, worker_device_scope, seed_worker
 from organoid_tracker.neural_network.division_detection_cnn.training_data_creator import _ImageWithDivisions
 
 
@@ -52,17 +53,24 @@ class _TorchDataset(IterableDataset):
         self._calculated_length = sum(len(image.dividing) for image in image_with_division_list)
 
     def __iter__(self) -> Iterable[Tuple[Tensor, bool]]:
-        for image_with_divisions in self._image_with_divisions_list:
-            image = image_with_divisions.load_image_time_stack(self._time_window)
-            label = image_with_divisions.xyz_positions[:, [2, 1, 0]]
-            dividing = image_with_divisions.dividing
-
-            image = normalize(image)
-
-            for crop, division in generate_patches_division(image, label, dividing, self._patch_shape_zyx, self._perturb):
-                if self._perturb:
-                    crop = apply_noise(crop)
-                yield crop, division
+        with worker_device_scope():
+            for image_with_divisions in get_worker_shard(self._image_with_divisions_list):
+                if image_with_divisions.has_image_cache():
+                    # Crop the patches directly from the memory-mapped images, no need to load the full images
+                    patches = generate_patches_division_from_cache(image_with_divisions, self._time_window,
+                                                                   self._patch_shape_zyx, self._perturb)
+                else:
+                    image = image_with_divisions.load_image_time_stack(self._time_window)
+                    label = image_with_divisions.xyz_positions[:, [2, 1, 0]]
+                    dividing = image_with_divisions.dividing
+
+                    image = normalize(image)
+                    patches = generate_patches_division(image, label, dividing, self._patch_shape_zyx, self._perturb)
+
+                for crop, division in patches:
+                    if self._perturb:
+                        crop = apply_noise(crop)
+                    yield crop, division
 
     def __len__(self) -> int:
         return self._calculated_length
@@ -70,7 +78,8 @@ class _TorchDataset(IterableDataset):
 
 # Creates training and validation data from an image_with_positions_list
 def training_data_creator_from_raw(image_with_divisions_list: List[_ImageWithDivisions], time_window, patch_shape,
-                                   batch_size: int, mode, split_proportion: float = 0.8, perturb=True):
+                                   batch_size: int, mode, split_proportion: float = 0.8, perturb=True,
+                                   num_workers: int = 0):
     if mode == "train":
         image_with_divisions_list = image_with_divisions_list[:round(split_proportion * len(image_with_divisions_list))]
     elif mode == "validation":
@@ -81,7 +90,8 @@ def training_data_creator_from_raw(image_with_divisions_list: List[_ImageWithDiv
     if mode == "train":
         dataset = ShufflingDataset(dataset, buffer_size=batch_size * 100)
     dataset = RepeatingDataset(dataset)
-    return DataLoader(dataset, batch_size=batch_size)
+    return DataLoader(dataset, batch_size=batch_size, num_workers=num_workers, worker_init_fn=seed_worker,
+                      persistent_workers=num_workers > 0)
 
 
 # Normalizes image data
@@ -108,22 +118,7 @@ def generate_patches_division(image, label, dividing, patch_shape, perturb):
                           center_point[1]: center_point[1] + 2*patch_shape[1],
                           center_point[2]: center_point[2] + 2*patch_shape[2], :]
 
-        # apply perturbations
-        if perturb:
-            #init_crop = apply_random_perturbations_stacked(init_crop)
-            random = keras.random.uniform((1,))
-            init_crop = keras.ops.cond(random<0.5,
-                                lambda: apply_random_flips(init_crop),
-                                lambda: apply_random_perturbations_stacked(init_crop))
-
-            #init_crop = black_out(init_crop)
-
-        # second, crop to the center region
-        crop = init_crop[:,
-               keras.ops.cast(patch_shape[1] / 2, "int32"): keras.ops.cast(patch_shape[1] / 2, "int32") + patch_shape[1],
-               keras.ops.cast(patch_shape[2] / 2, "int32"): keras.ops.cast(patch_shape[2] / 2, "int32") + patch_shape[2], :]
-
-        return crop
+        return _perturb_and_crop_center(init_crop, patch_shape, perturb)
 
     # create stack of crops centered around positions
     for single_label, single_division in zip(label, dividing):
@@ -131,6 +126,36 @@ def generate_patches_division(image, label, dividing, patch_shape, perturb):
         yield crop, single_division
 
 
+# generates multiple perturbed patches, cropped directly from the image cache
+def generate_patches_division_from_cache(image_with_divisions: _ImageWithDivisions, time_window, patch_shape, perturb):
+    # same region as the first crop in generate_patches_division, but without padding the full image first
+    init_crop_shape = (patch_shape[0], 2 * patch_shape[1], 2 * patch_shape[2])
+    for (x, y, z), single_division in zip(image_with_divisions.xyz_positions, image_with_divisions.dividing):
+        init_crop = image_with_divisions.crop_image_time_stack(
+            (z - patch_shape[0] // 2, y - patch_shape[1], x - patch_shape[2]), init_crop_shape, time_window)
+        crop = _perturb_and_crop_center(keras.ops.convert_to_tensor(init_crop), patch_shape, perturb)
+        yield crop, single_division
+
+
+def _perturb_and_crop_center(init_crop, patch_shape, perturb):
+    # apply perturbations
+    if perturb:
+        #init_crop = apply_random_perturbations_stacked(init_crop)
+        random = keras.random.uniform((1,))
+        init_crop = keras.ops.cond(random<0.5,
+                            lambda: apply_random_flips(init_crop),
+                            lambda: apply_random_perturbations_stacked(init_crop))
+
+        #init_crop = black_out(init_crop)
+
+    # second, crop to the center region
+    crop = init_crop[:,
+           keras.ops.cast(patch_shape[1] / 2, "int32"): keras.ops.cast(patch_shape[1] / 2, "int32") + patch_shape[1],
+           keras.ops.cast(patch_shape[2] / 2, "int32"): keras.ops.cast(patch_shape[2] / 2, "int32") + patch_shape[2], :]
+
+    return crop
+
+
 def apply_random_perturbations_stacked(stacked):
     image_shape = keras.ops.cast(keras.ops.shape(stacked), "float32")
 
@@ -30,7 +30,8 @@ import numpy as np
 from torch.utils.data import IterableDataset, DataLoader
 
 from organoid_tracker.neural_network import Tensor, image_transforms
-from organoid_tracker.neural_network.dataset_transforms import ShufflingDataset, RepeatingDataset, PrefetchingDataset
+from organoid_tracker.neural_network.dataset_transforms import ShufflingDataset, RepeatingDataset, PrefetchingDataset, \
+    get_worker_shard, worker_device_scope, seed_worker
 from organoid_tracker.neural_network.link_detection_cnn.ImageWithLinks_to_tensor_loader import \
     load_images_with_links
 from organoid_tracker.neural_network.link_detection_cnn.training_data_creator import _ImageWithLinks
@@ -57,19 +58,27 @@ class _TorchDataset(IterableDataset):
 
     def __iter__(self) -> Iterable[Tuple[List[Tensor], bool]]:
         # Output shape is iterable of (crops, target_crops, distances) -> linked
-        for image_with_links in self._image_with_divisions_list:
-            image, target_image, label, target_label, distances, linked =\
-                load_images_with_links(image_with_links, self._time_window)
-
-            image = normalize(image)
-            target_image = normalize(target_image)
-
-            for crops, target_crops, distances, linked in generate_patches_links(image, target_image,
-                     label, target_label, distances, linked, self._patch_shape_zyx, self._perturb):
-                if self._perturb:
-                    crops, target_crops = apply_noise(crops, target_crops)
-                crops, target_crops = add_3d_coord(crops, target_crops, distances)
-                yield [crops, target_crops, distances], linked
+        with worker_device_scope():
+            for image_with_links in get_worker_shard(self._image_with_divisions_list):
+                if image_with_links.has_image_cache():
+                    # Crop the patches directly from the memory-mapped images, no need to load the full images
+                    patches = generate_patches_links_from_cache(image_with_links, self._time_window,
+                                                                self._patch_shape_zyx, self._perturb)
+                else:
+                    image, target_image, label, target_label, distances, linked =\
+                        load_images_with_links(image_with_links, self._time_window)
+
+                    image = normalize(image)
+                    target_image = normalize(target_image)
+
+                    patches = generate_patches_links(image, target_image, label, target_label, distances, linked,
+                                                     self._patch_shape_zyx, self._perturb)
+
+                for crops, target_crops, distances, linked in patches:
+                    if self._perturb:
+                        crops, target_crops = apply_noise(crops, target_crops)
+                    crops, target_crops = add_3d_coord(crops, target_crops, distances)
+                    yield [crops, target_crops, distances], linked
 
     def __len__(self) -> int:
         return self._calculated_length
@@ -78,7 +87,8 @@ class _TorchDataset(IterableDataset):
 # Creates training and validation data from an image_with_positions_list
 def training_data_creator_from_raw(images_with_links_list: List[_ImageWithLinks], time_window: Tuple[int, int],
                                    patch_shape: Tuple[int, int, int], batch_size: int, mode: str,
-                                   split_proportion: float = 0.8, buffer: int = 2000, perturb=True):
+                                   split_proportion: float = 0.8, buffer: int = 2000, perturb=True,
+                                   num_workers: int = 0):
 
     # split dataset in validation and training part
     if mode == "train":
@@ -91,7 +101,8 @@ def training_data_creator_from_raw(images_with_links_list: List[_ImageWithLinks]
     if mode == "train":
         dataset = ShufflingDataset(dataset, buffer_size=buffer)
     dataset = RepeatingDataset(dataset)
-    return DataLoader(dataset, batch_size=batch_size)
+    return DataLoader(dataset, batch_size=batch_size, num_workers=num_workers, worker_init_fn=seed_worker,
+                      persistent_workers=num_workers > 0)
 
 
 # Normalizes image data
@@ -125,20 +136,7 @@ def generate_patches_links(image, target_image, label, target_label, distances,
 
         combined_init_crops = keras.ops.concatenate([init_crop, init_target_crop], axis=-1)
 
-        if perturb:
-            random = keras.random.uniform((1,))
-            combined_init_crops, distance = keras.ops.cond(random<0.99,
-                                                    lambda: apply_random_flips(combined_init_crops, distance),
-                                                    lambda: apply_random_perturbations_stacked(combined_init_crops, distance))
-        else:
-            distance = keras.ops.cast(distance, "float32")
-
-        # second crop of the center region
-        combined_crops = combined_init_crops[:,
-               keras.ops.cast(patch_shape[1] / 2, "int32"): keras.ops.cast(patch_shape[1] / 2, "int32") + patch_shape[1],
-               keras.ops.cast(patch_shape[2] / 2, "int32"): keras.ops.cast(patch_shape[2] / 2, "int32") + patch_shape[2], :]
-
-        return combined_crops, distance
+        return _perturb_and_crop_center(combined_init_crops, distance, patch_shape, perturb)
 
     distances = keras.ops.cast(distances, "int32")
     both_labels = keras.ops.stack([label, target_label, distances], axis=-1)
@@ -149,6 +147,47 @@ def generate_patches_links(image, target_image, label, target_label, distances,
         yield stacked_crop, stacked_target_crop, distance, linked[i]
 
 
+def generate_patches_links_from_cache(image_with_links: _ImageWithLinks, time_window, patch_shape, perturb):
+    # same regions as the first crops in generate_patches_links, but without padding the full images first
+    init_crop_shape = (patch_shape[0], 2 * patch_shape[1], 2 * patch_shape[2])
+    target_time_window = (-time_window[1], -time_window[0])
+    time_window_length = time_window[1] - time_window[0] + 1
+
+    for i in range(len(image_with_links.distances)):
+        x, y, z = image_with_links.xyz_positions[i]
+        target_x, target_y, target_z = image_with_links.target_xyz_positions[i]
+        distance = keras.ops.cast(image_with_links.distances[i, [2, 1, 0]], "int32")
+
+        init_crop = image_with_links.crop_image_time_stack(
+            (z - patch_shape[0] // 2, y - patch_shape[1], x - patch_shape[2]), init_crop_shape, time_window)
+        init_target_crop = image_with_links.crop_image_time_stack(
+            (target_z - patch_shape[0] // 2, target_y - patch_shape[1], target_x - patch_shape[2]), init_crop_shape,
+            target_time_window, delay=1)
+        combined_init_crops = keras.ops.convert_to_tensor(np.concatenate([init_crop, init_target_crop], axis=-1))
+
+        combined_crops, distance = _perturb_and_crop_center(combined_init_crops, distance, patch_shape, perturb)
+        stacked_crop = combined_crops[:, :, :, :time_window_length]
+        stacked_target_crop = combined_crops[:, :, :, time_window_length:]
+        yield stacked_crop, stacked_target_crop, distance, image_with_links.linked[i]
+
+
+def _perturb_and_crop_center(combined_init_crops, distance, patch_shape, perturb):
+    if perturb:
+        random = keras.random.uniform((1,))
+        combined_init_crops, distance = keras.ops.cond(random<0.99,
+                                                lambda: apply_random_flips(combined_init_crops, distance),
+                                                lambda: apply_random_perturbations_stacked(combined_init_crops, distance))
+    else:
+        distance = keras.ops.cast(distance, "float32")
+
+    # second crop of the center region
+    combined_crops = combined_init_crops[:,
+           keras.ops.cast(patch_shape[1] / 2, "int32"): keras.ops.cast(patch_shape[1] / 2, "int32") + patch_shape[1],
+           keras.ops.cast(patch_shape[2] / 2, "int32"): keras.ops.cast(patch_shape[2] / 2, "int32") + patch_shape[2], :]
+
+    return combined_crops, distance
+
+
 def apply_random_perturbations_stacked(stacked, distance):
     image_shape = keras.ops.cast(keras.ops.shape(stacked), "float32")
 
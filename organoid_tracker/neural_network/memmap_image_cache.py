@@ -0,0 +1,161 @@
+"""Cache for training images. Decoding TIFF, LIF, etc. files is slow, and during training the same images are read over
+and over again. Therefore, we can write all images to a local folder as uncompressed NumPy files once, and then read
+them back as memory-mapped arrays. Cropping a patch out of such an array only reads the bytes of that patch from disk
+(or more likely, from the OS file cache).
+
+The memory maps are opened lazily, so that an instance of this class can be sent to DataLoader worker processes. Every
+process then opens its own memory maps.
+
+Images are stored under a key that includes the image source and filters (see get_image_source_key), so a cache folder
+can safely be reused between runs: if the images change, they are simply written again.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Tuple, Iterable, Any
+
+import numpy
+from numpy import ndarray
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.images import Images
+from organoid_tracker.imaging import io
+
+_INDEX_FILE_NAME = "index.json"
+
+
+def _safe_file_name(image_key: str) -> str:
+    """Image keys contain the experiment name, which can contain all kinds of characters. We only keep the safe ones."""
+    return "".join(char if char.isalnum() or char in "-_" else "_" for char in image_key)
+
+
+def _find_containers(serialized: Any) -> Iterable[str]:
+    """Finds all image containers (files or folders) in the output of ImageLoader.serialize_to_dictionary()."""
+    if isinstance(serialized, dict):
+        for key, value in serialized.items():
+            if key == "images_container" and isinstance(value, str) and len(value) > 0:
+                yield value
+            else:
+                yield from _find_containers(value)
+    elif isinstance(serialized, list):
+        for value in serialized:
+            yield from _find_containers(value)
+
+
+def _get_modification_key(container: str) -> str:
+    """Gets a string that changes if the container file changes. For folders, the newest file in the folder is used, as
+    the modification time of the folder itself doesn't change if a file in it is overwritten."""
+    try:
+        stat = os.stat(container)
+        if not os.path.isdir(container):
+            return f"{stat.st_mtime_ns} {stat.st_size}"
+        modification_times = [entry.stat().st_mtime_ns for entry in os.scandir(container) if entry.is_file()]
+        return f"{max(modification_times, default=stat.st_mtime_ns)} {len(modification_times)}"
+    except OSError:
+        return ""  # Not a file, so we can only use the name
+
+
+def get_image_source_key(experiment_name: str, images: Images) -> str:
+    """Gets the key under which the images of an experiment are stored in the cache. It consists of the experiment name
+    and a hash of the image loader (see ImageLoader.serialize_to_dictionary), the modification times of the image files
+    and the image filters. That way, another experiment with the same name, changed image files or other channel
+    settings or filters all result in a different key."""
+    serialized_loader = images.image_loader().serialize_to_dictionary()
+    modification_keys = {os.path.abspath(container): _get_modification_key(os.path.abspath(container))
+                         for container in _find_containers(serialized_loader)}
+    source = json.dumps([serialized_loader, modification_keys, io._encode_image_filters_to_json(images.filters)],
+                        sort_keys=True, default=str)
+    return experiment_name + "_" + hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+
+class MemmapImageCache:
+    """Stores 3D images (one per experiment per time point) as .npy files, and opens them as memory-mapped arrays. Also
+    stores the minimum and maximum value of every image, so that patches can be normalized without loading the full
+    image."""
+
+    _folder: str
+    _index: Dict[str, Dict[int, Tuple[str, float, float]]]  # Image key -> time point -> (file name, min, max)
+    _open_arrays: Dict[Tuple[str, int], ndarray]
+
+    def __init__(self, folder: str):
+        """Creates a cache in the given folder. If the folder already contains a cache, that cache is reused."""
+        self._folder = folder
+        self._index = dict()
+        self._open_arrays = dict()
+
+        index_file = os.path.join(folder, _INDEX_FILE_NAME)
+        if os.path.exists(index_file):
+            with open(index_file, "r") as handle:
+                raw_index = json.load(handle)
+            for image_key, time_points in raw_index.items():
+                self._index[image_key] = {int(time_point_number): (entry[0], entry[1], entry[2])
+                                                for time_point_number, entry in time_points.items()}
+
+    def __getstate__(self):
+        # Memory maps are not sent to other processes, they're reopened there
+        state = self.__dict__.copy()
+        state["_open_arrays"] = dict()
+        return state
+
+    def contains(self, image_key: str, time_point: TimePoint) -> bool:
+        """Checks if an image has been stored for the given image key (see get_image_source_key) and time point. Time
+        points for which no image exists are also stored (as None), so this method also returns True for them."""
+        time_points = self._index.get(image_key)
+        return time_points is not None and time_point.time_point_number() in time_points
+
+    def write_image(self, image_key: str, time_point: TimePoint, array: Optional[ndarray]):
+        """Writes an image to the cache. Use None to record that no image exists for that time point. Call
+        save_index() once you're done writing images."""
+        time_points = self._index.setdefault(image_key, dict())
+        if array is None:
+            time_points[time_point.time_point_number()] = ("", 0, 0)
+            return
+
+        os.makedirs(self._folder, exist_ok=True)
+        key_number = list(self._index.keys()).index(image_key)  # Avoids clashes after _safe_file_name
+        file_name = f"{_safe_file_name(image_key)}_{key_number}_t{time_point.time_point_number()}.npy"
+        memmap = numpy.lib.format.open_memmap(os.path.join(self._folder, file_name), mode="w+", dtype=array.dtype,
+                                              shape=array.shape)
+        memmap[...] = array
+        memmap.flush()
+        del memmap
+
+        time_points[time_point.time_point_number()] = (file_name, float(array.min()), float(array.max()))
+        self._open_arrays.pop((image_key, time_point.time_point_number()), None)
+
+    def save_index(self):
+        """Writes the index file, so that the cache can be reused by a new instance of this class."""
+        os.makedirs(self._folder, exist_ok=True)
+        with open(os.path.join(self._folder, _INDEX_FILE_NAME), "w") as handle:
+            json.dump(self._index, handle)
+
+    def get_image(self, image_key: str, time_point: TimePoint) -> Optional[ndarray]:
+        """Gets the image as a read-only memory-mapped array. Returns None if no image exists for that time point, or if
+        the image was never written to the cache."""
+        key = (image_key, time_point.time_point_number())
+        array = self._open_arrays.get(key)
+        if array is not None:
+            return array
+
+        entry = self._index.get(image_key, dict()).get(time_point.time_point_number())
+        if entry is None or entry[0] == "":
+            return None
+        array = numpy.load(os.path.join(self._folder, entry[0]), mmap_mode="r")
+        self._open_arrays[key] = array
+        return array
+
+    def get_min_max(self, image_key: str, time_points: Iterable[TimePoint]) -> Tuple[float, float]:
+        """Gets the minimum and maximum pixel value over all given time points. Time points without an image are
+        skipped. Returns (0, 0) if none of the time points have an image."""
+        time_point_entries = self._index.get(image_key, dict())
+        min_value = None
+        max_value = None
+        for time_point in time_points:
+            entry = time_point_entries.get(time_point.time_point_number())
+            if entry is None or entry[0] == "":
+                continue
+            min_value = entry[1] if min_value is None else min(min_value, entry[1])
+            max_value = entry[2] if max_value is None else max(max_value, entry[2])
+        if min_value is None:
+            return 0, 0
+        return min_value, max_value
@@ -32,6 +32,9 @@ from organoid_tracker.core import TimePoint
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.core.images import Images
 from organoid_tracker.core.position import Position
+from organoid_tracker.imaging import cropper
+from organoid_tracker.neural_network import memmap_image_cache
+from organoid_tracker.neural_network.memmap_image_cache import MemmapImageCache
 
 
 class ImageWithPositions:
@@ -39,6 +42,8 @@ class ImageWithPositions:
     _images: Images
     xyz_positions: ndarray
     experiment_name: str
+    _image_cache: Optional[MemmapImageCache] = None
+    _image_cache_key: Optional[str] = None
 
     def __init__(self, experiment_name: str, images: Images, time_point: TimePoint, xyz_positions: ndarray):
         # xyz positions: 2D numpy integer array of cell nucleus positions: [ [x,y,z], [x,y,z], ...]
@@ -50,8 +55,27 @@ class ImageWithPositions:
     def __str__(self) -> str:
         return f"{self.experiment_name} t{self.time_point.time_point_number()}"
 
+    def use_image_cache(self, image_cache: MemmapImageCache, image_cache_key: str):
+        """From now on, images are read from the given cache instead of from the original image files. Time points
+        that are missing in the cache are still read from the original image files. The key must come from
+        get_image_cache_key()."""
+        self._image_cache = image_cache
+        self._image_cache_key = image_cache_key
+
+    def get_image_cache_key(self) -> str:
+        """Gets the key under which the images are stored in a MemmapImageCache. The key depends on the image source
+        and filters, so changed images are never read from an old cache."""
+        return memmap_image_cache.get_image_source_key(self.experiment_name, self._images)
+
+    def has_image_cache(self) -> bool:
+        """Checks if images are read from a MemmapImageCache. If yes, you can efficiently crop patches using
+        crop_image_time_stack."""
+        return self._image_cache is not None
+
     def load_image(self, dt: int = 0) -> Optional[ndarray]:
         time_point = TimePoint(self.time_point.time_point_number() + dt)
+        if self._image_cache is not None and self._image_cache.contains(self._image_cache_key, time_point):
+            return self._image_cache.get_image(self._image_cache_key, time_point)  # Read-only memory map
         image_stack = self._images.get_image_stack(time_point)
         if image_stack is not None and image_stack.dtype == numpy.uint16:
             # The dtype uint16 is not supported by PyTorch, so we convert it to int16 or int32, depending on what
@@ -140,9 +164,58 @@ class ImageWithPositions:
         # Stack our list of padded images
         if len(images_padded) == 1:
             single_image = images_padded[0]
+            if not single_image.flags.writeable:
+                single_image = numpy.array(single_image)  # Don't return read-only memory maps of the image cache
             return single_image[:, :, :, numpy.newaxis]  # Optimization: stack without allocating memory
         return numpy.stack(images_padded, axis=-1)
 
+    def crop_image_time_stack(self, start_zyx: Tuple[int, int, int], size_zyx: Tuple[int, int, int],
+                              time_window: Union[List[int], Tuple[int, int]] = (0, 0), delay: int = 0) -> ndarray:
+        """Crops a patch out of the images in a time window. Returns a 4D float32 array, [z, y, x, t], normalized to
+        the range 0 to 1 using the minimum and maximum of the full time stack, just like load_image_time_stack followed
+        by normalization would do. Areas outside the image are 0.
+
+        This method is meant to be used together with use_image_cache(...), since then only the bytes of the patch are
+        read. Without an image cache, this method still works, but it loads the full images.
+        """
+        center_time_point = TimePoint(self.time_point.time_point_number() + delay)
+        image_shape_ref = self.get_image_size_zyx(delay)
+        offset_ref = self._images.offsets.of_time_point(center_time_point)
+
+        frames = range(time_window[0] + delay, time_window[1] + 1 + delay)
+        available_images = dict()
+        for dt in frames:
+            image = self.load_image(dt)
+            if image is not None and image.shape == tuple(image_shape_ref):
+                available_images[dt] = image
+        if len(available_images) == 0:
+            raise ValueError(f"No images available for {self} in time window {time_window}")
+
+        # Find the normalization range
+        if self._image_cache is not None:
+            min_value, max_value = self._image_cache.get_min_max(self._image_cache_key, (
+                TimePoint(self.time_point.time_point_number() + dt) for dt in available_images.keys()))
+        else:
+            min_value = min(float(image.min()) for image in available_images.values())
+            max_value = max(float(image.max()) for image in available_images.values())
+        value_range = max_value - min_value if max_value > min_value else 1
+
+        output = numpy.full((size_zyx[0], size_zyx[1], size_zyx[2], len(frames)), min_value, dtype=numpy.float32)
+        fallback_dt = next(iter(available_images.keys()))  # Missing images are replaced by the nearest earlier image
+        for i, dt in enumerate(frames):
+            if dt in available_images:
+                fallback_dt = dt
+            offset = self._images.offsets.of_time_point(TimePoint(self.time_point.time_point_number() + fallback_dt))
+
+            # Correct for the image offsets, like the aligner in load_image_time_stack
+            shift = offset - offset_ref
+            cropper.crop_3d(available_images[fallback_dt], int(start_zyx[2] - round(shift.x)),
+                            int(start_zyx[1] - round(shift.y)), int(start_zyx[0] - round(shift.z)), output[:, :, :, i])
+
+        output -= min_value
+        output /= value_range
+        return output
+
     def create_labels(self, image_size_zyx: Tuple[int, int, int], *, image_offset_zyx: Tuple[int, int, int] = (0, 0, 0)):
         """Creates an image with the number 1 at self.xyz_positions. Ignores positions outside the image. Allows you
         to specify an offset and size, which makes it possible to draw the labels for any crop."""
@@ -206,3 +279,32 @@ def create_image_list_without_positions(experiment: Experiment) -> List[ImageWit
     return image_list
 
 
+
+
+def create_image_cache(image_with_positions_list: List[ImageWithPositions], cache_folder: str,
+                       time_window: Tuple[int, int] = (0, 0)) -> MemmapImageCache:
+    """Writes all images needed for the given list to a MemmapImageCache, and makes all ImageWithPositions instances
+    read their images from that cache. time_window is the (inclusive) range of time points around every
+    ImageWithPositions.time_point that will be stored.
+
+    If the cache folder already contains images for an experiment and time point, those are not written again. Images
+    are stored under the image source, its modification time and the image filters, so if any of those have changed,
+    the images are written again. The old images are not deleted; delete the cache folder to free up that space.
+    """
+    image_cache = MemmapImageCache(cache_folder)
+    image_cache_keys = dict()  # By id(Images), as all ImageWithPositions of an experiment share the same Images
+    for image_with_positions in image_with_positions_list:
+        image_cache_key = image_cache_keys.get(id(image_with_positions._images))
+        if image_cache_key is None:
+            image_cache_key = image_with_positions.get_image_cache_key()
+            image_cache_keys[id(image_with_positions._images)] = image_cache_key
+        for dt in range(time_window[0], time_window[1] + 1):
+            time_point = TimePoint(image_with_positions.time_point.time_point_number() + dt)
+            if image_cache.contains(image_cache_key, time_point):
+                continue
+            image_cache.write_image(image_cache_key, time_point, image_with_positions.load_image(dt))
+    image_cache.save_index()
+
+    for image_with_positions in image_with_positions_list:
+        image_with_positions.use_image_cache(image_cache, image_cache_keys[id(image_with_positions._images)])
+    return image_cache
@@ -34,7 +34,8 @@ from organoid_tracker.neural_network import image_transforms, Tensor
 from organoid_tracker.neural_network.position_detection_cnn.image_with_positions_to_tensor_loader import \
     load_images_with_positions
 from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import ImageWithPositions
-from organoid_tracker.neural_network.dataset_transforms import ShufflingDataset, RepeatingDataset, PrefetchingDataset
+from organoid_tracker.neural_network.dataset_transforms import ShufflingDataset, RepeatingDataset, PrefetchingDataset, \
+    get_worker_shard, worker_device_scope, seed_worker
 
 
 class _TorchDataset(IterableDataset):
@@ -55,25 +56,26 @@ class _TorchDataset(IterableDataset):
         self._crop_to_positions = crop_to_positions
 
     def __iter__(self) -> Iterable[Tuple[Tensor, Tensor]]:
-        for image_with_positions in self._image_with_position_list:
-            image, label = load_images_with_positions(image_with_positions,
-                                                      time_window=self._time_window, crop=self._crop_to_positions)
-            image = keras.ops.convert_to_tensor(image)
-            label = keras.ops.convert_to_tensor(label)
+        with worker_device_scope():
+            for image_with_positions in get_worker_shard(self._image_with_position_list):
+                image, label = load_images_with_positions(image_with_positions,
+                                                          time_window=self._time_window, crop=self._crop_to_positions)
+                image = keras.ops.convert_to_tensor(image)
+                label = keras.ops.convert_to_tensor(label)
 
-            label = keras.ops.expand_dims(label, axis=-1)  # Add channel dimension to labels
+                label = keras.ops.expand_dims(label, axis=-1)  # Add channel dimension to labels
 
-            image, label = normalize(image, label)
+                image, label = normalize(image, label)
 
-            image_patches, label_patches = generate_patches(image, label, self._patch_shape,
-                                                            multiplier=self._crops_per_image, perturb=self._perturb)
-            for i in range(len(image_patches)):
-                image = image_patches[i]
-                label = label_patches[i]
+                image_patches, label_patches = generate_patches(image, label, self._patch_shape,
+                                                                multiplier=self._crops_per_image, perturb=self._perturb)
+                for i in range(len(image_patches)):
+                    image = image_patches[i]
+                    label = label_patches[i]
 
-                if self._perturb:
-                    image, label = apply_noise(image, label)
-                yield image, label
+                    if self._perturb:
+                        image, label = apply_noise(image, label)
+                    yield image, label
 
     def __len__(self):
         return len(self._image_with_position_list) * self._crops_per_image
@@ -82,7 +84,7 @@ class _TorchDataset(IterableDataset):
 # Creates training and validation data from an image_with_positions_list
 def training_data_creator_from_raw(image_with_positions_list: List[ImageWithPositions], time_window, patch_shape,
                                    batch_size: int, mode, split_proportion: float = 0.8, seed: int = 1,
-                                   crop=False):
+                                   crop=False, num_workers: int = 0):
     if mode == "train":
         image_with_positions_list = image_with_positions_list[:round(split_proportion * len(image_with_positions_list))]
     elif mode == "validation":
@@ -92,7 +94,8 @@ def training_data_creator_from_raw(image_with_positions_list: List[ImageWithPosi
     #dataset = PrefetchingDataset(dataset, buffer_size=10)
     if mode == "train":
         dataset = ShufflingDataset(dataset, buffer_size=batch_size * 10, seed=seed)
-    return DataLoader(RepeatingDataset(dataset), batch_size=batch_size, num_workers=0, drop_last=True)
+    return DataLoader(RepeatingDataset(dataset), batch_size=batch_size, num_workers=num_workers, drop_last=True,
+                      worker_init_fn=seed_worker, persistent_workers=num_workers > 0)
 
 
 # Normalizes image data
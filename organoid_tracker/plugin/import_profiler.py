@@ -0,0 +1,89 @@
+"""Measures how long it takes to import each plugin, using the `-X importtime` option of Python. Every plugin is
+imported in a fresh Python process, so that modules imported by earlier plugins don't make later plugins look fast.
+
+>>> from organoid_tracker.plugin import import_profiler
+>>> profile = import_profiler.profile_plugin_import("path/to/folder/plugin_file.py")
+>>> print(profile.total_ms)
+"""
+import os
+import subprocess
+import sys
+from typing import List, Dict, NamedTuple
+
+from organoid_tracker.plugin import plugin_loader
+
+
+class ImportTime(NamedTuple):
+    """The import time of a single module, as reported by `python -X importtime`."""
+    module_name: str
+    self_us: int  # Time spent in the module itself
+    cumulative_us: int  # Including the time spent on importing other modules
+    children: List["ImportTime"]  # Modules imported by this module (that weren't imported already)
+
+
+class PluginImportProfile(NamedTuple):
+    """The import time of a plugin."""
+    file_path: str
+    total_ms: float  # Time to import the plugin module, including all modules it imported
+    slowest_imports: List[ImportTime]  # Modules directly imported by the plugin, slowest first
+    error: str  # Empty if the plugin was imported successfully
+
+
+def parse_import_times(importtime_output: str) -> List[ImportTime]:
+    """Parses the output of `python -X importtime`, which is written to stderr. Returns the top-level imports. Lines
+    that are not from -X importtime are ignored."""
+    pending_by_level: Dict[int, List[ImportTime]] = dict()
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Header line, or something else
+        name_part = parts[2][1:]  # Remove the single space after the "|"
+        level = (len(name_part) - len(name_part.lstrip(" "))) // 2
+
+        # A module is printed after all the modules it imported, which are one level deeper
+        children = pending_by_level.pop(level + 1, [])
+        import_time = ImportTime(module_name=name_part.strip(), self_us=int(parts[0]), cumulative_us=int(parts[1]),
+                                 children=children)
+        pending_by_level.setdefault(level, []).append(import_time)
+    return pending_by_level.get(0, [])
+
+
+def profile_plugin_import(file_path: str) -> PluginImportProfile:
+    """Imports the plugin in a new Python process, and reports how long that took."""
+    file_path = os.path.abspath(file_path)
+    module_name = plugin_loader._to_module_name(file_path)
+    grandparent_folder = os.path.dirname(os.path.dirname(file_path))
+    script = f"import sys; sys.path.insert(0, {grandparent_folder!r}); import {module_name}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script], capture_output=True, text=True)
+
+    # The module is imported as part of its package, and the package itself can also take some time
+    total_us = 0
+    slowest_imports = list()
+    for import_time in parse_import_times(result.stderr):
+        if import_time.module_name == module_name or module_name.startswith(import_time.module_name + "."):
+            total_us += import_time.cumulative_us
+            if import_time.module_name == module_name:
+                slowest_imports = sorted(import_time.children, key=lambda child: child.cumulative_us, reverse=True)
+
+    error = ""
+    if result.returncode != 0:
+        error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        error = error_lines[-1] if len(error_lines) > 0 else f"Exit code {result.returncode}"
+    return PluginImportProfile(file_path=file_path, total_ms=total_us / 1000, slowest_imports=slowest_imports,
+                               error=error)
+
+
+def profile_plugin_imports_in_folder(folder: str) -> List[PluginImportProfile]:
+    """Profiles all plugins in the given folder. Returns the profiles, slowest plugin first."""
+    profiles = list()
+    for file_name in sorted(os.listdir(folder)):
+        file_path = os.path.join(folder, file_name)
+        if not file_name.startswith("plugin_"):
+            continue
+        if not file_name.endswith(".py") and not os.path.isdir(file_path):
+            continue
+        profiles.append(profile_plugin_import(file_path))
+    profiles.sort(key=lambda profile: profile.total_ms, reverse=True)
+    return profiles
@@ -1,21 +1,36 @@
 import os
 import sys
+from functools import partial
 from typing import Any, List, Dict, Tuple, Callable, Optional
 import importlib
 
+from organoid_tracker.core import UserError
 from organoid_tracker.core.marker import Marker
-from organoid_tracker.imaging.file_loader import FileLoader
+from organoid_tracker.imaging.file_loader import FileLoader, FileLoaderType, LoadInto
 from organoid_tracker.plugin.instance import Plugin
+from organoid_tracker.plugin.plugin_manifest import PluginManifest, PluginManifestEntry
 
 
 class _ModulePlugin(Plugin):
     """A plugin that consists of a single .py file."""
+    _file_path: str
     _loaded_module_name: str
     _loaded_script: Any
+    _manifest: Optional[PluginManifest]
 
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, manifest: Optional[PluginManifest] = None):
+        self._file_path = os.path.abspath(file_name)
         self._loaded_module_name = _to_module_name(file_name)
         self._loaded_script = importlib.import_module(self._loaded_module_name)
+        self._manifest = manifest
+        self._record_in_manifest()
+
+    def _record_in_manifest(self):
+        if self._manifest is None:
+            return
+        lazy = not hasattr(self._loaded_script, "get_markers") and getattr(self._loaded_script, "LAZY_LOADING", True)
+        self._manifest.record_plugin(self._file_path, lazy=lazy, command_names=list(self.get_commands().keys()),
+                                     file_loaders=self.get_file_loaders())
 
     def get_markers(self) -> List[Marker]:
         if hasattr(self._loaded_script, 'get_markers'):
@@ -24,8 +39,12 @@ class _ModulePlugin(Plugin):
 
     def get_menu_items(self, window: "Window") -> Dict[str, Callable[[], None]]:
         if hasattr(self._loaded_script, 'get_menu_items'):
-            return self._loaded_script.get_menu_items(window)
-        return {}
+            menu_items = self._loaded_script.get_menu_items(window)
+        else:
+            menu_items = {}
+        if self._manifest is not None:
+            self._manifest.record_menu_items(self._file_path, list(menu_items.keys()))
+        return menu_items
 
     def get_file_loaders(self) -> List[FileLoader]:
         if hasattr(self._loaded_script, 'get_file_loaders'):
@@ -40,6 +59,7 @@ class _ModulePlugin(Plugin):
             # Reload submodules
             if module_name.startswith(to_unload_prefix):
                 importlib.reload(sys.modules[module_name])
+        self._record_in_manifest()
 
     def get_commands(self) -> Dict[str, Callable[[str], int]]:
         if hasattr(self._loaded_script, 'get_commands'):
@@ -47,6 +67,105 @@ class _ModulePlugin(Plugin):
         return {}
 
 
+class _LazyFileLoader(FileLoader):
+    """Stand-in for a file loader of a plugin that hasn't been imported yet. The name, file patterns and type come from
+    the plugin manifest. Only once a file is actually loaded, the plugin is imported."""
+
+    _plugin: "_LazyModulePlugin"
+    _name: str
+    _file_patterns: set[str]
+    _type: FileLoaderType
+
+    def __init__(self, plugin: "_LazyModulePlugin", description: Dict[str, Any]):
+        self._plugin = plugin
+        self._name = description["name"]
+        self._file_patterns = set(description["patterns"])
+        self._type = FileLoaderType[description["type"]]
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_file_patterns(self) -> set[str]:
+        return self._file_patterns
+
+    def load_file_interactive(self, file_path: str, *, into: LoadInto) -> bool:
+        for file_loader in self._plugin.get_loaded_plugin().get_file_loaders():
+            if file_loader.get_name() == self._name:
+                return file_loader.load_file_interactive(file_path, into=into)
+        raise UserError("Plugin changed", f"The file loader \"{self._name}\" no longer exists. Please reload all"
+                                          f" plugins.")
+
+    def get_type(self) -> FileLoaderType:
+        return self._type
+
+
+class _LazyModulePlugin(Plugin):
+    """A plugin that is only imported once one of its menu items, commands or file loaders is used. Until then, all
+    information comes from the plugin manifest."""
+
+    _file_path: str
+    _manifest_entry: PluginManifestEntry
+    _manifest: PluginManifest
+    _loaded_plugin: Optional[_ModulePlugin] = None
+
+    def __init__(self, file_path: str, manifest_entry: PluginManifestEntry, manifest: PluginManifest):
+        self._file_path = file_path
+        self._manifest_entry = manifest_entry
+        self._manifest = manifest
+
+    def is_imported(self) -> bool:
+        """Checks whether the plugin module has been imported already."""
+        return self._loaded_plugin is not None
+
+    def get_loaded_plugin(self) -> _ModulePlugin:
+        """Imports the plugin, if that wasn't done already."""
+        if self._loaded_plugin is None:
+            self._loaded_plugin = _ModulePlugin(self._file_path, self._manifest)
+        return self._loaded_plugin
+
+    def get_markers(self) -> List[Marker]:
+        return []  # Plugins with markers are never loaded lazily
+
+    def get_menu_items(self, window: "Window") -> Dict[str, Callable[[], None]]:
+        if self._loaded_plugin is not None:
+            return self._loaded_plugin.get_menu_items(window)
+        return {menu_item_name: partial(self._call_menu_item, window, menu_item_name)
+                for menu_item_name in self._manifest_entry.get_menu_item_names()}
+
+    def _call_menu_item(self, window: "Window", menu_item_name: str):
+        menu_items = self.get_loaded_plugin().get_menu_items(window)
+        if menu_item_name not in menu_items:
+            raise UserError("Plugin changed", f"The menu option \"{menu_item_name}\" no longer exists. Please reload"
+                                              f" all plugins.")
+        menu_items[menu_item_name]()
+
+    def get_file_loaders(self) -> List[FileLoader]:
+        if self._loaded_plugin is not None:
+            return self._loaded_plugin.get_file_loaders()
+        return [_LazyFileLoader(self, description) for description in self._manifest_entry.get_file_loaders()]
+
+    def get_commands(self) -> Dict[str, Callable[[List[str]], int]]:
+        if self._loaded_plugin is not None:
+            return self._loaded_plugin.get_commands()
+        return {command_name: partial(self._call_command, command_name)
+                for command_name in self._manifest_entry.get_command_names()}
+
+    def _call_command(self, command_name: str, args: List[str]) -> int:
+        commands = self.get_loaded_plugin().get_commands()
+        if command_name not in commands:
+            raise ValueError(f"The command \"{command_name}\" no longer exists in {self._file_path}")
+        return commands[command_name](args)
+
+    def reload(self):
+        if self._loaded_plugin is not None:
+            self._loaded_plugin.reload()
+
+
+def is_lazy_and_not_imported(plugin: Plugin) -> bool:
+    """Checks whether the plugin was loaded from the plugin manifest, without importing its module yet."""
+    return isinstance(plugin, _LazyModulePlugin) and not plugin.is_imported()
+
+
 def _to_module_name(file: str) -> str:
     """Returns the module name for the given file. A file stored in example_folder/test.py will end up as the module
     `example_folder.test`. In this way, relative imports still work fine. Returns the module name."""
@@ -67,10 +186,13 @@ def _to_module_name(file: str) -> str:
     return module_name
 
 
-def load_plugin(file_path: str) -> Optional[Plugin]:
+def load_plugin(file_path: str, manifest: Optional[PluginManifest] = None) -> Optional[Plugin]:
     """Loads a single plugin. The file_path can point to a single Python file or to a folder that is a Python module.
     The file name must be the full path, the basename must start with 'plugin_'.
 
+    If a manifest is given, and it has an up-to-date entry for this plugin, the plugin module is only imported once
+    the plugin is actually used. See the plugin_manifest module.
+
     Returns None if there is no plugin at that location."""
     file_name = os.path.basename(file_path)
     if not file_name.startswith("plugin_"):
@@ -78,11 +200,13 @@ def load_plugin(file_path: str) -> Optional[Plugin]:
             print("Ignoring Python file " + file_name + " in " + os.path.basename(file_path)
                   + " folder: it does not start with \"plugin_\"")
         return None
-    if os.path.isdir(file_path):
-        return _ModulePlugin(file_path)
-    elif file_name.endswith(".py"):
-        return _ModulePlugin(file_path)
-    else:
+    if not os.path.isdir(file_path) and not file_name.endswith(".py"):
         print("Ignoring file " + file_name + " in " + os.path.dirname(file_path)
               + " folder: is looks like a plugin, but is not a folder or a Python file.")
         return None
+
+    if manifest is not None:
+        manifest_entry = manifest.get_entry(os.path.abspath(file_path))
+        if manifest_entry is not None and manifest_entry.can_load_lazily() and manifest_entry.is_complete():
+            return _LazyModulePlugin(os.path.abspath(file_path), manifest_entry, manifest)
+    return _ModulePlugin(file_path, manifest)
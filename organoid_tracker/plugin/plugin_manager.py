@@ -1,9 +1,10 @@
 import os.path
-from typing import List, Iterable, Dict, Set
+from typing import List, Iterable, Dict, Set, Optional
 
 from organoid_tracker.core import UserError
 from organoid_tracker.plugin import plugin_loader
 from organoid_tracker.plugin.instance import Plugin
+from organoid_tracker.plugin.plugin_manifest import PluginManifest
 from organoid_tracker.plugin.registry import Registry
 
 # Default location for user plugins
@@ -11,6 +12,11 @@ STANDARD_USER_PLUGIN_FOLDER = "~/OrganoidTracker/Plugins"
 if os.name == 'nt':
     STANDARD_USER_PLUGIN_FOLDER = os.path.expandvars("%appdata%/OrganoidTracker/Plugins")
 
+# Default location of the plugin manifest, which allows plugins to be imported only when they're used
+STANDARD_PLUGIN_MANIFEST_FILE = os.path.expanduser("~/OrganoidTracker/plugin_manifest.json")
+if os.name == 'nt':
+    STANDARD_PLUGIN_MANIFEST_FILE = os.path.expandvars("%appdata%/OrganoidTracker/plugin_manifest.json")
+
 
 class PluginManager:
     """Holds all plugins in memory, as well as the folders where they were loaded from."""
@@ -20,12 +26,16 @@ class PluginManager:
 
     _plugins: Dict[str, Plugin]  # Plugins, by absolute file
     _registry: Registry
+    _manifest: PluginManifest
 
-    def __init__(self):
+    def __init__(self, manifest_file: Optional[str] = None):
+        """If a manifest file is given, plugins that were seen before are only imported once they are used. See the
+        plugin_manifest module."""
         self._plugins = dict()
         self._registry = Registry()
         self._folders = list()
         self._built_in_folders = set()
+        self._manifest = PluginManifest(manifest_file)
 
     def reload_plugins(self):
         """Reloads all plugins. Any new plugins in the folders will be picked up, any removed plugins will be
@@ -46,6 +56,10 @@ class PluginManager:
             if directory not in self._folders:
                 # Folder was removed - time to let the plugin go
                 continue
+            if plugin_loader.is_lazy_and_not_imported(plugin):
+                # Never imported, so there's nothing to reload. It will be loaded again below, which also checks
+                # whether the plugin was modified
+                continue
 
             # Plugin still exists, reload it from disk
             plugin.reload()
@@ -66,7 +80,7 @@ class PluginManager:
             if file_path in self._plugins:
                 continue  # Already loaded
 
-            plugin = plugin_loader.load_plugin(file_path)
+            plugin = plugin_loader.load_plugin(file_path, self._manifest)
             if plugin is None:
                 # Cannot be loaded
                 continue
@@ -130,3 +144,8 @@ class PluginManager:
     def get_registry(self) -> Registry:
         return self._registry
 
+    def save_manifest_if_changed(self):
+        """Saves the plugin manifest, so that next time, the plugins don't need to be imported during startup. Does
+        nothing if no manifest file was given in the constructor."""
+        self._manifest.save_if_changed()
+
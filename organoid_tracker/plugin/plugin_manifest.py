@@ -0,0 +1,135 @@
+"""A plugin manifest remembers which menu items, commands and file loaders every plugin provides. Using this information,
+plugins don't need to be imported when the program starts; they are imported only when one of their menu items,
+commands or file loaders is used for the first time.
+
+The manifest is stored as a JSON file. An entry is only used if the plugin files were not modified since the entry was
+written. Entries are written when a plugin is imported normally, so the first time the program starts with a new or
+modified plugin, that plugin is still imported at startup.
+"""
+import json
+import os
+from typing import Optional, Dict, Any, List
+
+from organoid_tracker.imaging.file_loader import FileLoader
+
+_MANIFEST_VERSION = 1
+
+
+def get_modification_time(file_path: str) -> float:
+    """Gets the last modification time of the plugin. For plugins that are a folder, this is the last modification time
+    of any Python file in that folder."""
+    if not os.path.isdir(file_path):
+        return os.path.getmtime(file_path)
+    modification_time = os.path.getmtime(file_path)
+    for folder, _, file_names in os.walk(file_path):
+        for file_name in file_names:
+            if file_name.endswith(".py"):
+                modification_time = max(modification_time, os.path.getmtime(os.path.join(folder, file_name)))
+    return modification_time
+
+
+class PluginManifestEntry:
+    """The information stored in the manifest for a single plugin."""
+
+    _data: Dict[str, Any]
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data
+
+    def get_menu_item_names(self) -> List[str]:
+        """Gets the names of the menu items, like "File//Export-Export something...". Note: this returns an empty list
+        if we don't know the menu items yet, use is_complete() to check for that."""
+        return self._data.get("menu_items") or []
+
+    def get_command_names(self) -> List[str]:
+        """Gets the names of all commands registered by this plugin."""
+        return self._data.get("commands", [])
+
+    def get_file_loaders(self) -> List[Dict[str, Any]]:
+        """Gets a description of every file loader, with the keys "name", "patterns" (list of str) and "type" (the name
+        of a FileLoaderType)."""
+        return self._data.get("file_loaders", [])
+
+    def can_load_lazily(self) -> bool:
+        """Checks whether the plugin can be imported only when it's needed. Plugins that register markers must be
+        imported at startup, as those markers are needed to display the data. Plugins can also opt out by setting
+        `LAZY_LOADING = False` in their module, which is useful if their menu items change while the program runs."""
+        return self._data.get("lazy", False)
+
+    def is_complete(self) -> bool:
+        """Menu items are only recorded once a window asked for them, so until then the entry is incomplete."""
+        return self._data.get("menu_items") is not None
+
+
+class PluginManifest:
+    """Stores a PluginManifestEntry for every plugin. See the module documentation."""
+
+    _file: Optional[str]
+    _entries: Dict[str, Dict[str, Any]]  # By absolute plugin path
+    _changed: bool = False
+
+    def __init__(self, file: Optional[str] = None):
+        """Loads the manifest from the given file. If the file is None, nothing is loaded or saved, but the manifest can
+        still be used during this session."""
+        self._file = file
+        self._entries = dict()
+        if file is not None and os.path.exists(file):
+            try:
+                with open(file, "r", encoding="utf-8") as handle:
+                    data = json.load(handle)
+                if data.get("version") == _MANIFEST_VERSION:
+                    self._entries = data["plugins"]
+            except (OSError, ValueError, KeyError):
+                self._entries = dict()  # Corrupt manifest, just start over
+
+    def get_entry(self, plugin_path: str) -> Optional[PluginManifestEntry]:
+        """Gets the manifest entry of the plugin, or None if there's no entry or if the plugin was modified since the
+        entry was written."""
+        data = self._entries.get(plugin_path)
+        if data is None or data.get("modified") != get_modification_time(plugin_path):
+            return None
+        return PluginManifestEntry(data)
+
+    def record_plugin(self, plugin_path: str, *, lazy: bool, command_names: List[str],
+                      file_loaders: List[FileLoader]):
+        """Records the information of a plugin that was just imported. Menu items are not recorded here, as those
+        can only be recorded once the plugin is used in a window, see record_menu_items. (Menu items recorded for
+        an unmodified plugin are kept.)"""
+        modification_time = get_modification_time(plugin_path)
+        old_data = self._entries.get(plugin_path)
+        menu_item_names = None
+        if old_data is not None and old_data.get("modified") == modification_time:
+            menu_item_names = old_data.get("menu_items")
+        new_data = {
+            "modified": modification_time,
+            "lazy": lazy,
+            "commands": list(command_names),
+            "file_loaders": [{
+                "name": file_loader.get_name(),
+                "patterns": sorted(file_loader.get_file_patterns()),
+                "type": file_loader.get_type().name
+            } for file_loader in file_loaders],
+            "menu_items": menu_item_names
+        }
+        if new_data != old_data:
+            self._entries[plugin_path] = new_data
+            self._changed = True
+
+    def record_menu_items(self, plugin_path: str, menu_item_names: List[str]):
+        """Records the menu items of a plugin. Does nothing if record_plugin wasn't called first."""
+        data = self._entries.get(plugin_path)
+        if data is None or data.get("menu_items") == menu_item_names:
+            return
+        data["menu_items"] = list(menu_item_names)
+        self._changed = True
+
+    def save_if_changed(self):
+        """Writes the manifest to disk, if anything was changed and if a file was given in the constructor."""
+        if not self._changed or self._file is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self._file)), exist_ok=True)
+        temp_file = self._file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as handle:
+            json.dump({"version": _MANIFEST_VERSION, "plugins": self._entries}, handle, indent=1)
+        os.replace(temp_file, self._file)
+        self._changed = False
@@ -0,0 +1,240 @@
+"""A long-running process that runs the organoid_tracker_*.py scripts and plugin commands on request. Because the
+process stays alive, libraries like Keras are imported only once, and neural network models stay in memory between
+jobs. This makes running the same pipeline on many small experiments a lot faster.
+
+Jobs are sent from another process using `submit_job(...)`, and they are run one after another. Every job runs in the
+folder it was submitted from, so the organoid_tracker.ini file of that folder is used. The output of the job is sent
+back to the submitting process.
+
+Start the server using `python organoid_tracker.py command_server`, then submit jobs using for example
+`python organoid_tracker.py submit predict_positions`.
+"""
+import io
+import json
+import os
+import queue
+import runpy
+import secrets
+import sys
+import threading
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Dict, Callable, List, Optional, Any, Tuple
+
+# File in which the running server stores its address and password
+STANDARD_SERVER_INFO_FILE = os.path.expanduser("~/OrganoidTracker/command_server.json")
+if os.name == 'nt':
+    STANDARD_SERVER_INFO_FILE = os.path.expandvars("%appdata%/OrganoidTracker/command_server.json")
+
+# Submit a job with this name to stop the server
+STOP_JOB_NAME = "stop_server"
+
+_SCRIPT_PREFIX = "organoid_tracker_"
+
+
+class _ConnectionWriter(io.TextIOBase):
+    """Sends everything that is written to the connection. Used to send the output of a job to the client."""
+
+    _connection: Connection
+
+    def __init__(self, connection: Connection):
+        self._connection = connection
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if len(text) > 0:
+            try:
+                self._connection.send(("output", text))
+            except OSError:
+                pass  # Client is gone, but let the job finish anyway
+        return len(text)
+
+
+class _Job:
+    name: str
+    args: List[str]
+    folder: str
+    connection: Connection
+
+    def __init__(self, name: str, args: List[str], folder: str, connection: Connection):
+        self.name = name
+        self.args = args
+        self.folder = folder
+        self.connection = connection
+
+
+class CommandServer:
+    """Runs jobs that are submitted from other processes. A job is either a script (for example "predict_positions",
+    for the organoid_tracker_predict_positions.py script) or a command registered by a plugin."""
+
+    _scripts_folder: str
+    _commands: Dict[str, Callable[[List[str]], int]]
+    _job_queue: "queue.Queue[Optional[_Job]]"
+
+    def __init__(self, scripts_folder: str, commands: Dict[str, Callable[[List[str]], int]]):
+        self._scripts_folder = os.path.abspath(scripts_folder)
+        self._commands = commands
+        self._job_queue = queue.Queue()
+
+    def serve_forever(self, info_file: str = STANDARD_SERVER_INFO_FILE):
+        """Runs jobs until a job named STOP_JOB_NAME is received. The jobs are run on the calling thread."""
+        password = secrets.token_bytes(32)
+        listener = Listener(("localhost", 0), authkey=password)
+        _write_server_info(info_file, listener.address, password)
+        threading.Thread(target=self._accept_connections, args=(listener,), name="CommandServerListener",
+                         daemon=True).start()
+        print(f"Command server is running. Submit jobs from another terminal using"
+              f" `python organoid_tracker.py submit <script or command> [arguments...]`.")
+
+        try:
+            while True:
+                job = self._job_queue.get()
+                if job is None:
+                    break
+                self._run_job(job)
+        finally:
+            listener.close()
+            if os.path.exists(info_file):
+                os.remove(info_file)
+        print("Command server stopped.")
+
+    def _accept_connections(self, listener: Listener):
+        while True:
+            try:
+                connection = listener.accept()
+            except OSError:
+                return  # Listener was closed
+            except Exception:
+                continue  # For example, a client with the wrong password
+            threading.Thread(target=self._receive_job, args=(connection,), daemon=True).start()
+
+    def _receive_job(self, connection: Connection):
+        try:
+            request = connection.recv()
+        except (OSError, EOFError):
+            return
+        if request.get("name") == STOP_JOB_NAME:
+            connection.send(("exit", 0))
+            self._job_queue.put(None)
+            return
+        connection.send(("queued", self._job_queue.qsize()))
+        self._job_queue.put(_Job(request["name"], list(request.get("args", [])), request["folder"], connection))
+
+    def _run_job(self, job: _Job):
+        print(f"Running {' '.join([job.name] + job.args)} in {job.folder}")
+        writer = _ConnectionWriter(job.connection)
+        old_folder = os.getcwd()
+        old_argv = sys.argv
+        old_stdin = sys.stdin
+        exit_code = 0
+        try:
+            os.chdir(job.folder)
+            sys.stdin = io.StringIO()  # There's no user to answer questions, so input() will raise EOFError
+            with redirect_stdout(writer), redirect_stderr(writer):
+                try:
+                    exit_code = self._run_job_in_current_folder(job)
+                except SystemExit as e:
+                    exit_code = _to_exit_code(e.code)
+                except BaseException:
+                    traceback.print_exc()
+                    exit_code = 1
+        finally:
+            sys.stdin = old_stdin
+            sys.argv = old_argv
+            os.chdir(old_folder)
+
+        print(f"Finished {job.name} with exit code {exit_code}")
+        try:
+            job.connection.send(("exit", exit_code))
+            job.connection.close()
+        except OSError:
+            pass  # Client is gone
+
+    def _run_job_in_current_folder(self, job: _Job) -> int:
+        if job.name in self._commands:
+            return _to_exit_code(self._commands[job.name](job.args))
+
+        script_file = os.path.join(self._scripts_folder, _SCRIPT_PREFIX + job.name + ".py")
+        if os.path.basename(job.name) != job.name or not os.path.isfile(script_file):
+            print(f"Unknown script or command: {job.name}")
+            return 1
+        sys.argv = [script_file] + job.args
+        runpy.run_path(script_file, run_name="__main__")
+        return 0
+
+
+def _to_exit_code(code: Any) -> int:
+    """Converts the code of SystemExit (or the return value of a command) to an int, like Python itself does."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _write_server_info(info_file: str, address: Tuple[str, int], password: bytes):
+    os.makedirs(os.path.dirname(os.path.abspath(info_file)), exist_ok=True)
+    # Only the current user may read the file, as it contains the password
+    file_descriptor = os.open(info_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(file_descriptor, "w", encoding="utf-8") as handle:
+        json.dump({"host": address[0], "port": address[1], "password": password.hex()}, handle)
+
+
+def submit_job(name: str, args: List[str], *, folder: Optional[str] = None,
+               info_file: str = STANDARD_SERVER_INFO_FILE) -> int:
+    """Submits a job to the running command server, and waits for it to finish. The output of the job is printed.
+    The job runs in the given folder, or in the current working directory if no folder was given. Returns the exit code
+    of the job. Raises ConnectionError if no server is running."""
+    if not os.path.exists(info_file):
+        raise ConnectionError("No command server is running. Start one using"
+                              " `python organoid_tracker.py command_server`.")
+    with open(info_file, "r", encoding="utf-8") as handle:
+        server_info = json.load(handle)
+    connection = Client((server_info["host"], server_info["port"]), authkey=bytes.fromhex(server_info["password"]))
+    try:
+        connection.send({"name": name, "args": args, "folder": os.path.abspath(folder or os.getcwd())})
+        while True:
+            message_type, value = connection.recv()
+            if message_type == "queued":
+                if value > 0:
+                    print(f"Waiting for {value} other job(s) to finish...")
+            elif message_type == "output":
+                sys.stdout.write(value)
+                sys.stdout.flush()
+            elif message_type == "exit":
+                return value
+    except EOFError:
+        raise ConnectionError("The command server stopped while running the job.")
+    finally:
+        connection.close()
+
+
+def keep_loaded_models_in_memory(module: Any, function_name: str):
+    """Replaces a model loading function, like `position_predictor.load_position_model`, by a version that returns the
+    same model if it's asked for the same folder again. If the model.keras file in that folder changes, the model is
+    loaded again. Scripts that import the function after this method was called will get the new version."""
+    original_function: Callable[[str], Any] = getattr(module, function_name)
+    if getattr(original_function, "_keeps_models_in_memory", False):
+        return  # Already replaced
+    loaded_models: Dict[Tuple[str, float], Any] = dict()
+
+    def load_model(model_folder: str) -> Any:
+        model_folder = os.path.abspath(model_folder)
+        model_file = os.path.join(model_folder, "model.keras")
+        key = (model_folder, os.path.getmtime(model_file) if os.path.exists(model_file) else 0)
+        model = loaded_models.get(key)
+        if model is None:
+            model = original_function(model_folder)
+            loaded_models.clear()  # Keep only the most recently used model of this type, models can be large
+            loaded_models[key] = model
+        else:
+            print(f"Using model from {model_folder} that was already loaded.")
+        return model
+
+    load_model.__doc__ = original_function.__doc__
+    load_model._keeps_models_in_memory = True
+    setattr(module, function_name, load_model)
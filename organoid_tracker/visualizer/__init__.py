@@ -135,6 +135,9 @@ class Visualizer:
             def on_finished(self, result: Any):
                 result_handler(result)
 
+            def get_priority(self) -> int:
+                return Task.PRIORITY_INTERACTIVE  # Used for drawing, so the user is waiting for it
+
         self._window.get_scheduler().add_task(MyTask())
 
     def draw_view(self):
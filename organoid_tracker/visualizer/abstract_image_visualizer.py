@@ -1,11 +1,13 @@
 import re
+import time
 from functools import partial
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set, Callable, Tuple, Union
 
 import matplotlib.colors
 import numpy
 import tifffile
-from matplotlib.backend_bases import MouseEvent
+from matplotlib.artist import Artist
+from matplotlib.backend_bases import MouseEvent, DrawEvent
 from matplotlib.collections import LineCollection
 from matplotlib.colors import Colormap
 from matplotlib.patches import Rectangle
@@ -23,7 +25,7 @@ from organoid_tracker.gui import dialog
 from organoid_tracker.gui.dialog import prompt_int
 from organoid_tracker.gui.undo_redo import UndoableAction
 from organoid_tracker.gui.window import Window, DisplaySettings
-from organoid_tracker.linking_analysis import linking_markers
+from organoid_tracker.plugin.registry import Registry
 from organoid_tracker.position_analysis import position_markers
 from organoid_tracker.util import bits
 from organoid_tracker.util.mpl_helper import line_infinite
@@ -54,6 +56,52 @@ class _ChannelChangeColorAction(UndoableAction):
         return f"Changed the colormap of channel {self._channel.index_one} to \"{self._new_colormap.name}\"."
 
 
+class PositionMarkerData:
+    """The data needed to draw the markers of all positions of a single time point, stored as NumPy arrays so that the
+    markers can be styled without looping over all positions. Sorted by z."""
+
+    positions: List[Position]
+    x: ndarray
+    y: ndarray
+    rounded_z: ndarray  # round(position.z), as integers
+    has_error: ndarray  # Whether there's an (unsuppressed) error marker
+    edge_colors: ndarray  # Shape (n, 3), RGB from 0 to 1
+    edge_widths: ndarray
+
+    def __init__(self, experiment: Experiment, time_point: TimePoint, registry: Registry):
+        positions = experiment.positions
+        self.positions = sorted(positions.of_time_point(time_point), key=lambda position: position.z)
+        count = len(self.positions)
+        self.x = numpy.fromiter((position.x for position in self.positions), dtype=numpy.float64, count=count)
+        self.y = numpy.fromiter((position.y for position in self.positions), dtype=numpy.float64, count=count)
+        self.rounded_z = numpy.fromiter((round(position.z) for position in self.positions), dtype=numpy.int64,
+                                        count=count)
+
+        # Read all metadata of this time point at once
+        metadata = positions.create_time_point_dict(time_point, self.positions)
+        no_values = [None] * count
+        errors = metadata.get("error", no_values)
+        suppressed_errors = metadata.get("suppressed_error", no_values)
+        self.has_error = numpy.fromiter((error is not None and error != suppressed_error
+                                         for error, suppressed_error in zip(errors, suppressed_errors)),
+                                        dtype=bool, count=count)
+
+        # Give every position type an id (0 is used for positions without a type), and then look up the edge style
+        type_ids_by_name = dict()
+        type_ids = numpy.fromiter((0 if type_name is None else
+                                   type_ids_by_name.setdefault(type_name.upper(), len(type_ids_by_name) + 1)
+                                   for type_name in metadata.get("type", no_values)), dtype=numpy.int32, count=count)
+        edge_colors_by_type_id = numpy.zeros((len(type_ids_by_name) + 1, 3), dtype=numpy.float64)
+        edge_widths_by_type_id = numpy.ones(len(type_ids_by_name) + 1, dtype=numpy.float64)
+        for type_name, type_id in type_ids_by_name.items():
+            position_type = registry.get_marker_by_save_name(type_name)
+            if position_type is not None:
+                edge_colors_by_type_id[type_id] = position_type.mpl_color
+                edge_widths_by_type_id[type_id] = 3.0
+        self.edge_colors = edge_colors_by_type_id[type_ids]
+        self.edge_widths = edge_widths_by_type_id[type_ids]
+
+
 class AbstractImageVisualizer(Visualizer):
     """A generic image visualizer."""
 
@@ -64,8 +112,30 @@ class AbstractImageVisualizer(Visualizer):
 
     _image_slice_2d: Optional[ndarray] = None
 
+    # Artists that are kept between redraws, so that only their data needs to be updated. See _get_retained_artist.
+    _retained_artists: Dict[str, Artist]
+    _used_retained_artist_keys: Set[str]
+
+    # Selection markers. If the canvas supports blitting, these are animated artists drawn on top of the rendered frame.
+    _selection_artists: List[Artist]
+    _extra_selection_artist_count: int = 0  # Selection markers drawn by _draw_extra, not by _draw_selections
+    _blit_background: Optional[Any] = None  # Rendered frame without selection markers
+    _blit_background_view: Optional[Tuple[float, float, float, float]] = None  # Axis limits of that frame
+
+    # Position marker data by time point number, see _get_position_marker_data. Cleared when the data changes.
+    _position_marker_data: Dict[int, PositionMarkerData]
+
+    # Redraw latency measurements, shown in a debug overlay if enabled in the display settings
+    _draw_view_start_time: Optional[float] = None
+    _last_update_ms: float = 0
+    _last_frame_ms: float = 0
+
     def __init__(self, window: Window):
         super().__init__(window)
+        self._retained_artists = dict()
+        self._used_retained_artist_keys = set()
+        self._selection_artists = list()
+        self._position_marker_data = dict()
 
         self._clamp_time_point()
         self._clamp_z()
@@ -160,17 +230,27 @@ class AbstractImageVisualizer(Visualizer):
         return image_3d
 
     def refresh_data(self):
+        self._position_marker_data.clear()
         self._calculate_time_point_metadata()
         if self.should_show_image_reconstruction():
             self._refresh_2d_image()  # Reload image, as image is a reconstruction of the data
         super().refresh_data()
 
     def refresh_all(self):
+        self._position_marker_data.clear()
         self._calculate_time_point_metadata()
         self._refresh_2d_image()  # Reload image
         super().refresh_all()
 
+    def attach(self):
+        super().attach()
+        self._window.register_event_handler("draw_event", self._on_draw_event)
+
     def draw_view(self):
+        self._draw_view_start_time = time.perf_counter()
+        self._used_retained_artist_keys.clear()
+        self._blit_background = None  # Will be captured again once the new frame has been rendered
+
         self._clear_axis()
         self._ax.set_facecolor((0.2, 0.2, 0.2))
         self._draw_image()
@@ -180,38 +260,165 @@ class AbstractImageVisualizer(Visualizer):
         self._draw_data_axes()
         self._draw_beacons()
         self._draw_extra()
+        self._extra_selection_artist_count = len(self._selection_artists)
+        self._draw_selections()
         self._draw_legend()
         self._window.set_figure_title(self._get_figure_title())
 
+        # Hide the retained artists that were not needed for this frame
+        for key, artist in self._retained_artists.items():
+            if key not in self._used_retained_artist_keys:
+                artist.set_visible(False)
+
+        self._last_update_ms = (time.perf_counter() - self._draw_view_start_time) * 1000
+        self._draw_redraw_latency_overlay()
         self._fig.canvas.draw_idle()
 
+    def _clear_axis(self):
+        """Removes all artists from the axis and the figure texts, except for the retained artists (see
+        _get_retained_artist). The titles and axis labels are reset. The zoom settings are preserved."""
+        retained_artists = set(self._retained_artists.values())
+        for ax in self._axes:
+            for image in ax.images:
+                colorbar = image.colorbar
+                if colorbar is not None:
+                    colorbar.remove_connection()
+            if ax.legend_ is not None:
+                ax.legend_.remove()
+            for artist_list in [ax.collections, ax.lines, ax.patches, ax.texts, ax.images, ax.artists]:
+                for artist in list(artist_list):
+                    if artist not in retained_artists:
+                        artist.remove()
+            for loc in ["left", "center", "right"]:
+                ax.set_title("", loc=loc)
+            ax.set_xlabel("")
+            ax.set_ylabel("")
+
+            xlim, ylim = ax.get_xlim(), ax.get_ylim()
+            if xlim[1] - xlim[0] > 2:
+                # Only preserve scale if some sensible value was recorded
+                ax.set_xlim(*xlim)
+                ax.set_ylim(max(ylim), min(ylim))  # Make sure y-axis is inverted
+                ax.set_autoscale_on(False)
+        for text in list(self._fig.texts):
+            if text not in retained_artists:
+                text.remove()
+        self._selection_artists.clear()
+
+    def _get_retained_artist(self, key: str, create_artist: Callable[[], Artist]) -> Artist:
+        """Gets an artist that is kept between redraws, so that only its data needs to be updated (using for example
+        set_data, set_offsets or set_segments). This is a lot faster than removing and recreating the artist on every
+        redraw. If no artist exists yet for the given key, create_artist is called to create one. Artists that are not
+        requested during a redraw are hidden."""
+        artist = self._retained_artists.get(key)
+        if artist is None or artist.axes is not self._ax:
+            artist = create_artist()
+            self._retained_artists[key] = artist
+        artist.set_visible(True)
+        self._used_retained_artist_keys.add(key)
+        return artist
+
+    def _can_blit(self) -> bool:
+        """Checks whether the canvas supports blitting, which we use to quickly redraw the selection markers."""
+        return self._fig.canvas.supports_blit
+
+    def _on_draw_event(self, event: DrawEvent):
+        """Called after the canvas has been rendered. Stores the rendered frame for blitting, and then draws the selection
+        markers (which are animated artists, so they are not part of the normal rendering) on top of it."""
+        canvas = self._fig.canvas
+        if canvas.is_saving():
+            return  # Animated artists are drawn normally when saving, and the renderer is not the one on screen
+        if self._draw_view_start_time is not None:
+            self._last_frame_ms = (time.perf_counter() - self._draw_view_start_time) * 1000
+            self._draw_view_start_time = None
+        if not self._can_blit():
+            return
+        self._blit_background = canvas.copy_from_bbox(self._ax.bbox)
+        self._blit_background_view = tuple(self._ax.viewLim.bounds)
+        for artist in self._selection_artists:
+            self._ax.draw_artist(artist)
+        self._draw_redraw_latency_overlay()
+
+    def _redraw_selections(self):
+        """Redraws only the markers drawn by _draw_selections, and updates the figure title. Call this instead of
+        draw_view() if only the selection has changed. If possible, blitting is used: the last rendered frame is restored
+        and only the selection markers are drawn on top of it. Otherwise, this method just calls draw_view()."""
+        if not self._can_blit() or self._blit_background is None \
+                or self._blit_background_view != tuple(self._ax.viewLim.bounds):
+            self.draw_view()
+            return
+
+        start_time = time.perf_counter()
+        for artist in self._selection_artists[self._extra_selection_artist_count:]:
+            artist.remove()
+        del self._selection_artists[self._extra_selection_artist_count:]
+        self._draw_selections()
+        self._window.set_figure_title(self._get_figure_title())
+
+        canvas = self._fig.canvas
+        canvas.restore_region(self._blit_background)
+        for artist in self._selection_artists:
+            self._ax.draw_artist(artist)
+        self._last_update_ms = self._last_frame_ms = (time.perf_counter() - start_time) * 1000
+        self._draw_redraw_latency_overlay()
+        canvas.blit(self._ax.bbox)
+
+    def _draw_redraw_latency_overlay(self):
+        """Shows how long the last redraw took, if enabled in the display settings. The update time is the time spent
+        in draw_view, the frame time also includes the time matplotlib needed to render the frame."""
+        if not self._display_settings.show_redraw_latency:
+            return
+        overlay = self._get_retained_artist("redraw_latency", lambda: self._ax.text(
+            0.01, 0.99, "", transform=self._ax.transAxes, verticalalignment="top", fontfamily="monospace",
+            color="white", backgroundcolor=(0, 0, 0, 0.5), zorder=5, animated=self._can_blit()))
+        overlay.set_text(f"Update: {self._last_update_ms:6.1f} ms\nFrame:  {self._last_frame_ms:6.1f} ms")
+        if self._can_blit() and self._draw_view_start_time is None:
+            # Called after rendering, so we need to draw the (animated) text ourselves
+            self._ax.draw_artist(overlay)
+
     def _draw_image(self):
         if self._image_slice_2d is not None:
             offset = self._experiment.images.offsets.of_time_point(self._time_point)
             extent = (offset.x, offset.x + self._image_slice_2d.shape[1],
                       offset.y + self._image_slice_2d.shape[0], offset.y)
-            self._ax.imshow(self._image_slice_2d, cmap=self._get_color_map(), extent=extent, interpolation="none", interpolation_stage="data")
+            color_map = self._get_color_map()
+            image = self._get_retained_artist("image", lambda: self._ax.imshow(
+                self._image_slice_2d, cmap=color_map, extent=extent, interpolation="none", interpolation_stage="data"))
+            image.set_data(self._image_slice_2d)
+            image.set_extent(extent)
+            image.set_cmap(color_map)
+            if self._image_slice_2d.ndim == 2:
+                image.autoscale()  # Update the color scale for the new data, like imshow does
             self._ax.set_aspect("equal", adjustable="datalim")
 
     def _draw_legend(self):
         """Draws the little legend in the bottom right corner."""
         legend_y = 0.05
-        self._ax.add_patch(Rectangle(xy=(0.895, legend_y * 1.8), width=0.105, height=-legend_y * 1.8, transform=self._fig.transFigure,
-                                     zorder=4, color="white", alpha=0.8))
-        self._ax.scatter([0.91], [legend_y], s=8**2, facecolor=core.COLOR_CELL_PREVIOUS, transform=self._fig.transFigure,
-                         edgecolors="black", linewidths=1, marker="o", zorder=4.5)
-        self._ax.scatter([0.945], [legend_y], s=7**2, facecolor=core.COLOR_CELL_CURRENT, transform=self._fig.transFigure,
-                         edgecolors="black", linewidths=1, marker="s", zorder=4.5)
-        self._ax.scatter([0.98], [legend_y], s=6**2, facecolor=core.COLOR_CELL_NEXT, transform=self._fig.transFigure,
-                         edgecolors="black", linewidths=1, marker="o", zorder=4.5)
-        self._ax.plot([0.91, 0.945], [legend_y, legend_y], transform=self._fig.transFigure, color=core.COLOR_CELL_PREVIOUS,
-                      linewidth=1, zorder=4.5)
-        self._ax.plot([0.945, 0.98], [legend_y, legend_y], transform=self._fig.transFigure, color=core.COLOR_CELL_NEXT,
-                       linewidth=1, zorder=4.5)
-        self._ax.text(0.9, legend_y + 0.015, f"t={self._time_point.time_point_number() - 1}", horizontalalignment="left",
-                      color="black", transform=self._fig.transFigure, zorder=4.5)
-        self._ax.text(0.99, legend_y + 0.015, f"t={self._time_point.time_point_number() + 1}", horizontalalignment="right",
-                      color="black", transform=self._fig.transFigure, zorder=4.5)
+        transform = self._fig.transFigure
+        self._get_retained_artist("legend_background", lambda: self._ax.add_patch(Rectangle(
+            xy=(0.895, legend_y * 1.8), width=0.105, height=-legend_y * 1.8, transform=transform, zorder=4,
+            color="white", alpha=0.8)))
+        self._get_retained_artist("legend_previous", lambda: self._ax.scatter(
+            [0.91], [legend_y], s=8**2, facecolor=core.COLOR_CELL_PREVIOUS, transform=transform, edgecolors="black",
+            linewidths=1, marker="o", zorder=4.5))
+        self._get_retained_artist("legend_current", lambda: self._ax.scatter(
+            [0.945], [legend_y], s=7**2, facecolor=core.COLOR_CELL_CURRENT, transform=transform, edgecolors="black",
+            linewidths=1, marker="s", zorder=4.5))
+        self._get_retained_artist("legend_next", lambda: self._ax.scatter(
+            [0.98], [legend_y], s=6**2, facecolor=core.COLOR_CELL_NEXT, transform=transform, edgecolors="black",
+            linewidths=1, marker="o", zorder=4.5))
+        self._get_retained_artist("legend_link_previous", lambda: self._ax.plot(
+            [0.91, 0.945], [legend_y, legend_y], transform=transform, color=core.COLOR_CELL_PREVIOUS, linewidth=1,
+            zorder=4.5)[0])
+        self._get_retained_artist("legend_link_next", lambda: self._ax.plot(
+            [0.945, 0.98], [legend_y, legend_y], transform=transform, color=core.COLOR_CELL_NEXT, linewidth=1,
+            zorder=4.5)[0])
+        self._get_retained_artist("legend_text_previous", lambda: self._ax.text(
+            0.9, legend_y + 0.015, "", horizontalalignment="left", color="black", transform=transform, zorder=4.5))\
+            .set_text(f"t={self._time_point.time_point_number() - 1}")
+        self._get_retained_artist("legend_text_next", lambda: self._ax.text(
+            0.99, legend_y + 0.015, "", horizontalalignment="right", color="black", transform=transform, zorder=4.5))\
+            .set_text(f"t={self._time_point.time_point_number() + 1}")
 
     def _draw_selection(self, position: Position, color: MPLColor):
         """Draws a marker for the given position that indicates that the position is selected. Subclasses can call this
@@ -237,8 +444,9 @@ class AbstractImageVisualizer(Visualizer):
             marker_size = 30
             marker_alpha = 0.6
         marker_color = matplotlib.colors.to_rgb(color) + (marker_alpha,)
-        self._ax.plot(position.x, position.y, marker_shape, markersize=marker_size, color=(0, 0, 0, 0),
-                      markeredgecolor=marker_color, markeredgewidth=5)
+        line, = self._ax.plot(position.x, position.y, marker_shape, markersize=marker_size, color=(0, 0, 0, 0),
+                              markeredgecolor=marker_color, markeredgewidth=5, animated=self._can_blit())
+        self._selection_artists.append(line)
 
     def _draw_beacons(self):
         registry = self._window.registry
@@ -320,6 +528,11 @@ class AbstractImageVisualizer(Visualizer):
         return f"Time point {self._time_point.time_point_number()}    (z={self._get_figure_title_z_str()}, " \
                f"c={self._get_figure_title_channel_str()}{timing})"
 
+    def _draw_selections(self):
+        """Draws the markers of the selected positions using _draw_selection(). Unlike the markers drawn in _draw_extra(),
+        these markers can be redrawn quickly using _redraw_selections(), without redrawing everything else."""
+        pass
+
     def _draw_extra(self):
         pass  # Subclasses can override this
 
@@ -363,46 +576,79 @@ class AbstractImageVisualizer(Visualizer):
         # Current time point
         self._draw_positions_of_time_point(self._time_point)
 
+    def _get_position_marker_data(self, time_point: TimePoint) -> PositionMarkerData:
+        """Gets the data needed to draw the position markers of the given time point. This data is cached until
+        refresh_data() or refresh_all() is called, so it's only collected once when moving through the z-layers."""
+        time_point_number = time_point.time_point_number()
+        marker_data = self._position_marker_data.get(time_point_number)
+        if marker_data is None:
+            # Only keep the data of nearby time points
+            current_time_point_number = self._time_point.time_point_number()
+            for cached_time_point_number in list(self._position_marker_data.keys()):
+                if abs(cached_time_point_number - current_time_point_number) > 1:
+                    del self._position_marker_data[cached_time_point_number]
+
+            marker_data = PositionMarkerData(self._experiment, time_point, self.get_window().registry)
+            self._position_marker_data[time_point_number] = marker_data
+        return marker_data
+
     def _draw_positions_of_time_point(self, time_point: TimePoint, color: str = core.COLOR_CELL_CURRENT):
-        positions = self._experiment.positions
         dt = time_point.time_point_number() - self._time_point.time_point_number()
         show_errors = self._display_settings.show_errors
         max_intensity_projection = self._display_settings.max_intensity_projection
+        marker_data = self._get_position_marker_data(time_point)
 
-        positions_x_list, positions_y_list, positions_edge_colors, positions_edge_widths, positions_marker_sizes =\
-            list(), list(), list(), list(), list()
-        crosses_x_list, crosses_y_list = list(), list()
-
-        min_z, max_z = self._z - self.MAX_Z_DISTANCE, self._z + self.MAX_Z_DISTANCE
+        # Select the positions that are close enough in z
+        dz = self._z - marker_data.rounded_z
         if max_intensity_projection:
-            min_z, max_z = None, None
-        for position in self._experiment.positions.of_time_point_and_z(time_point, min_z, max_z):
-            dz = self._z - round(position.z)
-
-            # Draw the position, making it selectable
-            if not self._on_position_draw(position, color, dz, dt):
-                continue
-
-            # Add error marker
-            if show_errors and linking_markers.get_error_marker(positions, position) is not None:
-                crosses_x_list.append(position.x)
-                crosses_y_list.append(position.y)
+            indices = numpy.arange(len(marker_data.positions))
+        else:
+            indices = numpy.flatnonzero(numpy.abs(dz) <= self.MAX_Z_DISTANCE)
+        if type(self)._on_position_draw is not AbstractImageVisualizer._on_position_draw:
+            # Let the subclass draw the position, or make it not drawn
+            indices = numpy.fromiter((i for i in indices if self._on_position_draw(marker_data.positions[i], color,
+                                                                                   int(dz[i]), dt)), dtype=numpy.intp)
+
+        # Get the marker style
+        positions_edge_colors, positions_edge_widths = self._get_position_edges(marker_data, indices)
+        positions_dz = dz[indices]
+        if max_intensity_projection:
+            dz_penalties = numpy.zeros_like(positions_dz)
+        else:
+            dz_penalties = numpy.where(positions_dz == 0, 0, numpy.abs(positions_dz) + 1)
+        positions_marker_sizes = numpy.maximum(1, 7 - dz_penalties - dt + positions_edge_widths) ** 2
+        positions_x_list, positions_y_list = marker_data.x[indices], marker_data.y[indices]
 
-            # Add marker
-            edge_color, edge_width = self._get_position_edge(position)
+        # Add error markers
+        if show_errors:
+            error_indices = indices[marker_data.has_error[indices]]
+        else:
+            error_indices = indices[:0]
+        crosses_x_list, crosses_y_list = marker_data.x[error_indices], marker_data.y[error_indices]
 
-            positions_x_list.append(position.x)
-            positions_y_list.append(position.y)
-            positions_edge_colors.append(edge_color)
-            positions_edge_widths.append(edge_width)
-            dz_penalty = 0 if dz == 0 or max_intensity_projection else abs(dz) + 1
-            positions_marker_sizes.append(max(1, 7 - dz_penalty - dt + edge_width) ** 2)
+        crosses = self._get_retained_artist(f"crosses_{dt}", lambda: self._ax.scatter(
+            crosses_x_list, crosses_y_list, marker='X', facecolor='black', edgecolors="white", s=17**2, linewidths=2))
+        crosses.set_offsets(_to_offsets(crosses_x_list, crosses_y_list))
 
-        self._ax.scatter(crosses_x_list, crosses_y_list, marker='X', facecolor='black', edgecolors="white",
-                         s=17**2, linewidths=2)
         marker = "s" if dt == 0 else "o"
-        self._ax.scatter(positions_x_list, positions_y_list, s=positions_marker_sizes, facecolor=color,
-                         edgecolors=positions_edge_colors, linewidths=positions_edge_widths, marker=marker)
+        positions_scatter = self._get_retained_artist(f"positions_{dt}_{color}", lambda: self._ax.scatter(
+            positions_x_list, positions_y_list, facecolor=color, marker=marker))
+        positions_scatter.set_offsets(_to_offsets(positions_x_list, positions_y_list))
+        positions_scatter.set_sizes(positions_marker_sizes)
+        positions_scatter.set_edgecolor(positions_edge_colors)
+        positions_scatter.set_linewidth(positions_edge_widths)
+
+    def _get_position_edges(self, marker_data: PositionMarkerData, indices: ndarray) -> Tuple[ndarray, ndarray]:
+        """Gets the RGB colors (0-1, shape (n, 3)) and the line widths (shape (n,)) of the positions at the given indices
+        in the marker data. Override this method if you want to style many positions at once, which is much faster than
+        overriding _get_position_edge."""
+        if type(self)._get_position_edge is not AbstractImageVisualizer._get_position_edge:
+            # Overridden, so we need to ask for every position
+            edges = [self._get_position_edge(marker_data.positions[i]) for i in indices]
+            edge_colors = numpy.array([edge_color for edge_color, _ in edges], dtype=numpy.float64).reshape(-1, 3)
+            edge_widths = numpy.array([edge_width for _, edge_width in edges], dtype=numpy.float64)
+            return edge_colors, edge_widths
+        return marker_data.edge_colors[indices], marker_data.edge_widths[indices]
 
     def _get_position_edge(self, position: Position) -> tuple[tuple[float, float, float], float]:
         """Gets the RGB color (0-1) and the line width"""
@@ -432,10 +678,9 @@ class AbstractImageVisualizer(Visualizer):
 
             line = (position1.x, position1.y), (position2.x, position2.y)
             lines.append(line)
-        colors = [core.COLOR_CELL_CURRENT]
-        linestyles = ["dotted"]
-        linewidths = [2]
-        self._ax.add_collection(LineCollection(lines, colors=colors, linestyles=linestyles, linewidths=linewidths))
+        connections = self._get_retained_artist("connections", lambda: self._ax.add_collection(LineCollection(
+            lines, colors=[core.COLOR_CELL_CURRENT], linestyles=["dotted"], linewidths=[2])))
+        connections.set_segments(lines)
 
     def _draw_links(self):
         """Draws all links. A link indicates that one position is the same a another position in another time point."""
@@ -458,8 +703,10 @@ class AbstractImageVisualizer(Visualizer):
                 else core.COLOR_CELL_PREVIOUS
             colors.append(color)
 
-        linewidths = [1]
-        self._ax.add_collection(LineCollection(lines, colors=colors, linewidths=linewidths))
+        links = self._get_retained_artist("links", lambda: self._ax.add_collection(LineCollection(
+            lines, linewidths=[1])))
+        links.set_segments(lines)
+        links.set_color(colors)
 
     def _draw_data_axes(self):
         """Draws the data axis, which is usually the crypt axis."""
@@ -549,6 +796,7 @@ class AbstractImageVisualizer(Visualizer):
             "View//Toggle-Toggle showing position markers [P]": self._toggle_showing_position_markers,
             "View//Toggle-Toggle showing link and connection markers": self._toggle_showing_links_and_connections,
             "View//Toggle-Toggle showing error markers": self._toggle_showing_error_markers,
+            "View//Toggle-Toggle showing redraw time (debug)": self._toggle_showing_redraw_latency,
             "View//Image-View image slices [\]": self._show_slices,
             "Navigate//Layer-Above layer [Up]": lambda: self._move_in_z(1),
             "Navigate//Layer-Below layer [Down]": lambda: self._move_in_z(-1),
@@ -756,6 +1004,10 @@ class AbstractImageVisualizer(Visualizer):
         self._display_settings.show_errors = not self._display_settings.show_errors
         self.draw_view()
 
+    def _toggle_showing_redraw_latency(self):
+        self._display_settings.show_redraw_latency = not self._display_settings.show_redraw_latency
+        self.draw_view()
+
     def _show_slices(self):
         from organoid_tracker.visualizer.image_slice_visualizer import ImageSliceViewer
         activate(ImageSliceViewer(self._window, self.__class__))
@@ -911,3 +1163,6 @@ class AbstractImageVisualizer(Visualizer):
             pass
 
 
+def _to_offsets(x_list: Union[List[float], ndarray], y_list: Union[List[float], ndarray]) -> ndarray:
+    """Converts the lists to an array of shape (n, 2), as used by PathCollection.set_offsets. Also works for n = 0."""
+    return numpy.column_stack([numpy.asarray(x_list, dtype=numpy.float64), numpy.asarray(y_list, dtype=numpy.float64)])
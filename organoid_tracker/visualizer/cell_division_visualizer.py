@@ -9,7 +9,7 @@ from organoid_tracker.core.links import Links
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution
 from organoid_tracker.core.typing import DataType
-from organoid_tracker.gui.undo_redo import UndoableAction
+from organoid_tracker.gui.undo_redo import UndoableAction, ESTIMATED_BYTES_PER_POSITION
 from organoid_tracker.gui.window import Window
 from organoid_tracker.linking import cell_division_finder
 from organoid_tracker.linking_analysis import cell_error_finder
@@ -53,6 +53,9 @@ class _DeleteDivisionLinksAction(UndoableAction):
 
         return f"Restored the division by inserting {len(self.position_pairs)} link(s)"
 
+    def get_memory_usage_bytes(self) -> int:
+        return len(self.position_pairs) * 2 * ESTIMATED_BYTES_PER_POSITION
+
 
 def _get_mothers(experiment: Experiment) -> List[Position]:
     return list(cell_division_finder.find_mothers(experiment.links))
@@ -1,6 +1,6 @@
 import math
 from functools import partial
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, Union
 import os
 import shutil
 
@@ -20,7 +20,7 @@ from organoid_tracker.core.image_loader import ImageChannel
 from organoid_tracker.core.images import ChannelDescription
 from organoid_tracker.core.position import Position
 from organoid_tracker.gui import dialog, action
-from organoid_tracker.gui.undo_redo import UndoableAction, UndoRedo, CombinedAction
+from organoid_tracker.gui.undo_redo import UndoableAction, UndoRedo, CombinedAction, CompressedArray
 from organoid_tracker.gui.window import Window
 from organoid_tracker.image_loading.builtin_merging_image_loaders import ChannelAppendingImageLoader
 from organoid_tracker.image_loading.folder_image_loader import FolderImageLoader
@@ -34,34 +34,41 @@ class _DeleteLabelAction(UndoableAction):
     _segmentation_stack: ndarray
     _label: int
 
-    _old_coords: Optional[ndarray] = None  # Coordinates of the deleted label, filled in do()
+    _old_indices: Optional[ndarray] = None  # Flat indices of the deleted label, filled in do()
 
     def __init__(self, segmentation_stack: ndarray, label: int):
         self._segmentation_stack = segmentation_stack
         self._label = label
 
     def do(self, experiment: Experiment) -> str:
-        self._old_coords = self._segmentation_stack == self._label
+        # Store only the indices of the label, which is much smaller than a mask of the whole stack
+        old_indices = numpy.flatnonzero(self._segmentation_stack == self._label)
+        if self._segmentation_stack.size < numpy.iinfo(numpy.uint32).max:
+            old_indices = old_indices.astype(numpy.uint32)
+        self._old_indices = old_indices
 
-        self._segmentation_stack[self._old_coords] = 0
+        numpy.put(self._segmentation_stack, self._old_indices, 0)
         return "Deleted label " + str(self._label)
 
     def undo(self, experiment: Experiment) -> str:
-        self._segmentation_stack[self._old_coords] = self._label
+        numpy.put(self._segmentation_stack, self._old_indices, self._label)
         return "Restored label " + str(self._label)
 
+    def get_memory_usage_bytes(self) -> int:
+        return self._old_indices.nbytes if self._old_indices is not None else 0
+
 
 class _SetLabelAction(UndoableAction):
     """Action that adds a label to a segmentation stack."""
     _segmentation_stack: ndarray
-    _mask: ndarray
+    _mask: Union[ndarray, CompressedArray]  # Compressed once the action has been done
     _mask_x_start: int
     _mask_y_start: int
     _mask_z: int
     _label_to_modify: int
     _delete: bool
 
-    _old_crop: Optional[ndarray] = None  # Cropped area of the segmentation stack, filled in do()
+    _old_crop: Optional[CompressedArray] = None  # Cropped area of the segmentation stack, filled in do()
 
     def __init__(self, segmentation_stack: ndarray, mask: ndarray, mask_x_start: int, mask_y_start: int, mask_z: int,
                  label_to_modify: int, delete: bool):
@@ -76,29 +83,39 @@ class _SetLabelAction(UndoableAction):
         self._delete = delete
 
     def do(self, experiment: Experiment) -> str:
-        width = self._mask.shape[1]
-        height = self._mask.shape[0]
+        mask = self._mask.to_array() if isinstance(self._mask, CompressedArray) else self._mask
+        width = mask.shape[1]
+        height = mask.shape[0]
 
         segmentation_crop = self._segmentation_stack[self._mask_z, self._mask_y_start:self._mask_y_start + height,
                             self._mask_x_start:self._mask_x_start + width]
-        self._old_crop = segmentation_crop.copy()
+        self._old_crop = CompressedArray(segmentation_crop)
         if self._delete:
             # Remove parts of the mask that don't match the label
-            self._mask[segmentation_crop != self._label_to_modify] = 0
+            mask[segmentation_crop != self._label_to_modify] = 0
 
             # Then remove the mask from the segmentation
-            segmentation_crop[self._mask > 0] = 0
-            return "Deleted (part of) label " + str(self._label_to_modify)
+            segmentation_crop[mask > 0] = 0
+            message = "Deleted (part of) label " + str(self._label_to_modify)
         else:
-            segmentation_crop[self._mask > 0] = self._label_to_modify
-            return "Added/expanded segmentation mask with label " + str(self._label_to_modify)
+            segmentation_crop[mask > 0] = self._label_to_modify
+            message = "Added/expanded segmentation mask with label " + str(self._label_to_modify)
+        self._mask = CompressedArray(mask)
+        return message
 
     def undo(self, experiment: Experiment) -> str:
-        self._segmentation_stack[self._mask_z, self._mask_y_start:self._mask_y_start + self._mask.shape[0],
-        self._mask_x_start:self._mask_x_start + self._mask.shape[1]] = self._old_crop
+        height, width = self._mask.shape
+        self._segmentation_stack[self._mask_z, self._mask_y_start:self._mask_y_start + height,
+        self._mask_x_start:self._mask_x_start + width] = self._old_crop.to_array()
         self._old_crop = None
         return "Restored segmentation mask"
 
+    def get_memory_usage_bytes(self) -> int:
+        memory_usage_bytes = self._mask.nbytes
+        if self._old_crop is not None:
+            memory_usage_bytes += self._old_crop.nbytes
+        return memory_usage_bytes
+
 
 def _find_new_label(segmentation_image: ndarray) -> int:
     """Returns a new label that is not yet used in the segmentation image."""
@@ -6,6 +6,7 @@ import matplotlib.cm
 import matplotlib.colors
 import numpy
 import numpy as np
+from matplotlib.axes import Axes
 from matplotlib.backend_bases import MouseEvent
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
@@ -20,7 +21,7 @@ from organoid_tracker.gui.window import Window
 from organoid_tracker.linking_analysis import linking_markers, lineage_markers
 from organoid_tracker.linking_analysis.lineage_division_counter import get_min_division_count_in_lineage, \
     get_number_of_cells_at_end
-from organoid_tracker.linking_analysis.lineage_drawing import LineageDrawing
+from organoid_tracker.linking_analysis.lineage_drawing import LineageDrawing, LineageLayoutCache
 from organoid_tracker.linking_analysis.linking_markers import EndMarker
 from organoid_tracker.local_marginalization.tree_drawing import color_error_rates, compute_lineage_error_probability, \
     compute_track_error_probability
@@ -44,6 +45,11 @@ class LineageTreeVisualizer(Visualizer):
 
     _location_map: Optional[LocationMap] = None
     _track_to_manual_color: Dict[LinkingTrack, Color]
+    _lineage_layout_cache: LineageLayoutCache
+
+    # Only the lineages within this x range are drawn. The range is larger than the visible area, so that you can scroll
+    # a bit before the lineage trees need to be redrawn.
+    _drawn_x_range: Tuple[float, float] = (-numpy.inf, numpy.inf)
 
     _filter_min_division_count: int = 0
     _filter_cell_type: Optional[str] = None
@@ -68,6 +74,11 @@ class LineageTreeVisualizer(Visualizer):
     def __init__(self, window: Window):
         super().__init__(window)
         self._track_to_manual_color = dict()
+        self._lineage_layout_cache = LineageLayoutCache()
+
+    def detach(self):
+        super().detach()
+        self._lineage_layout_cache.watch(None)  # Otherwise the links would keep a reference to this cache
 
     def _allow_lineage_filtering(self) -> bool:
         """Intended to be overridden. Shows whether the lineage filtering options are accesible."""
@@ -329,6 +340,7 @@ class LineageTreeVisualizer(Visualizer):
             self._cbar = None
 
         experiment = self._experiment
+        self._lineage_layout_cache.watch(experiment.links)
         try:
             display_timings = experiment.images.timings()
         except UserError:
@@ -336,8 +348,6 @@ class LineageTreeVisualizer(Visualizer):
         positions = experiment.positions
 
         tracks = self._get_sorted_tracks()
-        if len(tracks) > 5000:
-            raise ValueError(f"Lineage tree is too complex to display ({len(tracks)} tracks)")
 
         self._calculate_track_colors()
         axis_positions, highest_axis_position = self._calculate_axis_positions_if_enabled()
@@ -379,13 +389,19 @@ class LineageTreeVisualizer(Visualizer):
 
             return 0, 0, 0  # Default is black
 
+        # Only draw the lineages that are visible, plus some margin at both sides
+        x_min, x_max = self._ax.get_xlim()
+        if (x_min, x_max) == (0, 1):
+            self._drawn_x_range = (-numpy.inf, numpy.inf)  # Axis limits not set yet, we'll zoom out to show everything
+        else:
+            visible_width = x_max - x_min
+            self._drawn_x_range = (x_min - visible_width, x_max + visible_width)
+
         self._location_map = LocationMap()
-        width = LineageDrawing(tracks).draw_lineages_colored(self._ax, color_getter=color_getter,
-                                                             timings=display_timings,
-                                                             location_map=self._location_map,
-                                                             lineage_filter=self._lineage_filter,
-                                                             label_getter=self._get_track_label,
-                                                             line_width=self._get_lineage_line_width())
+        width = LineageDrawing(tracks, layout_cache=self._lineage_layout_cache).draw_lineages_colored(
+            self._ax, color_getter=color_getter, timings=display_timings, location_map=self._location_map,
+            lineage_filter=self._lineage_filter, label_getter=self._get_track_label,
+            line_width=self._get_lineage_line_width(), visible_x_range=self._drawn_x_range)
 
         self._ax.set_xticks([])
         if self._ax.get_xlim() == (0, 1):
@@ -424,8 +440,15 @@ class LineageTreeVisualizer(Visualizer):
             self._cbar.ax.set_yticklabels(['>50%', '10%', '1%', '<0.1%'])
 
         self._draw_extra()
+        self._ax.callbacks.connect("xlim_changed", self._on_xlim_changed)  # Clearing the axis removed the callback
         self._fig.canvas.draw_idle()
 
+    def _on_xlim_changed(self, ax: Axes):
+        """Redraws the lineage trees if the user scrolled or zoomed to lineages that haven't been drawn yet."""
+        x_min, x_max = ax.get_xlim()
+        if x_min < self._drawn_x_range[0] or x_max > self._drawn_x_range[1]:
+            self.draw_view()
+
     def _draw_extra(self):
         pass  # Empty, but can be overridden
 
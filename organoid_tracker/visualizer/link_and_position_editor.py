@@ -2,7 +2,9 @@ import typing
 from collections import defaultdict
 from typing import Optional, List, Dict, Iterable, Tuple, Set
 
+import numpy
 from matplotlib.backend_bases import KeyEvent, MouseEvent, LocationEvent
+from numpy import ndarray
 
 from organoid_tracker import core
 from organoid_tracker.core import Color, UserError, TimePoint
@@ -15,7 +17,8 @@ from organoid_tracker.core.position import Position
 from organoid_tracker.core.resolution import ImageResolution
 from organoid_tracker.core.typing import DataType
 from organoid_tracker.gui import dialog, option_choose_dialog
-from organoid_tracker.gui.undo_redo import UndoableAction, ReversedAction, CombinedAction
+from organoid_tracker.gui.undo_redo import UndoableAction, ReversedAction, CombinedAction, \
+    ESTIMATED_BYTES_PER_POSITION
 from organoid_tracker.gui.window import Window
 from organoid_tracker.linking_analysis import cell_error_finder, linking_markers, track_positions_finder, \
     lineage_markers, lineage_error_finder
@@ -25,6 +28,7 @@ from organoid_tracker.linking_analysis.links_postprocessor import _add_out_of_vi
 from organoid_tracker.position_analysis import position_markers
 from organoid_tracker.visualizer import activate
 from organoid_tracker.visualizer.abstract_editor import AbstractEditor
+from organoid_tracker.visualizer.abstract_image_visualizer import PositionMarkerData
 
 
 class _InsertLinkAction(UndoableAction):
@@ -86,6 +90,9 @@ class _DeleteLinksAction(UndoableAction):
                 experiment.links.set_link_data(position1, position2, data_key, data_value)
         return f"Inserted {len(self.position_pairs)} links"
 
+    def get_memory_usage_bytes(self) -> int:
+        return len(self.position_pairs) * 2 * ESTIMATED_BYTES_PER_POSITION
+
 
 class _InsertPositionAction(UndoableAction):
     """Used to insert a position."""
@@ -136,6 +143,9 @@ class _DeletePositionsAction(UndoableAction):
         cell_error_finder.find_errors_in_positions_links_and_all_dividing_cells(experiment, restored_positions)
         return f"Added {len(self._snapshots)} positions"
 
+    def get_memory_usage_bytes(self) -> int:
+        return len(self._snapshots) * ESTIMATED_BYTES_PER_POSITION
+
 
 class _MovePositionAction(UndoableAction):
     """Used to move a position"""
@@ -212,6 +222,9 @@ class _MoveMultiplePositionsAction(UndoableAction):
         cell_error_finder.find_errors_in_positions_links_and_all_dividing_cells(experiment, self.old_positions)
         return f"Moved {len(new_positions)} position(s) back by ({self.dx:01}, {self.dy:01}, {self.dz:01})"
 
+    def get_memory_usage_bytes(self) -> int:
+        return len(self.old_positions) * ESTIMATED_BYTES_PER_POSITION
+
 
 class _MarkLineageEndAction(UndoableAction):
     """Used to add a marker to the end of a lineage."""
@@ -305,6 +318,9 @@ class _SetAllAsType(UndoableAction):
             position_markers.set_position_type(positions, position, self._previous_position_types.get(position))
         return f"Reset all positions to their previous type"
 
+    def get_memory_usage_bytes(self) -> int:
+        return len(self._previous_position_types) * ESTIMATED_BYTES_PER_POSITION
+
 
 class _SetLineageColor(UndoableAction):
     _track: LinkingTrack
@@ -445,14 +461,16 @@ class LinkAndPositionEditor(AbstractEditor):
 
         self._selected = list(selected_positions)
 
-    def _get_position_edge(self, position: Position) -> tuple[tuple[float, float, float], float]:
-        if self._displayed_error_focus_points is not None:
-            # We're focusing on certain tracks, so make them stand out
-            if position in self._displayed_error_focus_points:
-                return (0, 0, 0), 3
-            return (.2, .2, .2), 0.5
-        else:
-            return super()._get_position_edge(position)
+    def _get_position_edges(self, marker_data: PositionMarkerData, indices: ndarray) -> Tuple[ndarray, ndarray]:
+        if self._displayed_error_focus_points is None:
+            return super()._get_position_edges(marker_data, indices)
+
+        # We're focusing on certain tracks, so make them stand out
+        in_focus = numpy.fromiter((marker_data.positions[i] in self._displayed_error_focus_points for i in indices),
+                                  dtype=bool, count=len(indices))
+        edge_colors = numpy.repeat(numpy.where(in_focus, 0.0, 0.2)[:, numpy.newaxis], 3, axis=1)
+        edge_widths = numpy.where(in_focus, 3.0, 0.5)
+        return edge_colors, edge_widths
 
     def _get_figure_title(self) -> str:
         title_start = "Editing time point " + str(self._time_point.time_point_number()) + "    (z=" + \
@@ -466,7 +484,7 @@ class LinkAndPositionEditor(AbstractEditor):
         else:
             return title_start
 
-    def _draw_extra(self):
+    def _draw_selections(self):
         to_unselect = set()
         for i in range(len(self._selected)):
             selected = self._selected[i]
@@ -507,7 +525,7 @@ class LinkAndPositionEditor(AbstractEditor):
             self._selected.remove(new_selection)  # Deselect
         else:
             self._selected.append(new_selection)  # Select
-        self.draw_view()
+        self._redraw_selections()
 
         if len(self._selected) <= 2:
             selected_first = self._selected[0] if len(self._selected) > 0 else None
@@ -523,7 +541,7 @@ class LinkAndPositionEditor(AbstractEditor):
         new_selection = self._get_position_at(event.xdata, event.ydata)
         if new_selection is None:
             self._selected.clear()
-            self.draw_view()
+            self._redraw_selections()
             self.update_status("Unselected all cells.")
             return
 
@@ -986,7 +1004,7 @@ class LinkAndPositionEditor(AbstractEditor):
 
     def _deselect_all(self):
         self._selected.clear()
-        self.draw_view()
+        self._redraw_selections()
         self.update_status("Deselected all positions.")
 
     def _deselect_positions_from_time_points(self):
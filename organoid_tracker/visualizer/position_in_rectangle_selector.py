@@ -137,6 +137,11 @@ class PositionsInRectangleSelector(LinkAndPositionEditor):
         # Invisible, but it will be made visible when needed in on_mouse_move
         self._ax.add_artist(self._selection_rectangle)
 
+        # Draw selection start marker
+        if self._min_position is not None and self._max_position is None:
+            self._ax.scatter([self._min_position.x], [self._min_position.y], color=core.COLOR_CELL_CURRENT, s=50, marker="+")
+
+    def _draw_selections(self):
         # Draw positions already selected
         time_point_number = self._time_point.time_point_number()
         to_unselect = set()
@@ -153,10 +158,6 @@ class PositionsInRectangleSelector(LinkAndPositionEditor):
         if len(to_unselect) > 0:
             self._selected = [element for element in self._selected if element not in to_unselect]
 
-        # Draw selection start marker
-        if self._min_position is not None and self._max_position is None:
-            self._ax.scatter([self._min_position.x], [self._min_position.y], color=core.COLOR_CELL_CURRENT, s=50, marker="+")
-
     def _set_min_max_position(self, pos1: Position, pos2: Position):
         """Sets the minimum and maximum positions, such that the lowest x,y,z,t ends up in the lowest pos, and vice
         versa."""
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""Measures how long it takes to save and load a large GEFF file. The GEFF file from the tests folder (the C. elegans
+embryo from the Cell Tracking Challenge) is copied a number of times, with every copy placed next to the previous one,
+to get a data set with millions of positions and links."""
+import os
+import tempfile
+import time
+
+from organoid_tracker.config import ConfigFile, config_type_int
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.position import Position
+from organoid_tracker.imaging import geff_io
+
+# PARAMETERS
+print("Hi! Configuration file is stored at " + ConfigFile.FILE_NAME)
+config = ConfigFile("benchmark_geff")
+_geff_file = config.get_or_default("geff_file", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests",
+                                                             "resources", "Fluo-N3DH-CE 01_GT.geff"))
+_copies = config.get_or_default("copies", "100", comment="Number of copies of the data set to make.",
+                                type=config_type_int)
+_chunk_size = config.get_or_default("chunk_size", "0", comment="Number of nodes or edges per chunk. Use 0 to let"
+                                    " zarr decide.", type=config_type_int)
+config.save_and_exit_if_changed()
+# END OF PARAMETERS
+
+
+def _scale_up(experiment: Experiment, copies: int) -> Experiment:
+    """Places copies of the experiment next to each other in the x direction."""
+    min_x = min(position.x for position in experiment.positions)
+    width_x = max(position.x for position in experiment.positions) - min_x + 10
+    links = list(experiment.links.find_all_links())
+
+    scaled_up = Experiment()
+    scaled_up_links = list()
+    for i in range(copies):
+        dx = i * width_x
+        for time_point in experiment.positions.time_points():
+            positions = list(experiment.positions.of_time_point(time_point))
+            metadata = experiment.positions.create_time_point_dict(time_point, positions)
+            moved_positions = [position.with_offset(dx, 0, 0) for position in positions]
+            scaled_up.positions.add_data_from_time_point_dict(time_point, moved_positions, metadata)
+        scaled_up_links += [(position1.with_offset(dx, 0, 0), position2.with_offset(dx, 0, 0))
+                             for position1, position2 in links]
+    scaled_up.links.add_links_from_list(scaled_up_links)
+    return scaled_up
+
+
+def _get_folder_size_mb(folder: str) -> float:
+    size = 0
+    for root, _, files in os.walk(folder):
+        for file in files:
+            size += os.path.getsize(os.path.join(root, file))
+    return size / 1024 / 1024
+
+
+print("Building the data set...")
+_experiment = _scale_up(geff_io.load_data_file(_geff_file), _copies)
+_position_count = len(_experiment.positions)
+_link_count = len(_experiment.links)
+print(f"Data set has {_position_count} positions and {_link_count} links.")
+
+print()
+print("Compression | Save (s) | Load (s) | Size (MB)")
+with tempfile.TemporaryDirectory() as folder:
+    for compression_name, compressors in [("default", "auto"), ("none", None)]:
+        file_name = os.path.join(folder, f"benchmark_{compression_name}.geff")
+
+        start_time = time.perf_counter()
+        geff_io.save_data_file(_experiment, file_name, chunk_size=_chunk_size if _chunk_size > 0 else None,
+                               compressors=compressors)
+        save_time_s = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        reloaded = geff_io.load_data_file(file_name)
+        load_time_s = time.perf_counter() - start_time
+        if len(reloaded.positions) != _position_count or len(reloaded.links) != _link_count:
+            raise ValueError("Round trip failed: the reloaded data is different")
+
+        print(f"{compression_name:11} | {save_time_s:8.2f} | {load_time_s:8.2f} | {_get_folder_size_mb(file_name):9.1f}")
+print("Done!")
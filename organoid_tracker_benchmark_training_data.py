@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""Measures how fast the training samples for the neural networks are generated, for different numbers of DataLoader
+worker processes. No neural network is trained; the samples are simply generated and thrown away. Useful to find out
+whether training is limited by the sample generation (loading images, augmentations) or by the neural network."""
+import _keras_environment
+_keras_environment.activate()
+
+import time
+
+from organoid_tracker.config import ConfigFile, config_type_image_shape_xyz_to_zyx, config_type_int
+from organoid_tracker.imaging import list_io
+from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import create_image_cache
+
+# PARAMETERS
+print("Hi! Configuration file is stored at " + ConfigFile.FILE_NAME)
+config = ConfigFile("benchmark_training_data")
+dataset_file = config.get_or_prompt("dataset_file", "Please paste the path here to the dataset file."
+                                     " You can generate such a file from OrganoidTracker using File -> Tabs -> "
+                                     " all tabs.", store_in_defaults=True)
+network_type = config.get_or_default("network_type", "divisions", comment="For which network the training samples"
+                                     " are generated. Use \"positions\", \"divisions\" or \"links\".")
+time_window = (int(config.get_or_default(f"time_window_before", str(-1))),
+               int(config.get_or_default(f"time_window_after", str(1))))
+patch_shape_zyx = list(
+    config.get_or_default("patch_shape", "32, 32, 16", comment="Size in pixels (x, y, z) of the patches.",
+                          type=config_type_image_shape_xyz_to_zyx))
+batch_size = config.get_or_default("batch_size", "64", type=config_type_int)
+batches_to_measure = config.get_or_default("batches_to_measure", "50", comment="Number of batches that are generated"
+                                           " for every number of workers.", type=config_type_int)
+worker_counts = [int(count) for count in config.get_or_default(
+    "worker_counts", "1, 4, 8", comment="Numbers of DataLoader worker processes to measure. 0 means that the samples"
+                                        " are generated in the main process.").split(",")]
+image_cache_folder = config.get_or_default("image_cache_folder", "", comment="Optional folder for the image cache, see"
+                                                                             " the training scripts.")
+config.save_and_exit_if_changed()
+# END OF PARAMETERS
+
+experiment_provider = list_io.load_experiment_list_file(dataset_file)
+if network_type == "positions":
+    from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import \
+        create_image_with_positions_list
+    from organoid_tracker.neural_network.position_detection_cnn.training_dataset import training_data_creator_from_raw
+    sample_list = create_image_with_positions_list(experiment_provider)
+    cache_time_window = time_window
+elif network_type == "divisions":
+    from organoid_tracker.neural_network.division_detection_cnn.training_data_creator import \
+        create_image_with_divisions_list
+    from organoid_tracker.neural_network.division_detection_cnn.training_dataset import training_data_creator_from_raw
+    sample_list = create_image_with_divisions_list(experiment_provider)
+    cache_time_window = time_window
+elif network_type == "links":
+    from organoid_tracker.neural_network.link_detection_cnn.training_data_creator import create_image_with_links_list
+    from organoid_tracker.neural_network.link_detection_cnn.training_dataset import training_data_creator_from_raw
+    sample_list = create_image_with_links_list(experiment_provider)
+    cache_time_window = (min(time_window[0], 1 - time_window[1]), max(time_window[1], 1 - time_window[0]))
+else:
+    raise ValueError(f"Unknown network type: {network_type}")
+
+if image_cache_folder:
+    print("Writing images to the image cache...")
+    create_image_cache(sample_list, image_cache_folder, time_window=cache_time_window)
+
+results = dict()
+for worker_count in worker_counts:
+    print(f"Measuring with {worker_count} workers...")
+    data_loader = training_data_creator_from_raw(sample_list, time_window=time_window, patch_shape=patch_shape_zyx,
+                                                 batch_size=batch_size, mode="train", split_proportion=1,
+                                                 num_workers=worker_count)
+    iterator = iter(data_loader)
+    next(iterator)  # Don't measure the startup time of the workers
+
+    start_time = time.perf_counter()
+    for _ in range(batches_to_measure):
+        next(iterator)
+    elapsed_seconds = time.perf_counter() - start_time
+    del iterator, data_loader
+
+    results[worker_count] = batches_to_measure * batch_size / elapsed_seconds
+
+print()
+print("Workers | Samples per second")
+for worker_count, samples_per_second in results.items():
+    print(f"{worker_count:7} | {samples_per_second:.1f}")
+print("Done!")
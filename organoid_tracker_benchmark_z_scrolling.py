@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""Measures how long it takes to load a 2D image slice from a merged TIFF file, like when you're scrolling through the
+z-stack in the visualizer. Both the memory-mapped reading (used for uncompressed files) and the normal reading through
+tifffile are measured. No image cache is used, so every slice is read from the file."""
+import time
+
+import numpy
+
+from organoid_tracker.config import ConfigFile, config_type_int
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.image_loader import ImageChannel
+from organoid_tracker.image_loading import merged_tiff_image_loader
+
+# PARAMETERS
+print("Hi! Configuration file is stored at " + ConfigFile.FILE_NAME)
+config = ConfigFile("benchmark_z_scrolling")
+_images_file = config.get_or_prompt("images_file", "Please paste the path to the TIFF file here.",
+                                    store_in_defaults=True)
+_time_points_to_measure = config.get_or_default("time_points_to_measure", "5", comment="For this many time points"
+                                                " (starting at the first), all z-slices are loaded.",
+                                                type=config_type_int)
+_channel = ImageChannel(index_one=config.get_or_default("channel", "1", type=config_type_int))
+config.save_and_exit_if_changed()
+# END OF PARAMETERS
+
+
+def _measure_latencies_ms(use_memmap: bool) -> numpy.ndarray:
+    experiment = Experiment()
+    merged_tiff_image_loader.load_from_tif_file(experiment, _images_file, use_memmap=use_memmap)
+    image_loader = experiment.images.image_loader()  # Note: this returns the loader without the image cache
+    image_size_z = image_loader.get_image_size_zyx()[0]
+    first_time_point_number = image_loader.first_time_point_number()
+    last_time_point_number = min(image_loader.last_time_point_number(),
+                                 first_time_point_number + _time_points_to_measure - 1)
+
+    latencies_ms = list()
+    for time_point_number in range(first_time_point_number, last_time_point_number + 1):
+        for image_z in range(image_size_z):
+            start_time = time.perf_counter()
+            array = image_loader.get_2d_image_array(TimePoint(time_point_number), _channel, image_z)
+            numpy.max(array)  # Makes sure that the pixels are actually read, also for memory maps
+            latencies_ms.append((time.perf_counter() - start_time) * 1000)
+    image_loader.close()
+    return numpy.array(latencies_ms)
+
+
+print("Warming up the OS file cache...")
+_measure_latencies_ms(use_memmap=False)
+
+print()
+print("Reading method | Mean (ms) | Median (ms) | Max (ms)")
+for method_name, use_memmap in [("tifffile", False), ("memory map", True)]:
+    latencies_ms = _measure_latencies_ms(use_memmap=use_memmap)
+    print(f"{method_name:14} | {latencies_ms.mean():9.3f} | {numpy.median(latencies_ms):11.3f} |"
+          f" {latencies_ms.max():8.3f}")
+print("Done! (For compressed files, the memory map cannot be used, so both methods will give the same results.)")
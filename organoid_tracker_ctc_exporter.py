@@ -1,4 +1,4 @@
-from organoid_tracker.config import ConfigFile
+from organoid_tracker.config import ConfigFile, config_type_bool, config_type_int
 from organoid_tracker.image_loading import general_image_loader
 from organoid_tracker.imaging import io
 from organoid_tracker.imaging.ctc_io import save_data_files
@@ -21,6 +21,14 @@ _max_time_point = int(config.get_or_default("max_time_point", str(9999), store_i
 
 _output_folder = config.get_or_default("output_folder", "_RES", comment="Output file for the cell cycles.")
 _mask_size_um = float(config.get_or_default("mask_size_um", str(7)))
+_workers = config.get_or_default("workers", str(4), type=config_type_int,
+                                 comment="Number of time points that are exported at the same time.")
+_local_watershed = config.get_or_default("local_watershed", str(False), type=config_type_bool,
+                                         comment="Whether the watershed (used to separate touching cells) is calculated"
+                                                 " only around each group of touching cells. Faster for sparse"
+                                                 " images.")
+_compress = config.get_or_default("compress", str(False), type=config_type_bool,
+                                  comment="Whether the images are saved with lossless compression.")
 
 config.save_and_exit_if_changed()
 
@@ -30,6 +38,7 @@ general_image_loader.load_images(experiment, _images_folder, _images_format,
                                  min_time_point=_min_time_point, max_time_point=_max_time_point)
 
 print("start saving")
-save_data_files(experiment, _output_folder, mask_size_um=_mask_size_um)
+save_data_files(experiment, _output_folder, mask_size_um=_mask_size_um, workers=_workers,
+                local_watershed=_local_watershed, compress=_compress)
 
 print("Exported all positions")
@@ -1,7 +1,7 @@
 from organoid_tracker.core.connections import Connections
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.gui import dialog
-from organoid_tracker.gui.undo_redo import UndoableAction
+from organoid_tracker.gui.undo_redo import UndoableAction, ESTIMATED_BYTES_PER_POSITION
 from organoid_tracker.gui.window import Window
 
 
@@ -33,6 +33,9 @@ class _ReplaceConnectionsAction(UndoableAction):
         experiment.connections = self._old_connections
         return "Restored the previous connections"
 
+    def get_memory_usage_bytes(self) -> int:
+        return (len(self._old_connections) + len(self._new_connections)) * 2 * ESTIMATED_BYTES_PER_POSITION
+
 
 def _connect_positions_by_distance(window: Window):
     """Strictly by distance."""
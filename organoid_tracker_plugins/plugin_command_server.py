@@ -0,0 +1,72 @@
+"""Called using `python organoid_tracker.py command_server`. Starts a server that keeps running, and that runs the
+organoid_tracker_*.py scripts and the commands of the plugins in this folder on request. Libraries and neural network
+models are then loaded only once, instead of once per script. Jobs are submitted from another terminal using
+`python organoid_tracker.py submit <script or command> [arguments...]`, for example
+`python organoid_tracker.py submit predict_positions`. To stop the server, submit `stop_server`.
+
+See organoid_tracker.util.command_server for more details."""
+import os
+from typing import Dict, Callable, List
+
+from organoid_tracker.util import command_server
+
+# The model loading functions of which the results are kept in memory
+_MODEL_LOADERS = [
+    ("organoid_tracker.neural_network.position_detection_cnn.position_predictor", "load_position_model"),
+    ("organoid_tracker.neural_network.link_detection_cnn.link_predictor", "load_link_model"),
+    ("organoid_tracker.neural_network.division_detection_cnn.division_predictor", "load_division_model"),
+]
+
+
+def get_commands() -> Dict[str, Callable[[List[str]], int]]:
+    return {
+        "command_server": _start_server,
+        "submit": _submit
+    }
+
+
+def _start_server(args: List[str]) -> int:
+    plugin_folder = os.path.dirname(os.path.abspath(__file__))
+    scripts_folder = os.path.dirname(plugin_folder)
+
+    print("Importing neural network libraries...")
+    _prepare_neural_networks()
+
+    # Make the commands of all other plugins available
+    from organoid_tracker.plugin.plugin_manager import PluginManager, STANDARD_PLUGIN_MANIFEST_FILE
+    plugin_manager = PluginManager(STANDARD_PLUGIN_MANIFEST_FILE)
+    plugin_manager.load_folder(plugin_folder, built_in_folder=True)
+    commands = dict()
+    for plugin in plugin_manager.get_plugins():
+        commands.update(plugin.get_commands())
+    for own_command in get_commands().keys():
+        del commands[own_command]
+
+    command_server.CommandServer(scripts_folder, commands).serve_forever()
+    return 0
+
+
+def _prepare_neural_networks():
+    """Imports Keras and the prediction code, so that the first job doesn't need to do that. Also makes sure that
+    models stay in memory."""
+    import importlib
+    try:
+        import _keras_environment  # In the same folder as organoid_tracker.py
+        _keras_environment.activate()
+        for module_name, function_name in _MODEL_LOADERS:
+            command_server.keep_loaded_models_in_memory(importlib.import_module(module_name), function_name)
+    except ImportError as e:
+        print(f"Cannot load neural network libraries ({e}), scripts that need them will not work.")
+
+
+def _submit(args: List[str]) -> int:
+    if len(args) == 0:
+        print("Usage: python organoid_tracker.py submit <script or command> [arguments...]")
+        print("For example, use `submit predict_positions` to run organoid_tracker_predict_positions.py, or"
+              " `submit " + command_server.STOP_JOB_NAME + "` to stop the server.")
+        return 1
+    try:
+        return command_server.submit_job(args[0], args[1:])
+    except ConnectionError as e:
+        print(e)
+        return 1
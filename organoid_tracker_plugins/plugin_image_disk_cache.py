@@ -0,0 +1,26 @@
+"""Shows how well the on-disk image cache works. See organoid_tracker.image_loading.disk_cached_image_loader for how to
+enable that cache."""
+from typing import Dict, Any
+
+from organoid_tracker.gui import dialog
+from organoid_tracker.gui.window import Window
+
+
+def get_menu_items(window: Window) -> Dict[str, Any]:
+    return {
+        "View//Image-Image disk cache statistics...": lambda: _show_statistics(window)
+    }
+
+
+def _show_statistics(window: Window):
+    from organoid_tracker.image_loading import disk_cached_image_loader
+
+    cache = disk_cached_image_loader.get_configured_cache()
+    if cache is None:
+        dialog.popup_message("Image disk cache", "The image disk cache is disabled. To enable it, set"
+                             " image_disk_cache_folder in the DEFAULTS section of the organoid_tracker.ini file.\n\n"
+                             "The cache stores decoded images of LIF, CZI, ND2 and IMS files, so that they load faster"
+                             " next time.")
+        return
+    dialog.popup_message("Image disk cache", f"Cache folder: {cache.get_folder()}\n\n"
+                                             f"Since the program started: {cache.get_statistics()}.")
@@ -0,0 +1,37 @@
+"""Called using `python organoid_tracker.py profile_plugin_imports [extra_plugin_folder ...]`. Reports how long it
+takes to import each plugin, and which imports make it slow. Useful to find out why the program starts slowly."""
+import os
+from typing import Dict, Callable, List
+
+from organoid_tracker.plugin import import_profiler
+
+_SHOWN_IMPORTS_PER_PLUGIN = 3
+
+
+def get_commands() -> Dict[str, Callable[[List[str]], int]]:
+    return {
+        "profile_plugin_imports": _profile_plugin_imports
+    }
+
+
+def _profile_plugin_imports(args: List[str]) -> int:
+    folders = [os.path.dirname(os.path.abspath(__file__))] + [os.path.expandvars(arg) for arg in args]
+
+    for folder in folders:
+        if not os.path.isdir(folder):
+            print("Not a folder: " + folder)
+            return 1
+
+        print(f"Import times of the plugins in {folder}:")
+        print()
+        print("Import time (ms) | Plugin | Slowest imports (ms)")
+        for profile in import_profiler.profile_plugin_imports_in_folder(folder):
+            slowest_imports = ", ".join(f"{import_time.module_name} ({import_time.cumulative_us / 1000:.0f})"
+                                        for import_time in profile.slowest_imports[0:_SHOWN_IMPORTS_PER_PLUGIN])
+            if profile.error != "":
+                slowest_imports = "Failed: " + profile.error
+            print(f"{profile.total_ms:16.1f} | {os.path.basename(profile.file_path)} | {slowest_imports}")
+        print()
+    print("Note: modules shared by multiple plugins are counted for every plugin. Plugins that are listed in the plugin"
+          " manifest are only imported once they're used.")
+    return 0
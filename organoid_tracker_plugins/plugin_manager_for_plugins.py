@@ -6,6 +6,9 @@ from organoid_tracker.config import ConfigFile
 from organoid_tracker.gui import action, dialog, APP_NAME
 from organoid_tracker.gui.window import Window
 
+# The menu items depend on the plugin folders, so they cannot be stored in the plugin manifest
+LAZY_LOADING = False
+
 
 def get_menu_items(window: Window) -> Dict[str, Any]:
     return_dict = dict()
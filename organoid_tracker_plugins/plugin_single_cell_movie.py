@@ -3,11 +3,13 @@ from typing import Dict, Any, Iterable, Optional
 import numpy
 import tifffile
 from matplotlib.backend_bases import MouseEvent
+from numpy import ndarray
 
 from organoid_tracker import core
 from organoid_tracker.core import TimePoint, UserError
 from organoid_tracker.core.experiment import Experiment
 from organoid_tracker.core.image_loader import ImageChannel
+from organoid_tracker.core.images import Images
 from organoid_tracker.core.links import LinkingTrack
 from organoid_tracker.core.position import Position
 from organoid_tracker.gui import dialog, worker_job
@@ -156,6 +158,38 @@ def _find_average_position(origin_track: LinkingTrack, time_point: TimePoint) ->
     return Position(avg_x, avg_y, avg_z, time_point=time_point)
 
 
+def _load_crop(images: Images, time_point: TimePoint, channel: ImageChannel, position: Position, crop_size_xy_px: int
+               ) -> Optional[ndarray]:
+    """Loads a 2D crop around the given position. Parts outside the image are zero. Returns None if there is no image
+    at that time point or z."""
+    offset = images.offsets.of_time_point(time_point)
+    image_z = int(round(position.z) - offset.z)
+    min_x = round(position.x - offset.x) - crop_size_xy_px // 2
+    min_y = round(position.y - offset.y) - crop_size_xy_px // 2
+
+    if next(iter(images.filters.of_channel(channel)), None) is None:
+        # No filters, so we can read just the cropped region instead of the full slice
+        if image_z < 0:
+            return None
+        region = images.get_image_region(time_point, channel, numpy.s_[
+            image_z:image_z + 1,
+            max(min_y, 0):max(min_y + crop_size_xy_px, 0),
+            max(min_x, 0):max(min_x + crop_size_xy_px, 0)])
+        if region is None or len(region) == 0:
+            return None
+        image_2d = region[0]
+        min_x, min_y = min(min_x, 0), min(min_y, 0)  # Now relative to the region
+    else:
+        # The filters need the full slice
+        image_2d = images.get_image_slice_2d(time_point, channel, round(position.z))
+        if image_2d is None:
+            return None
+
+    crop = numpy.zeros((crop_size_xy_px, crop_size_xy_px), dtype=image_2d.dtype)
+    cropper.crop_2d(image_2d, min_x, min_y, crop)
+    return crop
+
+
 class _ExportMovieJob(WorkerJob):
 
     _origin_position: Position
@@ -192,22 +226,15 @@ class _ExportMovieJob(WorkerJob):
             if average_position is None:
                 continue
 
-            # Load the image slice
-            image_2d = experiment_copy.images.get_image_slice_2d(time_point, self._channel, round(average_position.z))
-            if image_2d is None:
+            crop = _load_crop(experiment_copy.images, time_point, self._channel, average_position,
+                              self._crop_size_xy_px)
+            if crop is None:
                 continue
 
             # Initialize the array on the first successful image load (now that we know the dtype)
             if array is None:
-                array = numpy.zeros((time_point_count, self._crop_size_xy_px, self._crop_size_xy_px), dtype=image_2d.dtype)
-
-            # Crop around the average position
-            offset = experiment_copy.images.offsets.of_time_point(time_point)
-            center_x = round(average_position.x - offset.x)
-            center_y = round(average_position.y - offset.y)
-            min_x = center_x - self._crop_size_xy_px // 2
-            min_y = center_y - self._crop_size_xy_px // 2
-            cropper.crop_2d(image_2d, min_x, min_y, array[i])
+                array = numpy.zeros((time_point_count, self._crop_size_xy_px, self._crop_size_xy_px), dtype=crop.dtype)
+            array[i] = crop
 
         return array
 
@@ -22,6 +22,7 @@ from organoid_tracker.neural_network.division_detection_cnn.convolutional_neural
 from organoid_tracker.neural_network.division_detection_cnn.training_data_creator import \
     create_image_with_divisions_list
 from organoid_tracker.neural_network.division_detection_cnn.training_dataset import training_data_creator_from_raw
+from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import create_image_cache
 from organoid_tracker.neural_network.log_memory_callback import LogMemoryCallback
 
 # PARAMETERS
@@ -53,6 +54,15 @@ learning_rate = config.get_or_default("learning_rate", "0.0003", comment="The le
                                type=config_type_float)
 patience = config.get_or_default("patience", "2", comment="Number of epochs with no improvement after which training will be stopped.",
                                 type=config_type_int)
+image_cache_folder = config.get_or_default("image_cache_folder", "", comment="Optional folder on a fast local disk."
+                                            " If set, all training images are first written there as uncompressed"
+                                            " files, and patches are read directly from those files during training."
+                                            " Images are written again if the image files, the channel settings"
+                                            " or the image filters change. The old images are not removed, so"
+                                            " delete the folder now and then.")
+data_loader_workers = config.get_or_default("data_loader_workers", "0", comment="Number of worker processes that"
+                                             " generate the training samples. 0 means that the samples are generated"
+                                             " in the main process.", type=config_type_int)
 config.save_and_exit_if_changed()
 # END OF PARAMETERS
 
@@ -61,6 +71,9 @@ experiment_provider = list_io.load_experiment_list_file(dataset_file)
 
 # Create a list of images and annotated positions
 image_with_divisions_list = create_image_with_divisions_list(experiment_provider, full_window=full_window)
+if image_cache_folder:
+    print("Writing images to the image cache...")
+    create_image_cache(image_with_divisions_list, image_cache_folder, time_window=time_window)
 
 # shuffle training/validation data
 random.seed("using a fixed seed to ensure reproducibility")
@@ -74,10 +87,10 @@ for image_with_divisions in image_with_divisions_list[-round(0.2*len(image_with_
 # create tf.datasets that generate the data
 training_dataset = training_data_creator_from_raw(image_with_divisions_list, time_window=time_window,
                                                   patch_shape=patch_shape_zyx, batch_size=batch_size, mode='train',
-                                                  split_proportion=0.8)
+                                                  split_proportion=0.8, num_workers=data_loader_workers)
 validation_dataset = training_data_creator_from_raw(image_with_divisions_list, time_window=time_window,
                                                     patch_shape=patch_shape_zyx, batch_size=batch_size,
-                                                    mode='validation', split_proportion=0.8)
+                                                    mode='validation', split_proportion=0.8, num_workers=data_loader_workers)
 
 # Load model
 pretrained_model_path = config.get_or_default("pretrained_model_path", "", 
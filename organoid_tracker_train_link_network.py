@@ -24,6 +24,7 @@ from organoid_tracker.neural_network.dataset_transforms import LimitingDataset
 from organoid_tracker.neural_network.link_detection_cnn.convolutional_neural_network import build_model, load_pretrained_model
 from organoid_tracker.neural_network.link_detection_cnn.training_data_creator import create_image_with_links_list
 from organoid_tracker.neural_network.link_detection_cnn.training_dataset import training_data_creator_from_raw
+from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import create_image_cache
 from organoid_tracker.neural_network.log_memory_callback import LogMemoryCallback
 
 # PARAMETERS
@@ -52,6 +53,15 @@ learning_rate = config.get_or_default("learning_rate", "0.00003", comment="The l
                                type=config_type_float)
 patience = config.get_or_default("patience", "2", comment="Number of epochs to wait before stopping training if no improvement is seen.",
                                  type=config_type_int)
+image_cache_folder = config.get_or_default("image_cache_folder", "", comment="Optional folder on a fast local disk."
+                                            " If set, all training images are first written there as uncompressed"
+                                            " files, and patches are read directly from those files during training."
+                                            " Images are written again if the image files, the channel settings"
+                                            " or the image filters change. The old images are not removed, so"
+                                            " delete the folder now and then.")
+data_loader_workers = config.get_or_default("data_loader_workers", "0", comment="Number of worker processes that"
+                                             " generate the training samples. 0 means that the samples are generated"
+                                             " in the main process.", type=config_type_int)
 config.save_and_exit_if_changed()
 # END OF PARAMETERS
 
@@ -61,6 +71,11 @@ experiment_provider = list_io.load_experiment_list_file(dataset_file)
 
 # Create a list of images and annotated positions
 image_with_links_list = create_image_with_links_list(experiment_provider)
+if image_cache_folder:
+    # The target images are loaded for the time window mirrored around the next time point
+    print("Writing images to the image cache...")
+    create_image_cache(image_with_links_list, image_cache_folder,
+                       time_window=(min(time_window[0], 1 - time_window[1]), max(time_window[1], 1 - time_window[0])))
 
 # shuffle training/validation data
 random.seed("using a fixed seed to ensure reproducibility")
@@ -82,10 +97,10 @@ number_of_postions = np.mean(number_of_postions)
 
 training_dataset = training_data_creator_from_raw(image_with_links_list, time_window=time_window,
                                                   patch_shape=patch_shape_zyx, batch_size=batch_size, mode='train',
-                                                  split_proportion=0.8)
+                                                  split_proportion=0.8, num_workers=data_loader_workers)
 validation_dataset = training_data_creator_from_raw(image_with_links_list, time_window=time_window,
                                                     patch_shape=patch_shape_zyx, batch_size=batch_size,
-                                                    mode='validation', split_proportion=0.8)
+                                                    mode='validation', split_proportion=0.8, num_workers=data_loader_workers)
 
 debug_sample = next(iter(training_dataset))
 print(debug_sample)
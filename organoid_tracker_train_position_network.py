@@ -17,7 +17,8 @@ from organoid_tracker.neural_network.position_detection_cnn.training_inspection_
 from organoid_tracker.config import ConfigFile, config_type_int
 from organoid_tracker.neural_network.log_memory_callback import LogMemoryCallback
 from organoid_tracker.neural_network.position_detection_cnn.convolutional_neural_network import build_model, load_pretrained_model
-from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import create_image_with_positions_list
+from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import create_image_with_positions_list, \
+    create_image_cache
 from organoid_tracker.neural_network.position_detection_cnn.training_dataset import training_data_creator_from_raw
 
 
@@ -49,6 +50,15 @@ learning_rate = config.get_or_default("learning_rate", "0.0005", comment="The le
                                type=config_type_float)
 patience = config.get_or_default("patience", "1", comment="Number of epochs to wait before stopping training if no improvement is seen.",
                                  type=config_type_int)
+image_cache_folder = config.get_or_default("image_cache_folder", "", comment="Optional folder on a fast local disk."
+                                            " If set, all training images are first written there as uncompressed"
+                                            " files, and patches are read directly from those files during training."
+                                            " Images are written again if the image files, the channel settings"
+                                            " or the image filters change. The old images are not removed, so"
+                                            " delete the folder now and then.")
+data_loader_workers = config.get_or_default("data_loader_workers", "0", comment="Number of worker processes that"
+                                             " generate the training samples. 0 means that the samples are generated"
+                                             " in the main process.", type=config_type_int)
 config.save_and_exit_if_changed()
 # END OF PARAMETERS
 
@@ -57,6 +67,9 @@ experiment_provider = list_io.load_experiment_list_file(dataset_file)
 
 # Create a list of images and annotated positions
 image_with_positions_list = create_image_with_positions_list(experiment_provider)
+if image_cache_folder:
+    print("Writing images to the image cache...")
+    create_image_cache(image_with_positions_list, image_cache_folder, time_window=time_window)
 
 # shuffle training/validation data
 seed = 42
@@ -66,10 +79,10 @@ random.shuffle(image_with_positions_list)
 # create datasets that generate the data
 training_dataset = training_data_creator_from_raw(image_with_positions_list, time_window=time_window, seed=seed,
                                                   patch_shape=patch_shape_zyx, batch_size=batch_size, mode='train',
-                                                  split_proportion=0.8, crop=True)
+                                                  split_proportion=0.8, crop=True, num_workers=data_loader_workers)
 validation_dataset = training_data_creator_from_raw(image_with_positions_list, time_window=time_window, seed=seed,
                                                     patch_shape=patch_shape_zyx, batch_size=batch_size,
-                                                    mode='validation', split_proportion=0.8, crop=True)
+                                                    mode='validation', split_proportion=0.8, crop=True, num_workers=data_loader_workers)
 
 
 print("Defining model...")
@@ -0,0 +1,118 @@
+import unittest
+from typing import List
+
+from organoid_tracker.core.beacon_collection import BeaconCollection
+from organoid_tracker.core.change_events import ChangeEvent, ChangeType
+from organoid_tracker.core.connections import Connections
+from organoid_tracker.core.links import Links
+from organoid_tracker.core.position import Position
+from organoid_tracker.core.position_collection import PositionCollection
+
+
+class TestChangeEvents(unittest.TestCase):
+
+    def test_positions(self):
+        positions = PositionCollection()
+        events: List[ChangeEvent] = []
+        positions.add_change_listener(events.append)
+
+        position = Position(0, 0, 0, time_point_number=2)
+        moved_position = Position(1, 0, 0, time_point_number=2)
+        positions.add(position)
+        positions.set_position_data(position, "size", 3)
+        positions.move_position(position, moved_position)
+        positions.detach_position(moved_position)
+
+        self.assertEqual([
+            ChangeEvent(ChangeType.POSITION_ADDED, 2, position),
+            ChangeEvent(ChangeType.POSITION_DATA_CHANGED, 2, position, data_name="size"),
+            ChangeEvent(ChangeType.POSITION_MOVED, 2, position, moved_position),
+            ChangeEvent(ChangeType.POSITION_REMOVED, 2, moved_position)
+        ], events)
+
+    def test_nothing_removed_no_event(self):
+        positions = PositionCollection()
+        events: List[ChangeEvent] = []
+        positions.add_change_listener(events.append)
+
+        positions.detach_position(Position(0, 0, 0, time_point_number=2))
+        self.assertEqual([], events)
+
+    def test_remove_listener(self):
+        positions = PositionCollection()
+        events: List[ChangeEvent] = []
+        positions.add_change_listener(events.append)
+        positions.remove_change_listener(events.append)
+
+        positions.add(Position(0, 0, 0, time_point_number=2))
+        self.assertEqual([], events)
+
+    def test_links(self):
+        links = Links()
+        events: List[ChangeEvent] = []
+        links.add_change_listener(events.append)
+
+        position1 = Position(0, 0, 0, time_point_number=0)
+        position2 = Position(1, 0, 0, time_point_number=1)
+        links.add_link(position2, position1)  # Reported with the earliest position first
+        links.remove_link(position1, position2)
+        links.remove_link(position1, position2)  # Link no longer exists, so no event
+
+        self.assertEqual([
+            ChangeEvent(ChangeType.LINK_ADDED, 0, position1, position2),
+            ChangeEvent(ChangeType.LINK_REMOVED, 0, position1, position2)
+        ], events)
+
+    def test_links_of_removed_position(self):
+        links = Links()
+        position1 = Position(0, 0, 0, time_point_number=0)
+        position2 = Position(1, 0, 0, time_point_number=1)
+        position3 = Position(2, 0, 0, time_point_number=2)
+        links.add_link(position1, position2)
+        links.add_link(position2, position3)
+        events: List[ChangeEvent] = []
+        links.add_change_listener(events.append)
+
+        links.remove_links_of_position(position2)
+        self.assertEqual({
+            ChangeEvent(ChangeType.LINK_REMOVED, 0, position1, position2),
+            ChangeEvent(ChangeType.LINK_REMOVED, 1, position2, position3)
+        }, set(events))
+        self.assertTrue(events[0].is_in_time_point(1))
+
+    def test_connections(self):
+        connections = Connections()
+        events: List[ChangeEvent] = []
+        connections.add_change_listener(events.append)
+
+        position1 = Position(0, 0, 0, time_point_number=0)
+        position2 = Position(1, 0, 0, time_point_number=0)
+        connections.add_connection(position1, position2)
+        connections.remove_connections_of_position(position1)
+
+        self.assertEqual([
+            ChangeEvent(ChangeType.CONNECTION_ADDED, 0, position1, position2),
+            ChangeEvent(ChangeType.CONNECTION_REMOVED, 0, position1, position2)
+        ], events)
+
+    def test_beacons(self):
+        beacons = BeaconCollection()
+        events: List[ChangeEvent] = []
+        beacons.add_change_listener(events.append)
+
+        beacon = Position(0, 0, 0, time_point_number=1)
+        beacons.add(beacon)
+        beacons.move_in_time(1)
+
+        self.assertEqual([
+            ChangeEvent(ChangeType.BEACON_ADDED, 1, beacon),
+            ChangeEvent(ChangeType.ALL_CHANGED, None)
+        ], events)
+
+    def test_copy_has_no_listeners(self):
+        positions = PositionCollection()
+        events: List[ChangeEvent] = []
+        positions.add_change_listener(events.append)
+
+        positions.copy().add(Position(0, 0, 0, time_point_number=2))
+        self.assertEqual([], events)
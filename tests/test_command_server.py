@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import types
+import unittest
+from multiprocessing.connection import Client
+from typing import List
+
+from organoid_tracker.util import command_server
+from organoid_tracker.util.command_server import CommandServer
+
+
+def _wait_until(condition, timeout_s: float = 10):
+    end_time = time.perf_counter() + timeout_s
+    while not condition():
+        if time.perf_counter() > end_time:
+            raise TimeoutError()
+        time.sleep(0.01)
+
+
+class TestCommandServer(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._info_file = os.path.join(self._temp_dir.name, "server", "command_server.json")
+        with open(os.path.join(self._temp_dir.name, "organoid_tracker_exit_with.py"), "w") as handle:
+            handle.write("import sys\nprint('Exiting with', sys.argv[1])\nsys.exit(int(sys.argv[1]))\n")
+
+        self._release_job = threading.Event()
+        self._blocking_job_started = threading.Event()
+
+        def blocking_command(args: List[str]) -> int:
+            self._blocking_job_started.set()
+            self._release_job.wait(10)
+            return 0
+
+        self._server = CommandServer(self._temp_dir.name, {"block": blocking_command})
+        self._server_thread = threading.Thread(target=self._server.serve_forever, args=(self._info_file,), daemon=True)
+        self._server_thread.start()
+        _wait_until(lambda: os.path.exists(self._info_file))
+
+    def tearDown(self):
+        self._release_job.set()
+        if self._server_thread.is_alive():
+            command_server.submit_job(command_server.STOP_JOB_NAME, [], info_file=self._info_file)
+            self._server_thread.join(10)
+        self._temp_dir.cleanup()
+
+    def _submit_in_thread(self, name: str, args: List[str], exit_codes: List[int]) -> threading.Thread:
+        thread = threading.Thread(target=lambda: exit_codes.append(command_server.submit_job(
+            name, args, folder=self._temp_dir.name, info_file=self._info_file)), daemon=True)
+        thread.start()
+        return thread
+
+    def test_exit_codes(self):
+        self.assertEqual(3, command_server.submit_job("exit_with", ["3"], folder=self._temp_dir.name,
+                                                      info_file=self._info_file))
+        self.assertEqual(0, command_server.submit_job("exit_with", ["0"], folder=self._temp_dir.name,
+                                                      info_file=self._info_file))
+        self.assertEqual(1, command_server.submit_job("does_not_exist", [], folder=self._temp_dir.name,
+                                                      info_file=self._info_file))
+
+    def test_job_queue(self):
+        exit_codes = list()
+        blocking_thread = self._submit_in_thread("block", [], exit_codes)
+        self._blocking_job_started.wait(10)
+        waiting_thread = self._submit_in_thread("exit_with", ["5"], exit_codes)
+        _wait_until(lambda: self._server._job_queue.qsize() == 1)
+
+        # A third job must be told that one other job is waiting
+        with open(self._info_file, "r", encoding="utf-8") as handle:
+            server_info = json.load(handle)
+        connection = Client((server_info["host"], server_info["port"]),
+                            authkey=bytes.fromhex(server_info["password"]))
+        try:
+            connection.send({"name": "exit_with", "args": ["7"], "folder": self._temp_dir.name})
+            self.assertEqual(("queued", 1), connection.recv())
+
+            # Let the jobs finish, in order
+            self._release_job.set()
+            blocking_thread.join(10)
+            waiting_thread.join(10)
+            while True:
+                message_type, value = connection.recv()
+                if message_type == "exit":
+                    break
+        finally:
+            connection.close()
+        self.assertEqual([0, 5], exit_codes)
+        self.assertEqual(7, value)
+
+    def test_stop(self):
+        self.assertEqual(0, command_server.submit_job(command_server.STOP_JOB_NAME, [], info_file=self._info_file))
+        self._server_thread.join(10)
+        self.assertFalse(self._server_thread.is_alive())
+        self.assertFalse(os.path.exists(self._info_file))
+        with self.assertRaises(ConnectionError):
+            command_server.submit_job("exit_with", ["0"], info_file=self._info_file)
+
+
+class TestKeepLoadedModelsInMemory(unittest.TestCase):
+
+    def test_reuse_model(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder_1 = os.path.join(temp_dir, "model_1")
+            folder_2 = os.path.join(temp_dir, "model_2")
+            for folder in [folder_1, folder_2]:
+                os.makedirs(folder)
+                with open(os.path.join(folder, "model.keras"), "w") as handle:
+                    handle.write("Not a real model")
+
+            module = types.SimpleNamespace(load_model=lambda model_folder: object())
+            command_server.keep_loaded_models_in_memory(module, "load_model")
+
+            model_1 = module.load_model(folder_1)
+            self.assertIs(model_1, module.load_model(folder_1))
+            model_2 = module.load_model(folder_2)
+            self.assertIsNot(model_1, model_2)
+            self.assertIs(model_2, module.load_model(folder_2))
+
+            # Changing the model file loads the model again
+            model_file = os.path.join(folder_2, "model.keras")
+            stat = os.stat(model_file)
+            os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertIsNot(model_2, module.load_model(folder_2))
+
+            # Replacing the function twice has no effect
+            replaced_function = module.load_model
+            command_server.keep_loaded_models_in_memory(module, "load_model")
+            self.assertIs(replaced_function, module.load_model)
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy
+
+from organoid_tracker.core import bounding_box
+from organoid_tracker.core.images import Image
+from organoid_tracker.core.mask import Mask
+from organoid_tracker.core.position import Position
+from organoid_tracker.core.resolution import ImageResolution
+from organoid_tracker.imaging import ctc_io
+
+
+class TestCtcIo(unittest.TestCase):
+
+    def test_stamp_same_as_mask(self):
+        mask = Mask(bounding_box.ONE.expanded(3, 2, 1))
+        mask.add_from_function(lambda x, y, z: x ** 2 / 9 + y ** 2 / 4 + z ** 2 <= 1)
+        mask_offsets = ctc_io._get_mask_offsets_zyx(mask)
+        positions = [Position(1.5, 8.2, 0, time_point_number=0), Position(4, 5, 2.7, time_point_number=0),
+                     Position(5, 5, 3, time_point_number=0)]  # Last two overlap, and the first is at the edge
+
+        expected = Image(numpy.zeros((4, 10, 12), dtype=numpy.uint16))
+        for i, position in enumerate(positions):
+            mask.center_around(position)
+            mask.stamp_image(expected, i + 1)
+
+        actual = numpy.zeros((4, 10, 12), dtype=numpy.uint16)
+        centers_zyx = numpy.array([(int(p.z), int(p.y), int(p.x)) for p in positions], dtype=numpy.int64)
+        ctc_io._stamp(actual, centers_zyx, mask_offsets, numpy.array([1, 2, 3], dtype=numpy.uint16))
+
+        numpy.testing.assert_array_equal(expected.array, actual)
+
+    def test_local_watershed_same_as_full(self):
+        mask_array = numpy.zeros((3, 20, 30), dtype=bool)
+        mask_array[:, 2:8, 2:14] = True  # Two touching cells
+        mask_array[:, 12:18, 20:26] = True  # A separate cell
+        seed_array = numpy.zeros(mask_array.shape, dtype=numpy.uint16)
+        seed_array[1, 5, 4] = 1
+        seed_array[1, 5, 11] = 2
+        seed_array[1, 15, 23] = 3
+
+        full = ctc_io._watershed(mask_array, seed_array, (2, 0.5, 0.5))
+        local = ctc_io._watershed_locally(mask_array, seed_array, (2, 0.5, 0.5))
+
+        numpy.testing.assert_array_equal(full, local)
+        self.assertEqual({0, 1, 2, 3}, set(numpy.unique(local)))
+
+    def test_local_watershed_same_as_full_for_touching_cells(self):
+        resolution = ImageResolution(0.5, 0.5, 2, 1)
+        mask_offsets_zyx = ctc_io._get_mask_offsets_zyx(ctc_io._create_spherical_mask(5, resolution))
+        for random_seed in range(10):
+            random = numpy.random.default_rng(random_seed)
+            centers_zyx = numpy.column_stack([random.integers(0, size, 20) for size in (12, 60, 60)])
+            mask_array = numpy.zeros((12, 60, 60), dtype=bool)
+            ctc_io._stamp(mask_array, centers_zyx, mask_offsets_zyx, True)
+            seed_array = numpy.zeros(mask_array.shape, dtype=numpy.uint16)
+            ctc_io._stamp(seed_array, centers_zyx, numpy.zeros((1, 3), dtype=numpy.int64),
+                          numpy.arange(1, 21, dtype=numpy.uint16))
+
+            full = ctc_io._watershed(mask_array, seed_array, resolution.pixel_size_zyx_um)
+            local = ctc_io._watershed_locally(mask_array, seed_array, resolution.pixel_size_zyx_um)
+            numpy.testing.assert_array_equal(full, local)
+
+    def test_local_watershed_seedless_group(self):
+        mask_array = numpy.zeros((3, 20, 30), dtype=bool)
+        mask_array[:, 2:8, 2:8] = True
+        mask_array[:, 12:18, 20:26] = True  # No seed, so this one is filled from the other cell through the background
+        seed_array = numpy.zeros(mask_array.shape, dtype=numpy.uint16)
+        seed_array[1, 5, 4] = 1
+
+        local = ctc_io._watershed_locally(mask_array, seed_array, (2, 0.5, 0.5))
+        numpy.testing.assert_array_equal(ctc_io._watershed(mask_array, seed_array, (2, 0.5, 0.5)), local)
+        self.assertEqual(1, local[1, 15, 23])
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+from typing import Optional, Tuple
+
+import numpy
+from numpy import ndarray
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.image_loading.disk_cached_image_loader import DiskCachedImageLoader, DiskPlaneCache
+
+
+class _CountingImageLoader(ImageLoader):
+    """Image loader that pretends to read from the given file, and counts how many planes were decoded."""
+
+    _file_name: str
+    _array: ndarray  # Shape (t, z, y, x), single channel
+    decoded_planes: int
+    read_regions: int
+
+    def __init__(self, file_name: str, array: ndarray):
+        self._file_name = file_name
+        self._array = array
+        self.decoded_planes = 0
+        self.read_regions = 0
+
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        if image_channel.index_zero != 0 or not 0 <= time_point.time_point_number() < len(self._array):
+            return None
+        self.decoded_planes += self._array.shape[1]
+        return self._array[time_point.time_point_number()].copy()
+
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        array = self.get_3d_image_array(time_point, image_channel)
+        if array is None:
+            return None
+        self.decoded_planes -= array.shape[0] - 1  # We only count the plane we use
+        return array[image_z]
+
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        if image_channel.index_zero != 0 or not 0 <= time_point.time_point_number() < len(self._array):
+            return None
+        self.read_regions += 1
+        return self._array[time_point.time_point_number()][zyx_slice].copy()
+
+    def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
+        return self._array.shape[1:]
+
+    def first_time_point_number(self) -> Optional[int]:
+        return 0
+
+    def last_time_point_number(self) -> Optional[int]:
+        return len(self._array) - 1
+
+    def get_channel_count(self) -> int:
+        return 1
+
+    def serialize_to_config(self) -> Tuple[str, str]:
+        return self._file_name, "1"
+
+    def copy(self) -> "ImageLoader":
+        return _CountingImageLoader(self._file_name, self._array)
+
+
+class TestDiskCachedImageLoader(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._source_file = os.path.join(self._temp_dir.name, "images.lif")
+        with open(self._source_file, "wb") as handle:
+            handle.write(b"Not a real image file")
+        self._cache_folder = os.path.join(self._temp_dir.name, "cache")
+        self._array = numpy.random.default_rng(1).integers(0, 1000, size=(3, 4, 20, 30), dtype=numpy.uint16)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_reuse_between_sessions(self):
+        channel = ImageChannel(index_zero=0)
+        internal = _CountingImageLoader(self._source_file, self._array)
+        cache = DiskPlaneCache(self._cache_folder, max_size_bytes=100 * 1024 ** 2)
+        image_loader = DiskCachedImageLoader(internal, cache)
+
+        numpy.testing.assert_array_equal(self._array[1], image_loader.get_3d_image_array(TimePoint(1), channel))
+        numpy.testing.assert_array_equal(self._array[1, 2], image_loader.get_2d_image_array(TimePoint(1), channel, 2))
+        self.assertEqual(4, internal.decoded_planes)
+        self.assertEqual(1, cache.get_statistics().hits)
+
+        # Simulate a new session, with a new cache instance reading the same folder
+        internal = _CountingImageLoader(self._source_file, self._array)
+        cache = DiskPlaneCache(self._cache_folder, max_size_bytes=100 * 1024 ** 2)
+        image_loader = DiskCachedImageLoader(internal, cache)
+        numpy.testing.assert_array_equal(self._array[1], image_loader.get_3d_image_array(TimePoint(1), channel))
+        numpy.testing.assert_array_equal(self._array[1, 1:3, 5:10, 5:10], image_loader.get_3d_image_region(
+            TimePoint(1), channel, numpy.s_[1:3, 5:10, 5:10]))
+        self.assertEqual(0, internal.decoded_planes)
+        self.assertEqual(6, cache.get_statistics().hits)
+        self.assertEqual(0, cache.get_statistics().misses)
+
+        # Missing images are not cached
+        self.assertIsNone(image_loader.get_3d_image_array(TimePoint(5), channel))
+
+    def test_changed_source_file(self):
+        channel = ImageChannel(index_zero=0)
+        cache = DiskPlaneCache(self._cache_folder, max_size_bytes=100 * 1024 ** 2)
+        DiskCachedImageLoader(_CountingImageLoader(self._source_file, self._array), cache)\
+            .get_2d_image_array(TimePoint(0), channel, 0)
+
+        # Change the modification time of the source file, the cached plane may no longer be used
+        stat = os.stat(self._source_file)
+        os.utime(self._source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        changed_array = self._array + 1
+        internal = _CountingImageLoader(self._source_file, changed_array)
+        array = DiskCachedImageLoader(internal, cache).get_2d_image_array(TimePoint(0), channel, 0)
+        numpy.testing.assert_array_equal(changed_array[0, 0], array)
+        self.assertEqual(1, internal.decoded_planes)
+
+    def test_size_limit(self):
+        channel = ImageChannel(index_zero=0)
+        cache = DiskPlaneCache(self._cache_folder, max_size_bytes=2500)  # Room for about two planes
+        image_loader = DiskCachedImageLoader(_CountingImageLoader(self._source_file, self._array), cache)
+        for time_point_number in range(3):
+            image_loader.get_2d_image_array(TimePoint(time_point_number), channel, 0)
+        self.assertLessEqual(cache.get_statistics().size_bytes, 2500)
+
+        # The least recently used plane was removed
+        image_loader.get_2d_image_array(TimePoint(2), channel, 0)
+        image_loader.get_2d_image_array(TimePoint(0), channel, 0)
+        self.assertEqual(1, cache.get_statistics().hits)
+
+    def test_region_cache_miss(self):
+        channel = ImageChannel(index_zero=0)
+        internal = _CountingImageLoader(self._source_file, self._array)
+        cache = DiskPlaneCache(self._cache_folder, max_size_bytes=100 * 1024 ** 2)
+        image_loader = DiskCachedImageLoader(internal, cache)
+
+        # Planes that aren't cached are read as a region by the internal loader, instead of decoding full planes
+        region = numpy.s_[1:3, 5:10, 5:10]
+        numpy.testing.assert_array_equal(self._array[0][region],
+                                         image_loader.get_3d_image_region(TimePoint(0), channel, region))
+        self.assertEqual(1, internal.read_regions)
+        self.assertEqual(0, internal.decoded_planes)
+
+    def test_uncached(self):
+        internal = _CountingImageLoader(self._source_file, self._array)
+        cache = DiskPlaneCache(self._cache_folder, max_size_bytes=100 * 1024 ** 2)
+        self.assertIs(internal, DiskCachedImageLoader(internal, cache).uncached())
@@ -49,4 +49,22 @@ class TestGeffIO(TestCase):
             geff_io.save_data_file(experiment, file)
             experiment_reloaded = geff_io.load_data_file(file)
 
-        self.assertEqual(len(experiment.positions), len(experiment_reloaded.positions))
\ No newline at end of file
+        self.assertEqual(len(experiment.positions), len(experiment_reloaded.positions))
+        self.assertEqual({pos_b}, experiment_reloaded.links.find_futures(pos_a))
+        self.assertEqual("BAR", experiment_reloaded.positions.get_position_data(pos_x, "cell_type"))
+        self.assertEqual([4.5, 0.3], experiment_reloaded.positions.get_position_data(pos_x, "some_list"))
+        self.assertIsNone(experiment_reloaded.positions.get_position_data(pos_b, "some_intensity"))
+        self.assertEqual(True, experiment_reloaded.links.get_link_data(pos_a, pos_b, "some_link_data"))
+        self.assertIsNone(experiment_reloaded.links.get_link_data(pos_b, pos_c, "some_link_data"))
+
+    def test_geff_saving_chunked(self):
+        script_file_location = os.path.dirname(__file__)
+        experiment = geff_io.load_data_file(os.path.join(script_file_location, "resources", "Fluo-N3DH-CE 01_GT.geff"))
+
+        with TemporaryDirectory() as directory:
+            file = os.path.join(directory, "test.geff")
+            geff_io.save_data_file(experiment, file, chunk_size=1000, compressors=None)
+            experiment_reloaded = geff_io.load_data_file(file)
+
+        self.assertEqual(set(experiment.positions), set(experiment_reloaded.positions))
+        self.assertEqual(set(experiment.links.find_all_links()), set(experiment_reloaded.links.find_all_links()))
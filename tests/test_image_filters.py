@@ -0,0 +1,82 @@
+import unittest
+
+import numpy
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.image_filters import ImageFilters, PixelTransform
+from organoid_tracker.core.image_loader import ImageChannel
+from organoid_tracker.image_loading.builtin_image_filters import MultiplyPixelsFilter, ThresholdFilter, \
+    InterpolatedMinMaxFilter, IntensityPoint, create_min_max_filter
+
+_CHANNEL = ImageChannel(index_zero=0)
+
+
+class TestImageFilters(unittest.TestCase):
+
+    def test_combined_pixel_transforms(self):
+        values = numpy.linspace(-10, 300, num=500, dtype=numpy.float32)
+        transforms = [PixelTransform(20, 150, 2, -40), PixelTransform(-numpy.inf, 100, 1.5, 3),
+                      PixelTransform(0, 50, 0.5, 0), PixelTransform(200, 300, 1, 0)]
+
+        for first in transforms:
+            for second in transforms:
+                expected = values.copy()
+                first.apply(expected)
+                second.apply(expected)
+                actual = values.copy()
+                first.then(second).apply(actual)
+                numpy.testing.assert_allclose(expected, actual, atol=1e-3)
+
+    def test_filter(self):
+        array = numpy.arange(0, 200, dtype=numpy.uint8).reshape(2, 10, 10)
+        array_before = array.copy()
+        filters = ImageFilters()
+        filters.add_filter(_CHANNEL, create_min_max_filter(50, 150))
+        filters.add_filter(_CHANNEL, MultiplyPixelsFilter(2))
+        filters.add_filter(_CHANNEL, ThresholdFilter(0.5))
+
+        filtered = filters.filter(TimePoint(0), _CHANNEL, None, array)
+        self.assertEqual(numpy.uint8, filtered.dtype)
+        self.assertEqual(0, filtered[0, 0, 0])  # Below the minimum
+        self.assertEqual(0, filtered[0, 6, 0])  # 60 -> 25.5 -> 51, which is below the threshold of 255 / 2
+        self.assertEqual(204, filtered[0, 9, 0])  # 90 -> 102 -> 204, which is above it
+        self.assertEqual(255, filtered[1, 1, 0])  # 110 -> 153 -> 255 (as the multiplication is capped)
+        self.assertEqual(255, filtered[1, 9, 9])  # Above the maximum
+        numpy.testing.assert_array_equal(array_before, array)  # Input must not be modified
+
+        # No filters for other channels
+        self.assertIs(array, filters.filter(TimePoint(0), ImageChannel(index_zero=1), None, array))
+
+    def test_cache(self):
+        array = numpy.arange(0, 200, dtype=numpy.uint8).reshape(20, 10)
+        load_count = [0]
+
+        def load():
+            load_count[0] += 1
+            return array
+
+        filters = ImageFilters()
+        min_max_filter = InterpolatedMinMaxFilter({IntensityPoint(TimePoint(0), 0): (0, 100)})
+        filters.add_filter(_CHANNEL, min_max_filter)
+        first = filters.filter_cached(TimePoint(0), _CHANNEL, 3, load)
+        self.assertIs(first, filters.filter_cached(TimePoint(0), _CHANNEL, 3, load))
+        self.assertEqual(1, load_count[0])
+
+        # Other keys are not cached yet
+        filters.filter_cached(TimePoint(1), _CHANNEL, 3, load)
+        filters.filter_cached(TimePoint(0), _CHANNEL, None, load)
+        self.assertEqual(3, load_count[0])
+
+        # Changing a filter invalidates the cache
+        min_max_filter.set_point(IntensityPoint(TimePoint(0), 0), (0, 200))
+        second = filters.filter_cached(TimePoint(0), _CHANNEL, 3, load)
+        self.assertEqual(4, load_count[0])
+        self.assertEqual(255, first[10, 0])
+        self.assertEqual(128, second[10, 0])
+
+        # So does adding a filter, or clearing the cache
+        filters.add_filter(_CHANNEL, ThresholdFilter(0.9))
+        filters.filter_cached(TimePoint(0), _CHANNEL, 3, load)
+        filters.clear_cache()
+        filters.filter_cached(TimePoint(0), _CHANNEL, 3, load)
+        self.assertEqual(6, load_count[0])
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from typing import Optional, Tuple
+
+import numpy
+import tifffile
+from numpy import ndarray
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.core.images import Images
+from organoid_tracker.image_loading.builtin_image_filters import MultiplyPixelsFilter
+from organoid_tracker.image_loading.folder_image_loader import FolderImageLoader
+
+
+class _ArrayImageLoader(ImageLoader):
+    """Image loader for time points 0 and 1, using arrays in memory."""
+
+    def __init__(self, arrays):
+        self._arrays = arrays
+
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        return self._arrays.get(time_point.time_point_number())
+
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        array = self._arrays.get(time_point.time_point_number())
+        if array is None or image_z < 0 or image_z >= array.shape[0]:
+            return None
+        return array[image_z]
+
+    def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
+        return 10, 20, 30
+
+    def first_time_point_number(self) -> Optional[int]:
+        return min(self._arrays.keys())
+
+    def last_time_point_number(self) -> Optional[int]:
+        return max(self._arrays.keys())
+
+    def get_channel_count(self) -> int:
+        return 1
+
+    def serialize_to_config(self) -> Tuple[str, str]:
+        return "", ""
+
+    def copy(self) -> "ImageLoader":
+        return self
+
+
+def _create_array(seed: int) -> ndarray:
+    return numpy.random.default_rng(seed).integers(0, 255, size=(10, 20, 30), dtype=numpy.uint8)
+
+
+class TestImageRegion(unittest.TestCase):
+
+    def test_default_implementation(self):
+        array = _create_array(1)
+        image_loader = _ArrayImageLoader({0: array})
+        channel = ImageChannel(index_zero=0)
+
+        # Few z levels (loaded as 2D slices) and many z levels (loaded as 3D image)
+        numpy.testing.assert_array_equal(array[2:4, 5:8, 10:20], image_loader.get_3d_image_region(
+            TimePoint(0), channel, numpy.s_[2:4, 5:8, 10:20]))
+        numpy.testing.assert_array_equal(array[1:9, 5:8, 10:20], image_loader.get_3d_image_region(
+            TimePoint(0), channel, numpy.s_[1:9, 5:8, 10:20]))
+
+        # Parts outside the image are left out, just like in NumPy
+        self.assertEqual((2, 5, 30), image_loader.get_3d_image_region(
+            TimePoint(0), channel, numpy.s_[8:12, 15:25, :]).shape)
+
+        self.assertIsNone(image_loader.get_3d_image_region(TimePoint(1), channel, numpy.s_[2:4, 5:8, 10:20]))
+        with self.assertRaises(ValueError):
+            image_loader.get_3d_image_region(TimePoint(0), channel, numpy.s_[2:4:2, 5:8, 10:20])
+
+    def test_cached(self):
+        array = _create_array(2)
+        images = Images()
+        images.image_loader(_ArrayImageLoader({0: array}))
+        cached_loader = images._image_loader
+        channel = ImageChannel(index_zero=0)
+
+        numpy.testing.assert_array_equal(array[2:4, 5:8, 10:20], cached_loader.get_3d_image_region(
+            TimePoint(0), channel, numpy.s_[2:4, 5:8, 10:20]))  # Cache miss
+        cached_loader.get_3d_image_array(TimePoint(0), channel)
+        numpy.testing.assert_array_equal(array[2:4, 5:8, 10:20], cached_loader.get_3d_image_region(
+            TimePoint(0), channel, numpy.s_[2:4, 5:8, 10:20]))  # Cache hit
+
+    def test_images_with_filters(self):
+        array = _create_array(4)
+        images = Images()
+        images.image_loader(_ArrayImageLoader({0: array}))
+        channel = ImageChannel(index_zero=0)
+        numpy.testing.assert_array_equal(array[2:4, 5:8, 10:20], images.get_image_region(
+            TimePoint(0), channel, numpy.s_[2:4, 5:8, 10:20]))
+
+        # With a filter, the region must be cut out of the filtered image
+        images.filters.add_filter(channel, MultiplyPixelsFilter(2))
+        numpy.testing.assert_array_equal(images.get_image_stack(TimePoint(0), channel)[2:4, 5:8, 10:20],
+                                         images.get_image_region(TimePoint(0), channel, numpy.s_[2:4, 5:8, 10:20]))
+
+    def test_folder_tiff(self):
+        array = _create_array(3)
+        with tempfile.TemporaryDirectory() as folder:
+            tifffile.imwrite(os.path.join(folder, "image_t0.tif"), array)
+            image_loader = FolderImageLoader(folder, "image_t{time}.tif", 0, 0, 0, 0)
+
+            numpy.testing.assert_array_equal(array[2:4, 5:8, 10:20], image_loader.get_3d_image_region(
+                TimePoint(0), ImageChannel(index_zero=0), numpy.s_[2:4, 5:8, 10:20]))
+            numpy.testing.assert_array_equal(array[9:, :, 25:], image_loader.get_3d_image_region(
+                TimePoint(0), ImageChannel(index_zero=0), numpy.s_[9:15, :, 25:40]))
+
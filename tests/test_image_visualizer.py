@@ -0,0 +1,70 @@
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PySide6.QtWidgets import QApplication, QMainWindow, QLabel
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.position import Position
+from organoid_tracker.gui.gui_experiment import GuiExperiment
+from organoid_tracker.gui.window import Window
+from organoid_tracker.visualizer.standard_image_visualizer import StandardImageVisualizer
+
+
+class _AnnotatingVisualizer(StandardImageVisualizer):
+    """Adds a title, axis labels and some texts on every redraw, if enabled."""
+
+    annotate: bool = True
+
+    def _draw_extra(self):
+        if not self.annotate:
+            return
+        self._ax.set_title("Left title", loc="left")
+        self._ax.set_xlabel("x")
+        self._ax.set_ylabel("y")
+        self._ax.text(10, 10, "Axis text")
+        self._fig.text(0.5, 0.5, "Figure text")
+
+
+def _count_texts(texts, text: str) -> int:
+    return sum(1 for artist in texts if artist.get_text() == text)
+
+
+class TestImageVisualizer(unittest.TestCase):
+
+    def setUp(self):
+        self._app = QApplication.instance() or QApplication([])
+        self._fig = Figure()
+        FigureCanvasAgg(self._fig)
+        experiment = Experiment()
+        experiment.positions.add(Position(10, 20, 14, time_point=TimePoint(0)))
+        experiment.positions.add(Position(30, 20, 14, time_point=TimePoint(0)))
+        self._q_window = QMainWindow()
+        self._window = Window(self._q_window, self._fig, GuiExperiment(experiment), QLabel(), QLabel())
+
+    def test_redraw_removes_old_artists(self):
+        visualizer = _AnnotatingVisualizer(self._window)
+        visualizer.draw_view()
+        artist_count = len(visualizer._ax.get_children())
+
+        visualizer.draw_view()
+        self.assertEqual(artist_count, len(visualizer._ax.get_children()))
+        self.assertEqual(1, _count_texts(visualizer._ax.texts, "Axis text"))
+        self.assertEqual(["Figure text"], [text.get_text() for text in self._fig.texts])
+
+    def test_redraw_resets_titles_and_labels(self):
+        visualizer = _AnnotatingVisualizer(self._window)
+        visualizer.draw_view()
+
+        # Draw again without setting any titles or labels
+        visualizer.annotate = False
+        visualizer.draw_view()
+        self.assertEqual("", visualizer._ax.get_title(loc="left"))
+        self.assertEqual("", visualizer._ax.get_xlabel())
+        self.assertEqual("", visualizer._ax.get_ylabel())
+        self.assertEqual(0, len(self._fig.texts))
+        self.assertEqual(0, _count_texts(visualizer._ax.texts, "Axis text"))
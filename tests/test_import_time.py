@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Command-line tools and batch jobs should start quickly, so these modules must not import any of the slow libraries
+_SLOW_LIBRARIES = ["matplotlib", "scipy", "networkx", "skimage", "tifffile", "keras", "torch", "PySide6"]
+
+# Generous, so that slow test machines don't fail. Importing these modules normally takes about 0.15 seconds
+_IMPORT_TIME_BUDGET_SECONDS = 1.0
+
+_SCRIPT = """
+import sys, time
+start_time = time.perf_counter()
+import {module_name}
+print(time.perf_counter() - start_time)
+print(" ".join(["libraries:"] + [module for module in {slow_libraries} if module in sys.modules]))
+"""
+
+
+def _measure_import(module_name: str):
+    """Imports the module in a new Python process. Returns the import time in seconds, and the slow libraries that were
+    imported along with the module."""
+    repository_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = _SCRIPT.format(module_name=module_name, slow_libraries=repr(_SLOW_LIBRARIES))
+    result = subprocess.run([sys.executable, "-c", script], cwd=repository_folder, capture_output=True, text=True,
+                            check=True)
+    time_line, libraries_line = result.stdout.strip().splitlines()[-2:]
+    return float(time_line), libraries_line.split()[1:]
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_experiment_import(self):
+        import_time, slow_libraries = _measure_import("organoid_tracker.core.experiment")
+        self.assertEqual([], slow_libraries)
+        self.assertLess(import_time, _IMPORT_TIME_BUDGET_SECONDS)
+
+    def test_io_import(self):
+        import_time, slow_libraries = _measure_import("organoid_tracker.imaging.io")
+        self.assertEqual([], slow_libraries)
+        self.assertLess(import_time, _IMPORT_TIME_BUDGET_SECONDS)
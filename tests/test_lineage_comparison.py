@@ -94,3 +94,35 @@ class TestLinksComparison(unittest.TestCase):
         result = lineage_comparison.compare_links(ground_truth, scratch, max_distance_um=8)
         self.assertEqual(1, result.count_positions(lineage_comparison.LINEAGE_START_TRUE_POSITIVES))
         self.assertEqual(1, result.count_positions(lineage_comparison.LINEAGE_START_FALSE_NEGATIVES))
+
+    def test_detected_division(self):
+        # Create a cell division that is followed for one more time point: a1 -> [a2 -> a4, a3 -> a5]
+        a1 = Position(0, 0, 0, time_point_number=1)
+        a2 = Position(-5, 0, 0, time_point_number=2)
+        a3 = Position(5, 0, 0, time_point_number=2)
+        a4 = Position(-6, 0, 0, time_point_number=3)
+        a5 = Position(6, 0, 0, time_point_number=3)
+        ground_truth = _experiment(a1, a2, a3, a4, a5)
+        ground_truth.links.add_link(a1, a2)
+        ground_truth.links.add_link(a1, a3)
+        ground_truth.links.add_link(a2, a4)
+        ground_truth.links.add_link(a3, a5)
+
+        # Same division, but the daughters are added in a different order
+        b1 = Position(0, 0, 0, time_point_number=1)
+        b2 = Position(5, 0, 0, time_point_number=2)
+        b3 = Position(-5, 0, 0, time_point_number=2)
+        b4 = Position(6, 0, 0, time_point_number=3)
+        b5 = Position(-6, 0, 0, time_point_number=3)
+        scratch = _experiment(b1, b2, b3, b4, b5)
+        scratch.links.add_link(b1, b2)
+        scratch.links.add_link(b2, b4)
+        scratch.links.add_link(b1, b3)
+        scratch.links.add_link(b3, b5)
+
+        for workers in [1, 4]:
+            result = lineage_comparison.compare_links(ground_truth, scratch, max_distance_um=2, workers=workers)
+            self.assertEqual(1, result.count_positions(lineage_comparison.DIVISIONS_TRUE_POSITIVES))
+            self.assertEqual(2, result.count_positions(lineage_comparison.MOVEMENT_TRUE_POSITIVES))
+            self.assertEqual(0, result.count_positions(lineage_comparison.MOVEMENT_DISAGREEMENT))
+            self.assertEqual(2, result.count_positions(lineage_comparison.LINEAGE_END_TRUE_POSITIVES))
@@ -0,0 +1,73 @@
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib import pyplot
+
+from organoid_tracker.core.links import Links
+from organoid_tracker.core.position import Position
+from organoid_tracker.linking_analysis.lineage_drawing import LineageDrawing, LineageLayoutCache
+
+
+def _add_track(links: Links, x: float, time_point_count: int):
+    for t in range(time_point_count - 1):
+        links.add_link(Position(x, 0, 0, time_point_number=t), Position(x, 0, 0, time_point_number=t + 1))
+
+
+class TestLineageDrawing(unittest.TestCase):
+
+    def test_layout_reused_until_lineage_changes(self):
+        links = Links()
+        _add_track(links, 0, 5)
+        _add_track(links, 10, 5)
+        layout_cache = LineageLayoutCache()
+
+        drawing = LineageDrawing(links, layout_cache=layout_cache)
+        lines_before = {lineage: drawing._get_lineage_draw_data(lineage)[1] for lineage in drawing.starting_tracks}
+
+        # Add a division to the lineage at x=10
+        links.add_link(Position(10, 0, 0, time_point_number=4), Position(11, 0, 0, time_point_number=5))
+        links.add_link(Position(10, 0, 0, time_point_number=4), Position(12, 0, 0, time_point_number=5))
+
+        drawing = LineageDrawing(links, layout_cache=layout_cache)
+        for lineage in drawing.starting_tracks:
+            width, lines = drawing._get_lineage_draw_data(lineage)
+            if lineage.find_first_position().x == 0:
+                self.assertIs(lines_before[lineage], lines)  # Unchanged, so reused
+                self.assertEqual(1, width)
+            else:
+                self.assertIsNot(lines_before[lineage], lines)  # Recalculated
+                self.assertEqual(3, width)  # Two daughters, and the mother also reserves space
+
+    def test_watched_links_layout_recalculated_after_change(self):
+        links = Links()
+        _add_track(links, 0, 5)
+        layout_cache = LineageLayoutCache()
+        layout_cache.watch(links)
+
+        drawing = LineageDrawing(links, layout_cache=layout_cache)
+        lineage, = drawing.starting_tracks
+        _, lines_before = drawing._get_lineage_draw_data(lineage)
+        self.assertIs(lines_before, drawing._get_lineage_draw_data(lineage)[1])
+
+        # Add a division, which must be noticed even though the lineage is checked only after link changes
+        links.add_link(Position(0, 0, 0, time_point_number=4), Position(1, 0, 0, time_point_number=5))
+        links.add_link(Position(0, 0, 0, time_point_number=4), Position(2, 0, 0, time_point_number=5))
+        width, lines = drawing._get_lineage_draw_data(lineage)
+        self.assertIsNot(lines_before, lines)
+        self.assertEqual(3, width)
+
+    def test_only_visible_lineages_drawn(self):
+        links = Links()
+        for i in range(10):
+            _add_track(links, i, 5)
+
+        figure = pyplot.figure()
+        try:
+            ax = figure.gca()
+            width = LineageDrawing(links).draw_lineages_colored(ax, visible_x_range=(3.5, 4.5))
+            self.assertEqual(10, width)  # Width includes all lineages
+            self.assertEqual(1, len(ax.collections))
+            self.assertEqual(2, len(ax.collections[0].get_segments()))  # Only the lineages at x=3 and x=4
+        finally:
+            pyplot.close(figure)
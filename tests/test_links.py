@@ -181,3 +181,34 @@ class TestLinks(unittest.TestCase):
             Position(0, 1, 2, time_point_number=0), Position(3, 4, 5, time_point_number=1), "test1"))
         self.assertEqual("test1 value", links.get_link_data(
             Position(0, 1, 2, time_point_number=10), Position(3, 4, 5, time_point_number=11), "test1"))
+
+    def test_add_links_from_list(self):
+        # A track with a division, a merge and a duplicate link, given in random order
+        pos0 = Position(0, 0, 0, time_point_number=0)
+        pos1 = Position(0, 0, 0, time_point_number=1)
+        pos2a = Position(1, 0, 0, time_point_number=2)
+        pos2b = Position(2, 0, 0, time_point_number=2)
+        pos3 = Position(1, 0, 0, time_point_number=3)
+        pos4 = Position(1, 0, 0, time_point_number=4)
+        link_list = [(pos2a, pos3), (pos0, pos1), (pos1, pos2b), (pos3, pos4), (pos2b, pos3), (pos2a, pos1),
+                     (pos1, pos2a)]
+
+        links = Links()
+        links.add_links_from_list(link_list, {"test": [None, "foo", None, None, "bar", None, None]})
+        links.debug_sanity_check()
+
+        expected_links = Links()
+        for position1, position2 in link_list:
+            expected_links.add_link(position1, position2)
+        self.assertEqual(set(expected_links.find_all_links()), set(links.find_all_links()))
+        self.assertEqual(len(list(expected_links.find_all_tracks())), len(list(links.find_all_tracks())))
+        self.assertEqual({pos2a, pos2b}, links.find_futures(pos1))
+        self.assertEqual({pos2a, pos2b}, links.find_pasts(pos3))
+        self.assertEqual("foo", links.get_link_data(pos0, pos1, "test"))
+        self.assertEqual("bar", links.get_link_data(pos3, pos2b, "test"))
+
+        # Adding to existing links also works
+        pos5 = Position(1, 0, 0, time_point_number=5)
+        links.add_links_from_list([(pos4, pos5)])
+        links.debug_sanity_check()
+        self.assertEqual({pos5}, links.find_futures(pos4))
@@ -0,0 +1,56 @@
+import unittest
+
+from organoid_tracker.comparison import links_comparison
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.position import Position
+from organoid_tracker.core.resolution import ImageResolution
+
+
+def _experiment(*positions: Position) -> Experiment:
+    """Creates a testing experiment containing the given positions. Resolution is simply 1px = 1um"""
+    experiment = Experiment()
+    experiment.images.set_resolution(ImageResolution(1, 1, 1, 1))  # Set 1 px = 1 um for simplicity
+    for position in positions:
+        experiment.positions.add(position)
+    return experiment
+
+
+class TestLinksComparison(unittest.TestCase):
+
+    def test_compare_links(self):
+        # Ground truth: a1 -> a2 -> a3, and a separate a4 -> a5
+        a1 = Position(0, 0, 0, time_point_number=0)
+        a2 = Position(1, 0, 0, time_point_number=1)
+        a3 = Position(2, 0, 0, time_point_number=2)
+        a4 = Position(50, 0, 0, time_point_number=0)
+        a5 = Position(50, 0, 0, time_point_number=1)
+        ground_truth = _experiment(a1, a2, a3, a4, a5)
+        ground_truth.links.add_link(a1, a2)
+        ground_truth.links.add_link(a2, a3)
+        ground_truth.links.add_link(a4, a5)
+
+        # Scratch: b1 -> b2 is correct, b2 -> b3 goes to a position far away, and b4 -> b5 doesn't exist at all
+        b1 = Position(1, 0, 0, time_point_number=0)
+        b2 = Position(2, 0, 0, time_point_number=1)
+        b3 = Position(30, 0, 0, time_point_number=2)
+        b4 = Position(100, 0, 0, time_point_number=0)
+        b5 = Position(100, 0, 0, time_point_number=1)
+        scratch = _experiment(b1, b2, b3, b4, b5)
+        scratch.links.add_link(b1, b2)
+        scratch.links.add_link(b2, b3)
+        scratch.links.add_link(b4, b5)
+
+        result = links_comparison.compare_links(ground_truth, scratch, max_distance_um=5, margin_xy_px=-1)
+        self.assertEqual(1, result.count_positions(links_comparison.LINKS_TRUE_POSITIVES))
+        self.assertEqual(2, result.count_positions(links_comparison.LINKS_FALSE_NEGATIVES))  # a2 -> a3 and a4 -> a5
+        self.assertEqual(1, result.count_positions(links_comparison.LINKS_FALSE_POSITIVES))  # b2 -> b3
+        self.assertEqual(1, result.count_positions(links_comparison.REJECTED))  # b4 -> b5
+
+    def test_no_images(self):
+        a1 = Position(0, 0, 0, time_point_number=0)
+        a2 = Position(1, 0, 0, time_point_number=1)
+        ground_truth = _experiment(a1, a2)
+        ground_truth.links.add_link(a1, a2)
+
+        with self.assertRaises(ValueError):
+            links_comparison.compare_links(ground_truth, _experiment(), margin_xy_px=0)
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.image_loader import ImageChannel
+from organoid_tracker.core.images import Images
+from organoid_tracker.image_loading.array_image_loader import SingleImageLoader
+from organoid_tracker.image_loading.builtin_image_filters import MultiplyPixelsFilter
+from organoid_tracker.image_loading.builtin_merging_image_loaders import ChannelSummingImageLoader
+from organoid_tracker.image_loading.folder_image_loader import FolderImageLoader
+from organoid_tracker.neural_network import memmap_image_cache
+from organoid_tracker.neural_network.position_detection_cnn.training_data_creator import ImageWithPositions, \
+    create_image_cache
+
+
+def _create_image_with_positions(experiment_name: str, array: numpy.ndarray, file_name: str) -> ImageWithPositions:
+    images = Images()
+    images.image_loader(SingleImageLoader(array, file_name))
+    return ImageWithPositions(experiment_name, images, TimePoint(1), numpy.empty((0, 3), dtype=numpy.int32))
+
+
+class TestMemmapImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._cache_folder = os.path.join(self._temp_dir.name, "cache")
+        self._image_file = os.path.join(self._temp_dir.name, "image.tif")
+        with open(self._image_file, "wb") as handle:
+            handle.write(b"Not a real image file")
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_reuse_between_runs(self):
+        array = numpy.arange(3 * 4 * 5, dtype=numpy.int16).reshape(3, 4, 5)
+        create_image_cache([_create_image_with_positions("experiment", array, self._image_file)], self._cache_folder)
+
+        # In a new run, the image is read from the cache, even if the image loader now returns something else
+        image_with_positions = _create_image_with_positions("experiment", array + 1, self._image_file)
+        create_image_cache([image_with_positions], self._cache_folder)
+        numpy.testing.assert_array_equal(array, image_with_positions.load_image())
+
+    def test_changed_image_source(self):
+        array = numpy.arange(3 * 4 * 5, dtype=numpy.int16).reshape(3, 4, 5)
+        create_image_cache([_create_image_with_positions("experiment", array, self._image_file)], self._cache_folder)
+
+        # Another file with the same experiment name
+        other_file = os.path.join(self._temp_dir.name, "other_image.tif")
+        with open(other_file, "wb") as handle:
+            handle.write(b"Another image file")
+        image_with_positions = _create_image_with_positions("experiment", array + 1, other_file)
+        create_image_cache([image_with_positions], self._cache_folder)
+        numpy.testing.assert_array_equal(array + 1, image_with_positions.load_image())
+
+        # The same file, but modified
+        stat = os.stat(self._image_file)
+        os.utime(self._image_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        image_with_positions = _create_image_with_positions("experiment", array + 2, self._image_file)
+        create_image_cache([image_with_positions], self._cache_folder)
+        numpy.testing.assert_array_equal(array + 2, image_with_positions.load_image())
+
+    def test_changed_channels_and_filters(self):
+        array = numpy.arange(3 * 4 * 5, dtype=numpy.int16).reshape(3, 4, 5)
+        image_with_positions = _create_image_with_positions("experiment", array, self._image_file)
+        create_image_cache([image_with_positions], self._cache_folder)
+
+        # Image filters are applied to the cached images, so they must be part of the key
+        image_with_positions = _create_image_with_positions("experiment", array, self._image_file)
+        image_with_positions._images.filters.add_filter(ImageChannel(index_zero=0), MultiplyPixelsFilter(2))
+        create_image_cache([image_with_positions], self._cache_folder)
+        numpy.testing.assert_array_equal(image_with_positions._images.get_image_stack(TimePoint(1)),
+                                         image_with_positions.load_image())
+
+        # So is channel summing, even though serialize_to_config() doesn't show it
+        images = Images()
+        images.image_loader(SingleImageLoader(array, self._image_file))
+        summed_images = Images()
+        summed_images.image_loader(ChannelSummingImageLoader(SingleImageLoader(array, self._image_file),
+                                                             [[ImageChannel(index_one=1)]]))
+        self.assertNotEqual(memmap_image_cache.get_image_source_key("experiment", images),
+                            memmap_image_cache.get_image_source_key("experiment", summed_images))
+
+    def test_file_in_folder_overwritten(self):
+        image_folder = os.path.join(self._temp_dir.name, "images")
+        os.makedirs(image_folder)
+        for time_point_number in range(2):
+            with open(os.path.join(image_folder, f"image_t{time_point_number}.tif"), "wb") as handle:
+                handle.write(b"Not a real image file")
+        images = Images()
+        images.image_loader(FolderImageLoader(image_folder, "image_t{time}.tif", 0, 1, 1, 1))
+        key = memmap_image_cache.get_image_source_key("experiment", images)
+        self.assertEqual(key, memmap_image_cache.get_image_source_key("experiment", images))
+
+        # Overwriting a file doesn't change the modification time of the folder, but it must still change the key
+        image_file = os.path.join(image_folder, "image_t1.tif")
+        stat = os.stat(image_file)
+        folder_stat = os.stat(image_folder)
+        os.utime(image_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        os.utime(image_folder, ns=(folder_stat.st_atime_ns, folder_stat.st_mtime_ns))
+        self.assertNotEqual(key, memmap_image_cache.get_image_source_key("experiment", images))
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+import tifffile
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.image_loader import ImageChannel
+from organoid_tracker.image_loading import merged_tiff_image_loader
+
+
+class TestMergedTiffImageLoader(unittest.TestCase):
+
+    def test_memmap_and_tifffile_give_same_result(self):
+        array_tzcyx = numpy.random.default_rng(1).integers(0, 60000, size=(3, 7, 2, 20, 30), dtype=numpy.uint16)
+        with tempfile.TemporaryDirectory() as folder:
+            for file_name, compression in [("uncompressed.tif", None), ("compressed.tif", "zlib")]:
+                file = os.path.join(folder, file_name)
+                tifffile.imwrite(file, array_tzcyx, compression=compression, metadata={"axes": "TZCYX"})
+
+                experiment = Experiment()
+                merged_tiff_image_loader.load_from_tif_file(experiment, file)
+                image_loader = experiment.images.image_loader()
+                channel = ImageChannel(index_one=2)
+                numpy.testing.assert_array_equal(array_tzcyx[2, :, 1],
+                                                 image_loader.get_3d_image_array(TimePoint(2), channel))
+                numpy.testing.assert_array_equal(array_tzcyx[1, 4, 1],
+                                                 image_loader.get_2d_image_array(TimePoint(1), channel, 4))
+                numpy.testing.assert_array_equal(array_tzcyx[0, 2:5, 1, 5:15, 10:40], image_loader.get_3d_image_region(
+                    TimePoint(0), channel, numpy.s_[2:5, 5:15, 10:40]))
+                image_loader.close()
@@ -0,0 +1,124 @@
+import unittest
+from typing import Optional, Tuple, Dict, List
+
+import numpy
+from numpy import ndarray
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.image_loading.builtin_merging_image_loaders import ChannelSummingImageLoader, \
+    ChannelAppendingImageLoader, TimeAppendingImageLoader
+from organoid_tracker.util import bits
+
+
+class _ArrayImageLoader(ImageLoader):
+    """Image loader using arrays in memory. Arrays are indexed by time point, and have the shape (c, z, y, x)."""
+
+    _arrays: Dict[int, ndarray]
+    region_calls: List[Tuple[int, int]]  # Time point and channel index of every call to get_3d_image_region
+
+    def __init__(self, arrays: Dict[int, ndarray]):
+        self._arrays = arrays
+        self.region_calls = list()
+
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        array = self._arrays.get(time_point.time_point_number())
+        if array is None or image_channel.index_zero >= array.shape[0]:
+            return None
+        return array[image_channel.index_zero]
+
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        array = self.get_3d_image_array(time_point, image_channel)
+        if array is None or image_z < 0 or image_z >= array.shape[0]:
+            return None
+        return array[image_z]
+
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        self.region_calls.append((time_point.time_point_number(), image_channel.index_zero))
+        return super().get_3d_image_region(time_point, image_channel, zyx_slice)
+
+    def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
+        return next(iter(self._arrays.values())).shape[1:]
+
+    def first_time_point_number(self) -> Optional[int]:
+        return min(self._arrays.keys())
+
+    def last_time_point_number(self) -> Optional[int]:
+        return max(self._arrays.keys())
+
+    def get_channel_count(self) -> int:
+        return next(iter(self._arrays.values())).shape[0]
+
+    def serialize_to_config(self) -> Tuple[str, str]:
+        return "", ""
+
+    def copy(self) -> "ImageLoader":
+        return _ArrayImageLoader(self._arrays)
+
+
+def _create_array(seed: int, channel_count: int) -> ndarray:
+    return numpy.random.default_rng(seed).integers(0, 255, size=(channel_count, 4, 20, 30), dtype=numpy.uint8)
+
+
+class TestMergingImageLoaders(unittest.TestCase):
+
+    def test_channel_summing(self):
+        array = _create_array(1, 3)
+        array_before = array.copy()
+        channels = [ImageChannel(index_zero=i) for i in range(3)]
+        image_loader = ChannelSummingImageLoader(_ArrayImageLoader({0: array}), [channels, [channels[1]]])
+
+        expected = bits.add_and_return_8bit(bits.add_and_return_8bit(array[0].copy(), array[1].copy()),
+                                            array[2].copy())
+        numpy.testing.assert_array_equal(expected, image_loader.get_3d_image_array(TimePoint(0), channels[0]))
+        numpy.testing.assert_array_equal(expected[2], image_loader.get_2d_image_array(TimePoint(0), channels[0], 2))
+        numpy.testing.assert_array_equal(expected[1:3, 5:10, :], image_loader.get_3d_image_region(
+            TimePoint(0), channels[0], numpy.s_[1:3, 5:10, :]))
+
+        # A single channel is returned as-is
+        numpy.testing.assert_array_equal(array[1], image_loader.get_3d_image_array(TimePoint(0), channels[1]))
+        self.assertIsNone(image_loader.get_3d_image_array(TimePoint(0), ImageChannel(index_zero=2)))
+        self.assertIsNone(image_loader.get_3d_image_array(TimePoint(1), channels[0]))
+
+        # The original images must not be modified
+        numpy.testing.assert_array_equal(array_before, array)
+        image_loader.close()
+
+    def test_channel_appending(self):
+        array_1 = _create_array(2, 2)
+        array_2 = _create_array(3, 1)
+        loader_1 = _ArrayImageLoader({0: array_1})
+        loader_2 = _ArrayImageLoader({0: array_2})
+        image_loader = ChannelAppendingImageLoader([loader_1, loader_2])
+
+        self.assertEqual(3, image_loader.get_channel_count())
+        numpy.testing.assert_array_equal(array_1[1], image_loader.get_3d_image_array(
+            TimePoint(0), ImageChannel(index_zero=1)))
+        numpy.testing.assert_array_equal(array_2[0, 3], image_loader.get_2d_image_array(
+            TimePoint(0), ImageChannel(index_zero=2), 3))
+        self.assertIsNone(image_loader.get_3d_image_array(TimePoint(0), ImageChannel(index_zero=3)))
+
+        # Regions are passed on to the loader of that channel
+        numpy.testing.assert_array_equal(array_2[0, 1:2, 3:4, 5:6], image_loader.get_3d_image_region(
+            TimePoint(0), ImageChannel(index_zero=2), numpy.s_[1:2, 3:4, 5:6]))
+        self.assertEqual([], loader_1.region_calls)
+        self.assertEqual([(0, 0)], loader_2.region_calls)
+
+    def test_time_appending(self):
+        array_1 = _create_array(4, 1)
+        array_2 = _create_array(5, 1)
+        loader_1 = _ArrayImageLoader({0: array_1})
+        loader_2 = _ArrayImageLoader({3: array_2})
+        image_loader = TimeAppendingImageLoader([loader_1, loader_2])
+        channel = ImageChannel(index_zero=0)
+
+        self.assertEqual(1, image_loader.last_time_point_number())
+        numpy.testing.assert_array_equal(array_1[0], image_loader.get_3d_image_array(TimePoint(0), channel))
+        numpy.testing.assert_array_equal(array_2[0, 2], image_loader.get_2d_image_array(TimePoint(1), channel, 2))
+        self.assertIsNone(image_loader.get_3d_image_array(TimePoint(2), channel))
+
+        # Regions are passed on, using the time point of that loader
+        numpy.testing.assert_array_equal(array_2[0, 0:1, 3:4, 5:6], image_loader.get_3d_image_region(
+            TimePoint(1), channel, numpy.s_[0:1, 3:4, 5:6]))
+        self.assertEqual([(3, 0)], loader_2.region_calls)
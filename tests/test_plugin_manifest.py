@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from organoid_tracker.plugin import plugin_loader
+from organoid_tracker.plugin.plugin_manager import PluginManager
+
+_PLUGIN_CODE = """
+def get_menu_items(window):
+    return {"Tools//Test-Say hello": lambda: print("Hello")}
+
+def get_commands():
+    return {"test_command": lambda args: len(args)}
+"""
+
+
+class TestPluginManifest(unittest.TestCase):
+
+    def test_plugin_imported_when_command_is_used(self):
+        with tempfile.TemporaryDirectory() as folder:
+            plugin_folder = os.path.join(folder, "plugins_for_manifest_test")
+            os.makedirs(plugin_folder)
+            with open(os.path.join(plugin_folder, "plugin_lazy_test.py"), "w") as handle:
+                handle.write(_PLUGIN_CODE)
+            manifest_file = os.path.join(folder, "manifest.json")
+            module_name = "plugins_for_manifest_test.plugin_lazy_test"
+
+            # First time, the plugin needs to be imported to find out what it contains
+            plugin_manager = PluginManager(manifest_file)
+            plugin_manager.load_folder(plugin_folder)
+            plugin, = plugin_manager.get_plugins()
+            self.assertFalse(plugin_loader.is_lazy_and_not_imported(plugin))
+            plugin.get_menu_items(None)
+            plugin_manager.save_manifest_if_changed()
+            del sys.modules[module_name]
+
+            # Second time, the manifest is used
+            plugin_manager = PluginManager(manifest_file)
+            plugin_manager.load_folder(plugin_folder)
+            plugin, = plugin_manager.get_plugins()
+            self.assertTrue(plugin_loader.is_lazy_and_not_imported(plugin))
+            self.assertEqual(["Tools//Test-Say hello"], list(plugin.get_menu_items(None).keys()))
+            self.assertNotIn(module_name, sys.modules)
+
+            self.assertEqual(2, plugin.get_commands()["test_command"](["a", "b"]))
+            self.assertIn(module_name, sys.modules)
+            self.assertFalse(plugin_loader.is_lazy_and_not_imported(plugin))
+            del sys.modules[module_name]
@@ -1,5 +1,6 @@
 import unittest
 
+from organoid_tracker.core import TimePoint
 from organoid_tracker.core.position import Position
 from organoid_tracker.core.position_collection import PositionCollection
 
@@ -71,3 +72,25 @@ class TestPositionCollection(unittest.TestCase):
 
         self.assertEqual({"test_data_1": str, "test_data_2": str, "test_data_3": str},
                          positions_a.get_data_names_and_types())
+
+    def test_of_time_point_and_z(self):
+        positions = PositionCollection()
+        for z in [4.6, 2, 3.4, 8, 5.5, 1]:
+            positions.add(Position(0, 0, z, time_point_number=1))
+        positions.add(Position(0, 0, 3, time_point_number=2))
+
+        self.assertEqual([3.4, 4.6, 5.5], [position.z for position in
+                                           positions.of_time_point_and_z(TimePoint(1), z_min=3, z_max=6)])
+        self.assertEqual([1, 2, 3.4], [position.z for position in positions.of_time_point_and_z(TimePoint(1), z_max=3)])
+        self.assertEqual(1, positions.lowest_z())
+        self.assertEqual(8, positions.highest_z())
+
+        # Check that the index is updated after changes
+        positions.move_position(Position(0, 0, 8, time_point_number=1), Position(0, 0, 3.2, time_point_number=1))
+        positions.detach_position(Position(0, 0, 3.4, time_point_number=1))
+        positions.add(Position(0, 0, 2.9, time_point_number=1))
+        self.assertEqual([2.9, 3.2], [position.z for position in
+                                      positions.of_time_point_and_z(TimePoint(1), z_min=3, z_max=3)])
+        self.assertEqual(6, positions.highest_z())
+        self.assertEqual({Position(0, 0, 2.9, time_point_number=1), Position(0, 0, 3.2, time_point_number=1),
+                          Position(0, 0, 3, time_point_number=2)}, set(positions.nearby_z(3)))
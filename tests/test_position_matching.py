@@ -0,0 +1,91 @@
+import unittest
+
+import numpy
+
+from organoid_tracker.comparison import position_matching, positions_comparison
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.position import Position
+from organoid_tracker.core.resolution import ImageResolution
+
+
+def _experiment(*positions: Position) -> Experiment:
+    """Creates a testing experiment containing the given positions. Resolution is simply 1px = 1um"""
+    experiment = Experiment()
+    experiment.images.set_resolution(ImageResolution(1, 1, 1, 1))  # Set 1 px = 1 um for simplicity
+    for position in positions:
+        experiment.positions.add(position)
+    return experiment
+
+
+class TestPositionMatching(unittest.TestCase):
+
+    def test_maximizes_matches(self):
+        # a1 is closest to b2, but matching those two would leave both a2 and b1 unmatched
+        a1 = Position(0, 0, 0, time_point_number=0)
+        a2 = Position(4, 0, 0, time_point_number=0)
+        b1 = Position(-3, 0, 0, time_point_number=0)
+        b2 = Position(1, 0, 0, time_point_number=0)
+        matching = position_matching.match_positions(_experiment(a1, a2), _experiment(b1, b2), max_distance_um=4)
+
+        self.assertEqual(b1, matching.get_scratch_position(a1))
+        self.assertEqual(b2, matching.get_scratch_position(a2))
+        self.assertEqual(a2, matching.get_ground_truth_position(b2))
+
+    def test_minimizes_distance(self):
+        a1 = Position(0, 0, 0, time_point_number=0)
+        a2 = Position(10, 0, 0, time_point_number=0)
+        b1 = Position(9, 0, 0, time_point_number=0)
+        b2 = Position(2, 0, 0, time_point_number=0)
+        matching = position_matching.match_positions(_experiment(a1, a2), _experiment(b1, b2), max_distance_um=20)
+
+        self.assertEqual(b2, matching.get_scratch_position(a1))
+        self.assertEqual(b1, matching.get_scratch_position(a2))
+
+    def test_max_distance_and_time_points(self):
+        a1 = Position(0, 0, 0, time_point_number=0)
+        a2 = Position(0, 0, 0, time_point_number=1)
+        b1 = Position(6, 0, 0, time_point_number=0)
+        b2 = Position(0, 1, 0, time_point_number=1)
+        b3 = Position(0, 0, 0, time_point_number=2)
+        matching = position_matching.match_positions(_experiment(a1, a2), _experiment(b1, b2, b3), max_distance_um=5)
+
+        self.assertIsNone(matching.get_scratch_position(a1))
+        self.assertEqual(b2, matching.get_scratch_position(a2))
+        self.assertIsNone(matching.get_ground_truth_position(b3))
+        self.assertEqual([0, 1, 2], matching.time_point_numbers())
+        self.assertEqual(6, matching.of_time_point_number(0).ground_truth_nearest_distance_um[0])
+
+    def test_large_group(self):
+        # Every position is within reach of its neighbors, so this is one large group that's solved sparsely
+        ground_truth_positions = [Position(x, y, 0, time_point_number=0) for x in range(60) for y in range(90)]
+        scratch_positions = [Position(x + 0.3, y, 0, time_point_number=0) for x in range(60) for y in range(90)]
+        matching = position_matching.match_positions(_experiment(*ground_truth_positions),
+                                                      _experiment(*scratch_positions), max_distance_um=1.5)
+
+        for ground_truth_position, scratch_position in zip(ground_truth_positions, scratch_positions):
+            self.assertEqual(scratch_position, matching.get_scratch_position(ground_truth_position))
+
+    def test_sparse_maximizes_matches(self):
+        # Same situation as in test_maximizes_matches, but solved using the sparse solver
+        rows = numpy.array([0, 0, 1])
+        columns = numpy.array([0, 1, 1])
+        distances = numpy.array([3.0, 1.0, 3.0])
+        matched_rows, matched_columns = position_matching._solve_sparse_assignment(rows, columns, distances, 4)
+
+        self.assertEqual([0, 1], matched_rows.tolist())
+        self.assertEqual([0, 1], matched_columns.tolist())
+
+    def test_compare_positions(self):
+        a1 = Position(0, 0, 0, time_point_number=0)
+        a2 = Position(4, 0, 0, time_point_number=0)
+        a3 = Position(100, 0, 0, time_point_number=0)
+        b1 = Position(-3, 0, 0, time_point_number=0)
+        b2 = Position(1, 0, 0, time_point_number=0)
+        b3 = Position(50, 0, 0, time_point_number=0)
+        report = positions_comparison.compare_positions(_experiment(a1, a2, a3), _experiment(b1, b2, b3),
+                                                        max_distance_um=4, rejection_distance_um=20)
+
+        categories = {category.name: report.count_positions(category) for category in report.get_categories()}
+        self.assertEqual(2, categories["Found detections"])
+        self.assertEqual(1, categories["Missed detections"])
+        self.assertEqual(1, categories["Rejected detections"])
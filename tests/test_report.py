@@ -1,6 +1,13 @@
+import os
+import tempfile
+import time
 import unittest
 
+import numpy
+
+from organoid_tracker.comparison import report_json_io, report_csv_io
 from organoid_tracker.comparison.report import ComparisonReport, Category
+from organoid_tracker.core import TimePoint
 from organoid_tracker.core.position import Position
 
 
@@ -27,3 +34,115 @@ Other category: (1)
 -------------------
 * {Position(0, 0, 0, time_point_number=3)} - Last test
 """, str(report))
+
+    def test_duplicates_and_deletion(self):
+        category = Category("My category")
+        report = ComparisonReport()
+        report.add_data(category, Position(1, 2, 3, time_point_number=4), "First details")
+        report.add_data(category, Position(1, 2, 3, time_point_number=4))  # No details, so keeps the old details
+        report.add_data(category, Position(1, 2, 3, time_point_number=5))
+        self.assertEqual(2, report.count_positions(category))
+        self.assertEqual(1, report.count_positions(category, time_point=TimePoint(4)))
+        self.assertEqual("First details", str(next(iter(report.get_entries(category)))[1]))
+
+        report.add_data(category, Position(1, 2, 3, time_point_number=4), "Second details")
+        self.assertEqual(2, report.count_positions(category))
+        self.assertEqual("Second details", str(next(iter(report.get_entries(category)))[1]))
+
+        report.delete_data(category, Position(1, 2, 3, time_point_number=4))
+        self.assertEqual([Position(1, 2, 3, time_point_number=5)],
+                         list(report.get_positions(category, time_point=None)))
+
+    def test_nearby_duplicates(self):
+        # Positions at most 0.01 apart are the same, like in Position.__eq__
+        category = Category("My category")
+        report = ComparisonReport()
+        report.add_data(category, Position(0.004, 2, 3, time_point_number=4))
+        report.add_data(category, Position(0.006, 2, 3, time_point_number=4), "Details")
+        report.add_data(category, Position(0.02, 2, 3, time_point_number=4))
+        self.assertEqual([Position(0.004, 2, 3, time_point_number=4), Position(0.02, 2, 3, time_point_number=4)],
+                         list(report.get_positions(category, time_point=None)))
+        self.assertEqual("Details", str(next(iter(report.get_entries(category)))[1]))
+
+        report.delete_data(category, Position(0.015, 2, 3, time_point_number=4))
+        self.assertEqual([Position(0.004, 2, 3, time_point_number=4)],
+                         list(report.get_positions(category, time_point=None)))
+
+    def test_duplicates_same_as_position_equality(self):
+        random = numpy.random.default_rng(12)
+        category = Category("My category")
+        for _ in range(20):
+            report = ComparisonReport()
+            expected_positions = list()
+            for x, y, z, time_point_number in zip(numpy.round(random.uniform(0, 0.05, 40), 3).tolist(),
+                                                  random.choice([0, 0.005, 0.5], 40).tolist(),
+                                                  random.choice([0, 0.008, 0.016], 40).tolist(),
+                                                  random.integers(0, 2, 40).tolist()):
+                position = Position(x, y, z, time_point_number=time_point_number)
+                report.add_data(category, position)
+                if position not in expected_positions:
+                    expected_positions.append(position)
+            expected_positions.sort(key=lambda position: position.time_point_number())
+            self.assertEqual(expected_positions, list(report.get_positions(category, time_point=None)))
+
+    def test_duplicates_integer_coordinates_fast(self):
+        # Many positions share the same x coordinate, which must not make removing duplicates slow
+        x, y, z = numpy.meshgrid(numpy.arange(20), numpy.arange(200), numpy.arange(5))
+        xyzt = numpy.concatenate([numpy.column_stack([x.ravel(), y.ravel(), z.ravel(), numpy.full(x.size, t)])
+                                  for t in range(5)])
+        category = Category("My category")
+        report = ComparisonReport()
+        start_time = time.perf_counter()
+        report.add_entries(category, xyzt)
+        report.add_entries(category, xyzt[::2])
+        self.assertEqual(len(xyzt), report.count_positions(category))
+        self.assertLess(time.perf_counter() - start_time, 10)
+
+    def test_statistics(self):
+        true_positives = Category("True positives")
+        false_positives = Category("False positives")
+        false_negatives = Category("False negatives")
+        report = ComparisonReport()
+        report.add_data(true_positives, Position(0, 0, 0, time_point_number=2))
+        report.add_data(true_positives, Position(1, 0, 0, time_point_number=2))
+        report.add_data(true_positives, Position(0, 0, 2, time_point_number=3))
+        report.add_data(false_positives, Position(0, 0, 2, time_point_number=3))
+        report.add_data(false_negatives, Position(0, 0, 0, time_point_number=4))
+
+        statistics = report.calculate_time_statistics(true_positives, false_positives, false_negatives)
+        self.assertEqual([2, 3, 4], statistics.x_axis_numbers.tolist())
+        self.assertEqual([2, 1, 0], statistics.true_positives.tolist())
+        self.assertEqual([0, 1, 0], statistics.false_positives.tolist())
+        self.assertEqual([0, 0, 1], statistics.false_negatives.tolist())
+        self.assertAlmostEqual(3 / 4, statistics.precision_overall)
+
+        statistics = report.calculate_z_statistics(true_positives, false_positives, false_negatives)
+        self.assertEqual([0, 1, 2], statistics.x_axis_numbers.tolist())
+        self.assertEqual([2, 0, 1], statistics.true_positives.tolist())
+
+    def test_json_and_csv(self):
+        category = Category("My category")
+        other_category = Category("Other category")
+        report = ComparisonReport(max_distance_um=5)
+        report.title = "My title"
+        report.add_data(category, Position(1.5, 2, 3, time_point_number=4), "is linked to",
+                        Position(1, 2, 3, time_point_number=5))
+        report.add_data(category, Position(0, 0, 0, time_point_number=6))
+        report.add_data(other_category, Position(0, 0, 0, time_point_number=4))
+
+        with tempfile.TemporaryDirectory() as folder:
+            json_file = os.path.join(folder, "report.json")
+            report_json_io.save_report(report, json_file)
+            loaded = report_json_io.load_report(json_file)
+
+            csv_file = os.path.join(folder, "report.csv")
+            report_csv_io.save_report_time_statistics(loaded, csv_file)
+            with open(csv_file) as handle:
+                csv_contents = handle.read()
+
+        self.assertEqual(str(report), str(loaded))
+        self.assertEqual({"max_distance_um": 5}, dict(loaded.recorded_parameters()))
+        position, details = next(iter(loaded.get_entries(category)))
+        self.assertEqual(Position(1.5, 2, 3, time_point_number=4), position)
+        self.assertEqual(("is linked to", Position(1, 2, 3, time_point_number=5)), details.details)
+        self.assertEqual("Time point,My category,Other category\n4,1,1\n5,0,0\n6,1,0\n", csv_contents)
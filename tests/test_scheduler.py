@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+import unittest
+from typing import Any, List, Callable
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from organoid_tracker.gui.progress_bar import ProgressBar
+from organoid_tracker.gui.threading import Scheduler, Task
+
+
+class _RecordingTask(Task):
+    """Task that records what happened to it. compute() waits until the given event is set, if any."""
+
+    name: str
+    events: List[str]  # Shared between tasks
+    _priority: int
+    _allows_concurrency: bool
+    _release: threading.Event
+    started: threading.Event
+    gui_thread_callbacks: List[bool]  # For every callback, whether it was called on the GUI thread
+
+    def __init__(self, name: str, events: List[str], *, priority: int = Task.PRIORITY_NORMAL,
+                 allows_concurrency: bool = False, release: threading.Event = None):
+        self.name = name
+        self.events = events
+        self._priority = priority
+        self._allows_concurrency = allows_concurrency
+        self._release = release
+        self.started = threading.Event()
+        self.gui_thread_callbacks = list()
+
+    def compute(self) -> Any:
+        self.events.append("start " + self.name)
+        self.started.set()
+        if self._release is not None:
+            while not self._release.wait(0.01):
+                self.get_cancellation_token().raise_if_cancelled()
+        self.events.append("end " + self.name)
+        return self.name
+
+    def on_finished(self, result: Any):
+        self.gui_thread_callbacks.append(threading.current_thread() is threading.main_thread())
+        self.events.append("finished " + self.name)
+
+    def on_error(self, e: BaseException):
+        raise AssertionError("Unexpected error") from e
+
+    def on_cancelled(self):
+        self.gui_thread_callbacks.append(threading.current_thread() is threading.main_thread())
+        self.events.append("cancelled " + self.name)
+
+    def get_priority(self) -> int:
+        return self._priority
+
+    def allows_concurrency(self) -> bool:
+        return self._allows_concurrency
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self._app = QApplication.instance() or QApplication([])
+        self._scheduler = Scheduler(ProgressBar.NO_OP, worker_count=3)
+        self._events = list()
+        self._release = threading.Event()
+
+    def tearDown(self):
+        self._release.set()
+        self._scheduler.cancel_all_tasks()
+        self._wait_until(lambda: not self._scheduler.has_active_tasks())
+
+    def _wait_until(self, condition: Callable[[], bool]):
+        """Handles the finished tasks on this (the GUI) thread until the condition is met."""
+        end_time = time.perf_counter() + 10
+        while not condition():
+            if time.perf_counter() > end_time:
+                raise TimeoutError()
+            self._scheduler._check_for_results_on_gui_thread()
+            time.sleep(0.01)
+        self._scheduler._check_for_results_on_gui_thread()
+
+    def _add_blocking_task(self) -> _RecordingTask:
+        blocking_task = _RecordingTask("blocking", self._events, release=self._release)
+        self._scheduler.add_task(blocking_task)
+        blocking_task.started.wait(10)
+        return blocking_task
+
+    def test_priority_order(self):
+        self._add_blocking_task()
+        self._scheduler.add_task(_RecordingTask("background", self._events, priority=Task.PRIORITY_BACKGROUND))
+        self._scheduler.add_task(_RecordingTask("normal", self._events, priority=Task.PRIORITY_NORMAL))
+        self._scheduler.add_task(_RecordingTask("interactive", self._events, priority=Task.PRIORITY_INTERACTIVE))
+        time.sleep(0.1)
+        self.assertEqual(["start blocking"], self._events)  # The others are waiting for the blocking task
+
+        self._release.set()
+        self._wait_until(lambda: not self._scheduler.has_active_tasks())
+        started = [event for event in self._events if event.startswith("start")]
+        self.assertEqual(["start blocking", "start interactive", "start normal", "start background"], started)
+
+    def test_concurrency_is_opt_in(self):
+        self._add_blocking_task()
+
+        # A task that allows concurrency can run next to the blocking task
+        concurrent_task = _RecordingTask("concurrent", self._events, allows_concurrency=True)
+        self._scheduler.add_task(concurrent_task)
+        self._wait_until(lambda: "finished concurrent" in self._events)
+        self.assertNotIn("end blocking", self._events)
+
+        # Other tasks wait until the blocking task is done
+        self._scheduler.add_task(_RecordingTask("exclusive", self._events))
+        time.sleep(0.1)
+        self.assertNotIn("start exclusive", self._events)
+        self._release.set()
+        self._wait_until(lambda: "finished exclusive" in self._events)
+        self.assertLess(self._events.index("end blocking"), self._events.index("start exclusive"))
+
+    def test_cancel_queued_task(self):
+        self._add_blocking_task()
+        queued_task = _RecordingTask("queued", self._events)
+        self._scheduler.add_task(queued_task).cancel()
+        self._release.set()
+        self._wait_until(lambda: not self._scheduler.has_active_tasks())
+
+        self.assertIn("cancelled queued", self._events)
+        self.assertNotIn("start queued", self._events)
+        self.assertEqual([True], queued_task.gui_thread_callbacks)
+
+    def test_cancel_running_task(self):
+        running_task = self._add_blocking_task()
+        running_task.cancel()
+        self._wait_until(lambda: not self._scheduler.has_active_tasks())
+
+        self.assertEqual(["start blocking", "cancelled blocking"], self._events)
+        self.assertEqual([True], running_task.gui_thread_callbacks)
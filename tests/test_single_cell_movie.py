@@ -0,0 +1,90 @@
+import unittest
+from typing import Optional, Tuple, List
+
+import numpy
+from numpy import ndarray
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.image_loader import ImageLoader, ImageChannel
+from organoid_tracker.core.images import Images
+from organoid_tracker.core.position import Position
+from organoid_tracker.image_loading.builtin_image_filters import MultiplyPixelsFilter
+from organoid_tracker_plugins import plugin_single_cell_movie
+
+
+class _RegionRecordingImageLoader(ImageLoader):
+    """Image loader for a single time point, which records which regions were read."""
+
+    _array: ndarray
+    read_regions: List[Tuple[slice, slice, slice]]
+
+    def __init__(self, array: ndarray):
+        self._array = array
+        self.read_regions = list()
+
+    def get_3d_image_array(self, time_point: TimePoint, image_channel: ImageChannel) -> Optional[ndarray]:
+        return self._array if time_point.time_point_number() == 0 else None
+
+    def get_2d_image_array(self, time_point: TimePoint, image_channel: ImageChannel, image_z: int) -> Optional[ndarray]:
+        if time_point.time_point_number() != 0 or image_z < 0 or image_z >= len(self._array):
+            return None
+        return self._array[image_z]
+
+    def get_3d_image_region(self, time_point: TimePoint, image_channel: ImageChannel,
+                            zyx_slice: Tuple[slice, slice, slice]) -> Optional[ndarray]:
+        self.read_regions.append(zyx_slice)
+        return super().get_3d_image_region(time_point, image_channel, zyx_slice)
+
+    def get_image_size_zyx(self) -> Optional[Tuple[int, int, int]]:
+        return self._array.shape
+
+    def first_time_point_number(self) -> Optional[int]:
+        return 0
+
+    def last_time_point_number(self) -> Optional[int]:
+        return 0
+
+    def get_channel_count(self) -> int:
+        return 1
+
+    def serialize_to_config(self) -> Tuple[str, str]:
+        return "", ""
+
+    def copy(self) -> "ImageLoader":
+        return self
+
+
+def _expected_crop(image_2d: ndarray, min_x: int, min_y: int, size: int) -> ndarray:
+    padded = numpy.pad(image_2d, size)
+    return padded[min_y + size:min_y + 2 * size, min_x + size:min_x + 2 * size]
+
+
+class TestSingleCellMovie(unittest.TestCase):
+
+    def setUp(self):
+        self._array = numpy.random.default_rng(1).integers(1, 255, size=(4, 20, 30), dtype=numpy.uint8)
+        self._image_loader = _RegionRecordingImageLoader(self._array)
+        self._images = Images()
+        self._images.image_loader(self._image_loader)
+        self._channel = ImageChannel(index_zero=0)
+
+    def test_crop_reads_region(self):
+        # In the middle, and partly outside the image on all sides
+        for x, y in [(15, 10), (2, 3), (28, 18)]:
+            crop = plugin_single_cell_movie._load_crop(self._images, TimePoint(0), self._channel,
+                                                       Position(x, y, 2, time_point_number=0), 8)
+            numpy.testing.assert_array_equal(_expected_crop(self._array[2], x - 4, y - 4, 8), crop)
+        self.assertEqual(3, len(self._image_loader.read_regions))
+
+        # Outside the image in z
+        self.assertIsNone(plugin_single_cell_movie._load_crop(self._images, TimePoint(0), self._channel,
+                                                              Position(15, 10, 4, time_point_number=0), 8))
+
+    def test_crop_with_filter(self):
+        self._images.filters.add_filter(self._channel, MultiplyPixelsFilter(2))
+        crop = plugin_single_cell_movie._load_crop(self._images, TimePoint(0), self._channel,
+                                                   Position(2, 3, 1, time_point_number=0), 8)
+
+        filtered_2d = self._images.get_image_slice_2d(TimePoint(0), self._channel, 1)
+        numpy.testing.assert_array_equal(_expected_crop(filtered_2d, -2, -1, 8), crop)
+        self.assertEqual(0, len(self._image_loader.read_regions))
@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.position import Position
+from organoid_tracker.core.resolution import ImageResolution
+from organoid_tracker.imaging import trackmate_io
+
+
+class TestTrackMateIO(unittest.TestCase):
+
+    def test_save_and_load(self):
+        experiment = Experiment()
+        experiment.images.set_resolution(ImageResolution(0.32, 0.32, 2, 12))
+        position1 = Position(10, 20, 3, time_point_number=0)
+        position2 = Position(11, 20, 3, time_point_number=1)
+        position3 = Position(12, 21, 4, time_point_number=2)
+        position4 = Position(10, 19, 4, time_point_number=2)
+        experiment.links.add_link(position1, position2)
+        experiment.links.add_link(position2, position3)
+        experiment.links.add_link(position2, position4)
+        for position in [position1, position2, position3, position4]:
+            experiment.positions.add(position)
+
+        with tempfile.TemporaryDirectory() as folder:
+            file_name = os.path.join(folder, "tracks.xml")
+            trackmate_io.save_tracking_data(experiment, file_name)
+
+            loaded = trackmate_io.load_data_file(file_name, 0, 1000)
+            self.assertEqual({position1, position2, position3, position4}, set(loaded.positions))
+            self.assertEqual({position3, position4}, loaded.links.find_futures(position2))
+            self.assertEqual(2, loaded.images.resolution().pixel_size_z_um)
+
+            # Only load the first two time points
+            loaded = trackmate_io.load_data_file(file_name, 0, 1)
+            self.assertEqual({position1, position2}, set(loaded.positions))
+            self.assertEqual({position2}, loaded.links.find_futures(position1))
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy
+
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.gui.undo_redo import UndoRedo, UndoableAction, CompressedArray
+
+
+class _LargeAction(UndoableAction):
+
+    _size_bytes: int
+
+    def __init__(self, size_bytes: int):
+        self._size_bytes = size_bytes
+
+    def do(self, experiment: Experiment) -> str:
+        return "Done"
+
+    def undo(self, experiment: Experiment) -> str:
+        return "Undone"
+
+    def get_memory_usage_bytes(self) -> int:
+        return self._size_bytes
+
+
+class TestUndoRedo(unittest.TestCase):
+
+    def test_oldest_actions_removed_over_budget(self):
+        experiment = Experiment()
+        undo_redo = UndoRedo(memory_budget_bytes=2500)
+        for i in range(3):
+            undo_redo.do(_LargeAction(1000), experiment)
+
+        # Oldest action was removed
+        self.assertEqual(2000, undo_redo.get_memory_usage_bytes())
+        self.assertEqual("Undone", undo_redo.undo(experiment))
+        self.assertEqual("Undone", undo_redo.undo(experiment))
+        self.assertEqual("No more actions to undo.", undo_redo.undo(experiment))
+
+        # Actions can still be redone
+        self.assertEqual("Done", undo_redo.redo(experiment))
+        self.assertEqual(2000, undo_redo.get_memory_usage_bytes())
+
+    def test_most_recent_action_always_kept(self):
+        experiment = Experiment()
+        undo_redo = UndoRedo(memory_budget_bytes=100)
+        undo_redo.do(_LargeAction(1000), experiment)
+        undo_redo.do(_LargeAction(1000), experiment)
+
+        self.assertEqual(1000, undo_redo.get_memory_usage_bytes())
+        self.assertEqual("Undone", undo_redo.undo(experiment))
+
+    def test_compressed_array(self):
+        array = numpy.zeros((20, 30), dtype=numpy.uint16)
+        array[5:10, 3:8] = 4
+        compressed = CompressedArray(array)
+
+        self.assertLess(compressed.nbytes, array.nbytes)
+        self.assertEqual((20, 30), compressed.shape)
+        numpy.testing.assert_array_equal(array, compressed.to_array())
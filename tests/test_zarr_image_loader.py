@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+import zarr
+
+from organoid_tracker.core import TimePoint
+from organoid_tracker.core.experiment import Experiment
+from organoid_tracker.core.image_loader import ImageChannel
+from organoid_tracker.image_loading import zarr_image_loader
+from organoid_tracker.image_loading.zarr_image_loader import _ChunkCache
+
+
+def _write_ome_zarr(file_name: str, array_tczyx: numpy.ndarray):
+    """Writes an OME-Zarr 0.4 image with two resolution levels. The second level is downscaled in x and y."""
+    group = zarr.open_group(file_name, mode="w")
+    group.attrs["multiscales"] = [{
+        "version": "0.4",
+        "axes": [{"name": "t", "type": "time"}, {"name": "c", "type": "channel"}, {"name": "z", "type": "space"},
+                 {"name": "y", "type": "space"}, {"name": "x", "type": "space"}],
+        "datasets": [{"path": "0"}, {"path": "1"}]
+    }]
+    for path, array in [("0", array_tczyx), ("1", array_tczyx[..., ::2, ::2])]:
+        zarr_array = group.create_array(path, shape=array.shape, chunks=(1, 1, 2, 8, 8), dtype=array.dtype)
+        zarr_array[...] = array
+
+
+class TestZarrImageLoader(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._file_name = os.path.join(self._temp_dir.name, "image.zarr")
+        self._array_tczyx = numpy.random.default_rng(1).integers(0, 60000, size=(2, 2, 5, 20, 30),
+                                                                 dtype=numpy.uint16)
+        _write_ome_zarr(self._file_name, self._array_tczyx)
+
+        experiment = Experiment()
+        zarr_image_loader.load_from_zarr_file(experiment, self._file_name)
+        self._image_loader = experiment.images.image_loader()
+
+    def tearDown(self):
+        self._image_loader.close()
+        self._temp_dir.cleanup()
+
+    def test_full_image(self):
+        channel = ImageChannel(index_one=2)
+        self.assertEqual((5, 20, 30), self._image_loader.get_image_size_zyx())
+        numpy.testing.assert_array_equal(self._array_tczyx[1, 1],
+                                         self._image_loader.get_3d_image_array(TimePoint(1), channel))
+        numpy.testing.assert_array_equal(self._array_tczyx[0, 1, 3],
+                                         self._image_loader.get_2d_image_array(TimePoint(0), channel, 3))
+        self.assertIsNone(self._image_loader.get_3d_image_array(TimePoint(2), channel))
+
+    def test_resolution_levels(self):
+        channel = ImageChannel(index_one=1)
+        self.assertEqual(2, self._image_loader.get_resolution_level_count())
+        self.assertEqual((5, 10, 15), self._image_loader.get_image_size_zyx_at_level(1))
+        numpy.testing.assert_array_equal(self._array_tczyx[1, 0, :, ::2, ::2],
+                                         self._image_loader.get_3d_image_array_at_level(TimePoint(1), channel, 1))
+        numpy.testing.assert_array_equal(self._array_tczyx[1, 0, 4, ::2, ::2],
+                                         self._image_loader.get_2d_image_array_at_level(TimePoint(1), channel, 4, 1))
+        self.assertIsNone(self._image_loader.get_3d_image_array_at_level(TimePoint(1), channel, 2))
+
+    def test_region_across_chunk_borders(self):
+        # Chunks are 2x8x8 (zyx), so this region overlaps with 2x3x3 chunks. We read it twice, the second time the
+        # chunks come from the chunk cache
+        channel = ImageChannel(index_one=1)
+        region = numpy.s_[1:4, 5:19, 3:20]
+        for _ in range(2):
+            numpy.testing.assert_array_equal(self._array_tczyx[1, 0][region],
+                                             self._image_loader.get_3d_image_region(TimePoint(1), channel, region))
+
+    def test_region_outside_image(self):
+        # Like in NumPy, the part outside the image is left out
+        channel = ImageChannel(index_one=1)
+        region = numpy.s_[3:10, 15:40, 25:100]
+        array = self._image_loader.get_3d_image_region(TimePoint(0), channel, region)
+        self.assertEqual((2, 5, 5), array.shape)
+        numpy.testing.assert_array_equal(self._array_tczyx[0, 0][region], array)
+
+        # Region completely outside the image in y
+        array = self._image_loader.get_3d_image_region(TimePoint(0), channel, numpy.s_[0:5, 30:40, 0:5])
+        self.assertEqual((5, 0, 5), array.shape)
+
+
+class TestChunkCache(unittest.TestCase):
+
+    def test_least_recently_used_removed(self):
+        cache = _ChunkCache(max_size_bytes=400)  # Room for four chunks of 100 bytes
+        for i in range(4):
+            cache.put(("file", "0", (i,)), numpy.full(100, i, dtype=numpy.uint8))
+        cache.get(("file", "0", (0,)))  # Now chunk 1 is the least recently used one
+
+        cache.put(("file", "0", (4,)), numpy.full(100, 4, dtype=numpy.uint8))
+        self.assertIsNone(cache.get(("file", "0", (1,))))
+        for i in [0, 2, 3, 4]:
+            self.assertEqual(i, cache.get(("file", "0", (i,)))[0])
+
+    def test_remove_file(self):
+        cache = _ChunkCache(max_size_bytes=400)
+        cache.put(("file_a", "0", (0,)), numpy.zeros(100, dtype=numpy.uint8))
+        cache.put(("file_b", "0", (0,)), numpy.zeros(100, dtype=numpy.uint8))
+        cache.remove_file("file_a")
+
+        self.assertIsNone(cache.get(("file_a", "0", (0,))))
+        self.assertIsNotNone(cache.get(("file_b", "0", (0,))))
+
+        # The space of the removed chunk is available again, so adding three more chunks removes nothing
+        for i in range(1, 4):
+            cache.put(("file_b", "0", (i,)), numpy.zeros(100, dtype=numpy.uint8))
+        self.assertIsNotNone(cache.get(("file_b", "0", (0,))))